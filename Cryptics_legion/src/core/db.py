@@ -1,6 +1,14 @@
 # src/core/db.py
 import sqlite3
 import os
+import inspect
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import wraps
+
+from core import migrations, stats_cache
 
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -9,360 +17,507 @@ SRC_DIR = os.path.dirname(SCRIPT_DIR)
 DB_DIR = os.path.join(SRC_DIR, "database")
 DB_PATH = os.path.join(DB_DIR, "expense_tracker.db")
 
+# Maximum number of open connections per database file
+POOL_SIZE = 8
+# Seconds a thread waits for a free connection before giving up
+POOL_TIMEOUT = 30.0
+
+# Storage mode: "local" (desktop/mobile, single user) or "server" (shared
+# web deployment: WAL journal, tuned pragmas, one serialized writer thread)
+DB_MODE = os.getenv("CRYPTICS_DB_MODE", "local").strip().lower()
+
+# Pending writes allowed before callers block (server mode)
+WRITE_QUEUE_SIZE = 256
+# Most queued writes folded into one COMMIT (server mode)
+GROUP_COMMIT_MAX = 64
+
+_PRAGMAS = {
+    "local": [
+        "PRAGMA busy_timeout = 5000",
+    ],
+    "server": [
+        "PRAGMA busy_timeout = 10000",
+        "PRAGMA synchronous = NORMAL",     # safe with WAL, fsync only at checkpoints
+        "PRAGMA cache_size = -16000",      # ~16 MB page cache per connection
+        "PRAGMA mmap_size = 268435456",    # 256 MB memory-mapped reads
+        "PRAGMA temp_store = MEMORY",
+    ],
+}
+
+
+def is_server_mode() -> bool:
+    return DB_MODE == "server"
+
+
+def _open_connection(path: str, **kwargs):
+    """Open a connection with the pragmas for the current storage mode."""
+    conn = sqlite3.connect(path, check_same_thread=False, **kwargs)
+    for pragma in _PRAGMAS["server" if is_server_mode() else "local"]:
+        conn.execute(pragma)
+    return conn
 
-def connect_db():
-    os.makedirs(DB_DIR, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+# Database files whose schema has been brought up to date in this process
+_schema_ready = set()
+_schema_lock = threading.Lock()
 
-    # users table (password stored as BLOB)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password BLOB NOT NULL,
-        has_seen_onboarding INTEGER NOT NULL DEFAULT 0
-    )
-    """)
-
-    # Migration: Add has_seen_onboarding column if it doesn't exist
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN has_seen_onboarding INTEGER NOT NULL DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-
-    # Migration: Add personal details columns
-    personal_columns = [
-        ("full_name", "TEXT DEFAULT ''"),
-        ("first_name", "TEXT DEFAULT ''"),
-        ("last_name", "TEXT DEFAULT ''"),
-        ("email", "TEXT DEFAULT ''"),
-        ("phone", "TEXT DEFAULT ''"),
-        ("currency", "TEXT DEFAULT 'PHP'"),
-        ("timezone", "TEXT DEFAULT 'Asia/Manila'"),
-        ("first_day_of_week", "TEXT DEFAULT 'Monday'"),
-        ("photo", "TEXT DEFAULT ''"),
-    ]
-    for col_name, col_type in personal_columns:
+
+def ensure_schema():
+    """Create or upgrade the schema once per process (see core/migrations.py).
+
+    Call at startup. Later calls are a set lookup, so connect_db() can keep
+    calling it as a safety net without paying for any DDL.
+    """
+    path = DB_PATH
+    if path in _schema_ready:
+        return
+    with _schema_lock:
+        if path in _schema_ready:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path)
         try:
-            cursor.execute(f"ALTER TABLE users ADD COLUMN {col_name} {col_type}")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
+            if is_server_mode():
+                # Persistent per database file: readers no longer block the writer
+                conn.execute("PRAGMA journal_mode = WAL")
+            migrations.apply_migrations(conn)
+        finally:
+            conn.close()
+        _schema_ready.add(path)
 
-    # Migration: Add selected_account_id column to users table
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN selected_account_id INTEGER")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
 
-    # Migration: Add last_login column to users table
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN last_login TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+# ───── Connection pool ─────
 
-    # Migration: Add passcode column to users table
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN passcode TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    # Migration: Add biometric_enabled column to users table
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN biometric_enabled INTEGER DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+class ConnectionPool:
+    """Bounded pool of SQLite connections with per-thread affinity.
 
-    # expenses table (linked to users)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS expenses (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        amount REAL NOT NULL,
-        category TEXT NOT NULL,
-        description TEXT,
-        date TEXT NOT NULL,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )
-    """)
-
-    # accounts table (linked to users)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS accounts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        name TEXT NOT NULL,
-        account_number TEXT,
-        type TEXT NOT NULL,
-        balance REAL NOT NULL DEFAULT 0,
-        currency TEXT NOT NULL DEFAULT 'PHP',
-        color TEXT NOT NULL DEFAULT '#3B82F6',
-        is_primary INTEGER NOT NULL DEFAULT 0,
-        status TEXT NOT NULL DEFAULT 'active',
-        sort_order INTEGER NOT NULL DEFAULT 0,
-        created_at TEXT NOT NULL,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )
-    """)
-
-    # Migration: Add status and sort_order columns if they don't exist
-    try:
-        cursor.execute("ALTER TABLE accounts ADD COLUMN status TEXT NOT NULL DEFAULT 'active'")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    try:
-        cursor.execute("ALTER TABLE accounts ADD COLUMN sort_order INTEGER NOT NULL DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+    A thread keeps the same connection for the whole of a (possibly nested)
+    session() block and hands it back when the outermost block exits, so a
+    helper that calls other helpers shares one connection and transaction.
+    Flet event handlers and ReminderEngine threads all draw from the same
+    pool instead of opening and closing a connection per call.
+    """
 
-    # Migration: Add account_id column to expenses table
-    try:
-        cursor.execute("ALTER TABLE expenses ADD COLUMN account_id INTEGER")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+    def __init__(self, path: str, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _new_connection(self):
+        # Connections move between threads across checkouts, never during one
+        return _open_connection(self.path)
+
+    def depth(self) -> int:
+        """Nesting depth of the calling thread's current checkout (0 if none)."""
+        return getattr(self._local, "depth", 0)
+
+    def acquire(self):
+        """Check out this thread's connection, reusing it when already held."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            return held
 
-    # Migration: Add synced_to_qb column to expenses table for QB integration
-    try:
-        cursor.execute("ALTER TABLE expenses ADD COLUMN synced_to_qb INTEGER NOT NULL DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.max_size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    conn = self._new_connection()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError("Timed out waiting for a database connection")
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        """Return a checkout; the connection goes back to the pool at depth 0."""
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+
+        # Never hand out a connection with a half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+        else:
+            self._idle.put(conn)
+
+    def close_all(self):
+        """Close idle connections; checked-out ones are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
 
-    # OTP table for password reset
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS password_reset_otps (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        otp TEXT NOT NULL,
-        created_at TEXT NOT NULL,
-        is_used INTEGER NOT NULL DEFAULT 0,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )
-    """)
-
-    # Admin table for system administrators
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS admins (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password BLOB NOT NULL,
-        full_name TEXT DEFAULT '',
-        email TEXT DEFAULT '',
-        role TEXT DEFAULT 'admin',
-        created_at TEXT NOT NULL,
-        last_login TEXT,
-        is_active INTEGER NOT NULL DEFAULT 1
-    )
-    """)
-    
-    # Migration: Add admin profile fields
-    admin_profile_columns = [
-        ("job_title", "TEXT DEFAULT 'System Administrator'"),
-        ("department", "TEXT DEFAULT 'Admin user'"),
-        ("currency", "TEXT DEFAULT 'PHP'"),
-        ("reporting_manager", "TEXT DEFAULT 'None'"),
-        ("avatar", "TEXT DEFAULT ''"),
-    ]
-    for col_name, col_type in admin_profile_columns:
+
+# ───── Serialized writer (server mode) ─────
+
+# Set on the writer thread so session() uses the writer's connection there
+_thread_state = threading.local()
+
+
+class DatabaseWriter(threading.Thread):
+    """Single thread that owns every write to one database file.
+
+    Write helpers are queued as jobs on a bounded queue. The thread drains
+    whatever is waiting (up to GROUP_COMMIT_MAX jobs) into one transaction,
+    wrapping each job in a SAVEPOINT so a failing job is rolled back on its
+    own, and then commits the whole batch at once. Callers block until their
+    batch is committed, then get the job's return value or exception.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(name="db-writer", daemon=True)
+        self.path = path
+        self.jobs = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self.conn = None
+        self._savepoints = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) and wait for its committed result."""
+        future = Future()
+        try:
+            self.jobs.put((fn, args, kwargs, future), timeout=POOL_TIMEOUT)
+        except queue.Full:
+            raise sqlite3.OperationalError("Timed out waiting for the database write queue")
+        return future.result()
+
+    def stop(self):
+        self.jobs.put(None)
+        self.join()
+
+    @contextmanager
+    def savepoint(self):
+        """Yield a cursor inside a SAVEPOINT on the writer connection."""
+        self._savepoints += 1
+        name = f"sp_{self._savepoints}"
+        self.conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield self.conn.cursor()
+        except BaseException:
+            self.conn.execute(f"ROLLBACK TO {name}")
+            self.conn.execute(f"RELEASE {name}")
+            raise
+        else:
+            self.conn.execute(f"RELEASE {name}")
+        finally:
+            self._savepoints -= 1
+
+    def run(self):
+        # Autocommit mode: transactions are managed explicitly below
+        self.conn = _open_connection(self.path, isolation_level=None)
+        _thread_state.writer = self
+        running = True
+        while running:
+            job = self.jobs.get()
+            if job is None:
+                break
+            batch = [job]
+            while len(batch) < GROUP_COMMIT_MAX:
+                try:
+                    job = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    running = False
+                    break
+                batch.append(job)
+            self._run_batch(batch)
+        self.conn.close()
+
+    def _run_batch(self, batch):
+        outcomes = []
         try:
-            cursor.execute(f"ALTER TABLE admins ADD COLUMN {col_name} {col_type}")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
+            self.conn.execute("BEGIN IMMEDIATE")
+            for fn, args, kwargs, future in batch:
+                try:
+                    with self.savepoint():
+                        outcomes.append((future, fn(*args, **kwargs), None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+            self.conn.execute("COMMIT")
+        except Exception as e:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+            for _, _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer() -> DatabaseWriter:
+    """Get the writer thread for the current DB_PATH, starting it on first use."""
+    path = DB_PATH
+    writer = _writers.get(path)
+    if writer is None:
+        ensure_schema()
+        with _writers_lock:
+            writer = _writers.get(path)
+            if writer is None:
+                writer = DatabaseWriter(path)
+                writer.start()
+                _writers[path] = writer
+    return writer
+
+
+def serialized_write(fn):
+    """Run a write helper on the writer thread when in server mode.
+
+    In local mode, or when already on the writer thread (a write helper
+    calling another), the helper runs inline as before.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not is_server_mode() or getattr(_thread_state, "writer", None) is not None:
+            return fn(*args, **kwargs)
+        return get_writer().submit(fn, *args, **kwargs)
+    return wrapper
 
-    # Admin activity logs
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS admin_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        admin_id INTEGER NOT NULL,
-        action TEXT NOT NULL,
-        target_user_id INTEGER,
-        details TEXT,
-        timestamp TEXT NOT NULL,
-        FOREIGN KEY(admin_id) REFERENCES admins(id),
-        FOREIGN KEY(target_user_id) REFERENCES users(id)
-    )
-    """)
-
-    # Reminders table — user reminder preferences
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS reminders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        type TEXT NOT NULL,
-        enabled INTEGER NOT NULL DEFAULT 1,
-        time TEXT DEFAULT '20:00',
-        threshold REAL DEFAULT 20.0,
-        days_inactive INTEGER DEFAULT 3,
-        custom_message TEXT DEFAULT '',
-        last_triggered TEXT,
-        created_at TEXT NOT NULL,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )
-    """)
-
-    # Recurring expenses table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS recurring_expenses (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        name TEXT NOT NULL,
-        amount REAL NOT NULL,
-        category TEXT NOT NULL DEFAULT 'Other',
-        due_day INTEGER NOT NULL DEFAULT 1,
-        frequency TEXT NOT NULL DEFAULT 'monthly',
-        enabled INTEGER NOT NULL DEFAULT 1,
-        last_reminded TEXT,
-        created_at TEXT NOT NULL,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )
-    """)
-    # ── Gamification tables ──
-
-    # Daily streaks
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS user_streaks (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL UNIQUE,
-        current_streak INTEGER NOT NULL DEFAULT 0,
-        longest_streak INTEGER NOT NULL DEFAULT 0,
-        last_active_date TEXT,
-        streak_freezes INTEGER NOT NULL DEFAULT 1,
-        total_days_active INTEGER NOT NULL DEFAULT 0,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )
-    """)
-
-    # Unlocked badges
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS user_badges (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        badge_id TEXT NOT NULL,
-        unlocked_at TEXT NOT NULL,
-        seen INTEGER NOT NULL DEFAULT 0,
-        FOREIGN KEY(user_id) REFERENCES users(id),
-        UNIQUE(user_id, badge_id)
-    )
-    """)
-
-    # XP and levels
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS user_xp (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL UNIQUE,
-        total_xp INTEGER NOT NULL DEFAULT 0,
-        level INTEGER NOT NULL DEFAULT 1,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )
-    """)
-
-    # Weekly challenges
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS weekly_challenges (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        challenge_type TEXT NOT NULL,
-        target_value REAL NOT NULL,
-        current_value REAL NOT NULL DEFAULT 0,
-        xp_reward INTEGER NOT NULL DEFAULT 50,
-        week_start TEXT NOT NULL,
-        completed INTEGER NOT NULL DEFAULT 0,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )
-    """)
-
-    conn.commit()
-    return conn
 
+def invalidates_statistics(fn):
+    """Drop the user's cached statistics after an expense write.
 
-# ----- USER helpers (low-level) -----
-def insert_user(username: str, password_blob: bytes) -> bool:
-    conn = connect_db()
-    cur = conn.cursor()
+    Applied outside serialized_write, so in server mode the cache is
+    cleared once the writer's batch has committed. Change listeners are
+    then told the user's "expenses" changed.
+    """
+    user_index = list(inspect.signature(fn).parameters).index("user_id")
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        user_id = kwargs["user_id"] if "user_id" in kwargs else args[user_index]
+        stats_cache.invalidate_user(user_id)
+        _notify_change("expenses", user_id)
+        return result
+    return wrapper
+
+
+# Callbacks run as fn(kind, user_id) after a committed write to a user's
+# expenses, accounts, reminders or recurring_expenses
+_change_listeners = []
+
+
+def add_change_listener(fn):
+    if fn not in _change_listeners:
+        _change_listeners.append(fn)
+
+
+def remove_change_listener(fn):
+    if fn in _change_listeners:
+        _change_listeners.remove(fn)
+
+
+def _notify_change(kind: str, user_id: int):
+    for listener in list(_change_listeners):
+        try:
+            listener(kind, user_id)
+        except Exception as e:
+            print(f"[DB] Change listener error: {e}")
+
+
+def notifies_change(kind: str):
+    """Tell change listeners about a write to one user's `kind` data.
+
+    Like invalidates_statistics, applied outside serialized_write so
+    listeners run after the commit.
+    """
+    def decorate(fn):
+        user_index = list(inspect.signature(fn).parameters).index("user_id")
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            result = fn(*args, **kwargs)
+            _notify_change(kind, kwargs["user_id"] if "user_id" in kwargs else args[user_index])
+            return result
+        return wrapper
+    return decorate
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Get the connection pool for the current DB_PATH, creating it on first use."""
+    path = DB_PATH
+    pool = _pools.get(path)
+    if pool is None:
+        ensure_schema()
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = ConnectionPool(path)
+                _pools[path] = pool
+    return pool
+
+
+def close_pools():
+    """Stop writer threads and close every pooled connection (call on shutdown)."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.stop()
+
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+    # Cached statistics describe the databases just closed
+    stats_cache.get_stats_cache().clear()
+
+
+@contextmanager
+def session():
+    """Yield a cursor on this thread's pooled connection.
+
+    Usage:
+        with db.session() as cur:
+            cur.execute(...)
+
+    Nested blocks on the same thread share one connection and transaction.
+    The outermost block commits on success, rolls back on error, and
+    releases the connection back to the pool. On the writer thread the
+    block is a SAVEPOINT in the writer's batch transaction instead.
+    """
+    writer = getattr(_thread_state, "writer", None)
+    if writer is not None:
+        with writer.savepoint() as cur:
+            yield cur
+        return
+
+    pool = get_pool()
+    conn = pool.acquire()
+    outermost = pool.depth() == 1
     try:
-        cur.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password_blob))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
+        yield conn.cursor()
+        if outermost and conn.in_transaction:
+            conn.commit()
+    except BaseException:
+        if outermost and conn.in_transaction:
+            conn.rollback()
+        raise
     finally:
-        conn.close()
+        pool.release(conn)
+
+
+def connect_db():
+    """Open a standalone connection that the caller must close.
+
+    Kept for one-off scripts; application code should use session().
+    """
+    ensure_schema()
+    return sqlite3.connect(DB_PATH)
+
+
+# ----- USER helpers (low-level) -----
+@serialized_write
+def insert_user(username: str, password_blob: bytes) -> bool:
+    with session() as cur:
+        try:
+            cur.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password_blob))
+            return True
+        except sqlite3.IntegrityError:
+            return False
 
 
 def get_user_by_username(username: str):
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id, password FROM users WHERE username = ?", (username,))
-    row = cur.fetchone()
-    conn.close()
-    return row  # (id, password_blob) or None
+    with session() as cur:
+        cur.execute("SELECT id, password FROM users WHERE username = ?", (username,))
+        return cur.fetchone()  # (id, password_blob) or None
 
 
+@serialized_write
 def update_last_login(user_id: int):
     """Update the last login timestamp for a user."""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("UPDATE users SET last_login = ? WHERE id = ?", 
-                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user_id))
-    conn.commit()
-    conn.close()
+    with session() as cur:
+        cur.execute("UPDATE users SET last_login = ? WHERE id = ?",
+                    (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user_id))
 
 
 def get_recent_usernames(limit: int = 3):
     """Get the most recently logged in usernames."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT username FROM users 
-        WHERE last_login IS NOT NULL 
-        ORDER BY last_login DESC 
-        LIMIT ?
-    """, (limit,))
-    rows = cur.fetchall()
-    conn.close()
+    with session() as cur:
+        cur.execute("""
+            SELECT username FROM users
+            WHERE last_login IS NOT NULL
+            ORDER BY last_login DESC
+            LIMIT ?
+        """, (limit,))
+        rows = cur.fetchall()
     return [row[0] for row in rows]
 
 
+@serialized_write
 def update_username(user_id: int, new_username: str) -> tuple:
     """Update the username for a user. Returns (success, error_message)."""
     if not new_username or len(new_username.strip()) < 3:
         return (False, "Username must be at least 3 characters")
-    
+
     new_username = new_username.strip()
-    
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    # Check if username already exists (for another user)
-    cur.execute("SELECT id FROM users WHERE username = ? AND id != ?", (new_username, user_id))
-    existing = cur.fetchone()
-    if existing:
-        conn.close()
-        return (False, "Username already taken")
-    
+
     try:
-        cur.execute("UPDATE users SET username = ? WHERE id = ?", (new_username, user_id))
-        conn.commit()
-        conn.close()
+        with session() as cur:
+            # Check if username already exists (for another user)
+            cur.execute("SELECT id FROM users WHERE username = ? AND id != ?", (new_username, user_id))
+            if cur.fetchone():
+                return (False, "Username already taken")
+
+            cur.execute("UPDATE users SET username = ? WHERE id = ?", (new_username, user_id))
         return (True, None)
     except Exception as e:
-        conn.close()
         return (False, str(e))
 
 
 def get_user_profile(user_id: int) -> dict:
     """Get user profile including personal details."""
     import json
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, username, full_name, first_name, last_name, email, phone, currency, 
-               timezone, first_day_of_week, photo
-        FROM users WHERE id = ?
-    """, (user_id,))
-    row = cur.fetchone()
-    conn.close()
+    with session() as cur:
+        cur.execute("""
+            SELECT id, username, full_name, first_name, last_name, email, phone, currency,
+                   timezone, first_day_of_week, photo
+            FROM users WHERE id = ?
+        """, (user_id,))
+        row = cur.fetchone()
     if row:
         # Parse photo JSON
         photo_data = None
@@ -371,12 +526,12 @@ def get_user_profile(user_id: int) -> dict:
                 photo_data = json.loads(row[10])
             except:
                 photo_data = None
-        
+
         # Get first and last name, with fallback from full_name if not explicitly set
         first_name = (row[3] or "").strip()
         last_name = (row[4] or "").strip()
         full_name = (row[2] or "").strip()
-        
+
         # If first_name or last_name are empty, try to extract from full_name
         if not first_name or not last_name:
             if full_name:
@@ -385,7 +540,7 @@ def get_user_profile(user_id: int) -> dict:
                     first_name = full_name_parts[0]
                 if not last_name:
                     last_name = full_name_parts[1] if len(full_name_parts) > 1 else full_name_parts[0]
-        
+
         return {
             "id": row[0],
             "username": row[1],
@@ -402,301 +557,473 @@ def get_user_profile(user_id: int) -> dict:
     return None
 
 
+@serialized_write
 def save_personal_details(user_id: int, details: dict) -> bool:
     """Save personal details for a user."""
     import json
-    conn = connect_db()
-    cur = conn.cursor()
     try:
         # Convert photo dict to JSON string for storage
         photo_data = details.get("photo")
         photo_json = json.dumps(photo_data) if photo_data else ""
-        
-        cur.execute("""
-            UPDATE users SET 
-                full_name = ?,
-                first_name = ?,
-                last_name = ?,
-                email = ?,
-                phone = ?,
-                currency = ?,
-                timezone = ?,
-                first_day_of_week = ?,
-                photo = ?
-            WHERE id = ?
-        """, (
-            (details.get("full_name", "") or "").strip(),
-            (details.get("first_name", "") or "").strip(),
-            (details.get("last_name", "") or "").strip(),
-            (details.get("email", "") or "").strip(),
-            (details.get("phone", "") or "").strip(),
-            details.get("currency", "PHP"),
-            details.get("timezone", "Asia/Manila"),
-            details.get("first_day", "Monday"),
-            photo_json,
-            user_id
-        ))
-        conn.commit()
-        return cur.rowcount > 0
+
+        with session() as cur:
+            cur.execute("""
+                UPDATE users SET
+                    full_name = ?,
+                    first_name = ?,
+                    last_name = ?,
+                    email = ?,
+                    phone = ?,
+                    currency = ?,
+                    timezone = ?,
+                    first_day_of_week = ?,
+                    photo = ?
+                WHERE id = ?
+            """, (
+                (details.get("full_name", "") or "").strip(),
+                (details.get("first_name", "") or "").strip(),
+                (details.get("last_name", "") or "").strip(),
+                (details.get("email", "") or "").strip(),
+                (details.get("phone", "") or "").strip(),
+                details.get("currency", "PHP"),
+                details.get("timezone", "Asia/Manila"),
+                details.get("first_day", "Monday"),
+                photo_json,
+                user_id
+            ))
+            return cur.rowcount > 0
     except Exception as e:
         print(f"Error saving personal details: {e}")
         return False
-    finally:
-        conn.close()
 
 
 def has_user_seen_onboarding(user_id: int) -> bool:
     """Check if user has already seen the onboarding screen."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT has_seen_onboarding FROM users WHERE id = ?", (user_id,))
-    row = cur.fetchone()
-    conn.close()
+    with session() as cur:
+        cur.execute("SELECT has_seen_onboarding FROM users WHERE id = ?", (user_id,))
+        row = cur.fetchone()
     return bool(row[0]) if row else False
 
 
+@serialized_write
 def mark_onboarding_seen(user_id: int) -> bool:
     """Mark that user has seen the onboarding screen."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("UPDATE users SET has_seen_onboarding = 1 WHERE id = ?", (user_id,))
-    conn.commit()
-    updated = cur.rowcount
-    conn.close()
-    return updated > 0
+    with session() as cur:
+        cur.execute("UPDATE users SET has_seen_onboarding = 1 WHERE id = ?", (user_id,))
+        return cur.rowcount > 0
+
+
+@invalidates_statistics
+@serialized_write
+def delete_user_data(user_id: int):
+    """Permanently delete a user's account and all their data (user action)."""
+    with session() as cur:
+        cur.execute("DELETE FROM expenses WHERE user_id = ?", (user_id,))
+        cur.execute("DELETE FROM accounts WHERE user_id = ?", (user_id,))
+        cur.execute("DELETE FROM password_reset_otps WHERE user_id = ?", (user_id,))
+        cur.execute("DELETE FROM user_notifications WHERE user_id = ?", (user_id,))
+        cur.execute("DELETE FROM users WHERE id = ?", (user_id,))
 
 
 # ----- EXPENSE CRUD (low-level) -----
-def insert_expense(user_id: int, amount: float, category: str, description: str, date_str: str, account_id: int = None):
-    """Insert an expense and deduct the amount from the linked account balance."""
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    # Insert the expense with account_id
-    cur.execute(
-        "INSERT INTO expenses (user_id, amount, category, description, date, account_id) VALUES (?, ?, ?, ?, ?, ?)",
-        (user_id, amount, category, description, date_str, account_id),
-    )
-    expense_id = cur.lastrowid
-    
-    # Deduct amount from account balance if account_id is provided
-    if account_id:
+@invalidates_statistics
+@serialized_write
+def insert_expense(user_id: int, amount: float, category: str, description: str, date_str: str, account_id: int = None,
+                   original_amount: float = None, original_currency: str = None, rate: float = None):
+    """Insert an expense and deduct the amount from the linked account balance.
+
+    For an expense entered in another currency, `amount` is the converted
+    amount and original_amount/original_currency/rate record the entry and
+    the rate used (1 original_currency = rate account currency).
+    """
+    with session() as cur:
+        # Insert the expense with account_id
         cur.execute(
-            "UPDATE accounts SET balance = balance - ? WHERE id = ? AND user_id = ?",
-            (amount, account_id, user_id),
+            "INSERT INTO expenses (user_id, amount, category, description, date, account_id, "
+            "original_amount, original_currency, rate) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (user_id, amount, category, description, date_str, account_id, original_amount, original_currency, rate),
         )
-    
-    conn.commit()
-    conn.close()
+        expense_id = cur.lastrowid
+
+        # Deduct amount from account balance if account_id is provided
+        if account_id:
+            cur.execute(
+                "UPDATE accounts SET balance = balance - ? WHERE id = ? AND user_id = ?",
+                (amount, account_id, user_id),
+            )
     return expense_id
 
 
 def select_expenses_by_user(user_id: int, account_id: int = None):
     """Get expenses for a user, optionally filtered by account."""
-    conn = connect_db()
-    cur = conn.cursor()
-    
+    with session() as cur:
+        if account_id:
+            cur.execute(
+                "SELECT id, user_id, amount, category, description, date, account_id FROM expenses WHERE user_id = ? AND account_id = ? ORDER BY date DESC",
+                (user_id, account_id),
+            )
+        else:
+            cur.execute(
+                "SELECT id, user_id, amount, category, description, date, account_id FROM expenses WHERE user_id = ? ORDER BY date DESC",
+                (user_id,),
+            )
+        return cur.fetchall()
+
+
+# Expense columns in select_expenses_by_user() order, followed by the
+# linked account's name, currency and color (NULL without an account) and
+# the expense's original amount, currency and conversion rate (NULL unless
+# it was entered in another currency)
+_EXPENSE_WITH_ACCOUNT_SQL = """
+    SELECT e.id, e.user_id, e.amount, e.category, e.description, e.date, e.account_id,
+           a.name, a.currency, a.color, e.original_amount, e.original_currency, e.rate
+    FROM expenses e
+    LEFT JOIN accounts a ON a.id = e.account_id AND a.user_id = e.user_id
+"""
+
+
+def select_expenses_with_accounts(user_id: int, account_id: int = None, limit: int = None, since: str = None):
+    """Get expenses joined with their account's name, currency and color, newest first.
+
+    Rows are (id, user_id, amount, category, description, date, account_id,
+    account_name, account_currency, account_color, original_amount,
+    original_currency, rate); the account fields are None when the expense
+    has no account or it no longer exists, the last three unless the expense
+    was converted from another currency.
+    """
+    query = _EXPENSE_WITH_ACCOUNT_SQL + " WHERE e.user_id = ?"
+    params = [user_id]
     if account_id:
+        query += " AND e.account_id = ?"
+        params.append(account_id)
+    if since:
+        query += " AND e.date >= ?"
+        params.append(since)
+    query += " ORDER BY e.date DESC, e.id DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with session() as cur:
+        cur.execute(query, params)
+        return cur.fetchall()
+
+
+EXPENSE_PAGE_SIZE = 50
+
+
+def select_expenses_page(user_id: int, after: tuple = None, limit: int = EXPENSE_PAGE_SIZE,
+                         account_id: int = None) -> dict:
+    """Get one page of a user's expenses, newest first, using keyset pagination.
+
+    after is the (date, id) of the last row of the previous page, or None for
+    the first page. Rows have the same shape as select_expenses_with_accounts().
+    Returns {"rows", "next_after", "total_count", "total_amount"}; next_after
+    is None on the last page. The totals cover every matching expense and are
+    read from the expense rollups on the first page only (None after that).
+    """
+    where = "e.user_id = ?"
+    params = [user_id]
+    if account_id:
+        where += " AND e.account_id = ?"
+        params.append(account_id)
+
+    with session() as cur:
+        total_count = total_amount = None
+        if after is None:
+            if account_id:
+                cur.execute("SELECT expense_count, total_amount FROM account_expense_stats "
+                            "WHERE user_id = ? AND account_id = ?", (user_id, account_id))
+            else:
+                cur.execute("SELECT expense_count, total_amount FROM user_expense_stats WHERE user_id = ?",
+                            (user_id,))
+            row = cur.fetchone()
+            total_count, total_amount = (row[0], float(row[1] or 0.0)) if row else (0, 0.0)
+
+        page_where = where
+        page_params = list(params)
+        if after:
+            page_where += " AND (e.date, e.id) < (?, ?)"
+            page_params.extend(after)
+        # Fetch one extra row to know whether another page follows
         cur.execute(
-            "SELECT id, user_id, amount, category, description, date, account_id FROM expenses WHERE user_id = ? AND account_id = ? ORDER BY date DESC",
-            (user_id, account_id),
-        )
-    else:
-        cur.execute(
-            "SELECT id, user_id, amount, category, description, date, account_id FROM expenses WHERE user_id = ? ORDER BY date DESC",
-            (user_id,),
+            _EXPENSE_WITH_ACCOUNT_SQL + f" WHERE {page_where} ORDER BY e.date DESC, e.id DESC LIMIT ?",
+            page_params + [limit + 1],
         )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+        rows = cur.fetchall()
 
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "rows": rows,
+        "next_after": (rows[-1][5], rows[-1][0]) if has_more else None,
+        "total_count": total_count,
+        "total_amount": total_amount,
+    }
 
+
+@invalidates_statistics
+@serialized_write
 def update_expense_row(expense_id: int, user_id: int, amount: float, category: str, description: str, date_str: str, account_id: int = None) -> bool:
     """Update an expense and adjust account balances accordingly."""
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    # Get the old expense data to calculate balance difference
-    cur.execute("SELECT amount, account_id FROM expenses WHERE id = ? AND user_id = ?", (expense_id, user_id))
-    old_expense = cur.fetchone()
-    
-    if old_expense:
-        old_amount, old_account_id = old_expense
-        
-        # Restore balance to old account (add back the old amount)
-        if old_account_id:
-            cur.execute(
-                "UPDATE accounts SET balance = balance + ? WHERE id = ? AND user_id = ?",
-                (old_amount, old_account_id, user_id),
-            )
-        
-        # Deduct from new account (or same account with new amount)
-        if account_id:
-            cur.execute(
-                "UPDATE accounts SET balance = balance - ? WHERE id = ? AND user_id = ?",
-                (amount, account_id, user_id),
-            )
-    
-    # Update the expense
-    cur.execute(
-        "UPDATE expenses SET amount=?, category=?, description=?, date=?, account_id=? WHERE id=? AND user_id=?",
-        (amount, category, description, date_str, account_id, expense_id, user_id),
-    )
-    conn.commit()
-    updated = cur.rowcount
-    conn.close()
-    return updated > 0
+    with session() as cur:
+        # Get the old expense data to calculate balance difference
+        cur.execute("SELECT amount, account_id FROM expenses WHERE id = ? AND user_id = ?", (expense_id, user_id))
+        old_expense = cur.fetchone()
+
+        if old_expense:
+            old_amount, old_account_id = old_expense
+
+            # Restore balance to old account (add back the old amount)
+            if old_account_id:
+                cur.execute(
+                    "UPDATE accounts SET balance = balance + ? WHERE id = ? AND user_id = ?",
+                    (old_amount, old_account_id, user_id),
+                )
+
+            # Deduct from new account (or same account with new amount)
+            if account_id:
+                cur.execute(
+                    "UPDATE accounts SET balance = balance - ? WHERE id = ? AND user_id = ?",
+                    (amount, account_id, user_id),
+                )
+
+        # Update the expense
+        cur.execute(
+            "UPDATE expenses SET amount=?, category=?, description=?, date=?, account_id=? WHERE id=? AND user_id=?",
+            (amount, category, description, date_str, account_id, expense_id, user_id),
+        )
+        return cur.rowcount > 0
 
 
+@invalidates_statistics
+@serialized_write
 def delete_expense_row(expense_id: int, user_id: int) -> bool:
     """Delete an expense and restore the amount to the linked account balance."""
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    # Get the expense data to restore balance
-    cur.execute("SELECT amount, account_id FROM expenses WHERE id = ? AND user_id = ?", (expense_id, user_id))
-    expense = cur.fetchone()
-    
-    if expense:
-        amount, account_id = expense
-        
-        # Restore balance to account (add back the amount)
-        if account_id:
-            cur.execute(
-                "UPDATE accounts SET balance = balance + ? WHERE id = ? AND user_id = ?",
-                (amount, account_id, user_id),
-            )
-    
-    # Delete the expense
-    cur.execute("DELETE FROM expenses WHERE id=? AND user_id=?",(expense_id, user_id))
-    conn.commit()
-    deleted = cur.rowcount
-    conn.close()
-    return deleted > 0
+    with session() as cur:
+        # Get the expense data to restore balance
+        cur.execute("SELECT amount, account_id FROM expenses WHERE id = ? AND user_id = ?", (expense_id, user_id))
+        expense = cur.fetchone()
+
+        if expense:
+            amount, account_id = expense
+
+            # Restore balance to account (add back the amount)
+            if account_id:
+                cur.execute(
+                    "UPDATE accounts SET balance = balance + ? WHERE id = ? AND user_id = ?",
+                    (amount, account_id, user_id),
+                )
+
+        # Delete the expense
+        cur.execute("DELETE FROM expenses WHERE id=? AND user_id=?",(expense_id, user_id))
+        return cur.rowcount > 0
 
 
+@serialized_write
 def mark_expense_as_synced_to_qb(expense_id: int, synced: bool = True) -> bool:
     """Mark an expense as synced to QuickBooks (synced_to_qb = 1) or not synced (0)."""
-    conn = connect_db()
-    cur = conn.cursor()
-    try:
+    with session() as cur:
         cur.execute(
             "UPDATE expenses SET synced_to_qb = ? WHERE id = ?",
             (1 if synced else 0, expense_id)
         )
-        conn.commit()
-        success = cur.rowcount > 0
-        return success
-    finally:
-        conn.close()
+        return cur.rowcount > 0
 
 
+@serialized_write
 def mark_expenses_as_synced_batch(expense_ids: list, synced: bool = True) -> int:
     """Mark multiple expenses as synced. Returns count of updated expenses."""
     if not expense_ids:
         return 0
-    
-    conn = connect_db()
-    cur = conn.cursor()
-    try:
+
+    with session() as cur:
         placeholders = ','.join('?' * len(expense_ids))
         cur.execute(
             f"UPDATE expenses SET synced_to_qb = ? WHERE id IN ({placeholders})",
             [1 if synced else 0] + expense_ids
         )
-        conn.commit()
         return cur.rowcount
-    finally:
-        conn.close()
 
 
 # ----- Summary helpers -----
+# Totals below read the trigger-maintained rollups from migration 5
 def total_expenses_by_user(user_id: int) -> float:
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT SUM(amount) FROM expenses WHERE user_id=?", (user_id,))
-    t = cur.fetchone()[0]
-    conn.close()
-    return float(t) if t else 0.0
+    with session() as cur:
+        cur.execute("SELECT total_amount FROM user_expense_stats WHERE user_id=? AND expense_count > 0", (user_id,))
+        row = cur.fetchone()
+    return float(row[0]) if row and row[0] else 0.0
 
 
 def total_expenses_by_account(user_id: int, account_id: int) -> float:
     """Get total expenses for a specific account."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT SUM(amount) FROM expenses WHERE user_id=? AND account_id=?", (user_id, account_id))
-    t = cur.fetchone()[0]
-    conn.close()
-    return float(t) if t else 0.0
+    with session() as cur:
+        cur.execute("SELECT total_amount FROM account_expense_stats WHERE user_id=? AND account_id=?", (user_id, account_id))
+        row = cur.fetchone()
+    return float(row[0]) if row and row[0] else 0.0
+
+
+# Users per get_account_budgets() query, under SQLite's bound-parameter limit
+ACCOUNT_BUDGET_BATCH = 500
+
+
+def get_account_budgets(user_ids) -> dict:
+    """Active accounts and what has been spent from them, for many users at once.
+
+    Returns {user_id: [(account_id, name, balance, currency, spent), ...]}
+    with accounts in get_accounts_by_user() order; spent is read from the
+    account_expense_stats rollup. One query per ACCOUNT_BUDGET_BATCH users.
+    """
+    user_ids = sorted(set(user_ids))
+    budgets = {user_id: [] for user_id in user_ids}
+    with session() as cur:
+        for start in range(0, len(user_ids), ACCOUNT_BUDGET_BATCH):
+            batch = user_ids[start:start + ACCOUNT_BUDGET_BATCH]
+            cur.execute(f"""
+                SELECT a.user_id, a.id, a.name, a.balance, a.currency, COALESCE(s.total_amount, 0)
+                FROM accounts a
+                LEFT JOIN account_expense_stats s ON s.user_id = a.user_id AND s.account_id = a.id
+                WHERE a.user_id IN ({','.join('?' * len(batch))}) AND a.status = 'active'
+                ORDER BY a.user_id, a.sort_order ASC, a.created_at DESC
+            """, batch)
+            for user_id, *account in cur.fetchall():
+                budgets[user_id].append(tuple(account))
+    return budgets
 
 
 def category_summary_by_user(user_id: int):
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT category, SUM(amount) FROM expenses WHERE user_id=? GROUP BY category", (user_id,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("SELECT category, total_amount FROM category_expense_stats WHERE user_id=? ORDER BY category", (user_id,))
+        return cur.fetchall()
+
+
+def get_description_usage(user_id: int = None, names=None):
+    """(name, description, uses) per distinct expense description, most used first.
+
+    Descriptions are grouped case-insensitively on `name` (lower-cased,
+    trimmed); `description` is one of the original spellings. user_id limits
+    the count to one user, names to those lower-cased descriptions.
+    """
+    query = """
+    SELECT lower(trim(description)) AS name, MIN(trim(description)), COUNT(*) AS uses
+    FROM expenses WHERE description IS NOT NULL AND trim(description) != ''
+    """
+    params = []
+    if user_id is not None:
+        query += " AND user_id = ?"
+        params.append(user_id)
+    if names is not None:
+        names = list(names)
+        if not names:
+            return []
+        query += f" AND lower(trim(description)) IN ({', '.join('?' * len(names))})"
+        params.extend(names)
+    query += " GROUP BY name ORDER BY uses DESC, name"
+    with session() as cur:
+        cur.execute(query, params)
+        return cur.fetchall()
+
+
+def verify_expense_rollups() -> list:
+    """Compare the expense rollup tables against the raw expenses table.
+
+    Returns a list of (table, key, expected, actual) mismatches, where
+    expected/actual are (count, total) tuples; empty when consistent.
+    """
+    # (table, key columns in the rollup, the same key over expenses, filter, count column, total column)
+    checks = [
+        ("user_expense_stats", "user_id", "user_id", "1 = 1", "expense_count", "total_amount"),
+        ("account_expense_stats", "user_id, account_id", "user_id, account_id", "account_id IS NOT NULL",
+         "expense_count", "total_amount"),
+        ("category_expense_stats", "user_id, category", "user_id, category", "1 = 1", "expense_count", "total_amount"),
+        ("expense_daily_rollup", "user_id, day, category", "user_id, substr(date, 1, 10), category", "1 = 1",
+         "count", "total"),
+        # Weekly sums over the daily rollup, as get_weekly_total reads them (weeks start on Monday)
+        ("expense_daily_rollup", "user_id, date(day, '-6 days', 'weekday 1')",
+         "user_id, date(substr(date, 1, 10), '-6 days', 'weekday 1')", "1 = 1", "count", "total"),
+    ]
+    mismatches = []
+    with session() as cur:
+        for table, key, raw_key, where, count_col, total_col in checks:
+            cur.execute(f"SELECT {raw_key}, COUNT(*), SUM(amount) FROM expenses WHERE {where} GROUP BY {raw_key}")
+            expected = {tuple(r[:-2]): (r[-2], r[-1]) for r in cur.fetchall()}
+            cur.execute(f"SELECT {key}, SUM({count_col}), SUM({total_col}) FROM {table} GROUP BY {key} "
+                        f"HAVING SUM({count_col}) != 0 OR SUM({total_col}) != 0")
+            actual = {tuple(r[:-2]): (r[-2], r[-1]) for r in cur.fetchall()}
+            for k in expected.keys() | actual.keys():
+                exp_count, exp_total = expected.get(k, (0, 0.0))
+                act_count, act_total = actual.get(k, (0, 0.0))
+                if exp_count != act_count or abs((exp_total or 0.0) - (act_total or 0.0)) > 0.005:
+                    mismatches.append((table, k, (exp_count, exp_total), (act_count, act_total)))
+    return mismatches
+
+
+@serialized_write
+def _rebuild_expense_rollups():
+    with session() as cur:
+        migrations.rebuild_expense_rollups(cur)
+        migrations.rebuild_expense_daily_rollup(cur)
+
+
+def rebuild_expense_rollups():
+    """Recompute the expense rollup tables from the raw expenses table."""
+    _rebuild_expense_rollups()
+    # Any user's cached statistics may come from the replaced rollups; cleared
+    # after the commit, like invalidates_statistics
+    stats_cache.get_stats_cache().clear()
 
 
 # ----- ACCOUNT CRUD -----
-def insert_account(user_id: int, name: str, account_number: str, account_type: str, 
+@notifies_change("accounts")
+@serialized_write
+def insert_account(user_id: int, name: str, account_number: str, account_type: str,
                    balance: float, currency: str, color: str, created_at: str) -> int:
     """Insert a new account and return its ID. If this is the first account, it becomes primary."""
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    # Check if user has any existing accounts - if not, this will be primary
-    cur.execute("SELECT COUNT(*) FROM accounts WHERE user_id = ? AND status = 'active'", (user_id,))
-    existing_count = cur.fetchone()[0]
-    is_primary = 1 if existing_count == 0 else 0
-    
-    # Get next sort order
-    cur.execute("SELECT COALESCE(MAX(sort_order), 0) + 1 FROM accounts WHERE user_id = ?", (user_id,))
-    next_order = cur.fetchone()[0]
-    cur.execute(
-        """INSERT INTO accounts (user_id, name, account_number, type, balance, currency, color, is_primary, status, sort_order, created_at) 
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'active', ?, ?)""",
-        (user_id, name, account_number, account_type, balance, currency, color, is_primary, next_order, created_at),
-    )
-    conn.commit()
-    account_id = cur.lastrowid
-    conn.close()
-    return account_id
+    with session() as cur:
+        # Check if user has any existing accounts - if not, this will be primary
+        cur.execute("SELECT COUNT(*) FROM accounts WHERE user_id = ? AND status = 'active'", (user_id,))
+        existing_count = cur.fetchone()[0]
+        is_primary = 1 if existing_count == 0 else 0
+
+        # Get next sort order
+        cur.execute("SELECT COALESCE(MAX(sort_order), 0) + 1 FROM accounts WHERE user_id = ?", (user_id,))
+        next_order = cur.fetchone()[0]
+        cur.execute(
+            """INSERT INTO accounts (user_id, name, account_number, type, balance, currency, color, is_primary, status, sort_order, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'active', ?, ?)""",
+            (user_id, name, account_number, account_type, balance, currency, color, is_primary, next_order, created_at),
+        )
+        return cur.lastrowid
 
 
 def get_accounts_by_user(user_id: int, include_all: bool = False):
     """Get all accounts for a user. If include_all is False, only active accounts are returned."""
-    conn = connect_db()
-    cur = conn.cursor()
-    if include_all:
-        cur.execute(
-            """SELECT id, name, account_number, type, balance, currency, color, is_primary, created_at, status, sort_order 
-               FROM accounts WHERE user_id = ? ORDER BY sort_order ASC, created_at DESC""",
-            (user_id,),
-        )
-    else:
-        cur.execute(
-            """SELECT id, name, account_number, type, balance, currency, color, is_primary, created_at 
-               FROM accounts WHERE user_id = ? AND status = 'active' ORDER BY sort_order ASC, created_at DESC""",
-            (user_id,),
-        )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        if include_all:
+            cur.execute(
+                """SELECT id, name, account_number, type, balance, currency, color, is_primary, created_at, status, sort_order
+                   FROM accounts WHERE user_id = ? ORDER BY sort_order ASC, created_at DESC""",
+                (user_id,),
+            )
+        else:
+            cur.execute(
+                """SELECT id, name, account_number, type, balance, currency, color, is_primary, created_at
+                   FROM accounts WHERE user_id = ? AND status = 'active' ORDER BY sort_order ASC, created_at DESC""",
+                (user_id,),
+            )
+        return cur.fetchall()
 
 
+@notifies_change("accounts")
+@serialized_write
 def update_account(account_id: int, user_id: int, name: str = None, account_number: str = None,
                    account_type: str = None, balance: float = None, currency: str = None,
                    color: str = None, status: str = None) -> bool:
     """Update an account's details."""
-    conn = connect_db()
-    cur = conn.cursor()
-    
     # Build dynamic update query
     updates = []
     values = []
-    
+
     if name is not None:
         updates.append("name = ?")
         values.append(name)
@@ -718,181 +1045,157 @@ def update_account(account_id: int, user_id: int, name: str = None, account_numb
     if status is not None:
         updates.append("status = ?")
         values.append(status)
-    
+
     if not updates:
-        conn.close()
         return False
-    
+
     values.extend([account_id, user_id])
     query = f"UPDATE accounts SET {', '.join(updates)} WHERE id = ? AND user_id = ?"
-    cur.execute(query, values)
-    conn.commit()
-    updated = cur.rowcount
-    conn.close()
-    return updated > 0
+    with session() as cur:
+        cur.execute(query, values)
+        return cur.rowcount > 0
 
 
+@notifies_change("accounts")
+@serialized_write
 def update_account_balance(account_id: int, user_id: int, new_balance: float) -> bool:
     """Update an account's balance."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE accounts SET balance = ? WHERE id = ? AND user_id = ?",
-        (new_balance, account_id, user_id),
-    )
-    conn.commit()
-    updated = cur.rowcount
-    conn.close()
-    return updated > 0
+    with session() as cur:
+        cur.execute(
+            "UPDATE accounts SET balance = ? WHERE id = ? AND user_id = ?",
+            (new_balance, account_id, user_id),
+        )
+        return cur.rowcount > 0
 
 
+@notifies_change("accounts")
+@serialized_write
 def delete_account(account_id: int, user_id: int) -> bool:
     """Delete an account."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM accounts WHERE id = ? AND user_id = ?", (account_id, user_id))
-    conn.commit()
-    deleted = cur.rowcount
-    conn.close()
-    return deleted > 0
+    with session() as cur:
+        cur.execute("DELETE FROM accounts WHERE id = ? AND user_id = ?", (account_id, user_id))
+        return cur.rowcount > 0
 
 
+@notifies_change("accounts")
+@serialized_write
 def set_account_as_primary(user_id: int, account_id: int) -> bool:
     """Set an account as the primary account for a user."""
-    conn = connect_db()
-    cur = conn.cursor()
-    # First, unset all other accounts as primary
-    cur.execute("UPDATE accounts SET is_primary = 0 WHERE user_id = ?", (user_id,))
-    # Then set the specified account as primary
-    cur.execute("UPDATE accounts SET is_primary = 1 WHERE id = ? AND user_id = ?", (account_id, user_id))
-    conn.commit()
-    updated = cur.rowcount
-    conn.close()
-    return updated > 0
+    with session() as cur:
+        # First, unset all other accounts as primary
+        cur.execute("UPDATE accounts SET is_primary = 0 WHERE user_id = ?", (user_id,))
+        # Then set the specified account as primary
+        cur.execute("UPDATE accounts SET is_primary = 1 WHERE id = ? AND user_id = ?", (account_id, user_id))
+        return cur.rowcount > 0
 
 
 def get_primary_account(user_id: int):
     """Get the primary account for a user."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute(
-        """SELECT id, name, account_number, type, balance, currency, color, is_primary, created_at 
-           FROM accounts WHERE user_id = ? AND is_primary = 1 LIMIT 1""",
-        (user_id,),
-    )
-    row = cur.fetchone()
-    conn.close()
-    return row
+    with session() as cur:
+        cur.execute(
+            """SELECT id, name, account_number, type, balance, currency, color, is_primary, created_at
+               FROM accounts WHERE user_id = ? AND is_primary = 1 LIMIT 1""",
+            (user_id,),
+        )
+        return cur.fetchone()
 
 
 def get_total_balance_by_user(user_id: int) -> float:
     """Get total balance across all accounts for a user."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT SUM(balance) FROM accounts WHERE user_id = ? AND status = 'active'", (user_id,))
-    total = cur.fetchone()[0]
-    conn.close()
+    with session() as cur:
+        cur.execute("SELECT SUM(balance) FROM accounts WHERE user_id = ? AND status = 'active'", (user_id,))
+        total = cur.fetchone()[0]
     return float(total) if total else 0.0
 
 
 def get_selected_account(user_id: int):
     """Get the currently selected account for display on home page.
     If no account is selected, returns the primary account."""
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    # First check if user has a selected_account_id stored
-    selected_id = None
-    try:
-        cur.execute("SELECT selected_account_id FROM users WHERE id = ?", (user_id,))
-        row = cur.fetchone()
-        if row and row[0] is not None:
-            selected_id = row[0]
-    except Exception as e:
-        print(f"Error getting selected_account_id: {e}")
-    
-    if selected_id is not None:
-        # Get the selected account
+    stale_selection = False
+    with session() as cur:
+        # First check if user has a selected_account_id stored
+        selected_id = None
+        try:
+            cur.execute("SELECT selected_account_id FROM users WHERE id = ?", (user_id,))
+            row = cur.fetchone()
+            if row and row[0] is not None:
+                selected_id = row[0]
+        except Exception as e:
+            print(f"Error getting selected_account_id: {e}")
+
+        if selected_id is not None:
+            # Get the selected account
+            cur.execute(
+                """SELECT id, name, account_number, type, balance, currency, color, is_primary, created_at
+                   FROM accounts WHERE id = ? AND user_id = ? AND status = 'active'""",
+                (selected_id, user_id),
+            )
+            account = cur.fetchone()
+            if account:
+                return account
+            stale_selection = True
+
+        # Fallback to primary account
         cur.execute(
-            """SELECT id, name, account_number, type, balance, currency, color, is_primary, created_at 
-               FROM accounts WHERE id = ? AND user_id = ? AND status = 'active'""",
-            (selected_id, user_id),
+            """SELECT id, name, account_number, type, balance, currency, color, is_primary, created_at
+               FROM accounts WHERE user_id = ? AND is_primary = 1 AND status = 'active' LIMIT 1""",
+            (user_id,),
         )
         account = cur.fetchone()
-        if account:
-            conn.close()
-            return account
-        # If selected account not found (deleted?), clear the selection
-        cur.execute("UPDATE users SET selected_account_id = NULL WHERE id = ?", (user_id,))
-        conn.commit()
-    
-    # Fallback to primary account
-    cur.execute(
-        """SELECT id, name, account_number, type, balance, currency, color, is_primary, created_at 
-           FROM accounts WHERE user_id = ? AND is_primary = 1 AND status = 'active' LIMIT 1""",
-        (user_id,),
-    )
-    account = cur.fetchone()
-    conn.close()
+    if stale_selection:
+        # Selected account not found (deleted?), so clear the selection
+        clear_selected_account(user_id)
     return account
 
 
+@serialized_write
 def set_selected_account(user_id: int, account_id: int) -> bool:
     """Set the selected account for a user to display on home page."""
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    # Add column if it doesn't exist
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN selected_account_id INTEGER")
-        conn.commit()
-    except:
-        pass  # Column already exists
-    
-    cur.execute("UPDATE users SET selected_account_id = ? WHERE id = ?", (account_id, user_id))
-    conn.commit()
-    updated = cur.rowcount
-    conn.close()
+    with session() as cur:
+        cur.execute("UPDATE users SET selected_account_id = ? WHERE id = ?", (account_id, user_id))
+        updated = cur.rowcount
     print(f"set_selected_account: user_id={user_id}, account_id={account_id}, updated={updated}")
     return updated > 0
 
 
+@serialized_write
+def clear_selected_account(user_id: int) -> bool:
+    """Forget the user's selected account so the primary one is shown."""
+    with session() as cur:
+        cur.execute("UPDATE users SET selected_account_id = NULL WHERE id = ?", (user_id,))
+        return cur.rowcount > 0
+
+
 def get_account_by_id(account_id: int, user_id: int):
     """Get a specific account by ID."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute(
-        """SELECT id, name, account_number, type, balance, currency, color, is_primary, created_at 
-           FROM accounts WHERE id = ? AND user_id = ?""",
-        (account_id, user_id),
-    )
-    row = cur.fetchone()
-    conn.close()
-    return row
+    with session() as cur:
+        cur.execute(
+            """SELECT id, name, account_number, type, balance, currency, color, is_primary, created_at
+               FROM accounts WHERE id = ? AND user_id = ?""",
+            (account_id, user_id),
+        )
+        return cur.fetchone()
 
 
 # ----- OTP/Password Reset helpers -----
+@serialized_write
 def create_password_reset_otp(user_id: int, otp: str) -> bool:
     """Create a new password reset OTP for a user."""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
     try:
-        # Invalidate any existing unused OTPs for this user
-        cur.execute("UPDATE password_reset_otps SET is_used = 1 WHERE user_id = ? AND is_used = 0", (user_id,))
-        
-        # Create new OTP
-        cur.execute(
-            "INSERT INTO password_reset_otps (user_id, otp, created_at) VALUES (?, ?, ?)",
-            (user_id, otp, datetime.now().isoformat())
-        )
-        conn.commit()
+        with session() as cur:
+            # Invalidate any existing unused OTPs for this user
+            cur.execute("UPDATE password_reset_otps SET is_used = 1 WHERE user_id = ? AND is_used = 0", (user_id,))
+
+            # Create new OTP
+            cur.execute(
+                "INSERT INTO password_reset_otps (user_id, otp, created_at) VALUES (?, ?, ?)",
+                (user_id, otp, datetime.now().isoformat())
+            )
         return True
     except Exception as e:
         print(f"Error creating OTP: {e}")
         return False
-    finally:
-        conn.close()
 
 
 def verify_password_reset_otp(user_id: int, otp: str) -> tuple:
@@ -901,107 +1204,86 @@ def verify_password_reset_otp(user_id: int, otp: str) -> tuple:
     Returns (success, message, otp_id).
     """
     from utils.otp import is_otp_expired
-    
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    cur.execute(
-        "SELECT id, created_at, is_used FROM password_reset_otps WHERE user_id = ? AND otp = ? ORDER BY created_at DESC LIMIT 1",
-        (user_id, otp)
-    )
-    row = cur.fetchone()
-    conn.close()
-    
+
+    with session() as cur:
+        cur.execute(
+            "SELECT id, created_at, is_used FROM password_reset_otps WHERE user_id = ? AND otp = ? ORDER BY created_at DESC LIMIT 1",
+            (user_id, otp)
+        )
+        row = cur.fetchone()
+
     if not row:
         return (False, "Invalid OTP code", None)
-    
+
     otp_id, created_at, is_used = row
-    
+
     if is_used:
         return (False, "This OTP has already been used", None)
-    
+
     if is_otp_expired(created_at):
         return (False, "OTP has expired. Please request a new one", None)
-    
+
     return (True, "OTP verified successfully", otp_id)
 
 
+@serialized_write
 def mark_otp_as_used(otp_id: int):
     """Mark an OTP as used after successful password reset."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("UPDATE password_reset_otps SET is_used = 1 WHERE id = ?", (otp_id,))
-    conn.commit()
-    conn.close()
+    with session() as cur:
+        cur.execute("UPDATE password_reset_otps SET is_used = 1 WHERE id = ?", (otp_id,))
 
 
+@serialized_write
 def cleanup_expired_otps():
     """Clean up OTPs older than 24 hours."""
     from datetime import datetime, timedelta
-    conn = connect_db()
-    cur = conn.cursor()
-    
     cutoff = (datetime.now() - timedelta(hours=24)).isoformat()
-    cur.execute("DELETE FROM password_reset_otps WHERE created_at < ?", (cutoff,))
-    deleted = cur.rowcount
-    conn.commit()
-    conn.close()
-    return deleted
+    with session() as cur:
+        cur.execute("DELETE FROM password_reset_otps WHERE created_at < ?", (cutoff,))
+        return cur.rowcount
 
 
 def get_user_by_email(email: str):
     """Get user by email address."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id, username, email FROM users WHERE email = ?", (email,))
-    row = cur.fetchone()
-    conn.close()
-    return row  # (id, username, email) or None
+    with session() as cur:
+        cur.execute("SELECT id, username, email FROM users WHERE email = ?", (email,))
+        return cur.fetchone()  # (id, username, email) or None
 
 
+@serialized_write
 def update_password(user_id: int, new_password_blob: bytes) -> bool:
     """Update user password."""
-    conn = connect_db()
-    cur = conn.cursor()
     try:
-        cur.execute("UPDATE users SET password = ? WHERE id = ?", (new_password_blob, user_id))
-        conn.commit()
-        return cur.rowcount > 0
+        with session() as cur:
+            cur.execute("UPDATE users SET password = ? WHERE id = ?", (new_password_blob, user_id))
+            return cur.rowcount > 0
     except Exception as e:
         print(f"Error updating password: {e}")
         return False
-    finally:
-        conn.close()
 
 
+@serialized_write
 def save_user_passcode(user_id: int, passcode_hash: str) -> bool:
     """Save hashed passcode for a user."""
-    conn = connect_db()
-    cur = conn.cursor()
     try:
-        cur.execute("UPDATE users SET passcode = ? WHERE id = ?", (passcode_hash, user_id))
-        conn.commit()
-        return cur.rowcount > 0
+        with session() as cur:
+            cur.execute("UPDATE users SET passcode = ? WHERE id = ?", (passcode_hash, user_id))
+            return cur.rowcount > 0
     except Exception as e:
         print(f"Error saving passcode: {e}")
         return False
-    finally:
-        conn.close()
 
 
 def get_user_passcode(user_id: int) -> str:
     """Get stored passcode hash for a user."""
-    conn = connect_db()
-    cur = conn.cursor()
     try:
-        cur.execute("SELECT passcode FROM users WHERE id = ?", (user_id,))
-        row = cur.fetchone()
+        with session() as cur:
+            cur.execute("SELECT passcode FROM users WHERE id = ?", (user_id,))
+            row = cur.fetchone()
         return row[0] if row and row[0] else None
     except Exception as e:
         print(f"Error getting passcode: {e}")
         return None
-    finally:
-        conn.close()
 
 
 def has_passcode(user_id: int) -> bool:
@@ -1011,47 +1293,39 @@ def has_passcode(user_id: int) -> bool:
 
 
 # ----- ADMIN functions -----
+@serialized_write
 def insert_admin(username: str, password_blob: bytes, full_name: str = "", email: str = "") -> bool:
     """Insert a new admin user."""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
-    try:
-        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cur.execute(
-            "INSERT INTO admins (username, password, full_name, email, created_at) VALUES (?, ?, ?, ?, ?)",
-            (username, password_blob, full_name, email, created_at)
-        )
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        conn.close()
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with session() as cur:
+        try:
+            cur.execute(
+                "INSERT INTO admins (username, password, full_name, email, created_at) VALUES (?, ?, ?, ?, ?)",
+                (username, password_blob, full_name, email, created_at)
+            )
+            return True
+        except sqlite3.IntegrityError:
+            return False
 
 
 def get_admin_by_username(username: str):
     """Get admin by username."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id, username, password, full_name, email, role, is_active FROM admins WHERE username = ?", (username,))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    with session() as cur:
+        cur.execute("SELECT id, username, password, full_name, email, role, is_active FROM admins WHERE username = ?", (username,))
+        return cur.fetchone()
 
 
 def get_admin_profile(admin_id: int):
     """Get admin profile data by ID."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, username, full_name, email, role, job_title, department, 
-               currency, reporting_manager, avatar, last_login, created_at
-        FROM admins WHERE id = ?
-    """, (admin_id,))
-    row = cur.fetchone()
-    conn.close()
-    
+    with session() as cur:
+        cur.execute("""
+            SELECT id, username, full_name, email, role, job_title, department,
+                   currency, reporting_manager, avatar, last_login, created_at
+            FROM admins WHERE id = ?
+        """, (admin_id,))
+        row = cur.fetchone()
+
     if row:
         return {
             "id": row[0],
@@ -1070,16 +1344,14 @@ def get_admin_profile(admin_id: int):
     return None
 
 
+@serialized_write
 def update_admin_profile(admin_id: int, full_name: str = None, email: str = None,
-                        job_title: str = None, department: str = None, 
+                        job_title: str = None, department: str = None,
                         currency: str = None, reporting_manager: str = None, avatar: str = None):
     """Update admin profile data."""
-    conn = connect_db()
-    cur = conn.cursor()
-    
     updates = []
     params = []
-    
+
     if full_name is not None:
         updates.append("full_name = ?")
         params.append(full_name)
@@ -1101,377 +1373,211 @@ def update_admin_profile(admin_id: int, full_name: str = None, email: str = None
     if avatar is not None:
         updates.append("avatar = ?")
         params.append(avatar)
-    
+
     if updates:
         params.append(admin_id)
         query = f"UPDATE admins SET {', '.join(updates)} WHERE id = ?"
-        cur.execute(query, tuple(params))
-        conn.commit()
-    
-    conn.close()
+        with session() as cur:
+            cur.execute(query, tuple(params))
+
     return True
 
 
+@serialized_write
 def update_admin_last_login(admin_id: int):
     """Update admin last login timestamp."""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cur.execute("UPDATE admins SET last_login = ? WHERE id = ?", (timestamp, admin_id))
-    conn.commit()
-    conn.close()
+    with session() as cur:
+        cur.execute("UPDATE admins SET last_login = ? WHERE id = ?", (timestamp, admin_id))
 
 
+@serialized_write
 def log_admin_activity(admin_id: int, action: str, target_user_id: int = None, details: str = ""):
     """Log admin activity."""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cur.execute(
-        "INSERT INTO admin_logs (admin_id, action, target_user_id, details, timestamp) VALUES (?, ?, ?, ?, ?)",
-        (admin_id, action, target_user_id, details, timestamp)
-    )
-    conn.commit()
-    conn.close()
+    with session() as cur:
+        cur.execute(
+            "INSERT INTO admin_logs (admin_id, action, target_user_id, details, timestamp) VALUES (?, ?, ?, ?, ?)",
+            (admin_id, action, target_user_id, details, timestamp)
+        )
 
 
 def get_all_users_for_admin():
     """Get all users with their statistics for admin dashboard."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT u.id, u.username, u.full_name, u.email, u.last_login, u.has_seen_onboarding,
-               COALESCE((SELECT COUNT(*) FROM expenses WHERE user_id = u.id), 0) as expense_count,
-               COALESCE((SELECT SUM(amount) FROM expenses WHERE user_id = u.id), 0.0) as total_spent,
-               u.currency
-        FROM users u
-        ORDER BY u.id DESC
-    """)
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("""
+            SELECT u.id, u.username, u.full_name, u.email, u.last_login, u.has_seen_onboarding,
+                   COALESCE((SELECT COUNT(*) FROM expenses WHERE user_id = u.id), 0) as expense_count,
+                   COALESCE((SELECT SUM(amount) FROM expenses WHERE user_id = u.id), 0.0) as total_spent,
+                   u.currency
+            FROM users u
+            ORDER BY u.id DESC
+        """)
+        return cur.fetchall()
 
 
 def get_admin_logs(limit: int = 100):
     """Get recent admin activity logs."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT al.id, al.admin_id, a.username as admin_username, al.action, 
-               al.target_user_id, u.username as target_username, al.details, al.timestamp
-        FROM admin_logs al
-        LEFT JOIN admins a ON al.admin_id = a.id
-        LEFT JOIN users u ON al.target_user_id = u.id
-        ORDER BY al.timestamp DESC
-        LIMIT ?
-    """, (limit,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("""
+            SELECT al.id, al.admin_id, a.username as admin_username, al.action,
+                   al.target_user_id, u.username as target_username, al.details, al.timestamp
+            FROM admin_logs al
+            LEFT JOIN admins a ON al.admin_id = a.id
+            LEFT JOIN users u ON al.target_user_id = u.id
+            ORDER BY al.timestamp DESC
+            LIMIT ?
+        """, (limit,))
+        return cur.fetchall()
 
 
 def get_system_statistics():
     """Get system-wide statistics for admin dashboard."""
-    conn = connect_db()
-    cur = conn.cursor()
-    
     stats = {}
-    
-    # Total users
-    cur.execute("SELECT COUNT(*) FROM users")
-    stats['total_users'] = cur.fetchone()[0]
-    
-    # Total expenses
-    cur.execute("SELECT COUNT(*) FROM expenses")
-    stats['total_expenses'] = cur.fetchone()[0]
-    
-    # Total amount spent
-    cur.execute("SELECT SUM(amount) FROM expenses")
-    result = cur.fetchone()[0]
-    stats['total_amount'] = result if result else 0
-    
-    # Total accounts
-    cur.execute("SELECT COUNT(*) FROM accounts")
-    stats['total_accounts'] = cur.fetchone()[0]
-    
-    # Active users (logged in last 30 days)
-    cur.execute("""
-        SELECT COUNT(*) FROM users 
-        WHERE last_login IS NOT NULL 
-        AND datetime(last_login) >= datetime('now', '-30 days')
-    """)
-    stats['active_users'] = cur.fetchone()[0]
-    
-    # New users this month
-    cur.execute("""
-        SELECT COUNT(*) FROM users 
-        WHERE datetime(last_login) >= datetime('now', 'start of month')
-    """)
-    stats['new_users_this_month'] = cur.fetchone()[0]
-    
-    conn.close()
+
+    with session() as cur:
+        # Total users
+        cur.execute("SELECT COUNT(*) FROM users")
+        stats['total_users'] = cur.fetchone()[0]
+
+        # Total expenses
+        cur.execute("SELECT COUNT(*) FROM expenses")
+        stats['total_expenses'] = cur.fetchone()[0]
+
+        # Total amount spent
+        cur.execute("SELECT SUM(amount) FROM expenses")
+        result = cur.fetchone()[0]
+        stats['total_amount'] = result if result else 0
+
+        # Total accounts
+        cur.execute("SELECT COUNT(*) FROM accounts")
+        stats['total_accounts'] = cur.fetchone()[0]
+
+        # Active users (logged in last 30 days)
+        cur.execute("""
+            SELECT COUNT(*) FROM users
+            WHERE last_login IS NOT NULL
+            AND datetime(last_login) >= datetime('now', '-30 days')
+        """)
+        stats['active_users'] = cur.fetchone()[0]
+
+        # New users this month
+        cur.execute("""
+            SELECT COUNT(*) FROM users
+            WHERE datetime(last_login) >= datetime('now', 'start of month')
+        """)
+        stats['new_users_this_month'] = cur.fetchone()[0]
+
     return stats
 
 
+@invalidates_statistics
+@serialized_write
 def delete_user_by_admin(user_id: int) -> bool:
     """Delete a user and all their data (admin action)."""
-    conn = connect_db()
-    cursor = conn.cursor()
     try:
-        # Delete all expenses
-        cursor.execute("DELETE FROM expenses WHERE user_id = ?", (user_id,))
-        # Delete all accounts
-        cursor.execute("DELETE FROM accounts WHERE user_id = ?", (user_id,))
-        # Delete user
-        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-        conn.commit()
+        with session() as cur:
+            # Delete all expenses
+            cur.execute("DELETE FROM expenses WHERE user_id = ?", (user_id,))
+            # Delete all accounts
+            cur.execute("DELETE FROM accounts WHERE user_id = ?", (user_id,))
+            # Delete user
+            cur.execute("DELETE FROM users WHERE id = ?", (user_id,))
         return True
     except Exception as e:
-        conn.rollback()
         print(f"Error deleting user: {e}")
         return False
-    finally:
-        conn.close()
 
 
 def get_user_expenses_for_admin(user_id: int, limit: int = 5):
     """Get user's expenses for admin view."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, description, amount, category, date
-        FROM expenses
-        WHERE user_id = ?
-        ORDER BY date DESC
-        LIMIT ?
-    """, (user_id, limit))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("""
+            SELECT id, description, amount, category, date
+            FROM expenses
+            WHERE user_id = ?
+            ORDER BY date DESC
+            LIMIT ?
+        """, (user_id, limit))
+        return cur.fetchall()
 
 
 def get_user_accounts_for_admin(user_id: int):
     """Get user's accounts for admin view."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, name, balance, currency
-        FROM accounts
-        WHERE user_id = ?
-        ORDER BY name
-    """, (user_id,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("""
+            SELECT id, name, balance, currency
+            FROM accounts
+            WHERE user_id = ?
+            ORDER BY name
+        """, (user_id,))
+        return cur.fetchall()
 
 
 def get_all_expenses_for_admin():
     """Get all expenses from all users for admin view."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT e.id, e.user_id, e.amount, e.category, e.description, e.date, 
-               e.account_id, u.username, u.currency
-        FROM expenses e
-        LEFT JOIN users u ON e.user_id = u.id
-        ORDER BY e.date DESC
-    """)
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("""
+            SELECT e.id, e.user_id, e.amount, e.category, e.description, e.date,
+                   e.account_id, u.username, u.currency
+            FROM expenses e
+            LEFT JOIN users u ON e.user_id = u.id
+            ORDER BY e.date DESC
+        """)
+        return cur.fetchall()
 
 
 def get_all_accounts_for_admin():
     """Get all accounts from all users for admin view."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT a.id, a.user_id, a.name, a.balance, a.currency, a.type, 
-               a.is_primary, u.username, u.currency as user_currency
-        FROM accounts a
-        LEFT JOIN users u ON a.user_id = u.id
-        ORDER BY a.balance DESC
-    """)
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("""
+            SELECT a.id, a.user_id, a.name, a.balance, a.currency, a.type,
+                   a.is_primary, u.username, u.currency as user_currency
+            FROM accounts a
+            LEFT JOIN users u ON a.user_id = u.id
+            ORDER BY a.balance DESC
+        """)
+        return cur.fetchall()
 
 
 
+@serialized_write
 def set_biometric_enabled(user_id: int, enabled: bool = True) -> bool:
     """Enable or disable biometric authentication for a user."""
-    conn = connect_db()
-    cur = conn.cursor()
     try:
-        cur.execute("UPDATE users SET biometric_enabled = ? WHERE id = ?", (1 if enabled else 0, user_id))
-        conn.commit()
-        return cur.rowcount > 0
+        with session() as cur:
+            cur.execute("UPDATE users SET biometric_enabled = ? WHERE id = ?", (1 if enabled else 0, user_id))
+            return cur.rowcount > 0
     except Exception as e:
         print(f"Error setting biometric preference: {e}")
         return False
-    finally:
-        conn.close()
 
 
 def is_biometric_enabled(user_id: int) -> bool:
     """Check if user has biometric authentication enabled."""
-    conn = connect_db()
-    cur = conn.cursor()
     try:
-        cur.execute("SELECT biometric_enabled FROM users WHERE id = ?", (user_id,))
-        row = cur.fetchone()
+        with session() as cur:
+            cur.execute("SELECT biometric_enabled FROM users WHERE id = ?", (user_id,))
+            row = cur.fetchone()
         return bool(row[0]) if row and row[0] is not None else False
     except Exception as e:
         print(f"Error checking biometric preference: {e}")
         return False
-    finally:
-        conn.close()
 
 
 # ==================== ADMIN CONFIGURATION & POLICY ====================
 
 def init_admin_config_tables():
-    """Initialize admin configuration and policy tables"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    # Expense Categories table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS expense_categories (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT UNIQUE NOT NULL,
-        description TEXT,
-        gl_code TEXT,
-        icon TEXT DEFAULT 'category',
-        color TEXT DEFAULT '#2196F3',
-        is_active INTEGER DEFAULT 1,
-        parent_id INTEGER,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (parent_id) REFERENCES expense_categories(id)
-    )
-    """)
-    
-    # Policy Rules table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS policy_rules (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        rule_name TEXT NOT NULL,
-        rule_type TEXT NOT NULL,
-        category_id INTEGER,
-        max_amount REAL,
-        currency TEXT DEFAULT 'PHP',
-        requires_receipt INTEGER DEFAULT 0,
-        requires_approval INTEGER DEFAULT 1,
-        disallowed_vendors TEXT,
-        per_diem_rate REAL,
-        description TEXT,
-        is_active INTEGER DEFAULT 1,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (category_id) REFERENCES expense_categories(id)
-    )
-    """)
-    
-    # Currency Exchange Rates table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS currency_rates (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        from_currency TEXT NOT NULL,
-        to_currency TEXT NOT NULL,
-        rate REAL NOT NULL,
-        effective_date TEXT DEFAULT CURRENT_TIMESTAMP,
-        is_active INTEGER DEFAULT 1,
-        source TEXT DEFAULT 'manual',
-        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE(from_currency, to_currency, effective_date)
-    )
-    """)
-    
-    # Accounting Integration Config table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS accounting_integration (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        platform TEXT NOT NULL,
-        api_key TEXT,
-        api_secret TEXT,
-        company_id TEXT,
-        sync_enabled INTEGER DEFAULT 0,
-        last_sync TEXT,
-        sync_frequency TEXT DEFAULT 'daily',
-        auto_sync INTEGER DEFAULT 0,
-        config_json TEXT,
-        is_active INTEGER DEFAULT 1,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    
-    # Sync Logs table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS sync_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        integration_id INTEGER,
-        sync_type TEXT,
-        status TEXT,
-        records_synced INTEGER DEFAULT 0,
-        error_message TEXT,
-        started_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        completed_at TEXT,
-        FOREIGN KEY (integration_id) REFERENCES accounting_integration(id)
-    )
-    """)
-    
-    # Announcements table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS announcements (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        message TEXT NOT NULL,
-        type TEXT DEFAULT 'info',
-        priority TEXT DEFAULT 'normal',
-        admin_id INTEGER,
-        target_users TEXT DEFAULT 'all',
-        start_date TEXT DEFAULT CURRENT_TIMESTAMP,
-        end_date TEXT,
-        is_active INTEGER DEFAULT 1,
-        is_pinned INTEGER DEFAULT 0,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (admin_id) REFERENCES admins(id)
-    )
-    """)
-    
-    # User Notifications table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS user_notifications (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        announcement_id INTEGER,
-        title TEXT NOT NULL,
-        message TEXT NOT NULL,
-        type TEXT DEFAULT 'info',
-        is_read INTEGER DEFAULT 0,
-        read_at TEXT,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users(id),
-        FOREIGN KEY (announcement_id) REFERENCES announcements(id)
-    )
-    """)
-    
-    conn.commit()
-    conn.close()
+    """Initialize admin configuration and policy tables (now part of the versioned schema)."""
+    ensure_schema()
 
 
 # ==================== EXPENSE CATEGORIES CRUD ====================
 
 def get_expense_categories(include_inactive=False):
     """Get all expense categories"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
     query = """
     SELECT id, name, description, gl_code, icon, color, is_active, parent_id, created_at, updated_at
     FROM expense_categories
@@ -1479,37 +1585,32 @@ def get_expense_categories(include_inactive=False):
     if not include_inactive:
         query += " WHERE is_active = 1"
     query += " ORDER BY name"
-    
-    cursor.execute(query)
-    return cursor.fetchall()
 
+    with session() as cursor:
+        cursor.execute(query)
+        return cursor.fetchall()
 
+
+@serialized_write
 def add_expense_category(name, description="", gl_code="", icon="category", color="#2196F3", parent_id=None):
     """Add new expense category"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute("""
-        INSERT INTO expense_categories (name, description, gl_code, icon, color, parent_id)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """, (name, description, gl_code, icon, color, parent_id))
-        conn.commit()
-        return cursor.lastrowid
-    except sqlite3.IntegrityError:
-        return None
-    finally:
-        conn.close()
+    with session() as cursor:
+        try:
+            cursor.execute("""
+            INSERT INTO expense_categories (name, description, gl_code, icon, color, parent_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (name, description, gl_code, icon, color, parent_id))
+            return cursor.lastrowid
+        except sqlite3.IntegrityError:
+            return None
 
 
+@serialized_write
 def update_expense_category(category_id, name=None, description=None, gl_code=None, icon=None, color=None, is_active=None):
     """Update expense category"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
     updates = []
     params = []
-    
+
     if name is not None:
         updates.append("name = ?")
         params.append(name)
@@ -1528,19 +1629,17 @@ def update_expense_category(category_id, name=None, description=None, gl_code=No
     if is_active is not None:
         updates.append("is_active = ?")
         params.append(is_active)
-    
+
     updates.append("updated_at = CURRENT_TIMESTAMP")
     params.append(category_id)
-    
-    cursor.execute(f"""
-    UPDATE expense_categories
-    SET {', '.join(updates)}
-    WHERE id = ?
-    """, params)
-    
-    conn.commit()
-    conn.close()
-    return cursor.rowcount > 0
+
+    with session() as cursor:
+        cursor.execute(f"""
+        UPDATE expense_categories
+        SET {', '.join(updates)}
+        WHERE id = ?
+        """, params)
+        return cursor.rowcount > 0
 
 
 def delete_expense_category(category_id):
@@ -1552,9 +1651,6 @@ def delete_expense_category(category_id):
 
 def get_policy_rules(include_inactive=False):
     """Get all policy rules"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
     query = """
     SELECT pr.id, pr.rule_name, pr.rule_type, pr.category_id, ec.name as category_name,
            pr.max_amount, pr.currency, pr.requires_receipt, pr.requires_approval,
@@ -1566,63 +1662,56 @@ def get_policy_rules(include_inactive=False):
     if not include_inactive:
         query += " WHERE pr.is_active = 1"
     query += " ORDER BY pr.rule_name"
-    
-    cursor.execute(query)
-    return cursor.fetchall()
+
+    with session() as cursor:
+        cursor.execute(query)
+        return cursor.fetchall()
 
 
-def add_policy_rule(rule_name, rule_type, category_id=None, max_amount=None, currency="PHP", 
-                   requires_receipt=0, requires_approval=1, disallowed_vendors="", 
+@serialized_write
+def add_policy_rule(rule_name, rule_type, category_id=None, max_amount=None, currency="PHP",
+                   requires_receipt=0, requires_approval=1, disallowed_vendors="",
                    per_diem_rate=None, description=""):
     """Add new policy rule"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-    INSERT INTO policy_rules (rule_name, rule_type, category_id, max_amount, currency,
-                             requires_receipt, requires_approval, disallowed_vendors,
-                             per_diem_rate, description)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (rule_name, rule_type, category_id, max_amount, currency, requires_receipt,
-          requires_approval, disallowed_vendors, per_diem_rate, description))
-    
-    conn.commit()
-    conn.close()
-    return cursor.lastrowid
+    with session() as cursor:
+        cursor.execute("""
+        INSERT INTO policy_rules (rule_name, rule_type, category_id, max_amount, currency,
+                                 requires_receipt, requires_approval, disallowed_vendors,
+                                 per_diem_rate, description)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (rule_name, rule_type, category_id, max_amount, currency, requires_receipt,
+              requires_approval, disallowed_vendors, per_diem_rate, description))
+        return cursor.lastrowid
 
 
+@serialized_write
 def update_policy_rule(rule_id, **kwargs):
     """Update policy rule"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
     valid_fields = ['rule_name', 'rule_type', 'category_id', 'max_amount', 'currency',
                    'requires_receipt', 'requires_approval', 'disallowed_vendors',
                    'per_diem_rate', 'description', 'is_active']
-    
+
     updates = []
     params = []
-    
+
     for field, value in kwargs.items():
         if field in valid_fields:
             updates.append(f"{field} = ?")
             params.append(value)
-    
+
     if not updates:
         return False
-    
+
     updates.append("updated_at = CURRENT_TIMESTAMP")
     params.append(rule_id)
-    
-    cursor.execute(f"""
-    UPDATE policy_rules
-    SET {', '.join(updates)}
-    WHERE id = ?
-    """, params)
-    
-    conn.commit()
-    conn.close()
-    return cursor.rowcount > 0
+
+    with session() as cursor:
+        cursor.execute(f"""
+        UPDATE policy_rules
+        SET {', '.join(updates)}
+        WHERE id = ?
+        """, params)
+        return cursor.rowcount > 0
 
 
 def delete_policy_rule(rule_id):
@@ -1632,482 +1721,568 @@ def delete_policy_rule(rule_id):
 
 # ==================== CURRENCY EXCHANGE RATES ====================
 
+# Bumped after every write to exchange_rate_history so in-memory copies
+# (utils/rate_history) know to reload
+_rate_history_version = 0
+
+
+def rate_history_version() -> int:
+    return _rate_history_version
+
+
+def bumps_rate_history(fn):
+    """Mark exchange_rate_history as changed once the write has committed."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        global _rate_history_version
+        result = fn(*args, **kwargs)
+        _rate_history_version += 1
+        return result
+    return wrapper
+
+
+def _record_rate(cursor, currency, rate, effective_date=None, source="api"):
+    # History days are UTC, like currency_rates' CURRENT_TIMESTAMP dates
+    cursor.execute("""
+    INSERT INTO exchange_rate_history (currency, effective_date, rate, source)
+    VALUES (?, substr(COALESCE(?, date('now')), 1, 10), ?, ?)
+    ON CONFLICT (currency, effective_date) DO UPDATE SET
+        rate = excluded.rate, source = excluded.source, recorded_at = CURRENT_TIMESTAMP
+    """, (currency, effective_date, rate, source))
+
+
+def _record_quoted_rate(cursor, from_currency, to_currency, rate, effective_date, source):
+    # Only rates quoted against USD go into the (USD-based) dated history
+    if rate and from_currency != to_currency and "USD" in (from_currency, to_currency):
+        currency, usd_rate = (to_currency, rate) if from_currency == "USD" else (from_currency, 1.0 / rate)
+        _record_rate(cursor, currency, usd_rate, effective_date, source)
+
+
+@bumps_rate_history
+@serialized_write
+def record_exchange_rates(rates: dict, effective_date=None, source="api"):
+    """Store a USD-based rate snapshot ({currency: units per USD}) as of effective_date (default today, UTC)."""
+    with session() as cursor:
+        for currency, rate in rates.items():
+            if currency != "USD" and rate:
+                _record_rate(cursor, currency, rate, effective_date, source)
+
+
+def get_exchange_rate_history():
+    """All (currency, effective_date, rate) history rows, sorted by currency then date."""
+    with session() as cursor:
+        cursor.execute("""
+        SELECT currency, effective_date, rate FROM exchange_rate_history
+        ORDER BY currency, effective_date
+        """)
+        return cursor.fetchall()
+
+
 def get_currency_rates(from_currency=None, to_currency=None):
     """Get currency exchange rates"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
     query = """
     SELECT id, from_currency, to_currency, rate, effective_date, is_active, source, updated_at
     FROM currency_rates
     WHERE is_active = 1
     """
     params = []
-    
+
     if from_currency:
         query += " AND from_currency = ?"
         params.append(from_currency)
     if to_currency:
         query += " AND to_currency = ?"
         params.append(to_currency)
-    
+
     query += " ORDER BY effective_date DESC, from_currency, to_currency"
-    
-    cursor.execute(query, params)
-    return cursor.fetchall()
+
+    with session() as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchall()
 
 
+@bumps_rate_history
+@serialized_write
 def add_currency_rate(from_currency, to_currency, rate, effective_date=None, source="manual"):
     """Add currency exchange rate"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute("""
-        INSERT INTO currency_rates (from_currency, to_currency, rate, effective_date, source)
-        VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)
-        """, (from_currency, to_currency, rate, effective_date, source))
-        conn.commit()
-        return cursor.lastrowid
-    except sqlite3.IntegrityError:
-        # Update existing rate
-        cursor.execute("""
-        UPDATE currency_rates
-        SET rate = ?, updated_at = CURRENT_TIMESTAMP, source = ?
-        WHERE from_currency = ? AND to_currency = ? AND effective_date = COALESCE(?, CURRENT_TIMESTAMP)
-        """, (rate, source, from_currency, to_currency, effective_date))
-        conn.commit()
-        return cursor.lastrowid
-    finally:
-        conn.close()
-
-
+    with session() as cursor:
+        try:
+            cursor.execute("""
+            INSERT INTO currency_rates (from_currency, to_currency, rate, effective_date, source)
+            VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)
+            """, (from_currency, to_currency, rate, effective_date, source))
+            rate_id = cursor.lastrowid
+        except sqlite3.IntegrityError:
+            # Update existing rate
+            cursor.execute("""
+            UPDATE currency_rates
+            SET rate = ?, updated_at = CURRENT_TIMESTAMP, source = ?
+            WHERE from_currency = ? AND to_currency = ? AND effective_date = COALESCE(?, CURRENT_TIMESTAMP)
+            """, (rate, source, from_currency, to_currency, effective_date))
+            # lastrowid is meaningless after an UPDATE on a pooled connection
+            cursor.execute("""
+            SELECT id FROM currency_rates
+            WHERE from_currency = ? AND to_currency = ? AND effective_date = COALESCE(?, CURRENT_TIMESTAMP)
+            """, (from_currency, to_currency, effective_date))
+            row = cursor.fetchone()
+            rate_id = row[0] if row else None
+
+        _record_quoted_rate(cursor, from_currency, to_currency, rate, effective_date, source)
+        return rate_id
+
+
+@bumps_rate_history
+@serialized_write
 def update_currency_rate(rate_id, rate=None, is_active=None):
     """Update currency rate"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
     updates = []
     params = []
-    
+
     if rate is not None:
         updates.append("rate = ?")
         params.append(rate)
     if is_active is not None:
         updates.append("is_active = ?")
         params.append(is_active)
-    
+
     updates.append("updated_at = CURRENT_TIMESTAMP")
     params.append(rate_id)
-    
-    cursor.execute(f"""
-    UPDATE currency_rates
-    SET {', '.join(updates)}
-    WHERE id = ?
-    """, params)
-    
-    conn.commit()
-    conn.close()
-    return cursor.rowcount > 0
+
+    with session() as cursor:
+        cursor.execute(f"""
+        UPDATE currency_rates
+        SET {', '.join(updates)}
+        WHERE id = ?
+        """, params)
+        if cursor.rowcount == 0:
+            return False
+
+        # Keep the dated history in step with the edited rate
+        cursor.execute("""
+        SELECT from_currency, to_currency, rate, effective_date, is_active, source
+        FROM currency_rates WHERE id = ?
+        """, (rate_id,))
+        from_currency, to_currency, rate, effective_date, is_active, source = cursor.fetchone()
+        if is_active:
+            _record_quoted_rate(cursor, from_currency, to_currency, rate, effective_date, source)
+        elif "USD" in (from_currency, to_currency):
+            # A deactivated rate no longer applies to its day
+            cursor.execute("""
+            DELETE FROM exchange_rate_history
+            WHERE currency = ? AND effective_date = substr(?, 1, 10) AND source = ?
+            """, (to_currency if from_currency == "USD" else from_currency, effective_date, source))
+        return True
 
 
 # ==================== ACCOUNTING INTEGRATION ====================
 
 def get_accounting_integrations():
     """Get all accounting integrations"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-    SELECT id, platform, company_id, sync_enabled, last_sync, sync_frequency,
-           auto_sync, is_active, created_at, updated_at
-    FROM accounting_integration
-    WHERE is_active = 1
-    ORDER BY platform
-    """)
-    
-    return cursor.fetchall()
+    with session() as cursor:
+        cursor.execute("""
+        SELECT id, platform, company_id, sync_enabled, last_sync, sync_frequency,
+               auto_sync, is_active, created_at, updated_at
+        FROM accounting_integration
+        WHERE is_active = 1
+        ORDER BY platform
+        """)
+        return cursor.fetchall()
 
 
-def add_accounting_integration(platform, api_key="", api_secret="", company_id="", 
+@serialized_write
+def add_accounting_integration(platform, api_key="", api_secret="", company_id="",
                                sync_enabled=0, sync_frequency="daily", auto_sync=0, config_json="{}"):
     """Add accounting integration"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-    INSERT INTO accounting_integration (platform, api_key, api_secret, company_id,
-                                       sync_enabled, sync_frequency, auto_sync, config_json)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (platform, api_key, api_secret, company_id, sync_enabled, sync_frequency, auto_sync, config_json))
-    
-    conn.commit()
-    conn.close()
-    return cursor.lastrowid
+    with session() as cursor:
+        cursor.execute("""
+        INSERT INTO accounting_integration (platform, api_key, api_secret, company_id,
+                                           sync_enabled, sync_frequency, auto_sync, config_json)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (platform, api_key, api_secret, company_id, sync_enabled, sync_frequency, auto_sync, config_json))
+        return cursor.lastrowid
 
 
+@serialized_write
 def update_accounting_integration(integration_id, **kwargs):
     """Update accounting integration"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
     valid_fields = ['platform', 'api_key', 'api_secret', 'company_id', 'sync_enabled',
                    'last_sync', 'sync_frequency', 'auto_sync', 'config_json', 'is_active']
-    
+
     updates = []
     params = []
-    
+
     for field, value in kwargs.items():
         if field in valid_fields:
             updates.append(f"{field} = ?")
             params.append(value)
-    
+
     if not updates:
         return False
-    
+
     updates.append("updated_at = CURRENT_TIMESTAMP")
     params.append(integration_id)
-    
-    cursor.execute(f"""
-    UPDATE accounting_integration
-    SET {', '.join(updates)}
-    WHERE id = ?
-    """, params)
-    
-    conn.commit()
-    conn.close()
-    return cursor.rowcount > 0
 
+    with session() as cursor:
+        cursor.execute(f"""
+        UPDATE accounting_integration
+        SET {', '.join(updates)}
+        WHERE id = ?
+        """, params)
+        return cursor.rowcount > 0
 
+
+@serialized_write
 def log_sync_activity(integration_id, sync_type, status, records_synced=0, error_message=None):
     """Log sync activity"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-    INSERT INTO sync_logs (integration_id, sync_type, status, records_synced, error_message, completed_at)
-    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-    """, (integration_id, sync_type, status, records_synced, error_message))
-    
-    conn.commit()
-    conn.close()
-    return cursor.lastrowid
+    with session() as cursor:
+        cursor.execute("""
+        INSERT INTO sync_logs (integration_id, sync_type, status, records_synced, error_message, completed_at)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (integration_id, sync_type, status, records_synced, error_message))
+        return cursor.lastrowid
 
 
 def get_sync_logs(integration_id=None, limit=50):
     """Get sync logs"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
     query = """
     SELECT sl.id, sl.integration_id, ai.platform, sl.sync_type, sl.status,
            sl.records_synced, sl.error_message, sl.started_at, sl.completed_at
     FROM sync_logs sl
     JOIN accounting_integration ai ON sl.integration_id = ai.id
     """
-    
-    if integration_id:
-        query += " WHERE sl.integration_id = ?"
-        cursor.execute(query + " ORDER BY sl.started_at DESC LIMIT ?", (integration_id, limit))
-    else:
-        cursor.execute(query + " ORDER BY sl.started_at DESC LIMIT ?", (limit,))
-    
-    return cursor.fetchall()
+
+    with session() as cursor:
+        if integration_id:
+            query += " WHERE sl.integration_id = ?"
+            cursor.execute(query + " ORDER BY sl.started_at DESC LIMIT ?", (integration_id, limit))
+        else:
+            cursor.execute(query + " ORDER BY sl.started_at DESC LIMIT ?", (limit,))
+        return cursor.fetchall()
 
 
 # ===== ANNOUNCEMENTS & NOTIFICATIONS =====
 
-def add_announcement(title, message, type='info', priority='normal', admin_id=None, 
+@serialized_write
+def add_announcement(title, message, type='info', priority='normal', admin_id=None,
                      target_users='all', start_date=None, end_date=None, is_pinned=0):
     """Create a new announcement"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-    INSERT INTO announcements (title, message, type, priority, admin_id, target_users, 
-                              start_date, end_date, is_pinned)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (title, message, type, priority, admin_id, target_users, start_date, end_date, is_pinned))
-    
-    announcement_id = cursor.lastrowid
-    
-    # Create notifications for users
-    if target_users == 'all':
-        cursor.execute("SELECT id FROM users")
-        user_ids = [row[0] for row in cursor.fetchall()]
-    else:
-        # Parse comma-separated user IDs
-        user_ids = [int(uid.strip()) for uid in target_users.split(',') if uid.strip().isdigit()]
-    
-    for user_id in user_ids:
+    with session() as cursor:
         cursor.execute("""
+        INSERT INTO announcements (title, message, type, priority, admin_id, target_users,
+                                  start_date, end_date, is_pinned)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (title, message, type, priority, admin_id, target_users, start_date, end_date, is_pinned))
+
+        announcement_id = cursor.lastrowid
+
+        # Create notifications for users
+        if target_users == 'all':
+            cursor.execute("SELECT id FROM users")
+            user_ids = [row[0] for row in cursor.fetchall()]
+        else:
+            # Parse comma-separated user IDs
+            user_ids = [int(uid.strip()) for uid in target_users.split(',') if uid.strip().isdigit()]
+
+        cursor.executemany("""
         INSERT INTO user_notifications (user_id, announcement_id, title, message, type)
         VALUES (?, ?, ?, ?, ?)
-        """, (user_id, announcement_id, title, message, type))
-    
-    conn.commit()
-    conn.close()
+        """, [(user_id, announcement_id, title, message, type) for user_id in user_ids])
+
     return announcement_id
 
 
 def get_announcements(include_inactive=False, limit=None):
     """Get all announcements"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
     query = """
     SELECT a.id, a.title, a.message, a.type, a.priority, a.admin_id, ad.username,
            a.target_users, a.start_date, a.end_date, a.is_active, a.is_pinned,
            a.created_at, a.updated_at,
-           (SELECT COUNT(*) FROM user_notifications un WHERE un.announcement_id = a.id) as notification_count,
-           (SELECT COUNT(*) FROM user_notifications un WHERE un.announcement_id = a.id AND un.is_read = 1) as read_count
+           -- Index-only lookups; archived notifications are read and still count
+           (SELECT COUNT(*) FROM user_notifications un WHERE un.announcement_id = a.id)
+             + (SELECT COUNT(*) FROM user_notifications_archive na WHERE na.announcement_id = a.id) as notification_count,
+           (SELECT COUNT(*) FROM user_notifications un WHERE un.announcement_id = a.id AND un.is_read = 1)
+             + (SELECT COUNT(*) FROM user_notifications_archive na WHERE na.announcement_id = a.id) as read_count
     FROM announcements a
     LEFT JOIN admins ad ON a.admin_id = ad.id
     """
-    
+
     if not include_inactive:
         query += " WHERE a.is_active = 1"
-    
+
     query += " ORDER BY a.is_pinned DESC, a.created_at DESC"
-    
+
     if limit:
         query += f" LIMIT {limit}"
-    
-    cursor.execute(query)
-    return cursor.fetchall()
+
+    with session() as cursor:
+        cursor.execute(query)
+        return cursor.fetchall()
 
 
 def get_announcement_by_id(announcement_id):
     """Get announcement by ID"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-    SELECT a.id, a.title, a.message, a.type, a.priority, a.admin_id, ad.username,
-           a.target_users, a.start_date, a.end_date, a.is_active, a.is_pinned,
-           a.created_at, a.updated_at
-    FROM announcements a
-    LEFT JOIN admins ad ON a.admin_id = ad.id
-    WHERE a.id = ?
-    """, (announcement_id,))
-    
-    return cursor.fetchone()
+    with session() as cursor:
+        cursor.execute("""
+        SELECT a.id, a.title, a.message, a.type, a.priority, a.admin_id, ad.username,
+               a.target_users, a.start_date, a.end_date, a.is_active, a.is_pinned,
+               a.created_at, a.updated_at
+        FROM announcements a
+        LEFT JOIN admins ad ON a.admin_id = ad.id
+        WHERE a.id = ?
+        """, (announcement_id,))
+        return cursor.fetchone()
 
 
+@serialized_write
 def update_announcement(announcement_id, **fields):
     """Update announcement fields"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
     updates = []
     params = []
-    
+
     for field, value in fields.items():
-        if field in ['title', 'message', 'type', 'priority', 'target_users', 
+        if field in ['title', 'message', 'type', 'priority', 'target_users',
                      'start_date', 'end_date', 'is_active', 'is_pinned']:
             updates.append(f"{field} = ?")
             params.append(value)
-    
+
     if not updates:
         return False
-    
+
     updates.append("updated_at = CURRENT_TIMESTAMP")
     params.append(announcement_id)
-    
-    cursor.execute(f"""
-    UPDATE announcements
-    SET {', '.join(updates)}
-    WHERE id = ?
-    """, params)
-    
-    conn.commit()
-    conn.close()
-    return cursor.rowcount > 0
 
+    with session() as cursor:
+        cursor.execute(f"""
+        UPDATE announcements
+        SET {', '.join(updates)}
+        WHERE id = ?
+        """, params)
+        return cursor.rowcount > 0
 
+
+@serialized_write
 def delete_announcement(announcement_id):
     """Delete announcement and its notifications"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("DELETE FROM user_notifications WHERE announcement_id = ?", (announcement_id,))
-    cursor.execute("DELETE FROM announcements WHERE id = ?", (announcement_id,))
-    
-    conn.commit()
-    conn.close()
-    return cursor.rowcount > 0
+    with session() as cursor:
+        cursor.execute("DELETE FROM user_notifications WHERE announcement_id = ?", (announcement_id,))
+        cursor.execute("DELETE FROM user_notifications_archive WHERE announcement_id = ?", (announcement_id,))
+        cursor.execute("DELETE FROM announcements WHERE id = ?", (announcement_id,))
+        return cursor.rowcount > 0
 
 
 def get_user_notifications(user_id, include_read=False, limit=20):
     """Get notifications for a specific user"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
     query = """
     SELECT id, announcement_id, title, message, type, is_read, read_at, created_at
     FROM user_notifications
     WHERE user_id = ?
     """
-    
+
     if not include_read:
         query += " AND is_read = 0"
-    
-    query += " ORDER BY created_at DESC LIMIT ?"
-    
-    cursor.execute(query, (user_id, limit))
-    return cursor.fetchall()
 
+    query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+
+    with session() as cursor:
+        cursor.execute(query, (user_id, limit))
+        return cursor.fetchall()
 
+
+@serialized_write
 def mark_notification_read(notification_id):
     """Mark a notification as read"""
     from datetime import datetime
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-    UPDATE user_notifications
-    SET is_read = 1, read_at = ?
-    WHERE id = ?
-    """, (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), notification_id))
-    
-    conn.commit()
-    conn.close()
-    return cursor.rowcount > 0
+    with session() as cursor:
+        cursor.execute("""
+        UPDATE user_notifications
+        SET is_read = 1, read_at = ?
+        WHERE id = ?
+        """, (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), notification_id))
+        return cursor.rowcount > 0
 
 
 def get_unread_notification_count(user_id):
     """Get count of unread notifications for a user"""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-    SELECT COUNT(*) FROM user_notifications
-    WHERE user_id = ? AND is_read = 0
-    """, (user_id,))
-    
-    return cursor.fetchone()[0]
+    with session() as cursor:
+        cursor.execute("""
+        SELECT COUNT(*) FROM user_notifications
+        WHERE user_id = ? AND is_read = 0
+        """, (user_id,))
+        return cursor.fetchone()[0]
+
+
+# ===== RETENTION =====
+
+# Defaults for purge_old_records()
+ADMIN_LOG_RETENTION_DAYS = 180
+ADMIN_LOG_MAX_ROWS = 10000
+READ_NOTIFICATION_RETENTION_DAYS = 90
+READ_NOTIFICATIONS_PER_USER = 200
+
+
+@serialized_write
+def purge_old_records(log_days=ADMIN_LOG_RETENTION_DAYS, max_logs=ADMIN_LOG_MAX_ROWS,
+                      notification_days=READ_NOTIFICATION_RETENTION_DAYS,
+                      notifications_per_user=READ_NOTIFICATIONS_PER_USER) -> dict:
+    """Move old admin logs and read notifications into their archive tables.
+
+    Admin logs are archived once older than log_days or beyond the newest
+    max_logs rows. Read notifications are archived once read (or created)
+    more than notification_days ago, or beyond the newest
+    notifications_per_user read ones per user. Unread notifications are
+    never touched. Returns the number of rows archived per table.
+    """
+    from datetime import datetime, timedelta
+    now = datetime.now()
+    log_cutoff = (now - timedelta(days=log_days)).strftime("%Y-%m-%d %H:%M:%S")
+    notification_cutoff = (now - timedelta(days=notification_days)).strftime("%Y-%m-%d %H:%M:%S")
+
+    log_filter = """
+        timestamp < ? OR id NOT IN (
+            SELECT id FROM admin_logs ORDER BY timestamp DESC, id DESC LIMIT ?
+        )
+    """
+    log_params = (log_cutoff, max_logs)
+
+    notification_filter = """
+        is_read = 1 AND (
+            COALESCE(read_at, created_at) < ? OR id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY user_id ORDER BY created_at DESC, id DESC
+                    ) AS rn
+                    FROM user_notifications WHERE is_read = 1
+                ) WHERE rn > ?
+            )
+        )
+    """
+    notification_params = (notification_cutoff, notifications_per_user)
+
+    with session() as cur:
+        cur.execute(f"""
+            INSERT OR REPLACE INTO admin_logs_archive (id, admin_id, action, target_user_id, details, timestamp)
+            SELECT id, admin_id, action, target_user_id, details, timestamp
+            FROM admin_logs WHERE {log_filter}
+        """, log_params)
+        cur.execute(f"DELETE FROM admin_logs WHERE {log_filter}", log_params)
+        logs_archived = cur.rowcount
+
+        cur.execute(f"""
+            INSERT OR REPLACE INTO user_notifications_archive
+                (id, user_id, announcement_id, title, message, type, is_read, read_at, created_at)
+            SELECT id, user_id, announcement_id, title, message, type, is_read, read_at, created_at
+            FROM user_notifications WHERE {notification_filter}
+        """, notification_params)
+        cur.execute(f"DELETE FROM user_notifications WHERE {notification_filter}", notification_params)
+        notifications_archived = cur.rowcount
+
+    return {"admin_logs": logs_archived, "user_notifications": notifications_archived}
 
 
 # ----- REMINDER CRUD -----
 def get_user_reminders(user_id: int) -> list:
     """Get all reminders for a user."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id, type, enabled, time, threshold, days_inactive, custom_message, last_triggered, created_at FROM reminders WHERE user_id = ? ORDER BY created_at ASC", (user_id,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("SELECT id, type, enabled, time, threshold, days_inactive, custom_message, last_triggered, created_at FROM reminders WHERE user_id = ? ORDER BY created_at ASC, id ASC", (user_id,))
+        return cur.fetchall()
 
 
 def get_reminder_by_type(user_id: int, reminder_type: str):
     """Get a specific reminder by type for a user."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id, type, enabled, time, threshold, days_inactive, custom_message, last_triggered, created_at FROM reminders WHERE user_id = ? AND type = ?", (user_id, reminder_type))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    with session() as cur:
+        cur.execute("SELECT id, type, enabled, time, threshold, days_inactive, custom_message, last_triggered, created_at FROM reminders WHERE user_id = ? AND type = ?", (user_id, reminder_type))
+        return cur.fetchone()
 
 
+@notifies_change("reminders")
+@serialized_write
 def upsert_reminder(user_id: int, reminder_type: str, enabled: bool = True, time_str: str = "20:00",
                     threshold: float = 20.0, days_inactive: int = 3, custom_message: str = "") -> int:
     """Insert or update a reminder for a user. Returns the reminder ID."""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    # Check if exists
-    cur.execute("SELECT id FROM reminders WHERE user_id = ? AND type = ?", (user_id, reminder_type))
-    existing = cur.fetchone()
-    
-    if existing:
-        cur.execute("""
-            UPDATE reminders SET enabled = ?, time = ?, threshold = ?, days_inactive = ?, custom_message = ?
-            WHERE id = ?
-        """, (1 if enabled else 0, time_str, threshold, days_inactive, custom_message, existing[0]))
-        rid = existing[0]
-    else:
+    with session() as cur:
+        # Check if exists
+        cur.execute("SELECT id FROM reminders WHERE user_id = ? AND type = ?", (user_id, reminder_type))
+        existing = cur.fetchone()
+
+        if existing:
+            cur.execute("""
+                UPDATE reminders SET enabled = ?, time = ?, threshold = ?, days_inactive = ?, custom_message = ?
+                WHERE id = ?
+            """, (1 if enabled else 0, time_str, threshold, days_inactive, custom_message, existing[0]))
+            return existing[0]
+
         cur.execute("""
             INSERT INTO reminders (user_id, type, enabled, time, threshold, days_inactive, custom_message, created_at)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (user_id, reminder_type, 1 if enabled else 0, time_str, threshold, days_inactive, custom_message,
               datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-        rid = cur.lastrowid
-    
-    conn.commit()
-    conn.close()
-    return rid
+        return cur.lastrowid
 
 
+@serialized_write
 def update_reminder_last_triggered(reminder_id: int):
     """Update the last_triggered timestamp for a reminder."""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("UPDATE reminders SET last_triggered = ? WHERE id = ?",
-                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), reminder_id))
-    conn.commit()
-    conn.close()
+    with session() as cur:
+        cur.execute("UPDATE reminders SET last_triggered = ? WHERE id = ?",
+                    (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), reminder_id))
 
 
+@notifies_change("reminders")
+@serialized_write
 def delete_reminder(reminder_id: int, user_id: int) -> bool:
     """Delete a reminder."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM reminders WHERE id = ? AND user_id = ?", (reminder_id, user_id))
-    conn.commit()
-    deleted = cur.rowcount
-    conn.close()
-    return deleted > 0
+    with session() as cur:
+        cur.execute("DELETE FROM reminders WHERE id = ? AND user_id = ?", (reminder_id, user_id))
+        return cur.rowcount > 0
 
 
+@notifies_change("reminders")
+@serialized_write
 def init_default_reminders(user_id: int):
     """Initialize default reminders for a new user (if none exist)."""
-    existing = get_user_reminders(user_id)
-    if not existing:
-        upsert_reminder(user_id, "daily_expense", enabled=True, time_str="20:00")
-        upsert_reminder(user_id, "budget_warning", enabled=True, threshold=20.0)
-        upsert_reminder(user_id, "weekly_summary", enabled=True, time_str="09:00")
-        upsert_reminder(user_id, "idle_reminder", enabled=True, days_inactive=3)
-        upsert_reminder(user_id, "recurring_expense", enabled=True)
+    # One session so the check and the inserts share a connection and transaction
+    with session():
+        existing = get_user_reminders(user_id)
+        if not existing:
+            upsert_reminder(user_id, "daily_expense", enabled=True, time_str="20:00")
+            upsert_reminder(user_id, "budget_warning", enabled=True, threshold=20.0)
+            upsert_reminder(user_id, "weekly_summary", enabled=True, time_str="09:00")
+            upsert_reminder(user_id, "idle_reminder", enabled=True, days_inactive=3)
+            upsert_reminder(user_id, "recurring_expense", enabled=True)
 
 
 # ----- RECURRING EXPENSE CRUD -----
 def get_recurring_expenses(user_id: int) -> list:
     """Get all recurring expenses for a user."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, name, amount, category, due_day, frequency, enabled, last_reminded, created_at
-        FROM recurring_expenses WHERE user_id = ? ORDER BY due_day ASC
-    """, (user_id,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("""
+            SELECT id, name, amount, category, due_day, frequency, enabled, last_reminded, created_at
+            FROM recurring_expenses WHERE user_id = ? ORDER BY due_day ASC
+        """, (user_id,))
+        return cur.fetchall()
 
 
+@notifies_change("recurring_expenses")
+@serialized_write
 def insert_recurring_expense(user_id: int, name: str, amount: float, category: str,
                              due_day: int, frequency: str = "monthly") -> int:
     """Insert a new recurring expense. Returns the ID."""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO recurring_expenses (user_id, name, amount, category, due_day, frequency, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (user_id, name, amount, category, due_day, frequency,
-          datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-    conn.commit()
-    rid = cur.lastrowid
-    conn.close()
-    return rid
+    with session() as cur:
+        cur.execute("""
+            INSERT INTO recurring_expenses (user_id, name, amount, category, due_day, frequency, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (user_id, name, amount, category, due_day, frequency,
+              datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        return cur.lastrowid
 
 
+@notifies_change("recurring_expenses")
+@serialized_write
 def update_recurring_expense(expense_id: int, user_id: int, **fields) -> bool:
     """Update a recurring expense."""
-    conn = connect_db()
-    cur = conn.cursor()
-    
     updates = []
     values = []
     allowed = ["name", "amount", "category", "due_day", "frequency", "enabled"]
@@ -2115,61 +2290,52 @@ def update_recurring_expense(expense_id: int, user_id: int, **fields) -> bool:
         if field in allowed:
             updates.append(f"{field} = ?")
             values.append(value)
-    
+
     if not updates:
-        conn.close()
         return False
-    
+
     values.extend([expense_id, user_id])
-    cur.execute(f"UPDATE recurring_expenses SET {', '.join(updates)} WHERE id = ? AND user_id = ?", values)
-    conn.commit()
-    updated = cur.rowcount
-    conn.close()
-    return updated > 0
+    with session() as cur:
+        cur.execute(f"UPDATE recurring_expenses SET {', '.join(updates)} WHERE id = ? AND user_id = ?", values)
+        return cur.rowcount > 0
 
 
+@notifies_change("recurring_expenses")
+@serialized_write
 def delete_recurring_expense(expense_id: int, user_id: int) -> bool:
     """Delete a recurring expense."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM recurring_expenses WHERE id = ? AND user_id = ?", (expense_id, user_id))
-    conn.commit()
-    deleted = cur.rowcount
-    conn.close()
-    return deleted > 0
+    with session() as cur:
+        cur.execute("DELETE FROM recurring_expenses WHERE id = ? AND user_id = ?", (expense_id, user_id))
+        return cur.rowcount > 0
 
 
+@serialized_write
 def update_recurring_last_reminded(expense_id: int):
     """Update the last_reminded timestamp for a recurring expense."""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("UPDATE recurring_expenses SET last_reminded = ? WHERE id = ?",
-                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), expense_id))
-    conn.commit()
-    conn.close()
+    with session() as cur:
+        cur.execute("UPDATE recurring_expenses SET last_reminded = ? WHERE id = ?",
+                    (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), expense_id))
 
 
 def get_last_expense_date(user_id: int) -> str:
     """Get the date of the most recent expense for a user."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT date FROM expenses WHERE user_id = ? ORDER BY date DESC LIMIT 1", (user_id,))
-    row = cur.fetchone()
-    conn.close()
+    with session() as cur:
+        cur.execute("SELECT date FROM expenses WHERE user_id = ? ORDER BY date DESC LIMIT 1", (user_id,))
+        row = cur.fetchone()
     return row[0] if row else None
 
 
 def get_today_expense_count(user_id: int) -> int:
     """Get the number of expenses logged today."""
-    from datetime import datetime
-    today = datetime.now().strftime("%Y-%m-%d")
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM expenses WHERE user_id = ? AND date LIKE ?", (user_id, f"{today}%"))
-    count = cur.fetchone()[0]
-    conn.close()
-    return count
+    from datetime import datetime, timedelta
+    now = datetime.now()
+    today = now.strftime("%Y-%m-%d")
+    tomorrow = (now + timedelta(days=1)).strftime("%Y-%m-%d")
+    with session() as cur:
+        # Range instead of LIKE 'today%' so the (user_id, date) index applies
+        cur.execute("SELECT COUNT(*) FROM expenses WHERE user_id = ? AND date >= ? AND date < ?", (user_id, today, tomorrow))
+        return cur.fetchone()[0]
 
 
 def get_weekly_total(user_id: int) -> float:
@@ -2177,127 +2343,107 @@ def get_weekly_total(user_id: int) -> float:
     from datetime import datetime, timedelta
     now = datetime.now()
     start_of_week = (now - timedelta(days=now.weekday())).strftime("%Y-%m-%d")
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT SUM(amount) FROM expenses WHERE user_id = ? AND date >= ?", (user_id, start_of_week))
-    total = cur.fetchone()[0]
-    conn.close()
+    with session() as cur:
+        cur.execute("SELECT SUM(total) FROM expense_daily_rollup WHERE user_id = ? AND day >= ?", (user_id, start_of_week))
+        total = cur.fetchone()[0]
     return float(total) if total else 0.0
 
 
 # ───── GAMIFICATION CRUD ─────
 
 def get_user_streak(user_id: int) -> dict:
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT current_streak, longest_streak, last_active_date, streak_freezes, total_days_active FROM user_streaks WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
-    conn.close()
+    with session() as cur:
+        cur.execute("SELECT current_streak, longest_streak, last_active_date, streak_freezes, total_days_active FROM user_streaks WHERE user_id = ?", (user_id,))
+        row = cur.fetchone()
     if row:
         return {"current": row[0], "longest": row[1], "last_active": row[2], "freezes": row[3], "total_days": row[4]}
     return {"current": 0, "longest": 0, "last_active": None, "freezes": 1, "total_days": 0}
 
 
+@serialized_write
 def update_user_streak(user_id: int, current: int, longest: int, last_active: str, freezes: int, total_days: int):
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM user_streaks WHERE user_id = ?", (user_id,))
-    if cur.fetchone():
-        cur.execute("UPDATE user_streaks SET current_streak=?, longest_streak=?, last_active_date=?, streak_freezes=?, total_days_active=? WHERE user_id=?",
-                    (current, longest, last_active, freezes, total_days, user_id))
-    else:
-        cur.execute("INSERT INTO user_streaks (user_id, current_streak, longest_streak, last_active_date, streak_freezes, total_days_active) VALUES (?,?,?,?,?,?)",
-                    (user_id, current, longest, last_active, freezes, total_days))
-    conn.commit()
-    conn.close()
+    with session() as cur:
+        cur.execute("SELECT id FROM user_streaks WHERE user_id = ?", (user_id,))
+        if cur.fetchone():
+            cur.execute("UPDATE user_streaks SET current_streak=?, longest_streak=?, last_active_date=?, streak_freezes=?, total_days_active=? WHERE user_id=?",
+                        (current, longest, last_active, freezes, total_days, user_id))
+        else:
+            cur.execute("INSERT INTO user_streaks (user_id, current_streak, longest_streak, last_active_date, streak_freezes, total_days_active) VALUES (?,?,?,?,?,?)",
+                        (user_id, current, longest, last_active, freezes, total_days))
 
 
 def get_user_badges(user_id: int) -> list:
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT badge_id, unlocked_at, seen FROM user_badges WHERE user_id = ? ORDER BY unlocked_at DESC", (user_id,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("SELECT badge_id, unlocked_at, seen FROM user_badges WHERE user_id = ? ORDER BY unlocked_at DESC", (user_id,))
+        return cur.fetchall()
 
 
+@serialized_write
 def unlock_badge(user_id: int, badge_id: str) -> bool:
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO user_badges (user_id, badge_id, unlocked_at) VALUES (?, ?, ?)",
-                    (user_id, badge_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception:
-        conn.close()
-        return False
+    with session() as cur:
+        try:
+            cur.execute("INSERT INTO user_badges (user_id, badge_id, unlocked_at) VALUES (?, ?, ?)",
+                        (user_id, badge_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            return True
+        except sqlite3.IntegrityError:
+            return False
 
 
 def has_badge(user_id: int, badge_id: str) -> bool:
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM user_badges WHERE user_id = ? AND badge_id = ?", (user_id, badge_id))
-    result = cur.fetchone() is not None
-    conn.close()
-    return result
+    with session() as cur:
+        cur.execute("SELECT id FROM user_badges WHERE user_id = ? AND badge_id = ?", (user_id, badge_id))
+        return cur.fetchone() is not None
 
 
+@serialized_write
 def mark_badges_seen(user_id: int):
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("UPDATE user_badges SET seen = 1 WHERE user_id = ? AND seen = 0", (user_id,))
-    conn.commit()
-    conn.close()
+    with session() as cur:
+        cur.execute("UPDATE user_badges SET seen = 1 WHERE user_id = ? AND seen = 0", (user_id,))
 
 
 def get_unseen_badges(user_id: int) -> list:
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT badge_id FROM user_badges WHERE user_id = ? AND seen = 0", (user_id,))
-    rows = [r[0] for r in cur.fetchall()]
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("SELECT badge_id FROM user_badges WHERE user_id = ? AND seen = 0", (user_id,))
+        return [r[0] for r in cur.fetchall()]
 
 
 def get_user_xp(user_id: int) -> dict:
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT total_xp, level FROM user_xp WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
-    conn.close()
+    with session() as cur:
+        cur.execute("SELECT total_xp, level FROM user_xp WHERE user_id = ?", (user_id,))
+        row = cur.fetchone()
     if row:
         return {"xp": row[0], "level": row[1]}
     return {"xp": 0, "level": 1}
 
 
+# Total XP needed for levels 1..10
+XP_LEVEL_THRESHOLDS = [0, 100, 300, 600, 1000, 1500, 2500, 4000, 6000, 10000]
+
+
+def level_for_xp(xp: int) -> int:
+    level = 1
+    for i, threshold in enumerate(XP_LEVEL_THRESHOLDS):
+        if xp >= threshold:
+            level = i + 1
+    return min(level, 10)
+
+
+@serialized_write
 def add_user_xp(user_id: int, amount: int) -> dict:
     """Add XP and recalculate level. Returns {xp, level, leveled_up}."""
-    LEVELS = [0, 100, 300, 600, 1000, 1500, 2500, 4000, 6000, 10000]
-    
-    data = get_user_xp(user_id)
-    new_xp = data["xp"] + amount
-    old_level = data["level"]
-    
-    # Calculate new level
-    new_level = 1
-    for i, threshold in enumerate(LEVELS):
-        if new_xp >= threshold:
-            new_level = i + 1
-    new_level = min(new_level, 10)
-    
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM user_xp WHERE user_id = ?", (user_id,))
-    if cur.fetchone():
-        cur.execute("UPDATE user_xp SET total_xp = ?, level = ? WHERE user_id = ?", (new_xp, new_level, user_id))
-    else:
-        cur.execute("INSERT INTO user_xp (user_id, total_xp, level) VALUES (?, ?, ?)", (user_id, new_xp, new_level))
-    conn.commit()
-    conn.close()
-    
+    with session() as cur:
+        cur.execute("SELECT total_xp, level FROM user_xp WHERE user_id = ?", (user_id,))
+        row = cur.fetchone()
+        old_xp, old_level = row if row else (0, 1)
+        new_xp = old_xp + amount
+        new_level = level_for_xp(new_xp)
+
+        if row:
+            cur.execute("UPDATE user_xp SET total_xp = ?, level = ? WHERE user_id = ?", (new_xp, new_level, user_id))
+        else:
+            cur.execute("INSERT INTO user_xp (user_id, total_xp, level) VALUES (?, ?, ?)", (user_id, new_xp, new_level))
+
     return {"xp": new_xp, "level": new_level, "leveled_up": new_level > old_level}
 
 
@@ -2305,70 +2451,160 @@ def get_active_challenges(user_id: int) -> list:
     from datetime import datetime, timedelta
     now = datetime.now()
     week_start = (now - timedelta(days=now.weekday())).strftime("%Y-%m-%d")
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id, challenge_type, target_value, current_value, xp_reward, completed FROM weekly_challenges WHERE user_id = ? AND week_start = ?",
-                (user_id, week_start))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("SELECT id, challenge_type, target_value, current_value, xp_reward, completed FROM weekly_challenges WHERE user_id = ? AND week_start = ?",
+                    (user_id, week_start))
+        return cur.fetchall()
 
 
 def get_all_challenges(user_id: int) -> list:
     """Get all challenges (active and completed) for a user."""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id, challenge_type, target_value, current_value, xp_reward, completed, week_start FROM weekly_challenges WHERE user_id = ? ORDER BY week_start DESC, completed ASC",
-                (user_id,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with session() as cur:
+        cur.execute("SELECT id, challenge_type, target_value, current_value, xp_reward, completed, week_start FROM weekly_challenges WHERE user_id = ? ORDER BY week_start DESC, completed ASC",
+                    (user_id,))
+        return cur.fetchall()
 
 
+@serialized_write
 def upsert_challenge(user_id: int, challenge_type: str, target: float, xp: int = 50):
     from datetime import datetime, timedelta
     now = datetime.now()
     week_start = (now - timedelta(days=now.weekday())).strftime("%Y-%m-%d")
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM weekly_challenges WHERE user_id = ? AND challenge_type = ? AND week_start = ?",
-                (user_id, challenge_type, week_start))
-    if not cur.fetchone():
-        cur.execute("INSERT INTO weekly_challenges (user_id, challenge_type, target_value, xp_reward, week_start) VALUES (?,?,?,?,?)",
-                    (user_id, challenge_type, target, xp, week_start))
-    conn.commit()
-    conn.close()
+    with session() as cur:
+        cur.execute("SELECT id FROM weekly_challenges WHERE user_id = ? AND challenge_type = ? AND week_start = ?",
+                    (user_id, challenge_type, week_start))
+        if not cur.fetchone():
+            cur.execute("INSERT INTO weekly_challenges (user_id, challenge_type, target_value, xp_reward, week_start) VALUES (?,?,?,?,?)",
+                        (user_id, challenge_type, target, xp, week_start))
 
 
+@serialized_write
 def update_challenge_progress(challenge_id: int, value: float):
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("UPDATE weekly_challenges SET current_value = ? WHERE id = ?", (value, challenge_id))
-    conn.commit()
-    conn.close()
+    with session() as cur:
+        cur.execute("UPDATE weekly_challenges SET current_value = ? WHERE id = ?", (value, challenge_id))
 
 
+@serialized_write
 def complete_challenge(challenge_id: int):
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("UPDATE weekly_challenges SET completed = 1 WHERE id = ?", (challenge_id,))
-    conn.commit()
-    conn.close()
+    with session() as cur:
+        cur.execute("UPDATE weekly_challenges SET completed = 1 WHERE id = ?", (challenge_id,))
 
 
 def get_expense_count_by_user(user_id: int) -> int:
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM expenses WHERE user_id = ?", (user_id,))
-    count = cur.fetchone()[0]
-    conn.close()
-    return count
+    with session() as cur:
+        cur.execute("SELECT expense_count FROM user_expense_stats WHERE user_id = ?", (user_id,))
+        row = cur.fetchone()
+    return row[0] if row else 0
 
 
 def get_unique_categories_used(user_id: int) -> int:
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(DISTINCT category) FROM expenses WHERE user_id = ?", (user_id,))
-    count = cur.fetchone()[0]
-    conn.close()
-    return count
+    with session() as cur:
+        cur.execute("SELECT categories_used FROM user_gamification_state WHERE user_id = ?", (user_id,))
+        row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def get_gamification_state(user_id: int) -> dict:
+    """Everything the gamification rules read for one user, in one session.
+
+    Returns xp, level, streak (as get_user_streak), badges (set of ids),
+    challenges (this week's rows, as get_active_challenges), today_count and
+    the badge counters: expense_count, categories_used, voice_expenses and
+    challenges_completed. Counters come from rollup rows, not table scans.
+    """
+    from datetime import datetime, timedelta
+    now = datetime.now()
+    today = now.strftime("%Y-%m-%d")
+    tomorrow = (now + timedelta(days=1)).strftime("%Y-%m-%d")
+    week_start = (now - timedelta(days=now.weekday())).strftime("%Y-%m-%d")
+    with session() as cur:
+        cur.execute("""
+            SELECT
+                (SELECT total_xp FROM user_xp WHERE user_id = :u),
+                (SELECT level FROM user_xp WHERE user_id = :u),
+                (SELECT expense_count FROM user_expense_stats WHERE user_id = :u),
+                (SELECT COUNT(*) FROM expenses WHERE user_id = :u AND date >= :today AND date < :tomorrow)
+        """, {"u": user_id, "today": today, "tomorrow": tomorrow})
+        xp, level, expense_count, today_count = cur.fetchone()
+        cur.execute("SELECT categories_used, voice_expenses, challenges_completed FROM user_gamification_state "
+                    "WHERE user_id = ?", (user_id,))
+        counters = cur.fetchone() or (0, 0, 0)
+        cur.execute("SELECT current_streak, longest_streak, last_active_date, streak_freezes, total_days_active "
+                    "FROM user_streaks WHERE user_id = ?", (user_id,))
+        streak = cur.fetchone()
+        cur.execute("SELECT badge_id FROM user_badges WHERE user_id = ?", (user_id,))
+        badges = {r[0] for r in cur.fetchall()}
+        cur.execute("SELECT id, challenge_type, target_value, current_value, xp_reward, completed FROM weekly_challenges "
+                    "WHERE user_id = ? AND week_start = ?", (user_id, week_start))
+        challenges = cur.fetchall()
+    return {
+        "xp": xp or 0,
+        "level": level or 1,
+        "streak": ({"current": streak[0], "longest": streak[1], "last_active": streak[2], "freezes": streak[3],
+                    "total_days": streak[4]} if streak else
+                   {"current": 0, "longest": 0, "last_active": None, "freezes": 1, "total_days": 0}),
+        "badges": badges,
+        "challenges": challenges,
+        "today_count": today_count,
+        "expense_count": expense_count or 0,
+        "categories_used": counters[0],
+        "voice_expenses": counters[1],
+        "challenges_completed": counters[2],
+    }
+
+
+@serialized_write
+def save_gamification_changes(user_id: int, xp_gained: int = 0, streak: dict = None, badges=(),
+                              challenge_progress=(), new_challenges=(), voice_expenses: int = 0) -> dict:
+    """Write one evaluation's results in a single transaction.
+
+    xp_gained and voice_expenses are added to the stored totals (the level
+    follows the XP; the other badge counters are kept by triggers); streak is
+    the full new streak row; badges are ids to unlock; challenge_progress is
+    (challenge_id, current_value, completed) per changed challenge and
+    new_challenges is (challenge_type, target, xp) for this week.
+    Returns the stored {xp, level}.
+    """
+    from datetime import datetime, timedelta
+    now = datetime.now()
+    week_start = (now - timedelta(days=now.weekday())).strftime("%Y-%m-%d")
+    with session() as cur:
+        cur.execute("""
+            INSERT INTO user_xp (user_id, total_xp, level) VALUES (?, ?, 1)
+            ON CONFLICT (user_id) DO UPDATE SET total_xp = total_xp + excluded.total_xp
+        """, (user_id, xp_gained))
+        cur.execute("SELECT total_xp FROM user_xp WHERE user_id = ?", (user_id,))
+        xp = cur.fetchone()[0]
+        level = level_for_xp(xp)
+        cur.execute("UPDATE user_xp SET level = ? WHERE user_id = ?", (level, user_id))
+
+        if voice_expenses:
+            cur.execute("""
+                INSERT INTO user_gamification_state (user_id, voice_expenses) VALUES (?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET voice_expenses = voice_expenses + excluded.voice_expenses
+            """, (user_id, voice_expenses))
+
+        if streak is not None:
+            cur.execute("""
+                INSERT INTO user_streaks (user_id, current_streak, longest_streak, last_active_date,
+                                          streak_freezes, total_days_active)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    current_streak = excluded.current_streak, longest_streak = excluded.longest_streak,
+                    last_active_date = excluded.last_active_date, streak_freezes = excluded.streak_freezes,
+                    total_days_active = excluded.total_days_active
+            """, (user_id, streak["current"], streak["longest"], streak["last_active"], streak["freezes"],
+                  streak["total_days"]))
+
+        unlocked_at = now.strftime("%Y-%m-%d %H:%M:%S")
+        cur.executemany("INSERT OR IGNORE INTO user_badges (user_id, badge_id, unlocked_at) VALUES (?, ?, ?)",
+                        [(user_id, badge_id, unlocked_at) for badge_id in badges])
+        cur.executemany("UPDATE weekly_challenges SET current_value = ?, completed = ? WHERE id = ?",
+                        [(value, int(completed), cid) for cid, value, completed in challenge_progress])
+        cur.executemany("""
+            INSERT INTO weekly_challenges (user_id, challenge_type, target_value, xp_reward, week_start)
+            SELECT ?, ?, ?, ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM weekly_challenges WHERE user_id = ? AND challenge_type = ? AND week_start = ?)
+        """, [(user_id, ctype, target, xp_reward, week_start, user_id, ctype, week_start)
+              for ctype, target, xp_reward in new_challenges])
+    return {"xp": xp, "level": level}
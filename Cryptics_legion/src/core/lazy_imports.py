@@ -0,0 +1,141 @@
+# src/core/lazy_imports.py
+"""
+Deferred imports for heavy or optional dependencies and page modules.
+
+optional_import("torch") returns a stand-in that imports the real module
+the first time it is used (attribute access, truth test or .available),
+so modules like the voice assistant can be imported on the startup path
+without paying for torch, numpy or the audio stacks until they are needed.
+A missing package just makes the stand-in unavailable, like the
+try/except ImportError blocks it replaces.
+
+lazy_attr("ui.user.home_page", "build_home_content") does the same for one
+attribute of a required module: calling it (or reading its attributes)
+imports the module, so page modules load on first navigation.
+"""
+import importlib
+import threading
+import time
+
+_modules = {}
+_modules_lock = threading.Lock()
+
+
+class OptionalModule:
+    """Stand-in for a module that is imported on first use."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._module = None
+        self._error = None
+        self._attempted = False
+        self._lock = threading.Lock()
+        self.import_seconds = None
+
+    def _load(self):
+        if not self._attempted:
+            with self._lock:
+                if not self._attempted:
+                    start = time.perf_counter()
+                    try:
+                        self._module = importlib.import_module(self.name)
+                    except ImportError as e:
+                        self._error = e
+                    self.import_seconds = time.perf_counter() - start
+                    self._attempted = True
+        return self._module
+
+    @property
+    def available(self) -> bool:
+        """Import the module if needed; False when it is not installed."""
+        return self._load() is not None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the import has been attempted (without triggering it)."""
+        return self._attempted
+
+    def __bool__(self):
+        return self.available
+
+    def __getattr__(self, item):
+        module = self._load()
+        if module is None:
+            raise ImportError(f"{self.name} is not installed") from self._error
+        return getattr(module, item)
+
+    def __repr__(self):
+        state = "not loaded" if not self._attempted else ("loaded" if self._module else "missing")
+        return f"<OptionalModule {self.name} ({state})>"
+
+
+class LazyAttr:
+    """Stand-in for `module.attr`, imported on first call or attribute access."""
+
+    def __init__(self, module: str, attr: str):
+        self.module = module
+        self.attr = attr
+        self._value = None
+        self._lock = threading.Lock()
+        self.import_seconds = None
+
+    def resolve(self):
+        if self.import_seconds is None:
+            with self._lock:
+                if self.import_seconds is None:
+                    start = time.perf_counter()
+                    self._value = getattr(importlib.import_module(self.module), self.attr)
+                    self.import_seconds = time.perf_counter() - start
+        return self._value
+
+    @property
+    def loaded(self) -> bool:
+        return self.import_seconds is not None
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, item):
+        return getattr(self.resolve(), item)
+
+    def __repr__(self):
+        return f"<LazyAttr {self.module}:{self.attr} ({'loaded' if self.loaded else 'not loaded'})>"
+
+
+def optional_import(name: str) -> OptionalModule:
+    """The shared stand-in for module `name`."""
+    with _modules_lock:
+        module = _modules.get(name)
+        if module is None:
+            module = _modules[name] = OptionalModule(name)
+        return module
+
+
+def lazy_attr(module: str, attr: str) -> LazyAttr:
+    """The shared stand-in for `module.attr`."""
+    key = f"{module}:{attr}"
+    with _modules_lock:
+        value = _modules.get(key)
+        if value is None:
+            value = _modules[key] = LazyAttr(module, attr)
+        return value
+
+
+def import_report() -> list:
+    """(name, state, seconds) for every deferred import, for profiling.
+
+    Seconds is the first import's cost; for attributes of a module already
+    imported by another stand-in it is close to zero.
+    """
+    with _modules_lock:
+        items = list(_modules.items())
+    report = []
+    for name, item in items:
+        if not item.loaded:
+            state = "not loaded"
+        elif isinstance(item, OptionalModule) and item._module is None:
+            state = "missing"
+        else:
+            state = "loaded"
+        report.append((name, state, item.import_seconds))
+    return report
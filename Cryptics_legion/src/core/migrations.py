@@ -0,0 +1,787 @@
+# src/core/migrations.py
+"""
+Schema Migrations for Smart Expense Tracker
+Ordered, versioned schema steps tracked with SQLite's PRAGMA user_version.
+
+Each step runs at most once per database file. Steps must stay idempotent
+for databases created before versioning existed (user_version 0 but with
+some tables and columns already present), so they use IF NOT EXISTS and
+tolerate duplicate-column errors on ALTER TABLE.
+"""
+
+import re
+import sqlite3
+
+
+def _add_column(cursor, table: str, column: str, col_type: str):
+    """Add a column, ignoring the error raised when it already exists."""
+    try:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+
+
+# ───── Migration steps ─────
+
+def _m001_base_schema(cursor):
+    """Core user, expense, account, admin, reminder and gamification tables."""
+    # users table (password stored as BLOB)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password BLOB NOT NULL,
+        has_seen_onboarding INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+    _add_column(cursor, "users", "has_seen_onboarding", "INTEGER NOT NULL DEFAULT 0")
+
+    # Personal details columns
+    personal_columns = [
+        ("full_name", "TEXT DEFAULT ''"),
+        ("first_name", "TEXT DEFAULT ''"),
+        ("last_name", "TEXT DEFAULT ''"),
+        ("email", "TEXT DEFAULT ''"),
+        ("phone", "TEXT DEFAULT ''"),
+        ("currency", "TEXT DEFAULT 'PHP'"),
+        ("timezone", "TEXT DEFAULT 'Asia/Manila'"),
+        ("first_day_of_week", "TEXT DEFAULT 'Monday'"),
+        ("photo", "TEXT DEFAULT ''"),
+    ]
+    for col_name, col_type in personal_columns:
+        _add_column(cursor, "users", col_name, col_type)
+
+    _add_column(cursor, "users", "selected_account_id", "INTEGER")
+    _add_column(cursor, "users", "last_login", "TEXT")
+    _add_column(cursor, "users", "passcode", "TEXT")
+    _add_column(cursor, "users", "biometric_enabled", "INTEGER DEFAULT 0")
+
+    # expenses table (linked to users)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        amount REAL NOT NULL,
+        category TEXT NOT NULL,
+        description TEXT,
+        date TEXT NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+    # accounts table (linked to users)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS accounts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        account_number TEXT,
+        type TEXT NOT NULL,
+        balance REAL NOT NULL DEFAULT 0,
+        currency TEXT NOT NULL DEFAULT 'PHP',
+        color TEXT NOT NULL DEFAULT '#3B82F6',
+        is_primary INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'active',
+        sort_order INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+    _add_column(cursor, "accounts", "status", "TEXT NOT NULL DEFAULT 'active'")
+    _add_column(cursor, "accounts", "sort_order", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(cursor, "expenses", "account_id", "INTEGER")
+    # QuickBooks sync flag
+    _add_column(cursor, "expenses", "synced_to_qb", "INTEGER NOT NULL DEFAULT 0")
+
+    # OTP table for password reset
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS password_reset_otps (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        otp TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        is_used INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+    # Admin table for system administrators
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS admins (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password BLOB NOT NULL,
+        full_name TEXT DEFAULT '',
+        email TEXT DEFAULT '',
+        role TEXT DEFAULT 'admin',
+        created_at TEXT NOT NULL,
+        last_login TEXT,
+        is_active INTEGER NOT NULL DEFAULT 1
+    )
+    """)
+
+    # Admin profile fields
+    admin_profile_columns = [
+        ("job_title", "TEXT DEFAULT 'System Administrator'"),
+        ("department", "TEXT DEFAULT 'Admin user'"),
+        ("currency", "TEXT DEFAULT 'PHP'"),
+        ("reporting_manager", "TEXT DEFAULT 'None'"),
+        ("avatar", "TEXT DEFAULT ''"),
+    ]
+    for col_name, col_type in admin_profile_columns:
+        _add_column(cursor, "admins", col_name, col_type)
+
+    # Admin activity logs
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS admin_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        admin_id INTEGER NOT NULL,
+        action TEXT NOT NULL,
+        target_user_id INTEGER,
+        details TEXT,
+        timestamp TEXT NOT NULL,
+        FOREIGN KEY(admin_id) REFERENCES admins(id),
+        FOREIGN KEY(target_user_id) REFERENCES users(id)
+    )
+    """)
+
+    # Reminders table — user reminder preferences
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS reminders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        enabled INTEGER NOT NULL DEFAULT 1,
+        time TEXT DEFAULT '20:00',
+        threshold REAL DEFAULT 20.0,
+        days_inactive INTEGER DEFAULT 3,
+        custom_message TEXT DEFAULT '',
+        last_triggered TEXT,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+    # Recurring expenses table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS recurring_expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        amount REAL NOT NULL,
+        category TEXT NOT NULL DEFAULT 'Other',
+        due_day INTEGER NOT NULL DEFAULT 1,
+        frequency TEXT NOT NULL DEFAULT 'monthly',
+        enabled INTEGER NOT NULL DEFAULT 1,
+        last_reminded TEXT,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+    # ── Gamification tables ──
+
+    # Daily streaks
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_streaks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL UNIQUE,
+        current_streak INTEGER NOT NULL DEFAULT 0,
+        longest_streak INTEGER NOT NULL DEFAULT 0,
+        last_active_date TEXT,
+        streak_freezes INTEGER NOT NULL DEFAULT 1,
+        total_days_active INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+    # Unlocked badges
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_badges (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        badge_id TEXT NOT NULL,
+        unlocked_at TEXT NOT NULL,
+        seen INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY(user_id) REFERENCES users(id),
+        UNIQUE(user_id, badge_id)
+    )
+    """)
+
+    # XP and levels
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_xp (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL UNIQUE,
+        total_xp INTEGER NOT NULL DEFAULT 0,
+        level INTEGER NOT NULL DEFAULT 1,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+    # Weekly challenges
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS weekly_challenges (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        challenge_type TEXT NOT NULL,
+        target_value REAL NOT NULL,
+        current_value REAL NOT NULL DEFAULT 0,
+        xp_reward INTEGER NOT NULL DEFAULT 50,
+        week_start TEXT NOT NULL,
+        completed INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+
+def _m002_admin_config(cursor):
+    """Admin configuration, policy, currency, integration and announcement tables."""
+    # Expense Categories table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS expense_categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        description TEXT,
+        gl_code TEXT,
+        icon TEXT DEFAULT 'category',
+        color TEXT DEFAULT '#2196F3',
+        is_active INTEGER DEFAULT 1,
+        parent_id INTEGER,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (parent_id) REFERENCES expense_categories(id)
+    )
+    """)
+
+    # Policy Rules table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS policy_rules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rule_name TEXT NOT NULL,
+        rule_type TEXT NOT NULL,
+        category_id INTEGER,
+        max_amount REAL,
+        currency TEXT DEFAULT 'PHP',
+        requires_receipt INTEGER DEFAULT 0,
+        requires_approval INTEGER DEFAULT 1,
+        disallowed_vendors TEXT,
+        per_diem_rate REAL,
+        description TEXT,
+        is_active INTEGER DEFAULT 1,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (category_id) REFERENCES expense_categories(id)
+    )
+    """)
+
+    # Currency Exchange Rates table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS currency_rates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        from_currency TEXT NOT NULL,
+        to_currency TEXT NOT NULL,
+        rate REAL NOT NULL,
+        effective_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        is_active INTEGER DEFAULT 1,
+        source TEXT DEFAULT 'manual',
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(from_currency, to_currency, effective_date)
+    )
+    """)
+
+    # Accounting Integration Config table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS accounting_integration (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        platform TEXT NOT NULL,
+        api_key TEXT,
+        api_secret TEXT,
+        company_id TEXT,
+        sync_enabled INTEGER DEFAULT 0,
+        last_sync TEXT,
+        sync_frequency TEXT DEFAULT 'daily',
+        auto_sync INTEGER DEFAULT 0,
+        config_json TEXT,
+        is_active INTEGER DEFAULT 1,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # Sync Logs table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS sync_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        integration_id INTEGER,
+        sync_type TEXT,
+        status TEXT,
+        records_synced INTEGER DEFAULT 0,
+        error_message TEXT,
+        started_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        completed_at TEXT,
+        FOREIGN KEY (integration_id) REFERENCES accounting_integration(id)
+    )
+    """)
+
+    # Announcements table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS announcements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        message TEXT NOT NULL,
+        type TEXT DEFAULT 'info',
+        priority TEXT DEFAULT 'normal',
+        admin_id INTEGER,
+        target_users TEXT DEFAULT 'all',
+        start_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        end_date TEXT,
+        is_active INTEGER DEFAULT 1,
+        is_pinned INTEGER DEFAULT 0,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (admin_id) REFERENCES admins(id)
+    )
+    """)
+
+    # User Notifications table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        announcement_id INTEGER,
+        title TEXT NOT NULL,
+        message TEXT NOT NULL,
+        type TEXT DEFAULT 'info',
+        is_read INTEGER DEFAULT 0,
+        read_at TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (announcement_id) REFERENCES announcements(id)
+    )
+    """)
+
+
+def _m003_expense_indexes(cursor):
+    """Composite/covering indexes for the per-user expense queries.
+
+    Every screen filters expenses by user first, so each index leads with
+    user_id and carries amount so the SUM/COUNT summaries never touch the
+    table itself.
+    """
+    # Date-ordered lists, last-expense lookups, period totals and
+    # per-period category/daily breakdowns
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_expenses_user_date
+    ON expenses (user_id, date, category, amount)
+    """)
+    # Per-account lists and balances
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_expenses_user_account_date
+    ON expenses (user_id, account_id, date, amount)
+    """)
+    # All-time category summaries
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_expenses_user_category
+    ON expenses (user_id, category, amount)
+    """)
+
+
+def _m004_activity_indexes_and_archives(cursor):
+    """Indexes for notification, log, badge, challenge and reminder lookups,
+    plus archive tables that the retention job moves old rows into."""
+    # Notification bell: unread list/count, and full history
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_user_notifications_user_read
+    ON user_notifications (user_id, is_read, created_at)
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_user_notifications_user_created
+    ON user_notifications (user_id, created_at)
+    """)
+    # Per-announcement delivery/read counts
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_user_notifications_announcement
+    ON user_notifications (announcement_id, is_read)
+    """)
+    # Admin activity log, newest first
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_admin_logs_timestamp
+    ON admin_logs (timestamp)
+    """)
+    # Gamification and reminder lookups
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_user_badges_user_seen
+    ON user_badges (user_id, seen)
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_weekly_challenges_user_week
+    ON weekly_challenges (user_id, week_start, challenge_type)
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_reminders_user_type
+    ON reminders (user_id, type)
+    """)
+
+    # Archives keep the original ids so rows can be traced back
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS admin_logs_archive (
+        id INTEGER PRIMARY KEY,
+        admin_id INTEGER NOT NULL,
+        action TEXT NOT NULL,
+        target_user_id INTEGER,
+        details TEXT,
+        timestamp TEXT NOT NULL,
+        archived_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_notifications_archive (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        announcement_id INTEGER,
+        title TEXT NOT NULL,
+        message TEXT NOT NULL,
+        type TEXT DEFAULT 'info',
+        is_read INTEGER DEFAULT 1,
+        read_at TEXT,
+        created_at TEXT,
+        archived_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_user_notifications_archive_announcement
+    ON user_notifications_archive (announcement_id)
+    """)
+
+
+def rebuild_expense_rollups(cursor):
+    """Recompute every expense rollup table from the raw expenses table."""
+    cursor.execute("DELETE FROM user_expense_stats")
+    cursor.execute("""
+    INSERT INTO user_expense_stats (user_id, expense_count, total_amount)
+    SELECT user_id, COUNT(*), SUM(amount) FROM expenses GROUP BY user_id
+    """)
+    cursor.execute("DELETE FROM account_expense_stats")
+    cursor.execute("""
+    INSERT INTO account_expense_stats (user_id, account_id, expense_count, total_amount)
+    SELECT user_id, account_id, COUNT(*), SUM(amount) FROM expenses
+    WHERE account_id IS NOT NULL GROUP BY user_id, account_id
+    """)
+    cursor.execute("DELETE FROM category_expense_stats")
+    cursor.execute("""
+    INSERT INTO category_expense_stats (user_id, category, expense_count, total_amount)
+    SELECT user_id, category, COUNT(*), SUM(amount) FROM expenses GROUP BY user_id, category
+    """)
+
+
+def _m005_expense_rollups(cursor):
+    """Per-user, per-account and per-category expense totals kept in step
+    with the expenses table by triggers, so headline numbers are O(1) reads
+    no matter which code path (helper or raw SQL) changed an expense."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_expense_stats (
+        user_id INTEGER PRIMARY KEY,
+        expense_count INTEGER NOT NULL DEFAULT 0,
+        total_amount REAL NOT NULL DEFAULT 0
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS account_expense_stats (
+        user_id INTEGER NOT NULL,
+        account_id INTEGER NOT NULL,
+        expense_count INTEGER NOT NULL DEFAULT 0,
+        total_amount REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, account_id)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS category_expense_stats (
+        user_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        expense_count INTEGER NOT NULL DEFAULT 0,
+        total_amount REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, category)
+    )
+    """)
+
+    # Add/remove one expense row's contribution. The category row is dropped
+    # once empty so COUNT(*) gives the number of categories in use.
+    add_row = """
+        INSERT INTO user_expense_stats (user_id, expense_count, total_amount)
+        VALUES ({r}.user_id, 1, {r}.amount)
+        ON CONFLICT (user_id) DO UPDATE SET
+            expense_count = expense_count + 1, total_amount = total_amount + excluded.total_amount;
+        INSERT INTO account_expense_stats (user_id, account_id, expense_count, total_amount)
+        SELECT {r}.user_id, {r}.account_id, 1, {r}.amount WHERE {r}.account_id IS NOT NULL
+        ON CONFLICT (user_id, account_id) DO UPDATE SET
+            expense_count = expense_count + 1, total_amount = total_amount + excluded.total_amount;
+        INSERT INTO category_expense_stats (user_id, category, expense_count, total_amount)
+        VALUES ({r}.user_id, {r}.category, 1, {r}.amount)
+        ON CONFLICT (user_id, category) DO UPDATE SET
+            expense_count = expense_count + 1, total_amount = total_amount + excluded.total_amount;
+    """
+    remove_row = """
+        UPDATE user_expense_stats
+        SET expense_count = expense_count - 1, total_amount = total_amount - {r}.amount
+        WHERE user_id = {r}.user_id;
+        UPDATE account_expense_stats
+        SET expense_count = expense_count - 1, total_amount = total_amount - {r}.amount
+        WHERE user_id = {r}.user_id AND account_id = {r}.account_id;
+        DELETE FROM account_expense_stats
+        WHERE user_id = {r}.user_id AND account_id = {r}.account_id AND expense_count <= 0;
+        UPDATE category_expense_stats
+        SET expense_count = expense_count - 1, total_amount = total_amount - {r}.amount
+        WHERE user_id = {r}.user_id AND category = {r}.category;
+        DELETE FROM category_expense_stats
+        WHERE user_id = {r}.user_id AND category = {r}.category AND expense_count <= 0;
+    """
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_insert AFTER INSERT ON expenses
+    BEGIN
+        {add_row.format(r="NEW")}
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_delete AFTER DELETE ON expenses
+    BEGIN
+        {remove_row.format(r="OLD")}
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_update
+    AFTER UPDATE OF user_id, amount, category, account_id ON expenses
+    BEGIN
+        {remove_row.format(r="OLD")}
+        {add_row.format(r="NEW")}
+    END
+    """)
+
+    # Backfill from existing expenses
+    rebuild_expense_rollups(cursor)
+
+
+def rebuild_expense_daily_rollup(cursor):
+    """Recompute the per-day, per-category rollup from the raw expenses table."""
+    cursor.execute("DELETE FROM expense_daily_rollup")
+    cursor.execute("""
+    INSERT INTO expense_daily_rollup (user_id, day, category, total, count, max_amount)
+    SELECT user_id, substr(date, 1, 10), category, SUM(amount), COUNT(*), MAX(amount)
+    FROM expenses GROUP BY user_id, substr(date, 1, 10), category
+    """)
+
+
+def _m006_expense_daily_rollup(cursor):
+    """Per-user, per-day, per-category totals for the statistics screens.
+    Period queries read O(days in period) rollup rows instead of every
+    expense; weekly/monthly buckets group these day rows further."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS expense_daily_rollup (
+        user_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        category TEXT NOT NULL,
+        total REAL NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        max_amount REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day, category)
+    ) WITHOUT ROWID
+    """)
+
+    add_row = """
+        INSERT INTO expense_daily_rollup (user_id, day, category, total, count, max_amount)
+        VALUES ({r}.user_id, substr({r}.date, 1, 10), {r}.category, {r}.amount, 1, {r}.amount)
+        ON CONFLICT (user_id, day, category) DO UPDATE SET
+            total = total + excluded.total, count = count + 1,
+            max_amount = MAX(max_amount, excluded.max_amount);
+    """
+    # Removing the largest expense of a day/category re-reads that one
+    # group's remaining rows through idx_expenses_user_date.
+    remove_row = """
+        UPDATE expense_daily_rollup SET total = total - {r}.amount, count = count - 1
+        WHERE user_id = {r}.user_id AND day = substr({r}.date, 1, 10) AND category = {r}.category;
+        DELETE FROM expense_daily_rollup
+        WHERE user_id = {r}.user_id AND day = substr({r}.date, 1, 10) AND category = {r}.category
+          AND count <= 0;
+        UPDATE expense_daily_rollup SET max_amount = COALESCE((
+            SELECT MAX(amount) FROM expenses
+            WHERE user_id = {r}.user_id
+              AND date >= substr({r}.date, 1, 10) AND date < substr({r}.date, 1, 10) || '~'
+              AND substr(date, 1, 10) = substr({r}.date, 1, 10)
+              AND category = {r}.category
+        ), 0)
+        WHERE user_id = {r}.user_id AND day = substr({r}.date, 1, 10) AND category = {r}.category
+          AND max_amount <= {r}.amount;
+    """
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_daily_rollup_insert AFTER INSERT ON expenses
+    BEGIN
+        {add_row.format(r="NEW")}
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_daily_rollup_delete AFTER DELETE ON expenses
+    BEGIN
+        {remove_row.format(r="OLD")}
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_daily_rollup_update
+    AFTER UPDATE OF user_id, amount, category, date ON expenses
+    BEGIN
+        {remove_row.format(r="OLD")}
+        {add_row.format(r="NEW")}
+    END
+    """)
+
+    # Backfill from existing expenses
+    rebuild_expense_daily_rollup(cursor)
+
+
+# Conversion note older versions appended to expense descriptions, e.g.
+# [₱500.00 (PHP) = ¥1,069.52 (JPY) • Rate: 1 PHP = 2.139 JPY]
+_CONVERSION_NOTE = re.compile(
+    r'\[(.+?)\s+\(([A-Z]{3})\)\s+=\s+(.+?)\s+\(([A-Z]{3})\)\s+•\s+Rate:\s+1\s+([A-Z]{3})\s+=\s+([\d,.]+)\s+([A-Z]{3})\]'
+)
+
+
+def _m007_exchange_rate_history(cursor):
+    """Dated exchange-rate history and structured conversion columns on
+    expenses, replacing the conversion note kept in the description."""
+    # Units of `currency` per 1 USD, effective from `effective_date` (YYYY-MM-DD)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS exchange_rate_history (
+        currency TEXT NOT NULL,
+        effective_date TEXT NOT NULL,
+        rate REAL NOT NULL,
+        source TEXT DEFAULT 'api',
+        recorded_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (currency, effective_date)
+    ) WITHOUT ROWID
+    """)
+    # Seed from admin-entered rates quoted against USD
+    cursor.execute("""
+    INSERT OR REPLACE INTO exchange_rate_history (currency, effective_date, rate, source)
+    SELECT to_currency, substr(effective_date, 1, 10), rate, source FROM currency_rates
+    WHERE from_currency = 'USD' AND to_currency != 'USD' AND rate > 0 AND is_active = 1
+    UNION ALL
+    SELECT from_currency, substr(effective_date, 1, 10), 1.0 / rate, source FROM currency_rates
+    WHERE to_currency = 'USD' AND from_currency != 'USD' AND rate > 0 AND is_active = 1
+    """)
+
+    _add_column(cursor, "expenses", "original_amount", "REAL")
+    _add_column(cursor, "expenses", "original_currency", "TEXT")
+    _add_column(cursor, "expenses", "rate", "REAL")
+
+    # Move existing conversion notes into the new columns
+    cursor.execute("SELECT id, description FROM expenses WHERE description LIKE '%Rate: 1 %' AND original_currency IS NULL")
+    for expense_id, description in cursor.fetchall():
+        match = _CONVERSION_NOTE.search(description)
+        if not match:
+            continue
+        try:
+            original_amount = float(re.sub(r'[^\d.]', '', match.group(1)))
+            rate = float(match.group(6).replace(',', ''))
+        except ValueError:
+            continue
+        cursor.execute(
+            "UPDATE expenses SET original_amount = ?, original_currency = ?, rate = ?, description = ? WHERE id = ?",
+            (original_amount, match.group(2), rate, _CONVERSION_NOTE.sub('', description).strip(), expense_id),
+        )
+
+
+def _m008_gamification_state(cursor):
+    """Per-user counters the badge rules read, kept current by triggers on
+    the rollup and challenge tables (voice expenses are counted by the
+    gamification pipeline), so badge checks never scan expenses."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_gamification_state (
+        user_id INTEGER PRIMARY KEY,
+        categories_used INTEGER NOT NULL DEFAULT 0,
+        voice_expenses INTEGER NOT NULL DEFAULT 0,
+        challenges_completed INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+    # category_expense_stats holds one row per category in use (migration 5)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_gamification_category_added AFTER INSERT ON category_expense_stats
+    BEGIN
+        INSERT INTO user_gamification_state (user_id, categories_used) VALUES (NEW.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET categories_used = categories_used + 1;
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_gamification_category_removed AFTER DELETE ON category_expense_stats
+    BEGIN
+        UPDATE user_gamification_state SET categories_used = categories_used - 1 WHERE user_id = OLD.user_id;
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_gamification_challenge_completed
+    AFTER UPDATE OF completed ON weekly_challenges
+    WHEN NEW.completed = 1 AND OLD.completed = 0
+    BEGIN
+        INSERT INTO user_gamification_state (user_id, challenges_completed) VALUES (NEW.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET challenges_completed = challenges_completed + 1;
+    END
+    """)
+
+    # Backfill from the existing rollups and challenges
+    cursor.execute("""
+    INSERT OR REPLACE INTO user_gamification_state (user_id, categories_used, challenges_completed)
+    SELECT user_id, SUM(categories), SUM(completed) FROM (
+        SELECT user_id, COUNT(*) AS categories, 0 AS completed FROM category_expense_stats GROUP BY user_id
+        UNION ALL
+        SELECT user_id, 0, COUNT(*) FROM weekly_challenges WHERE completed = 1 GROUP BY user_id
+    ) GROUP BY user_id
+    """)
+
+
+# Ordered list of (version, description, step). Append new steps at the end;
+# never renumber or edit a step that has already shipped.
+MIGRATIONS = [
+    (1, "base schema", _m001_base_schema),
+    (2, "admin configuration tables", _m002_admin_config),
+    (3, "expense indexes", _m003_expense_indexes),
+    (4, "activity indexes and archive tables", _m004_activity_indexes_and_archives),
+    (5, "expense rollups", _m005_expense_rollups),
+    (6, "daily expense rollup", _m006_expense_daily_rollup),
+    (7, "exchange rate history", _m007_exchange_rate_history),
+    (8, "gamification state", _m008_gamification_state),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn) -> int:
+    """Return the schema version recorded in the database file."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn) -> list:
+    """Apply every pending migration in order. Returns the versions applied.
+
+    Each step runs in its own transaction together with the user_version
+    bump, so an interrupted upgrade resumes from the last completed step.
+    """
+    applied = []
+    current = get_schema_version(conn)
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+        print(f"[DB] Applied migration {version}: {description}")
+    return applied
@@ -0,0 +1,151 @@
+# src/core/routes.py
+"""
+Route table for the app's views.
+
+ROUTES maps each view name to the "module:builder" that renders it. The
+builder is imported the first time the route is opened (through
+core.lazy_imports), so startup only pays for the login page, and users who
+never open the admin screens never import them.
+
+warm_up() imports routes in a background thread ahead of time, e.g. the
+main tabs right after login, so the first tap on them does not stall on
+imports. Every build is timed; build_report() gives per-route figures.
+"""
+import threading
+import time
+
+from core.lazy_imports import lazy_attr
+
+ROUTES = {
+    "login": "ui.auth.login_page:build_login_content",
+    "register": "ui.auth.register_page:build_register_content",
+    "forgot_password": "ui.auth.forgot_password_page:create_forgot_password_view",
+    "passcode_setup": "ui.auth.passcode_lock_page:create_passcode_setup",
+    "passcode_verify": "ui.auth.passcode_lock_page:create_passcode_verify",
+    "onboarding": "ui.onboarding.onboarding_page:build_onboarding_content",
+    "personal_details": "ui.profile.personal_details:build_personal_details_content",
+    "currency_selection": "ui.user.currency_selection_page:build_currency_selection_content",
+    "my_balance": "ui.user.my_balance:build_my_balance_content",
+    "home": "ui.user.home_page:build_home_content",
+    "expenses": "ui.user.Expenses:build_expenses_content",
+    "statistics": "ui.user.statistics_page:build_statistics_content",
+    "exchange_rates": "ui.user.exchange_rates_page:build_exchange_rates_content",
+    "add_expense": "ui.user.add_expense_page:build_add_expense_content",
+    "voice_assistant": "ui.user.voice_assistant_page:build_voice_assistant_content",
+    "all_expenses": "ui.user.all_expenses_page:build_all_expenses_content",
+    "reminders": "ui.user.reminders_page:build_reminders_content",
+    "badges": "ui.user.badges_page:build_badges_content",
+    "profile": "ui.profile.profile_page:build_profile_content",
+    "account_settings": "ui.profile.account_settings_page:build_account_settings_content",
+    "privacy": "ui.profile.privacy_page:build_privacy_content",
+    "admin_dashboard": "ui.admin.admin_main_layout:AdminMainLayout",
+}
+
+# Routes a signed-in user is likely to open next, imported in the background
+USER_WARM_UP = ("home", "expenses", "statistics", "add_expense", "all_expenses", "profile")
+
+
+class RouteStats:
+    """Build timings for one route."""
+
+    __slots__ = ("builds", "total_seconds", "max_seconds", "last_seconds")
+
+    def __init__(self):
+        self.builds = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = None
+
+    def add(self, seconds: float):
+        self.builds += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.last_seconds = seconds
+
+
+class RouteRegistry:
+    """Resolves route names to their builders and times each build."""
+
+    def __init__(self, routes: dict = None):
+        self.routes = dict(ROUTES if routes is None else routes)
+        self._builders = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self.routes
+
+    def builder(self, name: str):
+        """The lazily imported builder for route `name`."""
+        builder = self._builders.get(name)
+        if builder is None:
+            target = self.routes.get(name)
+            if target is None:
+                raise KeyError(f"Unknown route: {name}")
+            module, _, attr = target.partition(":")
+            builder = self._builders[name] = lazy_attr(module, attr)
+        return builder
+
+    def build(self, name: str, *args, **kwargs):
+        """Call route `name`'s builder and record how long it took."""
+        builder = self.builder(name)
+        start = time.perf_counter()
+        try:
+            return builder(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stats = self._stats.get(name)
+                if stats is None:
+                    stats = self._stats[name] = RouteStats()
+                stats.add(elapsed)
+
+    def last_build_seconds(self, name: str):
+        stats = self._stats.get(name)
+        return stats.last_seconds if stats else None
+
+    def is_loaded(self, name: str) -> bool:
+        builder = self._builders.get(name)
+        return builder is not None and builder.loaded
+
+    def warm_up(self, names=USER_WARM_UP, background: bool = True):
+        """
+        Import the builders for `names` ahead of their first navigation.
+
+        Runs in a daemon thread by default and returns it; routes that fail
+        to import are left for navigation to report.
+        """
+        pending = [name for name in names if name in self.routes and not self.is_loaded(name)]
+
+        def load():
+            for name in pending:
+                try:
+                    self.builder(name).resolve()
+                except Exception as e:
+                    print(f"Route warm-up note ({name}): {e}")
+
+        if not background:
+            load()
+            return None
+        thread = threading.Thread(target=load, name="route-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def build_report(self) -> list:
+        """(name, import_seconds, builds, mean_seconds, max_seconds, last_seconds) per opened route."""
+        with self._lock:
+            items = sorted(self._stats.items())
+        report = []
+        for name, stats in items:
+            builder = self._builders.get(name)
+            import_seconds = builder.import_seconds if builder is not None else None
+            report.append((name, import_seconds, stats.builds, stats.total_seconds / stats.builds,
+                           stats.max_seconds, stats.last_seconds))
+        return report
+
+
+_routes = RouteRegistry()
+
+
+def get_routes() -> RouteRegistry:
+    return _routes
@@ -0,0 +1,104 @@
+# src/core/stats_cache.py
+"""
+In-memory cache for per-user statistics results.
+
+Entries are keyed by (user_id, period, chart_type) and evicted least
+recently used first, both overall and per user, so many concurrent web
+sessions stay bounded. Expense writes in core.db drop a user's entries
+once they have committed; a per-user generation counter keeps a result
+computed from pre-write data from being stored after the drop.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+STATS_CACHE_MAX_ENTRIES = 512
+STATS_CACHE_MAX_PER_USER = 32
+# Upper bound on staleness for writes that bypass the db helpers (and for
+# "last 7 days" style results crossing midnight)
+STATS_CACHE_TTL = 300.0
+
+
+class StatsCache:
+    """Thread-safe LRU of computed statistics."""
+
+    def __init__(self, max_entries: int = STATS_CACHE_MAX_ENTRIES,
+                 max_per_user: int = STATS_CACHE_MAX_PER_USER, ttl: float = STATS_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_per_user = max_per_user
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (user_id, period, chart_type) -> (stored_at, value)
+        self._user_keys = {}           # user_id -> OrderedDict of that user's keys, oldest first
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_compute(self, user_id, period, chart_type, compute):
+        """Return the cached value for the key, calling compute() on a miss."""
+        key = (user_id, period, chart_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self._user_keys[user_id].move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generations.get(user_id, 0)
+
+        value = compute()
+
+        with self._lock:
+            if self._generations.get(user_id, 0) == generation:
+                self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        user_id = key[0]
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        user_keys = self._user_keys.setdefault(user_id, OrderedDict())
+        user_keys[key] = None
+        user_keys.move_to_end(key)
+
+        while len(user_keys) > self.max_per_user:
+            self._drop(next(iter(user_keys)))
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        user_keys = self._user_keys.get(key[0])
+        if user_keys is not None:
+            user_keys.pop(key, None)
+            if not user_keys:
+                del self._user_keys[key[0]]
+
+    def invalidate_user(self, user_id):
+        """Drop every cached result for a user."""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in list(self._user_keys.get(user_id, ())):
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            for user_id in list(self._user_keys):
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._entries.clear()
+            self._user_keys.clear()
+
+
+_cache = StatsCache()
+
+
+def get_stats_cache() -> StatsCache:
+    return _cache
+
+
+def invalidate_user(user_id):
+    _cache.invalidate_user(user_id)
@@ -10,7 +10,7 @@ def create_default_admin():
     """Create the default admin account: ADMIN / ADMIN256"""
     
     # Initialize database
-    db.connect_db()
+    db.ensure_schema()
     
     # Check if admin already exists
     existing_admin = db.get_admin_by_username("ADMIN")
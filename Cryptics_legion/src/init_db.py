@@ -3,19 +3,15 @@ Database initialization script
 Creates all necessary tables and initializes admin configuration tables
 """
 
-from core import db
+from core import db, migrations
 
 def initialize_database():
     """Initialize all database tables"""
     print("Initializing database...")
     
-    # Initialize main tables
-    db.connect_db()
-    print("✓ Main tables initialized")
-    
-    # Initialize admin configuration tables
-    db.init_admin_config_tables()
-    print("✓ Admin configuration tables initialized")
+    # Apply all pending schema migrations (main and admin configuration tables)
+    db.ensure_schema()
+    print(f"✓ Schema at version {migrations.LATEST_VERSION}")
     
     print("\nDatabase initialization complete!")
 
@@ -37,37 +37,16 @@ import flet as ft
 from core import db
 from core.theme import get_theme, ThemeManager
 import core.auth as auth
+from core.lazy_imports import lazy_attr
+from core.routes import get_routes, USER_WARM_UP
 
-# Import view CONTENT builders (we'll create these)
-from ui.auth.login_page import build_login_content
-from ui.auth.register_page import build_register_content
-from ui.onboarding.onboarding_page import build_onboarding_content
-from ui.auth.forgot_password_page import create_forgot_password_view
-from ui.profile.personal_details import build_personal_details_content
-from ui.user.currency_selection_page import build_currency_selection_content
-from ui.user.my_balance import build_my_balance_content
-from ui.user.home_page import build_home_content
-from ui.user.Expenses import build_expenses_content
-from ui.user.statistics_page import build_statistics_content
-from ui.profile.profile_page import build_profile_content
-from ui.profile.account_settings_page import build_account_settings_content
-from ui.user.add_expense_page import build_add_expense_content
-from ui.user.voice_assistant_page import build_voice_assistant_content
-from ui.user.all_expenses_page import build_all_expenses_content
-from ui.user.exchange_rates_page import build_exchange_rates_content
-from ui.user.reminders_page import build_reminders_content
-from ui.user.badges_page import build_badges_content
-from ui.profile.privacy_page import build_privacy_content
-from ui.auth.passcode_lock_page import create_passcode_setup, create_passcode_verify
-from ui.admin.admin_dashboard_page import AdminDashboardPage
-from ui.admin.admin_users_page import AdminUserManagementPage
-from components.notification import NotificationHistory
-from ui.admin.admin_logs_page import AdminLogsPage
-from ui.admin.admin_main_layout import AdminMainLayout
-from ui.admin.admin_profile_page import AdminProfilePage
-from utils.statistics import create_charts_view
-from utils.reminders import ReminderEngine
-from utils.gamification import on_user_login
+# View builders come from the route table (core/routes) and are imported on
+# first navigation, so startup only pays for flet, core and the login page
+NotificationHistory = lazy_attr("components.notification", "NotificationHistory")
+ReminderEngine = lazy_attr("utils.reminders", "ReminderEngine")
+submit_user_login = lazy_attr("utils.gamification_worker", "submit_user_login")
+announce_to = lazy_attr("utils.gamification_worker", "announce_to")
+shutdown_gamification = lazy_attr("utils.gamification_worker", "shutdown")
 
 
 def main(page: ft.Page):
@@ -109,6 +88,8 @@ def main(page: ft.Page):
         "admin": None,
     }
 
+    routes = get_routes()
+
     # ============ HELPER FUNCTIONS ============
     def update_theme():
         """Update page background based on current theme."""
@@ -139,7 +120,8 @@ def main(page: ft.Page):
             # Build the new content and swap it in
             print(f"DEBUG: Building content for {view_name}")
             new_content = content_builder()
-            print(f"DEBUG: Content built successfully for {view_name}")
+            build_ms = (routes.last_build_seconds(view_name) or 0) * 1000
+            print(f"DEBUG: Content built successfully for {view_name} ({build_ms:.1f} ms)")
             app_container.content = new_content
             page.update()
             print(f"DEBUG: Successfully navigated to {view_name}")
@@ -148,6 +130,10 @@ def main(page: ft.Page):
             import traceback
             traceback.print_exc()
 
+    def open_route(view_name: str, *args, **kwargs):
+        """Navigate to a view whose builder comes from the route table."""
+        navigate_to(view_name, lambda: routes.build(view_name, *args, **kwargs))
+
     # ============ VIEW NAVIGATION FUNCTIONS ============
     def show_login():
         # Check if app_container still exists (forgot password uses page.clean())
@@ -156,9 +142,10 @@ def main(page: ft.Page):
             page.clean()
             page.add(app_container)
         
-        navigate_to("login", lambda: build_login_content(
+        open_route(
+            "login",
             page, on_login_success, show_register, show_onboarding, toast, show_forgot_password
-        ))
+        )
     
     def show_forgot_password():
         # Navigate properly - the forgot password page will handle its own rendering
@@ -166,134 +153,145 @@ def main(page: ft.Page):
         state["current_view"] = "forgot_password"
         update_theme()
         # Call the view function which uses page.clean() and page.add()
-        forgot_password_view = create_forgot_password_view(page, show_login, toast)
+        forgot_password_view = routes.build("forgot_password", page, show_login, toast)
         forgot_password_view()
     
     def show_register():
-        navigate_to("register", lambda: build_register_content(
+        open_route(
+            "register",
             page, on_register_success, show_login, toast, state
-        ))
+        )
     
     def show_onboarding():
-        navigate_to("onboarding", lambda: build_onboarding_content(
+        open_route(
+            "onboarding",
             page, show_home, state
-        ))
+        )
     
     def show_personal_details():
-        navigate_to("personal_details", lambda: build_personal_details_content(
+        open_route(
+            "personal_details",
             page, state, toast, show_passcode_setup, show_register
-        ))
+        )
     
     def show_currency_selection():
-        navigate_to("currency_selection", lambda: build_currency_selection_content(
+        open_route(
+            "currency_selection",
             page, state, toast, show_my_balance
-        ))
+        )
     
     def show_my_balance():
-        navigate_to("my_balance", lambda: build_my_balance_content(
+        open_route(
+            "my_balance",
             page, state, toast, show_onboarding, show_personal_details
-        ))
+        )
     
     def show_home():
         print("DEBUG: show_home() called")
-        # Trigger gamification daily login logic
-        if "user_id" in state and state["user_id"]:
-            login_events = on_user_login(state["user_id"])
-            if login_events.get("xp_gained", 0) > 0:
-                print(f"[Gamification] Daily login! +{login_events['xp_gained']} XP. Streak: {login_events['streak']}")
-            for badge in login_events.get("new_badges", []):
-                # Avoid toast() before navigate_to() due to Flet SnackBar race conditions
-                try:
-                    from components.notification import show_success_notification
-                    show_success_notification(page, f"🏆 New Badge Unlocked!", title="Achievement")
-                except ImportError:
-                    pass
+        # Daily login XP / streak run on the gamification worker
+        if state.get("user_id") and state.get("_gamification_login") != state["user_id"]:
+            state["_gamification_login"] = state["user_id"]
+            submit_user_login(state["user_id"], notify=announce_to(page))
         
-        navigate_to("home", lambda: build_home_content(
+        open_route(
+            "home",
             page, state, toast, show_expenses, do_logout, 
             show_statistics, show_profile, show_add_expense, show_all_expenses,
             show_reminders=show_reminders
-        ))
+        )
     
     def show_expenses():
-        navigate_to("expenses", lambda: build_expenses_content(
+        open_route(
+            "expenses",
             page, state, toast, show_home, show_statistics, 
             show_profile, show_add_expense, show_expenses
-        ))
+        )
     
     def show_statistics():
         state["refresh_statistics"] = show_statistics
-        navigate_to("statistics", lambda: build_statistics_content(
+        open_route(
+            "statistics",
             page, state, toast, show_home, show_expenses, 
             show_profile, show_add_expense, show_exchange_rates
-        ))
+        )
     
     def show_exchange_rates():
-        navigate_to("exchange_rates", lambda: build_exchange_rates_content(
+        open_route(
+            "exchange_rates",
             page, state, toast, show_statistics
-        ))
+        )
     
     def show_profile():
-        navigate_to("profile", lambda: build_profile_content(
+        open_route(
+            "profile",
             page, state, toast, show_home, do_logout, 
             show_account_settings, refresh_current_view, show_privacy,
             show_reminders=show_reminders, show_badges=show_badges
-        ))
+        )
     
     def show_account_settings():
-        navigate_to("account_settings", lambda: build_account_settings_content(
+        open_route(
+            "account_settings",
             page, state, toast, show_profile
-        ))
+        )
     
     def show_privacy():
-        navigate_to("privacy", lambda: build_privacy_content(
+        open_route(
+            "privacy",
             page, state, toast, show_profile, do_logout
-        ))
+        )
     
     def show_add_expense():
         state["show_voice_assistant"] = show_voice_assistant
-        navigate_to("add_expense", lambda: build_add_expense_content(
+        open_route(
+            "add_expense",
             page, state, toast, show_expenses, show_home, 
             show_expenses, show_statistics, show_profile
-        ))
+        )
     
     def show_voice_assistant():
-        navigate_to("voice_assistant", lambda: build_voice_assistant_content(
+        open_route(
+            "voice_assistant",
             page, state, toast, show_add_expense, show_add_expense
-        ))
+        )
     
     def show_reminders():
-        navigate_to("reminders", lambda: build_reminders_content(
+        open_route(
+            "reminders",
             page, state, toast, show_home
-        ))
+        )
         
     def show_badges():
-        navigate_to("badges", lambda: build_badges_content(
+        open_route(
+            "badges",
             page, state, toast, show_profile
-        ))
+        )
     
     def show_all_expenses():
-        navigate_to("all_expenses", lambda: build_all_expenses_content(
+        open_route(
+            "all_expenses",
             page, state, toast, show_home, show_all_expenses
-        ))
+        )
     
     def show_passcode_setup():
         """Show passcode setup screen (after signup)."""
-        navigate_to("passcode_setup", lambda: create_passcode_setup(
+        open_route(
+            "passcode_setup",
             page, state, on_passcode_setup_complete
-        ))
+        )
     
     def show_passcode_verify():
         """Show passcode verification screen (after login)."""
-        navigate_to("passcode_verify", lambda: create_passcode_verify(
+        open_route(
+            "passcode_verify",
             page, state, on_passcode_verify_success, show_forgot_password
-        ))
+        )
     
     # ============ ADMIN NAVIGATION FUNCTIONS ============
     def show_admin_dashboard():
         """Show admin dashboard with new layout."""
-        navigate_to("admin_dashboard", lambda: AdminMainLayout(
-            page, state, lambda route: show_login() if route == "login" else None
+        navigate_to("admin_dashboard", lambda: routes.build(
+            "admin_dashboard", page, state, lambda route: show_login() if route == "login" else None
         ).build())
     
     def show_admin_users():
@@ -334,6 +332,9 @@ def main(page: ft.Page):
                 state["_reminder_engine"] = reminder_engine
             except Exception as e:
                 print(f"Reminder engine start note: {e}")
+
+            # Import the main tabs while the passcode / home screen is up
+            routes.warm_up(USER_WARM_UP)
             
             # Check if user has a passcode set up
             if db.has_passcode(user_id):
@@ -382,6 +383,7 @@ def main(page: ft.Page):
         state["user_id"] = None
         state["editing_id"] = None
         state.pop("_voice_greeting_shown", None)
+        state.pop("_gamification_login", None)
         show_login()
 
     # ============ REFRESH FUNCTIONS ============
@@ -407,7 +409,8 @@ def main(page: ft.Page):
             view_map[current]()
 
     # ============ INITIALIZE APP ============
-    db.connect_db()
+    # Create/upgrade the schema once per process; per-call connections skip DDL
+    db.ensure_schema()
     
     # Initialize default admin account if not exists
     try:
@@ -434,6 +437,14 @@ def main(page: ft.Page):
 
 if __name__ == "__main__":
 
+    # Archive old admin logs and read notifications once per process start
+    try:
+        archived = db.purge_old_records()
+        if any(archived.values()):
+            print(f"[DB] Archived {archived['admin_logs']} admin logs, {archived['user_notifications']} read notifications")
+    except Exception as e:
+        print(f"Retention note: {e}")
+
     # ============================================================
     # RUN MODE - uncomment ONE block at a time
     # ============================================================
@@ -444,6 +455,8 @@ if __name__ == "__main__":
     # as a native desktop application.
     # ----------------------------------------------------------
     ft.app(target=main, assets_dir="assets")
+    shutdown_gamification()
+    db.close_pools()
 
     # ----------------------------------------------------------
     # MODE 2: WEB / LOCALHOST  (+ optional ngrok public URL)
@@ -746,18 +746,15 @@ class AdminAccountingIntegrationPage:
         # based on your expense schema
         try:
             # Get all expenses (you may want to filter by date range)
-            conn = db.connect_db()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT e.id, e.description, e.amount, e.category, e.date, e.account_id
-                FROM expenses e
-                WHERE e.synced_to_qb = 0 OR e.synced_to_qb IS NULL
-                ORDER BY e.date DESC
-                LIMIT 50
-            """)
-            
-            expenses = cursor.fetchall()
-            conn.close()
+            with db.session() as cursor:
+                cursor.execute("""
+                    SELECT e.id, e.description, e.amount, e.category, e.date, e.account_id
+                    FROM expenses e
+                    WHERE e.synced_to_qb = 0 OR e.synced_to_qb IS NULL
+                    ORDER BY e.date DESC
+                    LIMIT 50
+                """)
+                expenses = cursor.fetchall()
             
             formatted_expenses = []
             for exp in expenses:
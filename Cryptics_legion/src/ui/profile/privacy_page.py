@@ -22,22 +22,8 @@ def build_privacy_content(page: ft.Page, state: dict, toast, go_back, logout_cal
             user_id = state.get("user_id")
             if user_id:
                 try:
-                    # Create a connection for this operation
-                    conn = db.connect_db()
-                    cursor = conn.cursor()
-                    
-                    # Delete all expenses
-                    cursor.execute("DELETE FROM expenses WHERE user_id = ?", (user_id,))
-                    # Delete all accounts
-                    cursor.execute("DELETE FROM accounts WHERE user_id = ?", (user_id,))
-                    # Delete password reset OTPs
-                    cursor.execute("DELETE FROM password_reset_otps WHERE user_id = ?", (user_id,))
-                    # Delete user notifications
-                    cursor.execute("DELETE FROM user_notifications WHERE user_id = ?", (user_id,))
-                    # Delete user
-                    cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-                    conn.commit()
-                    conn.close()
+                    # One transaction on the shared writer: all of it or none
+                    db.delete_user_data(user_id)
                     
                     # Clear state immediately
                     state["user_id"] = None
@@ -51,12 +37,6 @@ def build_privacy_content(page: ft.Page, state: dict, toast, go_back, logout_cal
                         logout_callback()
                     
                 except Exception as ex:
-                    if 'conn' in locals():
-                        try:
-                            conn.rollback()
-                            conn.close()
-                        except:
-                            pass
                     toast(f"Error deleting data: {str(ex)}", "#EF4444")
         
         def cancel_delete(e):
@@ -74,7 +74,7 @@ def create_profile_view(page: ft.Page, state: dict, toast, go_back, logout_callb
         
         # Get user stats
         total_spent = db.total_expenses_by_user(state["user_id"])
-        transactions = len(db.select_expenses_by_user(state["user_id"]))
+        transactions = db.get_expense_count_by_user(state["user_id"])
         categories = len(db.category_summary_by_user(state["user_id"]))
         
         # Header
@@ -369,7 +369,7 @@ def build_profile_content(page: ft.Page, state: dict, toast,
     
     # Get user stats
     total_spent = db.total_expenses_by_user(state["user_id"])
-    transactions = len(db.select_expenses_by_user(state["user_id"]))
+    transactions = db.get_expense_count_by_user(state["user_id"])
     categories = len(db.category_summary_by_user(state["user_id"]))
     
     # Header
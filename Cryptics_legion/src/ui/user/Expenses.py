@@ -5,11 +5,7 @@ from core import db
 from core.theme import get_theme
 from ui.components.nav_bar_buttom import create_page_with_nav
 from components.notification import NotificationCenter
-
-
-def get_clearbit_logo(domain: str) -> str:
-    """Get brand logo URL from Clearbit API."""
-    return f"https://logo.clearbit.com/{domain}"
+from utils.category_resolver import resolve_category
 
 
 def create_user_avatar(user_id: int, radius: int = 22, theme=None):
@@ -60,637 +56,6 @@ def create_user_avatar(user_id: int, radius: int = 22, theme=None):
     )
 
 
-# Brand database for recognition - using Clearbit Logo API for clear, high-quality logos
-BRAND_DATABASE = {
-    # Shopping & E-commerce
-    "amazon": {
-        "icon": "a", "color": "#FF9900", "bg": "#232F3E", "text": "white",
-        "logo": get_clearbit_logo("amazon.com")
-    },
-    "shopee": {
-        "icon": "🛒", "color": "#EE4D2D", "bg": "#EE4D2D", "text": "white",
-        "logo": get_clearbit_logo("shopee.com")
-    },
-    "lazada": {
-        "icon": "L", "color": "#0F146D", "bg": "#0F146D", "text": "white",
-        "logo": get_clearbit_logo("lazada.com")
-    },
-    "zalora": {
-        "icon": "Z", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("zalora.com")
-    },
-    "ebay": {
-        "icon": "e", "color": "#E53238", "bg": "#FFFFFF", "text": "#E53238",
-        "logo": get_clearbit_logo("ebay.com")
-    },
-    "alibaba": {
-        "icon": "A", "color": "#FF6A00", "bg": "#FF6A00", "text": "white",
-        "logo": get_clearbit_logo("alibaba.com")
-    },
-    "temu": {
-        "icon": "T", "color": "#F97316", "bg": "#F97316", "text": "white",
-        "logo": get_clearbit_logo("temu.com")
-    },
-    "shein": {
-        "icon": "S", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("shein.com")
-    },
-    
-    # Food & Restaurants
-    "mcdonalds": {
-        "icon": "M", "color": "#FFC72C", "bg": "#DA291C", "text": "#FFC72C",
-        "logo": get_clearbit_logo("mcdonalds.com")
-    },
-    "mcdonald's": {
-        "icon": "M", "color": "#FFC72C", "bg": "#DA291C", "text": "#FFC72C",
-        "logo": get_clearbit_logo("mcdonalds.com")
-    },
-    "starbucks": {
-        "icon": "☕", "color": "#00704A", "bg": "#00704A", "text": "white",
-        "logo": get_clearbit_logo("starbucks.com")
-    },
-    "jollibee": {
-        "icon": "🐝", "color": "#E31837", "bg": "#E31837", "text": "white",
-        "logo": get_clearbit_logo("jollibee.com.ph")
-    },
-    "kfc": {
-        "icon": "🍗", "color": "#F40027", "bg": "#F40027", "text": "white",
-        "logo": get_clearbit_logo("kfc.com")
-    },
-    "burger king": {
-        "icon": "🍔", "color": "#FF8732", "bg": "#502314", "text": "#FF8732",
-        "logo": get_clearbit_logo("bk.com")
-    },
-    "pizza hut": {
-        "icon": "🍕", "color": "#E31837", "bg": "#E31837", "text": "white",
-        "logo": get_clearbit_logo("pizzahut.com")
-    },
-    "dominos": {
-        "icon": "🍕", "color": "#006491", "bg": "#006491", "text": "white",
-        "logo": get_clearbit_logo("dominos.com")
-    },
-    "domino's": {
-        "icon": "🍕", "color": "#006491", "bg": "#006491", "text": "white",
-        "logo": get_clearbit_logo("dominos.com")
-    },
-    "subway": {
-        "icon": "🥪", "color": "#008C15", "bg": "#FFC600", "text": "#008C15",
-        "logo": get_clearbit_logo("subway.com")
-    },
-    "dunkin": {
-        "icon": "🍩", "color": "#FF671F", "bg": "#FF671F", "text": "white",
-        "logo": get_clearbit_logo("dunkindonuts.com")
-    },
-    "chowking": {
-        "icon": "🥡", "color": "#E31837", "bg": "#E31837", "text": "white",
-        "logo": get_clearbit_logo("chowkingdelivery.com")
-    },
-    "greenwich": {
-        "icon": "🍕", "color": "#006B3F", "bg": "#006B3F", "text": "white",
-        "logo": get_clearbit_logo("greenwichdelivery.com")
-    },
-    "mang inasal": {
-        "icon": "🍗", "color": "#FDB813", "bg": "#FDB813", "text": "#1E1E1E",
-        "logo": get_clearbit_logo("manginasal.com")
-    },
-    "yellow cab": {
-        "icon": "🍕", "color": "#FFD100", "bg": "#000000", "text": "#FFD100",
-        "logo": get_clearbit_logo("yellowcabpizza.com")
-    },
-    "shakeys": {
-        "icon": "🍕", "color": "#E31937", "bg": "#E31937", "text": "white",
-        "logo": get_clearbit_logo("shakeyspizza.ph")
-    },
-    "shakey's": {
-        "icon": "🍕", "color": "#E31937", "bg": "#E31937", "text": "white",
-        "logo": get_clearbit_logo("shakeyspizza.ph")
-    },
-    "wendy's": {
-        "icon": "W", "color": "#E2164B", "bg": "#E2164B", "text": "white",
-        "logo": get_clearbit_logo("wendys.com")
-    },
-    "wendys": {
-        "icon": "W", "color": "#E2164B", "bg": "#E2164B", "text": "white",
-        "logo": get_clearbit_logo("wendys.com")
-    },
-    "taco bell": {
-        "icon": "🌮", "color": "#702082", "bg": "#702082", "text": "white",
-        "logo": get_clearbit_logo("tacobell.com")
-    },
-    "chipotle": {
-        "icon": "🌯", "color": "#441500", "bg": "#441500", "text": "white",
-        "logo": get_clearbit_logo("chipotle.com")
-    },
-    "popeyes": {
-        "icon": "🍗", "color": "#FF6700", "bg": "#FF6700", "text": "white",
-        "logo": get_clearbit_logo("popeyes.com")
-    },
-    "krispy kreme": {
-        "icon": "🍩", "color": "#00873C", "bg": "#00873C", "text": "white",
-        "logo": get_clearbit_logo("krispykreme.com")
-    },
-    "tim hortons": {
-        "icon": "☕", "color": "#C8102E", "bg": "#C8102E", "text": "white",
-        "logo": get_clearbit_logo("timhortons.com")
-    },
-    "papa johns": {
-        "icon": "🍕", "color": "#008145", "bg": "#008145", "text": "white",
-        "logo": get_clearbit_logo("papajohns.com")
-    },
-    
-    # Tech & Electronics
-    "apple": {
-        "icon": "", "color": "#555555", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("apple.com")
-    },
-    "ipad": {
-        "icon": "", "color": "#555555", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("apple.com")
-    },
-    "iphone": {
-        "icon": "", "color": "#555555", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("apple.com")
-    },
-    "macbook": {
-        "icon": "", "color": "#555555", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("apple.com")
-    },
-    "airpods": {
-        "icon": "🎧", "color": "#555555", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("apple.com")
-    },
-    "samsung": {
-        "icon": "S", "color": "#1428A0", "bg": "#1428A0", "text": "white",
-        "logo": get_clearbit_logo("samsung.com")
-    },
-    "galaxy": {
-        "icon": "S", "color": "#1428A0", "bg": "#1428A0", "text": "white",
-        "logo": get_clearbit_logo("samsung.com")
-    },
-    "google": {
-        "icon": "G", "color": "#4285F4", "bg": "#FFFFFF", "text": "#4285F4",
-        "logo": get_clearbit_logo("google.com")
-    },
-    "pixel": {
-        "icon": "G", "color": "#4285F4", "bg": "#FFFFFF", "text": "#4285F4",
-        "logo": get_clearbit_logo("google.com")
-    },
-    "microsoft": {
-        "icon": "⊞", "color": "#00A4EF", "bg": "#737373", "text": "white",
-        "logo": get_clearbit_logo("microsoft.com")
-    },
-    "xbox": {
-        "icon": "X", "color": "#107C10", "bg": "#107C10", "text": "white",
-        "logo": get_clearbit_logo("xbox.com")
-    },
-    "sony": {
-        "icon": "S", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("sony.com")
-    },
-    "playstation": {
-        "icon": "P", "color": "#003791", "bg": "#003791", "text": "white",
-        "logo": get_clearbit_logo("playstation.com")
-    },
-    "ps5": {
-        "icon": "P", "color": "#003791", "bg": "#003791", "text": "white",
-        "logo": get_clearbit_logo("playstation.com")
-    },
-    "nintendo": {
-        "icon": "N", "color": "#E60012", "bg": "#E60012", "text": "white",
-        "logo": get_clearbit_logo("nintendo.com")
-    },
-    "dell": {
-        "icon": "D", "color": "#007DB8", "bg": "#007DB8", "text": "white",
-        "logo": get_clearbit_logo("dell.com")
-    },
-    "hp": {
-        "icon": "hp", "color": "#0096D6", "bg": "#0096D6", "text": "white",
-        "logo": get_clearbit_logo("hp.com")
-    },
-    "lenovo": {
-        "icon": "L", "color": "#E2231A", "bg": "#E2231A", "text": "white",
-        "logo": get_clearbit_logo("lenovo.com")
-    },
-    "asus": {
-        "icon": "A", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("asus.com")
-    },
-    "acer": {
-        "icon": "A", "color": "#83B81A", "bg": "#83B81A", "text": "white",
-        "logo": get_clearbit_logo("acer.com")
-    },
-    "huawei": {
-        "icon": "H", "color": "#FF0000", "bg": "#FF0000", "text": "white",
-        "logo": get_clearbit_logo("huawei.com")
-    },
-    "xiaomi": {
-        "icon": "Mi", "color": "#FF6900", "bg": "#FF6900", "text": "white",
-        "logo": get_clearbit_logo("mi.com")
-    },
-    "oppo": {
-        "icon": "O", "color": "#1BA784", "bg": "#1BA784", "text": "white",
-        "logo": get_clearbit_logo("oppo.com")
-    },
-    "vivo": {
-        "icon": "V", "color": "#415FFF", "bg": "#415FFF", "text": "white",
-        "logo": get_clearbit_logo("vivo.com")
-    },
-    "realme": {
-        "icon": "R", "color": "#F5C700", "bg": "#F5C700", "text": "#1E1E1E",
-        "logo": get_clearbit_logo("realme.com")
-    },
-    "jbl": {
-        "icon": "JBL", "color": "#FF6600", "bg": "#FF6600", "text": "white",
-        "logo": get_clearbit_logo("jbl.com")
-    },
-    "bose": {
-        "icon": "B", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("bose.com")
-    },
-    "beats": {
-        "icon": "b", "color": "#E31937", "bg": "#E31937", "text": "white",
-        "logo": get_clearbit_logo("beatsbydre.com")
-    },
-    "logitech": {
-        "icon": "L", "color": "#00B8FC", "bg": "#00B8FC", "text": "white",
-        "logo": get_clearbit_logo("logitech.com")
-    },
-    "razer": {
-        "icon": "R", "color": "#44D62C", "bg": "#000000", "text": "#44D62C",
-        "logo": get_clearbit_logo("razer.com")
-    },
-    "gopro": {
-        "icon": "G", "color": "#00A0D6", "bg": "#00A0D6", "text": "white",
-        "logo": get_clearbit_logo("gopro.com")
-    },
-    "canon": {
-        "icon": "C", "color": "#BC0024", "bg": "#BC0024", "text": "white",
-        "logo": get_clearbit_logo("canon.com")
-    },
-    "nikon": {
-        "icon": "N", "color": "#F6CE13", "bg": "#F6CE13", "text": "#1E1E1E",
-        "logo": get_clearbit_logo("nikon.com")
-    },
-    "fujifilm": {
-        "icon": "F", "color": "#ED1A3A", "bg": "#ED1A3A", "text": "white",
-        "logo": get_clearbit_logo("fujifilm.com")
-    },
-    
-    # Finance & Payment
-    "mastercard": {
-        "icon": "●●", "color": "#EB001B", "bg": "#FF5F00", "text": "white",
-        "logo": get_clearbit_logo("mastercard.com")
-    },
-    "visa": {
-        "icon": "V", "color": "#1A1F71", "bg": "#1A1F71", "text": "white",
-        "logo": get_clearbit_logo("visa.com")
-    },
-    "paypal": {
-        "icon": "P", "color": "#003087", "bg": "#003087", "text": "white",
-        "logo": get_clearbit_logo("paypal.com")
-    },
-    "gcash": {
-        "icon": "G", "color": "#007DFE", "bg": "#007DFE", "text": "white",
-        "logo": get_clearbit_logo("gcash.com")
-    },
-    "maya": {
-        "icon": "M", "color": "#00D66C", "bg": "#00D66C", "text": "white",
-        "logo": get_clearbit_logo("maya.ph")
-    },
-    "paymaya": {
-        "icon": "M", "color": "#00D66C", "bg": "#00D66C", "text": "white",
-        "logo": get_clearbit_logo("maya.ph")
-    },
-    "bpi": {
-        "icon": "B", "color": "#9E1B34", "bg": "#9E1B34", "text": "white",
-        "logo": get_clearbit_logo("bpi.com.ph")
-    },
-    "bdo": {
-        "icon": "B", "color": "#003478", "bg": "#003478", "text": "white",
-        "logo": get_clearbit_logo("bdo.com.ph")
-    },
-    "metrobank": {
-        "icon": "M", "color": "#003DA5", "bg": "#003DA5", "text": "white",
-        "logo": get_clearbit_logo("metrobank.com.ph")
-    },
-    "landbank": {
-        "icon": "L", "color": "#006400", "bg": "#006400", "text": "white",
-        "logo": get_clearbit_logo("landbank.com")
-    },
-    "unionbank": {
-        "icon": "U", "color": "#FF6600", "bg": "#FF6600", "text": "white",
-        "logo": get_clearbit_logo("unionbankph.com")
-    },
-    
-    # Streaming & Entertainment
-    "netflix": {
-        "icon": "N", "color": "#E50914", "bg": "#000000", "text": "#E50914",
-        "logo": get_clearbit_logo("netflix.com")
-    },
-    "spotify": {
-        "icon": "♪", "color": "#1DB954", "bg": "#191414", "text": "#1DB954",
-        "logo": get_clearbit_logo("spotify.com")
-    },
-    "youtube": {
-        "icon": "▶", "color": "#FF0000", "bg": "#282828", "text": "#FF0000",
-        "logo": get_clearbit_logo("youtube.com")
-    },
-    "youtube premium": {
-        "icon": "▶", "color": "#FF0000", "bg": "#282828", "text": "#FF0000",
-        "logo": get_clearbit_logo("youtube.com")
-    },
-    "disney": {
-        "icon": "D", "color": "#113CCF", "bg": "#040814", "text": "white",
-        "logo": get_clearbit_logo("disneyplus.com")
-    },
-    "disney+": {
-        "icon": "D", "color": "#113CCF", "bg": "#040814", "text": "white",
-        "logo": get_clearbit_logo("disneyplus.com")
-    },
-    "hbo": {
-        "icon": "H", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("hbomax.com")
-    },
-    "hulu": {
-        "icon": "H", "color": "#1CE783", "bg": "#1CE783", "text": "#1E1E1E",
-        "logo": get_clearbit_logo("hulu.com")
-    },
-    "amazon prime": {
-        "icon": "P", "color": "#00A8E1", "bg": "#232F3E", "text": "white",
-        "logo": get_clearbit_logo("primevideo.com")
-    },
-    "prime video": {
-        "icon": "P", "color": "#00A8E1", "bg": "#232F3E", "text": "white",
-        "logo": get_clearbit_logo("primevideo.com")
-    },
-    "twitch": {
-        "icon": "T", "color": "#9146FF", "bg": "#9146FF", "text": "white",
-        "logo": get_clearbit_logo("twitch.tv")
-    },
-    "steam": {
-        "icon": "S", "color": "#1B2838", "bg": "#1B2838", "text": "white",
-        "logo": get_clearbit_logo("steampowered.com")
-    },
-    "epic games": {
-        "icon": "E", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("epicgames.com")
-    },
-    
-    # Transport
-    "grab": {
-        "icon": "G", "color": "#00B14F", "bg": "#00B14F", "text": "white",
-        "logo": get_clearbit_logo("grab.com")
-    },
-    "grabfood": {
-        "icon": "G", "color": "#00B14F", "bg": "#00B14F", "text": "white",
-        "logo": get_clearbit_logo("grab.com")
-    },
-    "uber": {
-        "icon": "U", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("uber.com")
-    },
-    "angkas": {
-        "icon": "A", "color": "#F16521", "bg": "#F16521", "text": "white",
-        "logo": get_clearbit_logo("angkas.com")
-    },
-    "foodpanda": {
-        "icon": "🐼", "color": "#D70F64", "bg": "#D70F64", "text": "white",
-        "logo": get_clearbit_logo("foodpanda.com")
-    },
-    "lalamove": {
-        "icon": "L", "color": "#F26722", "bg": "#F26722", "text": "white",
-        "logo": get_clearbit_logo("lalamove.com")
-    },
-    "shell": {
-        "icon": "🐚", "color": "#FBCE07", "bg": "#DD1D21", "text": "#FBCE07",
-        "logo": get_clearbit_logo("shell.com")
-    },
-    "petron": {
-        "icon": "P", "color": "#1E4D8C", "bg": "#1E4D8C", "text": "white",
-        "logo": get_clearbit_logo("petron.com")
-    },
-    "caltex": {
-        "icon": "★", "color": "#E31937", "bg": "#E31937", "text": "white",
-        "logo": get_clearbit_logo("caltex.com")
-    },
-    "phoenix": {
-        "icon": "P", "color": "#FF6600", "bg": "#FF6600", "text": "white",
-        "logo": get_clearbit_logo("phoenixfuels.ph")
-    },
-    
-    # Utilities
-    "meralco": {
-        "icon": "⚡", "color": "#FF6B00", "bg": "#FF6B00", "text": "white",
-        "logo": get_clearbit_logo("meralco.com.ph")
-    },
-    "pldt": {
-        "icon": "P", "color": "#E31937", "bg": "#E31937", "text": "white",
-        "logo": get_clearbit_logo("pldthome.com")
-    },
-    "globe": {
-        "icon": "G", "color": "#0056A3", "bg": "#0056A3", "text": "white",
-        "logo": get_clearbit_logo("globe.com.ph")
-    },
-    "smart": {
-        "icon": "S", "color": "#00913A", "bg": "#00913A", "text": "white",
-        "logo": get_clearbit_logo("smart.com.ph")
-    },
-    "maynilad": {
-        "icon": "M", "color": "#0072CE", "bg": "#0072CE", "text": "white",
-        "logo": get_clearbit_logo("mayniladwater.com.ph")
-    },
-    "manila water": {
-        "icon": "M", "color": "#003DA5", "bg": "#003DA5", "text": "white",
-        "logo": get_clearbit_logo("manilawater.com")
-    },
-    "converge": {
-        "icon": "C", "color": "#FF6600", "bg": "#FF6600", "text": "white",
-        "logo": get_clearbit_logo("convergeict.com")
-    },
-    
-    # Retail & Supermarkets
-    "sm": {
-        "icon": "SM", "color": "#003DA5", "bg": "#003DA5", "text": "white",
-        "logo": get_clearbit_logo("smsupermalls.com")
-    },
-    "sm supermarket": {
-        "icon": "SM", "color": "#003DA5", "bg": "#003DA5", "text": "white",
-        "logo": get_clearbit_logo("smsupermarket.com")
-    },
-    "robinsons": {
-        "icon": "R", "color": "#00529B", "bg": "#00529B", "text": "white",
-        "logo": get_clearbit_logo("robinsonsmalls.com")
-    },
-    "puregold": {
-        "icon": "P", "color": "#FFD700", "bg": "#FFD700", "text": "#1E1E1E",
-        "logo": get_clearbit_logo("puregold.com.ph")
-    },
-    "savemore": {
-        "icon": "S", "color": "#00529B", "bg": "#00529B", "text": "white",
-        "logo": get_clearbit_logo("savemore.com.ph")
-    },
-    "mercury drug": {
-        "icon": "M", "color": "#E31937", "bg": "#E31937", "text": "white",
-        "logo": get_clearbit_logo("mercurydrug.com")
-    },
-    "watsons": {
-        "icon": "W", "color": "#00A651", "bg": "#00A651", "text": "white",
-        "logo": get_clearbit_logo("watsons.com.ph")
-    },
-    "7-eleven": {
-        "icon": "7", "color": "#00703C", "bg": "#00703C", "text": "white",
-        "logo": get_clearbit_logo("7-eleven.com")
-    },
-    "7eleven": {
-        "icon": "7", "color": "#00703C", "bg": "#00703C", "text": "white",
-        "logo": get_clearbit_logo("7-eleven.com")
-    },
-    "ministop": {
-        "icon": "M", "color": "#003DA5", "bg": "#003DA5", "text": "white",
-        "logo": get_clearbit_logo("ministop.com.ph")
-    },
-    "family mart": {
-        "icon": "F", "color": "#00703C", "bg": "#00703C", "text": "white",
-        "logo": get_clearbit_logo("family.co.jp")
-    },
-    
-    # Fashion & Apparel
-    "uniqlo": {
-        "icon": "U", "color": "#FF0000", "bg": "#FFFFFF", "text": "#FF0000",
-        "logo": get_clearbit_logo("uniqlo.com")
-    },
-    "h&m": {
-        "icon": "H&M", "color": "#E50010", "bg": "#FFFFFF", "text": "#E50010",
-        "logo": get_clearbit_logo("hm.com")
-    },
-    "zara": {
-        "icon": "Z", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("zara.com")
-    },
-    "nike": {
-        "icon": "✓", "color": "#111111", "bg": "#111111", "text": "white",
-        "logo": get_clearbit_logo("nike.com")
-    },
-    "adidas": {
-        "icon": "⫿", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("adidas.com")
-    },
-    "puma": {
-        "icon": "P", "color": "#E31937", "bg": "#E31937", "text": "white",
-        "logo": get_clearbit_logo("puma.com")
-    },
-    "new balance": {
-        "icon": "NB", "color": "#CF0A2C", "bg": "#CF0A2C", "text": "white",
-        "logo": get_clearbit_logo("newbalance.com")
-    },
-    "converse": {
-        "icon": "★", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("converse.com")
-    },
-    "vans": {
-        "icon": "V", "color": "#C41230", "bg": "#C41230", "text": "white",
-        "logo": get_clearbit_logo("vans.com")
-    },
-    "skechers": {
-        "icon": "S", "color": "#0033A0", "bg": "#0033A0", "text": "white",
-        "logo": get_clearbit_logo("skechers.com")
-    },
-    "under armour": {
-        "icon": "UA", "color": "#1D1D1D", "bg": "#1D1D1D", "text": "white",
-        "logo": get_clearbit_logo("underarmour.com")
-    },
-    "gap": {
-        "icon": "GAP", "color": "#1E3A5F", "bg": "#1E3A5F", "text": "white",
-        "logo": get_clearbit_logo("gap.com")
-    },
-    "levis": {
-        "icon": "L", "color": "#C41230", "bg": "#C41230", "text": "white",
-        "logo": get_clearbit_logo("levi.com")
-    },
-    "levi's": {
-        "icon": "L", "color": "#C41230", "bg": "#C41230", "text": "white",
-        "logo": get_clearbit_logo("levi.com")
-    },
-    "gucci": {
-        "icon": "G", "color": "#1B4D3E", "bg": "#1B4D3E", "text": "white",
-        "logo": get_clearbit_logo("gucci.com")
-    },
-    "louis vuitton": {
-        "icon": "LV", "color": "#8B6914", "bg": "#8B6914", "text": "white",
-        "logo": get_clearbit_logo("louisvuitton.com")
-    },
-    "lv": {
-        "icon": "LV", "color": "#8B6914", "bg": "#8B6914", "text": "white",
-        "logo": get_clearbit_logo("louisvuitton.com")
-    },
-    "chanel": {
-        "icon": "C", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("chanel.com")
-    },
-    "prada": {
-        "icon": "P", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("prada.com")
-    },
-    "crocs": {
-        "icon": "C", "color": "#00A651", "bg": "#00A651", "text": "white",
-        "logo": get_clearbit_logo("crocs.com")
-    },
-    
-    # Coffee & Cafes
-    "coffee bean": {
-        "icon": "☕", "color": "#6B3A1E", "bg": "#6B3A1E", "text": "white",
-        "logo": get_clearbit_logo("coffeebean.com")
-    },
-    "bo's coffee": {
-        "icon": "☕", "color": "#003DA5", "bg": "#003DA5", "text": "white",
-        "logo": get_clearbit_logo("bfranchising.com")
-    },
-    
-    # Software & Services
-    "adobe": {
-        "icon": "A", "color": "#FF0000", "bg": "#FF0000", "text": "white",
-        "logo": get_clearbit_logo("adobe.com")
-    },
-    "dropbox": {
-        "icon": "D", "color": "#0061FF", "bg": "#0061FF", "text": "white",
-        "logo": get_clearbit_logo("dropbox.com")
-    },
-    "slack": {
-        "icon": "S", "color": "#4A154B", "bg": "#4A154B", "text": "white",
-        "logo": get_clearbit_logo("slack.com")
-    },
-    "zoom": {
-        "icon": "Z", "color": "#2D8CFF", "bg": "#2D8CFF", "text": "white",
-        "logo": get_clearbit_logo("zoom.us")
-    },
-    "notion": {
-        "icon": "N", "color": "#000000", "bg": "#000000", "text": "white",
-        "logo": get_clearbit_logo("notion.so")
-    },
-    "canva": {
-        "icon": "C", "color": "#00C4CC", "bg": "#00C4CC", "text": "white",
-        "logo": get_clearbit_logo("canva.com")
-    },
-    "github": {
-        "icon": "G", "color": "#181717", "bg": "#181717", "text": "white",
-        "logo": get_clearbit_logo("github.com")
-    },
-    "figma": {
-        "icon": "F", "color": "#F24E1E", "bg": "#F24E1E", "text": "white",
-        "logo": get_clearbit_logo("figma.com")
-    },
-}
-
-
-def get_brand_info(text: str):
-    """Get brand info from text."""
-    text_lower = text.lower()
-    for brand, info in BRAND_DATABASE.items():
-        if brand in text_lower:
-            return info
-    return None
-
-
 def create_expense_item(brand_text: str, date: str, amount: float, on_click=None, theme=None, account_name: str = None, user_currency: str = "PHP"):
     """Creates a modern expense item row with real brand logos and theme support."""
     # Get theme if not provided
@@ -713,7 +78,7 @@ def create_expense_item(brand_text: str, date: str, amount: float, on_click=None
         amount_bg = "#0D3D2E" if theme.is_dark else "#D1FAE5"
     
     # Get brand info
-    brand_info = get_brand_info(brand_text)
+    brand_info = resolve_category(brand_text)["brand"]
     
     if brand_info:
         # Check if we have a logo URL
@@ -867,27 +232,13 @@ def create_expenses_view(page: ft.Page, state: dict, toast, show_home, show_wall
         """Load and display all expenses with theme support."""
         theme = get_theme()
         expenses_list.controls.clear()
-        rows = db.select_expenses_by_user(state["user_id"])
-        
-        # Cache account info (name and currency) for efficiency
-        account_cache = {}
-        def get_account_info(acc_id):
-            if acc_id is None:
-                return None, user_currency
-            if acc_id not in account_cache:
-                acc = db.get_account_by_id(acc_id, state["user_id"])
-                if acc:
-                    # acc structure: id, name, account_number, type, balance, currency, color, is_primary, created_at
-                    account_cache[acc_id] = {"name": acc[1], "currency": acc[5]}
-                else:
-                    account_cache[acc_id] = {"name": None, "currency": user_currency}
-            return account_cache[acc_id]["name"], account_cache[acc_id]["currency"]
+        # One query: expenses joined with their account's name and currency
+        rows = db.select_expenses_with_accounts(state["user_id"])
         
         for r in rows:
-            # Unpack with account_id (position 6)
-            eid, uid, amt, cat, dsc, dtt, acc_id = r[:7]
+            eid, uid, amt, cat, dsc, dtt, acc_id, acc_name, acc_currency = r[:9]
             display_name = dsc if dsc else cat
-            acc_name, acc_currency = get_account_info(acc_id)
+            acc_currency = acc_currency or user_currency
             
             expenses_list.controls.append(
                 create_expense_item(
@@ -2249,7 +1600,7 @@ def build_expenses_content(page: ft.Page, state: dict, toast,
     # Get user profile and currency
     user_profile = db.get_user_profile(state["user_id"])
     first_name = user_profile.get("firstName", "User") if user_profile else "User"
-    from utils.currency import get_currency_from_user_profile
+    from utils.currency import convert_total, get_currency_from_user_profile
     user_currency = get_currency_from_user_profile(user_profile)
     
     # Create avatar
@@ -2259,11 +1610,11 @@ def build_expenses_content(page: ft.Page, state: dict, toast,
     accounts = db.select_accounts_by_user(state["user_id"])
     selected_account = db.get_selected_account(state["user_id"])
     
-    # Get expenses
-    expenses = db.select_expenses_by_user(state["user_id"])
+    # Get expenses, joined with their account's name and currency
+    expenses = db.select_expenses_with_accounts(state["user_id"])
     
-    # Calculate total balance
-    total_balance = sum(acc[4] for acc in accounts) if accounts else 0
+    # Calculate total balance in the user's currency
+    total_balance = convert_total((acc[4] for acc in accounts), (acc[5] for acc in accounts), user_currency) if accounts else 0
     
     # Header
     header = ft.Container(
@@ -2334,32 +1685,10 @@ def build_expenses_content(page: ft.Page, state: dict, toast,
     # Expenses list
     expenses_list = ft.Column(spacing=8)
     
-    # Cache account names and currencies for efficiency
-    account_cache = {}
-    currency_cache = {}
-    
-    def get_account_name(acc_id):
-        if acc_id is None:
-            return None
-        if acc_id not in account_cache:
-            acc = db.get_account_by_id(acc_id, state["user_id"])
-            account_cache[acc_id] = acc[1] if acc else None
-        return account_cache[acc_id]
-    
-    def get_account_currency(acc_id):
-        """Get the currency of the account used for this expense"""
-        if acc_id is None:
-            return "PHP"
-        if acc_id not in currency_cache:
-            acc = db.get_account_by_id(acc_id, state["user_id"])
-            currency_cache[acc_id] = acc[5] if acc else "PHP"
-        return currency_cache[acc_id]
-    
     for exp in expenses[:10]:
-        eid, uid, amt, cat, dsc, dtt, acc_id = exp[:7]
+        eid, uid, amt, cat, dsc, dtt, acc_id, acc_name, acc_currency = exp[:9]
         display_name = dsc if dsc else cat
-        acc_name = get_account_name(acc_id)
-        expense_currency = get_account_currency(acc_id)
+        expense_currency = acc_currency or "PHP"
         try:
             dt = datetime.strptime(dtt, "%Y-%m-%d")
             date_str = dt.strftime("%d %b %Y")
@@ -2446,7 +1775,7 @@ def build_expenses_content(page: ft.Page, state: dict, toast,
     # Get user profile for avatar and currency
     user_profile = db.get_user_profile(state["user_id"])
     first_name = user_profile.get("firstName", "User") if user_profile else "User"
-    from utils.currency import get_currency_from_user_profile
+    from utils.currency import convert_total, get_currency_from_user_profile
     user_currency = get_currency_from_user_profile(user_profile)
     
     # Create avatar
@@ -2485,7 +1814,8 @@ def build_expenses_content(page: ft.Page, state: dict, toast,
     accounts = db.get_accounts_by_user(state["user_id"])
     selected_account = db.get_selected_account(state["user_id"])
     selected_account_id = selected_account[0] if selected_account else None
-    total_balance = sum(acc[4] for acc in accounts) if accounts else 0
+    # Accounts may hold different currencies; total them in the user's currency
+    total_balance = convert_total((acc[4] for acc in accounts), (acc[5] for acc in accounts), user_currency) if accounts else 0
     
     # Balance header
     balance_header = ft.Row(
@@ -2941,22 +2271,8 @@ def build_expenses_content(page: ft.Page, state: dict, toast,
     
     # Expenses list
     expenses_list = ft.Column(spacing=4)
-    rows = db.select_expenses_by_user(state["user_id"])
-    
-    # Cache account names for efficiency
-    # Cache account info (name and currency) for efficiency  
-    account_cache = {}
-    def get_account_info(acc_id):
-        if acc_id is None:
-            return None, user_currency
-        if acc_id not in account_cache:
-            acc = db.get_account_by_id(acc_id, state["user_id"])
-            if acc:
-                # acc structure: id, name, account_number, type, balance, currency, color, is_primary, created_at
-                account_cache[acc_id] = {"name": acc[1], "currency": acc[5]}
-            else:
-                account_cache[acc_id] = {"name": None, "currency": user_currency}
-        return account_cache[acc_id]["name"], account_cache[acc_id]["currency"]
+    # One query: expenses joined with their account's name and currency
+    rows = db.select_expenses_with_accounts(state["user_id"])
     
     def format_date(date_str):
         try:
@@ -2966,9 +2282,9 @@ def build_expenses_content(page: ft.Page, state: dict, toast,
             return date_str
     
     for r in rows:
-        eid, uid, amt, cat, dsc, dtt, acc_id = r[:7]
+        eid, uid, amt, cat, dsc, dtt, acc_id, acc_name, acc_currency = r[:9]
         display_name = dsc if dsc else cat
-        acc_name, acc_currency = get_account_info(acc_id)
+        acc_currency = acc_currency or user_currency
         expenses_list.controls.append(
             create_expense_item(
                 brand_text=display_name,
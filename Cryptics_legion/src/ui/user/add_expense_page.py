@@ -3,11 +3,13 @@ import flet as ft
 from datetime import datetime
 from core import db
 from core.theme import get_theme
-from utils.brand_recognition import identify_brand, get_brand_suggestions
+from utils.brand_recognition import identify_brand
+from utils.autocomplete import record_description_use, suggest
 from utils.currency import get_currency_symbol
 from utils.currency_exchange import get_exchange_api
+from utils.rate_history import rate_as_of
 from components.notification import ImmersiveNotification
-from utils.gamification import on_expense_logged
+from utils.gamification_worker import announce_to, submit_expense_logged
 
 
 # Category options
@@ -135,6 +137,7 @@ def create_add_expense_view(page: ft.Page, state: dict, toast, go_back,
             datetime.now().strftime("%Y-%m-%d"),
             account_id
         )
+        record_description_use(state["user_id"], expense_description)
         
         toast(f"Expense added! Deducted {currency_symbol}{amount:,.2f} from {account_name}", "#2E7D32")
         nav_back()
@@ -294,13 +297,13 @@ def create_add_expense_view(page: ft.Page, state: dict, toast, go_back,
                         preview_text.italic = False
                         ai_badge.visible = False
                     
-                    # Show suggestions
-                    suggestions = get_brand_suggestions(input_value, limit=4)
+                    # Show suggestions, ranked by the user's own usage (category info included)
+                    suggestions = suggest(input_value, user_id=state["user_id"], limit=4)
                     if suggestions and len(input_value) >= 2:
                         suggestions_column.controls.clear()
-                        for suggestion in suggestions:
+                        for sug_result in suggestions:
+                            suggestion = sug_result["name"]
                             if suggestion.lower() != input_value.lower():
-                                sug_result = identify_brand(suggestion)
                                 suggestions_column.controls.append(
                                     ft.Container(
                                         content=ft.Row(
@@ -1380,27 +1383,31 @@ def build_add_expense_content(page: ft.Page, state: dict, toast, go_back,
         expense_currency = expense_state["selected_currency_code"]  # Currency user entered amount in
         account_currency = acc_info[5] if len(acc_info) > 5 else "PHP"  # Account's currency
         
+        expense_datetime = datetime.combine(
+            expense_state["selected_date"].date(),
+            expense_state["selected_time"].time()
+        )
+        date_str = expense_datetime.strftime("%Y-%m-%d %H:%M:%S")
+        
         # Convert amount if currencies are different
         converted_amount = amount
-        exchange_rate = 1.0
-        conversion_note = ""
+        exchange_rate = None
+        original_amount = original_currency = None
         
         if expense_currency != account_currency:
-            # Get exchange rate and convert
-            api = get_exchange_api()
-            exchange_rate = api.get_exchange_rate(expense_currency, account_currency)
-            converted_amount = api.convert_currency(amount, expense_currency, account_currency)
-            
-            # Create conversion note for display
-            expense_symbol = get_currency_symbol(expense_currency)
-            account_symbol = get_currency_symbol(account_currency)
-            conversion_note = f"{expense_symbol}{amount:,.2f} ({expense_currency}) = {account_symbol}{converted_amount:,.2f} ({account_currency}) • Rate: 1 {expense_currency} = {exchange_rate:.4f} {account_currency}"
-            
-            # Update description to include conversion info
-            if description:
-                description = f"{description} [{conversion_note}]"
+            # Get exchange rate and convert; the original amount and the
+            # rate used are stored alongside the expense. Backdated
+            # expenses use the rate in effect on their date when known.
+            if expense_datetime.date() < datetime.now().date():
+                exchange_rate = rate_as_of(expense_currency, account_currency, date_str)
+            if exchange_rate is not None:
+                converted_amount = round(amount * exchange_rate, 2)
+                exchange_rate = round(exchange_rate, 4)
             else:
-                description = f"[{conversion_note}]"
+                api = get_exchange_api()
+                exchange_rate = api.get_exchange_rate(expense_currency, account_currency)
+                converted_amount = api.convert_currency(amount, expense_currency, account_currency)
+            original_amount, original_currency = amount, expense_currency
         
         # Check if account has enough balance (in account's currency)
         if converted_amount > acc_info[4]:
@@ -1408,12 +1415,6 @@ def build_add_expense_content(page: ft.Page, state: dict, toast, go_back,
             toast(f"Insufficient balance in {acc_info[1]} ({acc_symbol}{acc_info[4]:,.2f})", "#EF4444")
             return
         
-        expense_datetime = datetime.combine(
-            expense_state["selected_date"].date(),
-            expense_state["selected_time"].time()
-        )
-        date_str = expense_datetime.strftime("%Y-%m-%d %H:%M:%S")
-        
         category = expense_state.get("detected_category") or expense_state["category"]
         
         # Save expense with converted amount (in account's currency)
@@ -1424,7 +1425,11 @@ def build_add_expense_content(page: ft.Page, state: dict, toast, go_back,
             description=description,
             date_str=date_str,
             account_id=expense_state["selected_account_id"],
+            original_amount=original_amount,
+            original_currency=original_currency,
+            rate=exchange_rate,
         )
+        record_description_use(state["user_id"], description)
         
         acc_name = acc_info[1]
         acc_symbol = get_currency_symbol(account_currency)
@@ -1446,23 +1451,9 @@ def build_add_expense_content(page: ft.Page, state: dict, toast, go_back,
             )
             
         # ── Trigger Gamification Hook ──
-        # Check if this came from the voice assistant
-        via_voice = bool(state.get("voice_expense_data"))
-        events = on_expense_logged(state["user_id"], via_voice=via_voice)
-        
-        # Clear voice data if it existed
-        if "voice_expense_data" in state:
-            state.pop("voice_expense_data", None)
-        
-        # We use ImmersiveNotification for rewards to avoid Flet SnackBar navigation race conditions
-        if events.get("leveled_up"):
-            notif.show(f"🎉 Level Up! You reached Level {events['new_level']}!", "success", title="Level Up!")
-        elif events.get("new_badges"):
-            for b in events["new_badges"]:
-                notif.show(f"🏆 New Badge Unlocked!", "success", title="Achievement Unlocked!")
-        else:
-            if events.get("xp_gained", 0) > 0:
-                print(f"[Gamification] +{events['xp_gained']} XP gained")
+        # Processed on the gamification worker; rewards pop up when ready
+        via_voice = bool(state.pop("voice_expense_data", None))
+        submit_expense_logged(state["user_id"], via_voice=via_voice, notify=announce_to(page))
         
         if show_expenses:
             show_expenses()
@@ -1,24 +1,21 @@
 # src/ui/all_expenses_page.py
 import flet as ft
 from datetime import datetime
-import re
 from core import db
 from core.theme import get_theme
-from utils.brand_recognition import identify_brand, get_icon_for_category
+from utils.category_resolver import resolve_category
 from utils.currency import format_currency, get_currency_from_user_profile, get_currency_symbol
 from components.notification import ImmersiveNotification
 
 
 def get_category_icon(category: str):
     """Returns an appropriate icon for the category using AI brand recognition."""
-    result = identify_brand(category)
-    return result["icon"]
+    return resolve_category(category)["icon"]
 
 
 def get_category_color(category: str):
     """Returns an appropriate color for the category using AI brand recognition."""
-    result = identify_brand(category)
-    return result["color"]
+    return resolve_category(category)["color"]
 
 
 def format_date(date_str: str) -> str:
@@ -48,25 +45,21 @@ def format_date_time(date_str: str) -> str:
         return date_str
 
 
-def extract_conversion_info(description: str) -> dict:
-    """Extract currency conversion information from description."""
-    if not description:
+def get_conversion_info(expense) -> dict:
+    """Currency conversion details of a joined expense row, or None if it wasn't converted."""
+    original_amount, original_currency, rate = expense[10:13] if len(expense) > 12 else (None, None, None)
+    if original_currency is None or original_amount is None:
         return None
     
-    # Pattern: [₱500.00 (PHP) = ¥1,069.52 (JPY) • Rate: 1 PHP = 2.139 JPY]
-    pattern = r'\[(.+?)\s+\(([A-Z]{3})\)\s+=\s+(.+?)\s+\(([A-Z]{3})\)\s+•\s+Rate:\s+1\s+([A-Z]{3})\s+=\s+([\d,.]+)\s+([A-Z]{3})\]'
-    match = re.search(pattern, description)
-    
-    if match:
-        return {
-            'from_amount': match.group(1),
-            'from_currency': match.group(2),
-            'to_amount': match.group(3),
-            'to_currency': match.group(4),
-            'rate': match.group(6),
-            'description_clean': re.sub(pattern, '', description).strip()
-        }
-    return None
+    to_currency = expense[8] or "PHP"
+    return {
+        'from_amount': f"{get_currency_symbol(original_currency)}{original_amount:,.2f}",
+        'from_currency': original_currency,
+        'to_amount': f"{get_currency_symbol(to_currency)}{expense[2]:,.2f}",
+        'to_currency': to_currency,
+        'rate': f"{rate:.4f}" if rate is not None else "—",
+        'description_clean': expense[4] or '',
+    }
 
 
 def create_all_expenses_view(page: ft.Page, state: dict, toast, go_back):
@@ -76,24 +69,15 @@ def create_all_expenses_view(page: ft.Page, state: dict, toast, go_back):
     user_currency = get_currency_from_user_profile(user_profile)
     
     expenses_list = ft.Column(spacing=8)
+    paging = {"after": None, "loading": False, "total": 0.0}
     
     def load_expenses():
+        """(Re)load the first page of expenses; later pages load on scroll."""
         expenses_list.controls.clear()
-        rows = db.select_expenses_by_user(state["user_id"])
-        
-        # Cache full account info for efficiency
-        account_cache = {}
-        def get_account_info(acc_id):
-            if acc_id is None:
-                return None, user_currency  # Return None for name, user's currency as default
-            if acc_id not in account_cache:
-                acc = db.get_account_by_id(acc_id, state["user_id"])
-                if acc:
-                    # acc structure: id, name, account_number, type, balance, currency, color, is_primary, created_at
-                    account_cache[acc_id] = {"name": acc[1], "currency": acc[5]}
-                else:
-                    account_cache[acc_id] = {"name": None, "currency": user_currency}
-            return account_cache[acc_id]["name"], account_cache[acc_id]["currency"]
+        first_page = db.select_expenses_page(state["user_id"])
+        rows = first_page["rows"]
+        paging["after"] = first_page["next_after"]
+        paging["total"] = first_page["total_amount"]
         
         if not rows:
             expenses_list.controls.append(
@@ -111,16 +95,35 @@ def create_all_expenses_view(page: ft.Page, state: dict, toast, go_back):
                 )
             )
         else:
-            for r in rows:
-                # Unpack with account_id (position 6)
-                eid, uid, amt, cat, dsc, dtt, acc_id = r[:7]
-                acc_name, acc_currency = get_account_info(acc_id)
-                expenses_list.controls.append(
-                    create_expense_card(eid, amt, cat, dsc, dtt, acc_name, acc_currency)
-                )
+            append_cards(rows)
         
         page.update()
     
+    def append_cards(rows):
+        for r in rows:
+            # Rows come joined with account name and currency (positions 7, 8)
+            eid, uid, amt, cat, dsc, dtt, acc_id, acc_name, acc_currency = r[:9]
+            expenses_list.controls.append(
+                create_expense_card(eid, amt, cat, dsc, dtt, acc_name, acc_currency)
+            )
+    
+    def load_next_page():
+        """Append the next page of expenses when scrolled near the end."""
+        if paging["loading"] or paging["after"] is None:
+            return
+        paging["loading"] = True
+        try:
+            next_page = db.select_expenses_page(state["user_id"], after=paging["after"])
+            paging["after"] = next_page["next_after"]
+            append_cards(next_page["rows"])
+            expenses_list.update()
+        finally:
+            paging["loading"] = False
+    
+    def on_scroll(e: ft.OnScrollEvent):
+        if e.max_scroll_extent and e.pixels >= e.max_scroll_extent - 400:
+            load_next_page()
+    
     def create_expense_card(eid, amount, category, description, date, account_name=None, account_currency=None):
         """Create an expense card with edit/delete options."""
         # Use account currency if available, otherwise fall back to user currency
@@ -325,8 +328,9 @@ def create_all_expenses_view(page: ft.Page, state: dict, toast, go_back):
     def show_view():
         page.clean()
         
-        # Calculate totals
-        total = db.total_expenses_by_user(state["user_id"])
+        # First page and totals come from one query session
+        load_expenses()
+        total = paging["total"]
         
         # Header
         header = ft.Row(
@@ -363,8 +367,6 @@ def create_all_expenses_view(page: ft.Page, state: dict, toast, go_back):
             border=ft.border.all(1, "#2d2d44"),
         )
         
-        load_expenses()
-        
         # Main layout
         page.add(
             ft.Container(
@@ -387,6 +389,8 @@ def create_all_expenses_view(page: ft.Page, state: dict, toast, go_back):
                     ],
                     expand=True,
                     scroll=ft.ScrollMode.AUTO,
+                    on_scroll=on_scroll,
+                    on_scroll_interval=100,
                 ),
             )
         )
@@ -402,13 +406,12 @@ def build_all_expenses_content(page: ft.Page, state: dict, toast, go_back, show_
     """
     theme = get_theme()
     
-    # Get all expenses
-    expenses = db.select_expenses_by_user(state["user_id"])
-    total_spent = db.total_expenses_by_user(state["user_id"])
-    expense_count = len(expenses) if expenses else 0
-    
-    # Expenses list container
-    expenses_list = ft.Column(spacing=8)
+    # First page of expenses plus overall totals; later pages load on scroll
+    first_page = db.select_expenses_page(state["user_id"])
+    expenses = first_page["rows"]
+    total_spent = first_page["total_amount"]
+    expense_count = first_page["total_count"]
+    paging = {"after": first_page["next_after"], "loading": False}
     
     def refresh_view():
         """Refresh the view after deletion."""
@@ -447,32 +450,10 @@ def build_all_expenses_content(page: ft.Page, state: dict, toast, go_back, show_
         )
         page.open(confirm_dialog)
     
-    # Cache account names and currencies for efficiency
-    account_cache = {}
-    currency_cache = {}
-    
-    def get_account_name(acc_id):
-        if acc_id is None:
-            return None
-        if acc_id not in account_cache:
-            acc = db.get_account_by_id(acc_id, state["user_id"])
-            account_cache[acc_id] = acc[1] if acc else None
-        return account_cache[acc_id]
-    
-    def get_account_currency(acc_id):
-        """Get the currency of the account used for this expense"""
-        if acc_id is None:
-            return "PHP"
-        if acc_id not in currency_cache:
-            acc = db.get_account_by_id(acc_id, state["user_id"])
-            currency_cache[acc_id] = acc[5] if acc else "PHP"
-        return currency_cache[acc_id]
-    
-    def show_expense_details(eid, amount, category, description, date_str, acc_id, expense_currency):
+    def show_expense_details(eid, amount, category, description, date_str, account_name, expense_currency, conversion_info=None):
         """Show detailed transaction information dialog."""
-        account_name = get_account_name(acc_id) or "Cash"
-        conversion_info = extract_conversion_info(description)
-        display_desc = conversion_info['description_clean'] if conversion_info else (description or category)
+        account_name = account_name or "Cash"
+        display_desc = description or category
         
         # Generate recommendations based on expense
         recommendations = []
@@ -640,22 +621,19 @@ def build_all_expenses_content(page: ft.Page, state: dict, toast, go_back, show_
     
     def create_expense_card(expense):
         """Create an expense card with swipe to delete."""
-        eid, uid, amount, category, description, date_str, acc_id = expense[:7]
+        # Rows come joined with the account's name and currency
+        eid, uid, amount, category, description, date_str, acc_id, account_name, account_currency = expense[:9]
         
         icon = get_category_icon(description or category)
         icon_color = get_category_color(description or category)
         display_name = description if description else category
         formatted_date = format_date(date_str)
-        account_name = get_account_name(acc_id)
         
         # Get currency from the expense's original account
-        expense_currency = get_account_currency(acc_id)
+        expense_currency = account_currency or "PHP"
         currency_symbol = get_currency_symbol(expense_currency)
         
-        # Clean display name if conversion info exists
-        conversion_info = extract_conversion_info(description)
-        if conversion_info:
-            display_name = conversion_info['description_clean'] if conversion_info['description_clean'] else category
+        conversion_info = get_conversion_info(expense)
         
         # Build subtitle text
         subtitle = f"{category} • {formatted_date}"
@@ -734,7 +712,7 @@ def build_all_expenses_content(page: ft.Page, state: dict, toast, go_back, show_
                         icon_color=theme.accent_primary,
                         icon_size=18,
                         tooltip="See Details",
-                        on_click=lambda e, i=eid, a=amount, c=category, d=description, dt=date_str, ac=acc_id, cur=expense_currency: show_expense_details(i, a, c, d, dt, ac, cur),
+                        on_click=lambda e, i=eid, a=amount, c=category, d=description, dt=date_str, ac=account_name, cur=expense_currency, ci=conversion_info: show_expense_details(i, a, c, d, dt, ac, cur, ci),
                     ),
                 ], spacing=0),
             ], vertical_alignment=ft.CrossAxisAlignment.CENTER),
@@ -750,12 +728,13 @@ def build_all_expenses_content(page: ft.Page, state: dict, toast, go_back, show_
             ),
         )
     
-    # Build expenses list
+    # Build expenses list (cards are items of the virtualized list below)
+    expense_cards = []
     if expenses:
         for expense in expenses:
-            expenses_list.controls.append(create_expense_card(expense))
+            expense_cards.append(create_expense_card(expense))
     else:
-        expenses_list.controls.append(
+        expense_cards.append(
             ft.Container(
                 content=ft.Column([
                     ft.Container(
@@ -932,15 +911,45 @@ def build_all_expenses_content(page: ft.Page, state: dict, toast, go_back, show_
         ),
     ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN)
     
-    # Main scrollable content
-    scrollable_content = ft.Column([
-        summary_row,
-        ft.Container(height=24),
-        section_header,
-        ft.Container(height=14),
-        expenses_list,
-        ft.Container(height=60),
-    ], scroll=ft.ScrollMode.AUTO, expand=True, spacing=0)
+    bottom_spacer = ft.Container(height=60)
+    
+    def load_next_page():
+        """Append the next batch of expense cards above the bottom spacer."""
+        if paging["loading"] or paging["after"] is None:
+            return
+        paging["loading"] = True
+        try:
+            next_page = db.select_expenses_page(state["user_id"], after=paging["after"])
+            paging["after"] = next_page["next_after"]
+            insert_at = len(scrollable_content.controls) - 1
+            scrollable_content.controls[insert_at:insert_at] = [
+                ft.Container(content=create_expense_card(expense), padding=ft.padding.only(bottom=8))
+                for expense in next_page["rows"]
+            ]
+            scrollable_content.update()
+        finally:
+            paging["loading"] = False
+    
+    def on_list_scroll(e: ft.OnScrollEvent):
+        # Prefetch when within a few cards of the end
+        if e.max_scroll_extent and e.pixels >= e.max_scroll_extent - 400:
+            load_next_page()
+    
+    # Main scrollable content: a lazily built ListView so only visible cards render
+    scrollable_content = ft.ListView(
+        controls=[
+            summary_row,
+            ft.Container(height=24),
+            section_header,
+            ft.Container(height=14),
+            *[ft.Container(content=card, padding=ft.padding.only(bottom=8)) for card in expense_cards],
+            bottom_spacer,
+        ],
+        expand=True,
+        spacing=0,
+        on_scroll=on_list_scroll,
+        on_scroll_interval=100,
+    )
     
     return ft.Container(
         expand=True,
@@ -507,4 +507,16 @@ def build_exchange_rates_content(page: ft.Page, state: dict, toast, go_back):
     
     # Build initial content and set it
     main_container.content = build_view()
+    
+    def on_rates_refreshed(rates):
+        """Re-render with rates that a background refresh just fetched."""
+        if main_container.page is None:
+            return
+        main_container.content = build_view()
+        page.update()
+    
+    # Only the page instance currently shown listens for refreshes
+    if state.get("exchange_rates_unsubscribe"):
+        state["exchange_rates_unsubscribe"]()
+    state["exchange_rates_unsubscribe"] = api.subscribe(on_rates_refreshed)
     return main_container
@@ -7,6 +7,7 @@ from ui.components.nav_bar_buttom import create_page_with_nav
 from utils.currency import format_currency, format_currency_short, get_currency_from_user_profile, get_currency_symbol
 from components.notification import NotificationCenter, NotificationHistory
 from components.enhanced_icons import EnhancedIcon, CategoryIcon, EnhancedIconButton
+from utils.category_resolver import resolve_category
 from utils.gamification import StreakManager, XPEngine, ChallengeManager, BadgeEngine
 import random
 import math
@@ -26,126 +27,6 @@ def get_time_based_greeting():
         return "Welcome back"
 
 
-def get_clearbit_logo(domain: str) -> str:
-    """Get brand logo URL from Clearbit API."""
-    return f"https://logo.clearbit.com/{domain}"
-
-
-# Brand database for recognition - using Clearbit Logo API for clear, high-quality logos
-BRAND_DATABASE = {
-    # Shopping & E-commerce
-    "amazon": {"icon": "a", "color": "#FF9900", "bg": "#232F3E", "text": "white", "logo": get_clearbit_logo("amazon.com")},
-    "shopee": {"icon": "🛒", "color": "#EE4D2D", "bg": "#EE4D2D", "text": "white", "logo": get_clearbit_logo("shopee.com")},
-    "lazada": {"icon": "L", "color": "#0F146D", "bg": "#0F146D", "text": "white", "logo": get_clearbit_logo("lazada.com")},
-    "zalora": {"icon": "Z", "color": "#000000", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("zalora.com")},
-    "ebay": {"icon": "e", "color": "#E53238", "bg": "#FFFFFF", "text": "#E53238", "logo": get_clearbit_logo("ebay.com")},
-    
-    # Food & Restaurants
-    "mcdonalds": {"icon": "M", "color": "#FFC72C", "bg": "#DA291C", "text": "#FFC72C", "logo": get_clearbit_logo("mcdonalds.com")},
-    "mcdonald's": {"icon": "M", "color": "#FFC72C", "bg": "#DA291C", "text": "#FFC72C", "logo": get_clearbit_logo("mcdonalds.com")},
-    "starbucks": {"icon": "☕", "color": "#00704A", "bg": "#00704A", "text": "white", "logo": get_clearbit_logo("starbucks.com")},
-    "jollibee": {"icon": "🐝", "color": "#E31837", "bg": "#E31837", "text": "white", "logo": get_clearbit_logo("jollibee.com.ph")},
-    "kfc": {"icon": "🍗", "color": "#F40027", "bg": "#F40027", "text": "white", "logo": get_clearbit_logo("kfc.com")},
-    "burger king": {"icon": "🍔", "color": "#FF8732", "bg": "#502314", "text": "#FF8732", "logo": get_clearbit_logo("bk.com")},
-    "pizza hut": {"icon": "🍕", "color": "#E31837", "bg": "#E31837", "text": "white", "logo": get_clearbit_logo("pizzahut.com")},
-    "subway": {"icon": "🥪", "color": "#008C15", "bg": "#FFC600", "text": "#008C15", "logo": get_clearbit_logo("subway.com")},
-    "dunkin": {"icon": "🍩", "color": "#FF671F", "bg": "#FF671F", "text": "white", "logo": get_clearbit_logo("dunkindonuts.com")},
-    "chowking": {"icon": "🥡", "color": "#E31837", "bg": "#E31837", "text": "white", "logo": get_clearbit_logo("chowkingdelivery.com")},
-    "greenwich": {"icon": "🍕", "color": "#006B3F", "bg": "#006B3F", "text": "white", "logo": get_clearbit_logo("greenwichdelivery.com")},
-    "mang inasal": {"icon": "🍗", "color": "#FDB813", "bg": "#FDB813", "text": "#1E1E1E", "logo": get_clearbit_logo("manginasal.com")},
-    
-    # Tech & Electronics
-    "apple": {"icon": "", "color": "#555555", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("apple.com")},
-    "ipad": {"icon": "", "color": "#555555", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("apple.com")},
-    "iphone": {"icon": "", "color": "#555555", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("apple.com")},
-    "macbook": {"icon": "", "color": "#555555", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("apple.com")},
-    "samsung": {"icon": "S", "color": "#1428A0", "bg": "#1428A0", "text": "white", "logo": get_clearbit_logo("samsung.com")},
-    "google": {"icon": "G", "color": "#4285F4", "bg": "#FFFFFF", "text": "#4285F4", "logo": get_clearbit_logo("google.com")},
-    "microsoft": {"icon": "⊞", "color": "#00A4EF", "bg": "#737373", "text": "white", "logo": get_clearbit_logo("microsoft.com")},
-    "sony": {"icon": "S", "color": "#000000", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("sony.com")},
-    "xiaomi": {"icon": "Mi", "color": "#FF6900", "bg": "#FF6900", "text": "white", "logo": get_clearbit_logo("mi.com")},
-    "huawei": {"icon": "H", "color": "#FF0000", "bg": "#FF0000", "text": "white", "logo": get_clearbit_logo("huawei.com")},
-    
-    # Finance & Payment
-    "gcash": {"icon": "G", "color": "#007DFE", "bg": "#007DFE", "text": "white", "logo": get_clearbit_logo("gcash.com")},
-    "maya": {"icon": "M", "color": "#00D66C", "bg": "#00D66C", "text": "white", "logo": get_clearbit_logo("maya.ph")},
-    "bpi": {"icon": "B", "color": "#9E1B34", "bg": "#9E1B34", "text": "white", "logo": get_clearbit_logo("bpi.com.ph")},
-    "bdo": {"icon": "B", "color": "#003478", "bg": "#003478", "text": "white", "logo": get_clearbit_logo("bdo.com.ph")},
-    "paypal": {"icon": "P", "color": "#003087", "bg": "#003087", "text": "white", "logo": get_clearbit_logo("paypal.com")},
-    
-    # Streaming & Entertainment
-    "netflix": {"icon": "N", "color": "#E50914", "bg": "#000000", "text": "#E50914", "logo": get_clearbit_logo("netflix.com")},
-    "spotify": {"icon": "♪", "color": "#1DB954", "bg": "#191414", "text": "#1DB954", "logo": get_clearbit_logo("spotify.com")},
-    "youtube": {"icon": "▶", "color": "#FF0000", "bg": "#282828", "text": "#FF0000", "logo": get_clearbit_logo("youtube.com")},
-    "disney": {"icon": "D", "color": "#113CCF", "bg": "#040814", "text": "white", "logo": get_clearbit_logo("disneyplus.com")},
-    
-    # Transport
-    "grab": {"icon": "G", "color": "#00B14F", "bg": "#00B14F", "text": "white", "logo": get_clearbit_logo("grab.com")},
-    "uber": {"icon": "U", "color": "#000000", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("uber.com")},
-    "angkas": {"icon": "A", "color": "#F16521", "bg": "#F16521", "text": "white", "logo": get_clearbit_logo("angkas.com")},
-    "shell": {"icon": "🐚", "color": "#FBCE07", "bg": "#DD1D21", "text": "#FBCE07", "logo": get_clearbit_logo("shell.com")},
-    "petron": {"icon": "P", "color": "#1E4D8C", "bg": "#1E4D8C", "text": "white", "logo": get_clearbit_logo("petron.com")},
-    "caltex": {"icon": "★", "color": "#E31937", "bg": "#E31937", "text": "white", "logo": get_clearbit_logo("caltex.com")},
-    "foodpanda": {"icon": "🐼", "color": "#D70F64", "bg": "#D70F64", "text": "white", "logo": get_clearbit_logo("foodpanda.com")},
-    
-    # Utilities
-    "meralco": {"icon": "⚡", "color": "#FF6B00", "bg": "#FF6B00", "text": "white", "logo": get_clearbit_logo("meralco.com.ph")},
-    "pldt": {"icon": "P", "color": "#E31937", "bg": "#E31937", "text": "white", "logo": get_clearbit_logo("pldthome.com")},
-    "globe": {"icon": "G", "color": "#0056A3", "bg": "#0056A3", "text": "white", "logo": get_clearbit_logo("globe.com.ph")},
-    "smart": {"icon": "S", "color": "#00913A", "bg": "#00913A", "text": "white", "logo": get_clearbit_logo("smart.com.ph")},
-    "maynilad": {"icon": "M", "color": "#0072CE", "bg": "#0072CE", "text": "white", "logo": get_clearbit_logo("mayniladwater.com.ph")},
-    "converge": {"icon": "C", "color": "#FF6600", "bg": "#FF6600", "text": "white", "logo": get_clearbit_logo("convergeict.com")},
-    
-    # Retail & Supermarkets
-    "sm": {"icon": "SM", "color": "#003DA5", "bg": "#003DA5", "text": "white", "logo": get_clearbit_logo("smsupermalls.com")},
-    "robinsons": {"icon": "R", "color": "#00529B", "bg": "#00529B", "text": "white", "logo": get_clearbit_logo("robinsonsmalls.com")},
-    "uniqlo": {"icon": "U", "color": "#FF0000", "bg": "#FFFFFF", "text": "#FF0000", "logo": get_clearbit_logo("uniqlo.com")},
-    "h&m": {"icon": "H&M", "color": "#E50010", "bg": "#FFFFFF", "text": "#E50010", "logo": get_clearbit_logo("hm.com")},
-    "nike": {"icon": "✓", "color": "#111111", "bg": "#111111", "text": "white", "logo": get_clearbit_logo("nike.com")},
-    "adidas": {"icon": "⫿", "color": "#000000", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("adidas.com")},
-    "zara": {"icon": "Z", "color": "#000000", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("zara.com")},
-}
-
-# Category fallback icons
-CATEGORY_ICONS = {
-    "food": {"icon": "🍔", "bg": "#EF4444"},
-    "transport": {"icon": "🚗", "bg": "#3B82F6"},
-    "shopping": {"icon": "🛍️", "bg": "#8B5CF6"},
-    "entertainment": {"icon": "🎬", "bg": "#EC4899"},
-    "bills": {"icon": "📄", "bg": "#F59E0B"},
-    "health": {"icon": "💊", "bg": "#10B981"},
-    "education": {"icon": "📚", "bg": "#6366F1"},
-    "salary": {"icon": "💰", "bg": "#10B981"},
-    "income": {"icon": "📈", "bg": "#10B981"},
-    "electronics": {"icon": "📱", "bg": "#6366F1"},
-    "groceries": {"icon": "🛒", "bg": "#10B981"},
-    "utilities": {"icon": "⚡", "bg": "#F59E0B"},
-    "rent": {"icon": "🏠", "bg": "#8B5CF6"},
-    "travel": {"icon": "✈️", "bg": "#3B82F6"},
-    "fitness": {"icon": "💪", "bg": "#EF4444"},
-    "subscription": {"icon": "📺", "bg": "#EC4899"},
-    "other": {"icon": "📦", "bg": "#6B7280"},
-}
-
-
-def get_brand_info(text: str):
-    """Get brand info from text."""
-    text_lower = text.lower()
-    for brand, info in BRAND_DATABASE.items():
-        if brand in text_lower:
-            return info
-    return None
-
-
-def get_category_fallback(category: str):
-    """Get category icon as fallback."""
-    cat_lower = category.lower()
-    for key, info in CATEGORY_ICONS.items():
-        if key in cat_lower:
-            return info
-    return {"icon": "📦", "bg": "#6B7280"}
-
-
 # Financial tips for the "Tip of the Day" card
 TIPS = [
     "Prepare a Budget and Abide by it",
@@ -528,7 +409,7 @@ def create_expense_item(brand_text: str, category: str, date: str, amount: float
         amount_bg = "#0D3D2E" if theme.is_dark else "#D1FAE5"
     
     # Get brand info first, then category fallback
-    brand_info = get_brand_info(brand_text)
+    brand_info = resolve_category(brand_text)["brand"]
     
     if brand_info:
         # Check if we have a logo URL
@@ -679,24 +560,14 @@ def create_home_view(page: ft.Page, state: dict, toast, show_dashboard, logout_c
         """Load and display expenses."""
         theme = get_theme()
         expenses_list.controls.clear()
-        rows = db.select_expenses_by_user(state["user_id"])
+        # Show only recent 5 expenses on home, joined with their account
+        rows = db.select_expenses_with_accounts(state["user_id"], limit=5)
         
-        # Cache for account currencies
-        currency_cache = {}
-        def get_expense_currency(acc_id):
-            if acc_id is None:
-                return "PHP"
-            if acc_id not in currency_cache:
-                acc = db.get_account_by_id(acc_id, state["user_id"])
-                currency_cache[acc_id] = acc[5] if acc else "PHP"
-            return currency_cache[acc_id]
-        
-        # Show only recent 5 expenses on home
-        for r in rows[:5]:
-            # Unpack with account_id (position 6)
-            eid, uid, amt, cat, dsc, dtt, acc_id = r[:7]
+        for r in rows:
+            # Account currency comes joined in (position 8)
+            eid, uid, amt, cat, dsc, dtt, acc_id, acc_name, acc_currency = r[:9]
             display_name = dsc if dsc else cat
-            expense_currency = get_expense_currency(acc_id)
+            expense_currency = acc_currency or "PHP"
             
             expenses_list.controls.append(
                 create_expense_item(
@@ -939,7 +810,7 @@ def create_home_view(page: ft.Page, state: dict, toast, show_dashboard, logout_c
                             ft.Text("Recent", size=18, weight=ft.FontWeight.BOLD, color=theme.text_primary),
                             ft.Container(
                                 content=ft.Text(
-                                    str(len(db.select_expenses_by_user(state["user_id"]))),
+                                    str(db.get_expense_count_by_user(state["user_id"])),
                                     size=11,
                                     color="white",
                                     weight=ft.FontWeight.W_600,
@@ -1142,34 +1013,13 @@ def build_home_content(page: ft.Page, state: dict, toast,
                 user_currency = user_default_currency  # Fallback to user's default
     
     # Load expenses
-    rows = db.select_expenses_by_user(state["user_id"])
-    
-    # Cache account names and currencies for efficiency
-    account_cache = {}
-    currency_cache = {}
-    
-    def get_account_name(acc_id):
-        if acc_id is None:
-            return None
-        if acc_id not in account_cache:
-            acc = db.get_account_by_id(acc_id, state["user_id"])
-            account_cache[acc_id] = acc[1] if acc else None
-        return account_cache[acc_id]
-    
-    def get_expense_currency(acc_id):
-        """Get currency from the expense's original account"""
-        if acc_id is None:
-            return "PHP"
-        if acc_id not in currency_cache:
-            acc = db.get_account_by_id(acc_id, state["user_id"])
-            currency_cache[acc_id] = acc[5] if acc else "PHP"
-        return currency_cache[acc_id]
-    
-    for r in rows[:5]:
-        eid, uid, amt, cat, dsc, dtt, acc_id = r[:7]
+    # Recent 5 expenses, joined with their account's name and currency
+    rows = db.select_expenses_with_accounts(state["user_id"], limit=5)
+    
+    for r in rows:
+        eid, uid, amt, cat, dsc, dtt, acc_id, acc_name, acc_currency = r[:9]
         display_name = dsc if dsc else cat
-        acc_name = get_account_name(acc_id)
-        expense_currency = get_expense_currency(acc_id)
+        expense_currency = acc_currency or "PHP"
         expenses_list.controls.append(
             create_expense_item(
                 brand_text=display_name,
@@ -6,22 +6,12 @@ from ui.components.nav_bar_buttom import create_page_with_nav
 from components.notification import NotificationCenter
 from datetime import datetime, timedelta
 from utils.statistics import (
-    get_expense_summary_by_period,
-    get_daily_expenses,
-    get_weekly_expenses,
-    get_monthly_expenses,
-    get_spending_trend,
-    get_top_spending_categories,
+    PERIOD_DELTAS,
+    compute_statistics,
     get_category_color,
-    get_statistics_summary,
-    get_average_daily_spending,
 )
 from utils.currency import format_currency, get_currency_from_user_profile
-
-
-def get_clearbit_logo(domain: str) -> str:
-    """Get brand logo URL from Clearbit API."""
-    return f"https://logo.clearbit.com/{domain}"
+from utils.category_resolver import resolve_category
 
 
 def create_user_avatar(user_id: int, radius: int = 22, theme=None):
@@ -72,121 +62,6 @@ def create_user_avatar(user_id: int, radius: int = 22, theme=None):
     )
 
 
-# Brand database for recognition - using Clearbit Logo API for clear, high-quality logos
-BRAND_DATABASE = {
-    # Shopping & E-commerce
-    "amazon": {"icon": "a", "color": "#FF9900", "bg": "#232F3E", "text": "white", "logo": get_clearbit_logo("amazon.com")},
-    "shopee": {"icon": "🛒", "color": "#EE4D2D", "bg": "#EE4D2D", "text": "white", "logo": get_clearbit_logo("shopee.com")},
-    "lazada": {"icon": "L", "color": "#0F146D", "bg": "#0F146D", "text": "white", "logo": get_clearbit_logo("lazada.com")},
-    "zalora": {"icon": "Z", "color": "#000000", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("zalora.com")},
-    "ebay": {"icon": "e", "color": "#E53238", "bg": "#FFFFFF", "text": "#E53238", "logo": get_clearbit_logo("ebay.com")},
-    
-    # Food & Restaurants
-    "mcdonalds": {"icon": "M", "color": "#FFC72C", "bg": "#DA291C", "text": "#FFC72C", "logo": get_clearbit_logo("mcdonalds.com")},
-    "mcdonald's": {"icon": "M", "color": "#FFC72C", "bg": "#DA291C", "text": "#FFC72C", "logo": get_clearbit_logo("mcdonalds.com")},
-    "starbucks": {"icon": "☕", "color": "#00704A", "bg": "#00704A", "text": "white", "logo": get_clearbit_logo("starbucks.com")},
-    "jollibee": {"icon": "🐝", "color": "#E31837", "bg": "#E31837", "text": "white", "logo": get_clearbit_logo("jollibee.com.ph")},
-    "kfc": {"icon": "🍗", "color": "#F40027", "bg": "#F40027", "text": "white", "logo": get_clearbit_logo("kfc.com")},
-    "burger king": {"icon": "🍔", "color": "#FF8732", "bg": "#502314", "text": "#FF8732", "logo": get_clearbit_logo("bk.com")},
-    "pizza hut": {"icon": "🍕", "color": "#E31837", "bg": "#E31837", "text": "white", "logo": get_clearbit_logo("pizzahut.com")},
-    "subway": {"icon": "🥪", "color": "#008C15", "bg": "#FFC600", "text": "#008C15", "logo": get_clearbit_logo("subway.com")},
-    "dunkin": {"icon": "🍩", "color": "#FF671F", "bg": "#FF671F", "text": "white", "logo": get_clearbit_logo("dunkindonuts.com")},
-    "chowking": {"icon": "🥡", "color": "#E31837", "bg": "#E31837", "text": "white", "logo": get_clearbit_logo("chowkingdelivery.com")},
-    "greenwich": {"icon": "🍕", "color": "#006B3F", "bg": "#006B3F", "text": "white", "logo": get_clearbit_logo("greenwichdelivery.com")},
-    "mang inasal": {"icon": "🍗", "color": "#FDB813", "bg": "#FDB813", "text": "#1E1E1E", "logo": get_clearbit_logo("manginasal.com")},
-    
-    # Tech & Electronics
-    "apple": {"icon": "", "color": "#555555", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("apple.com")},
-    "ipad": {"icon": "", "color": "#555555", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("apple.com")},
-    "iphone": {"icon": "", "color": "#555555", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("apple.com")},
-    "macbook": {"icon": "", "color": "#555555", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("apple.com")},
-    "samsung": {"icon": "S", "color": "#1428A0", "bg": "#1428A0", "text": "white", "logo": get_clearbit_logo("samsung.com")},
-    "google": {"icon": "G", "color": "#4285F4", "bg": "#FFFFFF", "text": "#4285F4", "logo": get_clearbit_logo("google.com")},
-    "microsoft": {"icon": "⊞", "color": "#00A4EF", "bg": "#737373", "text": "white", "logo": get_clearbit_logo("microsoft.com")},
-    "sony": {"icon": "S", "color": "#000000", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("sony.com")},
-    "xiaomi": {"icon": "Mi", "color": "#FF6900", "bg": "#FF6900", "text": "white", "logo": get_clearbit_logo("mi.com")},
-    "huawei": {"icon": "H", "color": "#FF0000", "bg": "#FF0000", "text": "white", "logo": get_clearbit_logo("huawei.com")},
-    
-    # Finance & Payment
-    "gcash": {"icon": "G", "color": "#007DFE", "bg": "#007DFE", "text": "white", "logo": get_clearbit_logo("gcash.com")},
-    "maya": {"icon": "M", "color": "#00D66C", "bg": "#00D66C", "text": "white", "logo": get_clearbit_logo("maya.ph")},
-    "bpi": {"icon": "B", "color": "#9E1B34", "bg": "#9E1B34", "text": "white", "logo": get_clearbit_logo("bpi.com.ph")},
-    "bdo": {"icon": "B", "color": "#003478", "bg": "#003478", "text": "white", "logo": get_clearbit_logo("bdo.com.ph")},
-    "paypal": {"icon": "P", "color": "#003087", "bg": "#003087", "text": "white", "logo": get_clearbit_logo("paypal.com")},
-    
-    # Streaming & Entertainment
-    "netflix": {"icon": "N", "color": "#E50914", "bg": "#000000", "text": "#E50914", "logo": get_clearbit_logo("netflix.com")},
-    "spotify": {"icon": "♪", "color": "#1DB954", "bg": "#191414", "text": "#1DB954", "logo": get_clearbit_logo("spotify.com")},
-    "youtube": {"icon": "▶", "color": "#FF0000", "bg": "#282828", "text": "#FF0000", "logo": get_clearbit_logo("youtube.com")},
-    "disney": {"icon": "D", "color": "#113CCF", "bg": "#040814", "text": "white", "logo": get_clearbit_logo("disneyplus.com")},
-    
-    # Transport
-    "grab": {"icon": "G", "color": "#00B14F", "bg": "#00B14F", "text": "white", "logo": get_clearbit_logo("grab.com")},
-    "uber": {"icon": "U", "color": "#000000", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("uber.com")},
-    "angkas": {"icon": "A", "color": "#F16521", "bg": "#F16521", "text": "white", "logo": get_clearbit_logo("angkas.com")},
-    "shell": {"icon": "🐚", "color": "#FBCE07", "bg": "#DD1D21", "text": "#FBCE07", "logo": get_clearbit_logo("shell.com")},
-    "petron": {"icon": "P", "color": "#1E4D8C", "bg": "#1E4D8C", "text": "white", "logo": get_clearbit_logo("petron.com")},
-    "caltex": {"icon": "★", "color": "#E31937", "bg": "#E31937", "text": "white", "logo": get_clearbit_logo("caltex.com")},
-    "foodpanda": {"icon": "🐼", "color": "#D70F64", "bg": "#D70F64", "text": "white", "logo": get_clearbit_logo("foodpanda.com")},
-    
-    # Utilities
-    "meralco": {"icon": "⚡", "color": "#FF6B00", "bg": "#FF6B00", "text": "white", "logo": get_clearbit_logo("meralco.com.ph")},
-    "pldt": {"icon": "P", "color": "#E31937", "bg": "#E31937", "text": "white", "logo": get_clearbit_logo("pldthome.com")},
-    "globe": {"icon": "G", "color": "#0056A3", "bg": "#0056A3", "text": "white", "logo": get_clearbit_logo("globe.com.ph")},
-    "smart": {"icon": "S", "color": "#00913A", "bg": "#00913A", "text": "white", "logo": get_clearbit_logo("smart.com.ph")},
-    "maynilad": {"icon": "M", "color": "#0072CE", "bg": "#0072CE", "text": "white", "logo": get_clearbit_logo("mayniladwater.com.ph")},
-    "converge": {"icon": "C", "color": "#FF6600", "bg": "#FF6600", "text": "white", "logo": get_clearbit_logo("convergeict.com")},
-    
-    # Retail & Supermarkets
-    "sm": {"icon": "SM", "color": "#003DA5", "bg": "#003DA5", "text": "white", "logo": get_clearbit_logo("smsupermalls.com")},
-    "robinsons": {"icon": "R", "color": "#00529B", "bg": "#00529B", "text": "white", "logo": get_clearbit_logo("robinsonsmalls.com")},
-    "uniqlo": {"icon": "U", "color": "#FF0000", "bg": "#FFFFFF", "text": "#FF0000", "logo": get_clearbit_logo("uniqlo.com")},
-    "h&m": {"icon": "H&M", "color": "#E50010", "bg": "#FFFFFF", "text": "#E50010", "logo": get_clearbit_logo("hm.com")},
-    "nike": {"icon": "✓", "color": "#111111", "bg": "#111111", "text": "white", "logo": get_clearbit_logo("nike.com")},
-    "adidas": {"icon": "⫿", "color": "#000000", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("adidas.com")},
-    "zara": {"icon": "Z", "color": "#000000", "bg": "#000000", "text": "white", "logo": get_clearbit_logo("zara.com")},
-}
-
-# Category fallback icons
-CATEGORY_ICONS = {
-    "food": {"icon": "🍔", "bg": "#EF4444"},
-    "transport": {"icon": "🚗", "bg": "#3B82F6"},
-    "shopping": {"icon": "🛍️", "bg": "#8B5CF6"},
-    "entertainment": {"icon": "🎬", "bg": "#EC4899"},
-    "bills": {"icon": "📄", "bg": "#F59E0B"},
-    "health": {"icon": "💊", "bg": "#10B981"},
-    "education": {"icon": "📚", "bg": "#6366F1"},
-    "salary": {"icon": "💰", "bg": "#10B981"},
-    "income": {"icon": "📈", "bg": "#10B981"},
-    "electronics": {"icon": "📱", "bg": "#6366F1"},
-    "groceries": {"icon": "🛒", "bg": "#10B981"},
-    "utilities": {"icon": "⚡", "bg": "#F59E0B"},
-    "rent": {"icon": "🏠", "bg": "#8B5CF6"},
-    "travel": {"icon": "✈️", "bg": "#3B82F6"},
-    "fitness": {"icon": "💪", "bg": "#EF4444"},
-    "subscription": {"icon": "📺", "bg": "#EC4899"},
-    "other": {"icon": "📦", "bg": "#6B7280"},
-}
-
-
-def _get_brand_info(text: str):
-    """Get brand info from text."""
-    text_lower = text.lower()
-    for brand, info in BRAND_DATABASE.items():
-        if brand in text_lower:
-            return info
-    return None
-
-
-def _get_category_fallback(category: str):
-    """Get category icon as fallback."""
-    cat_lower = category.lower()
-    for key, info in CATEGORY_ICONS.items():
-        if key in cat_lower:
-            return info
-    return {"icon": "📦", "bg": "#6B7280"}
-
-
 def create_statistics_view(page: ft.Page, state: dict, toast, go_back, 
                            show_expenses=None, show_profile=None, show_add_expense=None):
     """Create the Statistics page with spending graph and transactions."""
@@ -210,56 +85,23 @@ def create_statistics_view(page: ft.Page, state: dict, toast, go_back,
         if show_add_expense:
             show_add_expense()
     
-    def get_period_data(period: str, previous: bool = False):
-        """Get expense data for the selected time period.
+    def get_period_expenses(period: str, limit: int = 5):
+        """Get the newest expenses of the selected time period.
         
         Args:
             period: Time period string (\"1D\", \"1W\", \"1M\", \"3M\", \"1Y\")
-            previous: If True, get data for the previous period instead
+            limit: Number of rows to fetch
         """
-        expenses = db.select_expenses_by_user(state["user_id"])
-        today = datetime.now()
-        
-        if period == "1D":
-            delta = timedelta(days=1)
-        elif period == "1W":
-            delta = timedelta(weeks=1)
-        elif period == "1M":
-            delta = timedelta(days=30)
-        elif period == "3M":
-            delta = timedelta(days=90)
-        elif period == "1Y":
-            delta = timedelta(days=365)
-        else:
-            delta = timedelta(weeks=1)
-        
-        if previous:
-            # Get previous period
-            end_date = today - delta
-            start_date = end_date - delta
-        else:
-            # Get current period
-            start_date = today - delta
-            end_date = today
-        
-        filtered = []
-        for exp in expenses:
-            try:
-                exp_date = datetime.strptime(exp[5], "%Y-%m-%d")
-                if start_date <= exp_date <= end_date:
-                    filtered.append(exp)
-            except:
-                pass
-        
-        total = sum(exp[2] for exp in filtered)
-        return filtered, total
+        start = datetime.now() - PERIOD_DELTAS.get(period, timedelta(weeks=1))
+        # Rows carry the account name/currency, so the list below needs no lookups
+        return db.select_expenses_with_accounts(state["user_id"], limit=limit, since=start.strftime("%Y-%m-%d"))
     
-    def create_spending_graph(expenses, period, theme=None):
+    def create_spending_graph(period_daily, period, theme=None):
         """Create a line chart showing spending over time."""
         if theme is None:
             theme = get_theme()
         
-        if not expenses:
+        if not period_daily:
             # Empty state
             return ft.Container(
                 content=ft.Column(
@@ -274,24 +116,8 @@ def create_statistics_view(page: ft.Page, state: dict, toast, go_back,
                 alignment=ft.alignment.center,
             )
         
-        # Group expenses by day
-        daily_totals = {}
-        for exp in expenses:
-            try:
-                date_str = exp[5]
-                if date_str in daily_totals:
-                    daily_totals[date_str] += exp[2]
-                else:
-                    daily_totals[date_str] = exp[2]
-            except:
-                pass
-        
-        if not daily_totals:
-            return ft.Container(height=200)
-        
-        # Sort by date
-        sorted_dates = sorted(daily_totals.keys())
-        values = [daily_totals[d] for d in sorted_dates]
+        # Daily totals arrive sorted by date
+        values = [amount for _, amount in period_daily]
         max_val = max(values) if values else 1
         
         # Create data points for line chart
@@ -471,8 +297,10 @@ def create_statistics_view(page: ft.Page, state: dict, toast, go_back,
         user_profile = db.get_user_profile(state["user_id"])
         user_currency = get_currency_from_user_profile(user_profile)
         
-        # Get expense data for selected period
-        expenses, total_spent = get_period_data(selected_period["value"])
+        # Every bucket for the selected period comes from one statistics pass
+        stats = compute_statistics(state["user_id"], selected_period["value"])
+        total_spent = stats["total_spent"]
+        expenses = get_period_expenses(selected_period["value"])
         
         # Header
         header = ft.Container(
@@ -508,8 +336,8 @@ def create_statistics_view(page: ft.Page, state: dict, toast, go_back,
             alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
         )
         
-        # Get previous period data for comparison
-        prev_expenses, prev_total = get_period_data(selected_period["value"], previous=True)
+        # Previous period for comparison
+        prev_total = stats["previous_total"]
         change_amount = total_spent - prev_total
         change_percent = ((total_spent - prev_total) / prev_total * 100) if prev_total > 0 else 0
         is_increase = change_amount > 0
@@ -560,7 +388,7 @@ def create_statistics_view(page: ft.Page, state: dict, toast, go_back,
                     period_buttons,
                     ft.Container(height=10),
                     # Line graph
-                    create_spending_graph(expenses, selected_period["value"], theme),
+                    create_spending_graph(stats["period_daily"], selected_period["value"], theme),
                 ],
             ),
             padding=ft.padding.symmetric(horizontal=16, vertical=12),
@@ -570,7 +398,7 @@ def create_statistics_view(page: ft.Page, state: dict, toast, go_back,
         )
         
         # Category breakdown section
-        category_summary = get_expense_summary_by_period(state["user_id"], selected_period["value"])
+        category_summary = stats["categories"]
         total_spending = sum(cat[1] for cat in category_summary) if category_summary else 0
         
         def create_category_card(category, amount, total, theme):
@@ -646,8 +474,7 @@ def create_statistics_view(page: ft.Page, state: dict, toast, go_back,
         )
         
         # Spending insights cards
-        avg_daily = get_average_daily_spending(state["user_id"], 30)
-        stats_summary = get_statistics_summary(state["user_id"])
+        avg_daily = stats["average_daily"]
         
         def create_insight_card(icon, title, value, subtitle, color, theme):
             return ft.Container(
@@ -684,7 +511,7 @@ def create_statistics_view(page: ft.Page, state: dict, toast, go_back,
             create_insight_card(
                 ft.Icons.RECEIPT_LONG,
                 "Transactions",
-                str(stats_summary.get('total_transactions', 0)),
+                str(stats["transaction_count"]),
                 "This period",
                 "#10B981",
                 theme
@@ -714,24 +541,10 @@ def create_statistics_view(page: ft.Page, state: dict, toast, go_back,
         # Recent transactions list
         transactions_list = ft.Column(spacing=8)
         
-        # Cache account info (name and currency) for efficiency
-        account_cache = {}
-        def get_account_info(acc_id):
-            if acc_id is None:
-                return None, user_currency
-            if acc_id not in account_cache:
-                acc = db.get_account_by_id(acc_id, state["user_id"])
-                if acc:
-                    # acc structure: id, name, account_number, type, balance, currency, color, is_primary, created_at
-                    account_cache[acc_id] = {"name": acc[1], "currency": acc[5]}
-                else:
-                    account_cache[acc_id] = {"name": None, "currency": user_currency}
-            return account_cache[acc_id]["name"], account_cache[acc_id]["currency"]
-        
         for exp in expenses[:5]:  # Show last 5
-            # Unpack with account_id (position 6)
-            eid, uid, amount, category, description, date_str, acc_id = exp[:7]
-            acc_name, acc_currency = get_account_info(acc_id)
+            # Account name and currency come joined in (positions 7, 8)
+            eid, uid, amount, category, description, date_str, acc_id, acc_name, acc_currency = exp[:9]
+            acc_currency = acc_currency or user_currency
             transactions_list.controls.append(
                 _transaction_item(
                     category=category,
@@ -894,7 +707,7 @@ def build_statistics_content(page: ft.Page, state: dict, toast,
     )
     
     # Get comprehensive statistics
-    stats = get_statistics_summary(user_id, selected_period)
+    stats = compute_statistics(user_id, selected_period)
     trend = stats["trend"]
     top_categories = stats["top_categories"]
     
@@ -991,7 +804,7 @@ def build_statistics_content(page: ft.Page, state: dict, toast,
     )
     
     # Create Pie Chart with colors
-    expense_summary = get_expense_summary_by_period(user_id, selected_period)
+    expense_summary = stats["categories"]
     total = sum(row[1] for row in expense_summary) if expense_summary else 0
     
     pie_sections = []
@@ -1036,7 +849,7 @@ def build_statistics_content(page: ft.Page, state: dict, toast,
     )
     
     # Create Bar Chart for daily spending
-    daily_data = get_daily_expenses(user_id, 7)
+    daily_data = stats["daily"]
     bar_groups = []
     max_val = max([d[1] for d in daily_data]) if daily_data else 1
     
@@ -1245,21 +1058,7 @@ def build_statistics_content(page: ft.Page, state: dict, toast,
         highest_card = ft.Container()
     
     # Get all expenses for recent transactions
-    all_expenses = db.select_expenses_by_user(user_id)
-    
-    # Cache account info (name and currency)
-    account_cache = {}
-    def get_account_info(acc_id):
-        if acc_id is None:
-            return None, user_currency
-        if acc_id not in account_cache:
-            acc = db.get_account_by_id(acc_id, user_id)
-            if acc:
-                # acc structure: id, name, account_number, type, balance, currency, color, is_primary, created_at
-                account_cache[acc_id] = {"name": acc[1], "currency": acc[5]}
-            else:
-                account_cache[acc_id] = {"name": None, "currency": user_currency}
-        return account_cache[acc_id]["name"], account_cache[acc_id]["currency"]
+    all_expenses = db.select_expenses_with_accounts(user_id, limit=5)
     
     # Recent transactions with better styling
     # Initialize the transactions list first
@@ -1313,9 +1112,9 @@ def build_statistics_content(page: ft.Page, state: dict, toast,
         border=ft.border.all(1, theme.border_primary),
     )
     
-    for exp in all_expenses[:5]:
-        eid, uid, amount, category, description, date_str, acc_id = exp[:7]
-        acc_name, acc_currency = get_account_info(acc_id)
+    for exp in all_expenses:
+        eid, uid, amount, category, description, date_str, acc_id, acc_name, acc_currency = exp[:9]
+        acc_currency = acc_currency or user_currency
         transactions_section_content.controls.append(
             _transaction_item(
                 category=category,
@@ -1600,7 +1399,7 @@ def _create_insight_badges(stats, user_currency, theme):
         {
             "icon": "📊",
             "title": "Avg/Day",
-            "value": format_currency(get_average_daily_spending(stats.get("user_id", 1)), user_currency),
+            "value": format_currency(stats.get("average_daily", 0), user_currency),
             "color": "#3B82F6",
             "detail": "This is your average daily spending over the last 30 days."
         },
@@ -1708,7 +1507,7 @@ def _transaction_item(category: str, description: str, amount: float, date: str,
         theme = get_theme()
     
     # Get brand info first, then category fallback
-    brand_info = _get_brand_info(description)
+    brand_info = resolve_category(description)["brand"]
     
     if brand_info:
         # Check if we have a logo URL
@@ -1750,10 +1549,10 @@ def _transaction_item(category: str, description: str, amount: float, date: str,
             )
     else:
         # Use category fallback
-        cat_info = _get_category_fallback(category)
+        cat_info = resolve_category(category)
         icon_container = ft.Container(
             content=ft.Text(
-                cat_info["icon"],
+                cat_info["emoji"],
                 size=20,
                 text_align=ft.TextAlign.CENTER,
             ),
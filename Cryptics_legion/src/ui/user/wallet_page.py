@@ -219,7 +219,7 @@ def create_wallet_view(page: ft.Page, state: dict, toast, go_back,
                     content=ft.Column(
                         controls=[
                             ft.Icon(ft.Icons.RECEIPT, color="#6366F1", size=24),
-                            ft.Text(str(len(db.select_expenses_by_user(state["user_id"]))), 
+                            ft.Text(str(db.get_expense_count_by_user(state["user_id"])), 
                                    size=20, weight=ft.FontWeight.BOLD, color="white"),
                             ft.Text("Transactions", size=12, color="#9CA3AF"),
                         ],
@@ -0,0 +1,168 @@
+# src/utils/autocomplete.py
+"""
+Ranked autocomplete for the brand / category field.
+
+Brand names and each user's own frequent descriptions live in sorted
+prefix indexes, so a lookup is a binary search plus the matches instead of
+a scan over BRAND_DATABASE. Matches are ranked by how often the user has
+used them, then by how often the brand is used across all users, and come
+back with their resolved category info.
+"""
+
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict
+from heapq import nsmallest
+from itertools import islice
+
+from core import db
+from utils.brand_recognition import BRAND_DATABASE
+from utils.category_resolver import resolve_category
+
+# A user's own description is suggested back once used this many times
+MIN_PERSONAL_USES = 2
+AUTOCOMPLETE_MAX_USERS = 256
+
+_WORD_BREAKS = " -&'/."
+
+
+class PrefixIndex:
+    """
+    Sorted (key, name) pairs with one key per word start of each name, so
+    "eats" finds "uber eats" as well as names starting with it.
+    """
+
+    def __init__(self, names=()):
+        self._names = set()
+        pairs = set()
+        for name in names:
+            if name not in self._names:
+                self._names.add(name)
+                pairs.update(self._keys(name))
+        self._pairs = sorted(pairs)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    @staticmethod
+    def _keys(name):
+        starts = [0] + [i + 1 for i, ch in enumerate(name[:-1]) if ch in _WORD_BREAKS]
+        return [(name[i:], name) for i in starts]
+
+    def add(self, name):
+        if name in self._names:
+            return
+        self._names.add(name)
+        for pair in self._keys(name):
+            insort(self._pairs, pair)
+
+    def matching(self, prefix: str) -> set:
+        """Names with a word starting with prefix."""
+        found = set()
+        start = bisect_left(self._pairs, (prefix,))
+        for key, name in islice(self._pairs, start, None):
+            if not key.startswith(prefix):
+                break
+            found.add(name)
+        return found
+
+
+class _UserUsage:
+    def __init__(self, rows):
+        self.counts = Counter()
+        self.display = {}
+        for name, description, uses in rows:
+            self.counts[name] = uses
+            self.display[name] = description
+        self.index = PrefixIndex(name for name, uses in self.counts.items() if uses >= MIN_PERSONAL_USES)
+
+
+class Autocomplete:
+    """Brand index shared by everyone plus a bounded LRU of per-user usage."""
+
+    def __init__(self, max_users: int = AUTOCOMPLETE_MAX_USERS):
+        self.max_users = max_users
+        self._brands = PrefixIndex(BRAND_DATABASE)
+        self._popularity = None  # brand name -> uses across all users, loaded on first lookup
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load_popularity(self):
+        if self._popularity is None:
+            self._popularity = Counter({name: uses for name, _, uses in db.get_description_usage(names=BRAND_DATABASE)})
+        return self._popularity
+
+    def _load_user(self, user_id):
+        usage = self._users.get(user_id)
+        if usage is None:
+            usage = self._users[user_id] = _UserUsage(db.get_description_usage(user_id))
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return usage
+
+    def suggest(self, partial_input: str, user_id: int = None, limit: int = 5) -> list:
+        """
+        Top `limit` completions for partial_input (at least 2 characters).
+
+        Each is resolve_category()'s info plus 'name' (text to fill in),
+        'uses' (by this user) and 'popularity' (brand uses overall).
+        """
+        prefix = (partial_input or "").strip().lower()
+        if len(prefix) < 2:
+            return []
+
+        with self._lock:
+            popularity = self._load_popularity()
+            usage = self._load_user(user_id) if user_id is not None else None
+            candidates = self._brands.matching(prefix)
+            counts, display = {}, {}
+            if usage is not None:
+                candidates |= usage.index.matching(prefix)
+                counts, display = usage.counts, usage.display
+            ranked = nsmallest(limit, candidates, key=lambda name: (
+                -counts.get(name, 0), -popularity.get(name, 0), not name.startswith(prefix), name))
+            picked = [(name.title() if name in self._brands else display[name],
+                       counts.get(name, 0), popularity.get(name, 0)) for name in ranked]
+
+        return [dict(resolve_category(text), name=text, uses=uses, popularity=popular)
+                for text, uses, popular in picked]
+
+    def record_use(self, user_id: int, description: str):
+        """Count a newly saved description without reloading from the database."""
+        name = (description or "").strip().lower()
+        if not name:
+            return
+        with self._lock:
+            if self._popularity is not None and name in self._brands:
+                self._popularity[name] += 1
+            usage = self._users.get(user_id)
+            if usage is not None:
+                usage.counts[name] += 1
+                usage.display.setdefault(name, description.strip())
+                if usage.counts[name] >= MIN_PERSONAL_USES:
+                    usage.index.add(name)
+
+    def clear(self):
+        with self._lock:
+            self._popularity = None
+            self._users.clear()
+
+
+_autocomplete = Autocomplete()
+
+
+def get_autocomplete() -> Autocomplete:
+    return _autocomplete
+
+
+def suggest(partial_input: str, user_id: int = None, limit: int = 5) -> list:
+    return _autocomplete.suggest(partial_input, user_id=user_id, limit=limit)
+
+
+def record_description_use(user_id: int, description: str):
+    _autocomplete.record_use(user_id, description)
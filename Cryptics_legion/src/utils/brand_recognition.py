@@ -345,6 +345,114 @@ DEFAULT_CATEGORY_ICONS = {
 }
 
 
+class _KeywordAutomaton:
+    """
+    Aho-Corasick automaton over ranked patterns.
+
+    first_match(text) returns the lowest rank of any pattern occurring in
+    text in one pass over it. Each state carries the best rank reachable
+    through its failure links, so no output chains are walked at search time.
+    """
+
+    def __init__(self, patterns):
+        goto, fail, best = [{}], [0], [None]
+        for pattern, rank in patterns:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    best.append(None)
+                state = nxt
+            if best[state] is None or rank < best[state]:
+                best[state] = rank
+
+        # Breadth-first so a state's failure target is finished before it
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, child in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[child] = target if target != child else 0
+                inherited = best[fail[child]]
+                if inherited is not None and (best[child] is None or inherited < best[child]):
+                    best[child] = inherited
+                queue.append(child)
+
+        self._goto, self._fail, self._best = goto, fail, best
+
+    def first_match(self, text: str):
+        goto, fail, best = self._goto, self._fail, self._best
+        state, found = 0, best[0]
+        for ch in text:
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            rank = best[state]
+            if rank is not None and (found is None or rank < found):
+                found = rank
+                if found == 0:
+                    break
+        return found
+
+
+class _SubstringTrie:
+    """
+    Prefix trie over every suffix of the ranked patterns.
+
+    containing(text) returns the lowest rank of a pattern that contains
+    text, walking at most len(text) nodes. Each node keeps that rank under
+    the None key (characters are always str).
+    """
+
+    def __init__(self, patterns):
+        self._root = {None: None}
+        for pattern, rank in patterns:
+            if self._root[None] is None or rank < self._root[None]:
+                self._root[None] = rank
+            for start in range(len(pattern)):
+                node = self._root
+                for ch in pattern[start:]:
+                    node = node.setdefault(ch, {None: rank})
+                    if rank < node[None]:
+                        node[None] = rank
+
+    def containing(self, text: str):
+        node = self._root
+        for ch in text:
+            node = node.get(ch)
+            if node is None:
+                return None
+        return node[None]
+
+
+# Compiled once at import; ranks are dict positions, so the lowest rank is
+# the entry the original first-match-in-order scans would have returned
+_BRAND_NAMES = list(BRAND_DATABASE)
+_BRANDS_IN_TEXT = _KeywordAutomaton((name, rank) for rank, name in enumerate(_BRAND_NAMES))
+_TEXT_IN_BRANDS = _SubstringTrie((name, rank) for rank, name in enumerate(_BRAND_NAMES))
+_KEYWORD_CATEGORIES = list(CATEGORY_KEYWORDS)
+_KEYWORDS_IN_TEXT = _KeywordAutomaton(
+    (keyword, rank)
+    for rank, category in enumerate(_KEYWORD_CATEGORIES)
+    for keyword in CATEGORY_KEYWORDS[category]
+)
+
+
+def _match_brand(input_lower: str):
+    """The first brand (in BRAND_DATABASE order) contained in or containing the input."""
+    ranks = [r for r in (_BRANDS_IN_TEXT.first_match(input_lower), _TEXT_IN_BRANDS.containing(input_lower))
+             if r is not None]
+    return _BRAND_NAMES[min(ranks)] if ranks else None
+
+
 def identify_brand(input_text: str) -> dict:
     """
     AI-like brand recognition function.
@@ -380,31 +488,32 @@ def identify_brand(input_text: str) -> dict:
             "is_brand": True
         }
     
-    # 2. Partial brand match (brand name contained in input)
-    for brand_name, brand_info in BRAND_DATABASE.items():
-        if brand_name in input_lower or input_lower in brand_name:
-            return {
-                "original": input_text,
-                "display_name": input_text.title(),
-                "category": brand_info["category"],
-                "icon": brand_info["icon"],
-                "color": brand_info["color"],
-                "is_brand": True
-            }
+    # 2. Partial brand match (brand name contained in input, or input in brand name)
+    brand_name = _match_brand(input_lower)
+    if brand_name is not None:
+        brand_info = BRAND_DATABASE[brand_name]
+        return {
+            "original": input_text,
+            "display_name": input_text.title(),
+            "category": brand_info["category"],
+            "icon": brand_info["icon"],
+            "color": brand_info["color"],
+            "is_brand": True
+        }
     
     # 3. Category keyword matching
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in input_lower:
-                cat_info = DEFAULT_CATEGORY_ICONS.get(category, DEFAULT_CATEGORY_ICONS["Other"])
-                return {
-                    "original": input_text,
-                    "display_name": input_text.title(),
-                    "category": category,
-                    "icon": cat_info["icon"],
-                    "color": cat_info["color"],
-                    "is_brand": False
-                }
+    rank = _KEYWORDS_IN_TEXT.first_match(input_lower)
+    if rank is not None:
+        category = _KEYWORD_CATEGORIES[rank]
+        cat_info = DEFAULT_CATEGORY_ICONS.get(category, DEFAULT_CATEGORY_ICONS["Other"])
+        return {
+            "original": input_text,
+            "display_name": input_text.title(),
+            "category": category,
+            "icon": cat_info["icon"],
+            "color": cat_info["color"],
+            "is_brand": False
+        }
     
     # 4. Default - unknown category
     return {
@@ -435,27 +544,18 @@ def get_icon_for_category(category: str) -> dict:
     }
 
 
-def get_brand_suggestions(partial_input: str, limit: int = 5) -> list:
+def get_brand_suggestions(partial_input: str, limit: int = 5, user_id: int = None) -> list:
     """
     Get brand suggestions based on partial input (for autocomplete).
     
     Args:
         partial_input: The partial text input
         limit: Maximum number of suggestions
+        user_id: Rank the user's own frequent entries first and include them
     
     Returns:
-        List of matching brand names
+        List of matching names, best first (see utils.autocomplete.suggest
+        for the same list with category info)
     """
-    if not partial_input or len(partial_input) < 2:
-        return []
-    
-    input_lower = partial_input.lower().strip()
-    suggestions = []
-    
-    for brand_name in BRAND_DATABASE.keys():
-        if brand_name.startswith(input_lower) or input_lower in brand_name:
-            suggestions.append(brand_name.title())
-            if len(suggestions) >= limit:
-                break
-    
-    return suggestions
+    from utils.autocomplete import suggest
+    return [s["name"] for s in suggest(partial_input, user_id=user_id, limit=limit)]
@@ -0,0 +1,751 @@
+# src/utils/category_resolver.py
+"""
+Shared category/brand appearance lookup for the expense views.
+
+resolve_category() answers everything a view needs to draw an expense or
+category (icon, colors, emoji, brand logo, display name) from one cached
+lookup, so lists and charts stop repeating the same brand and keyword
+scans for every row on every render.
+"""
+
+from functools import lru_cache
+
+from utils.brand_recognition import _KeywordAutomaton, identify_brand
+
+CATEGORY_RESOLVER_MAX_ENTRIES = 2048
+
+
+def get_clearbit_logo(domain: str) -> str:
+    """Get brand logo URL from Clearbit API."""
+    return f"https://logo.clearbit.com/{domain}"
+
+
+# Brand database for recognition - using Clearbit Logo API for clear, high-quality logos
+BRAND_LOGOS = {
+    # Shopping & E-commerce
+    "amazon": {
+        "icon": "a", "color": "#FF9900", "bg": "#232F3E", "text": "white",
+        "logo": get_clearbit_logo("amazon.com")
+    },
+    "shopee": {
+        "icon": "🛒", "color": "#EE4D2D", "bg": "#EE4D2D", "text": "white",
+        "logo": get_clearbit_logo("shopee.com")
+    },
+    "lazada": {
+        "icon": "L", "color": "#0F146D", "bg": "#0F146D", "text": "white",
+        "logo": get_clearbit_logo("lazada.com")
+    },
+    "zalora": {
+        "icon": "Z", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("zalora.com")
+    },
+    "ebay": {
+        "icon": "e", "color": "#E53238", "bg": "#FFFFFF", "text": "#E53238",
+        "logo": get_clearbit_logo("ebay.com")
+    },
+    "alibaba": {
+        "icon": "A", "color": "#FF6A00", "bg": "#FF6A00", "text": "white",
+        "logo": get_clearbit_logo("alibaba.com")
+    },
+    "temu": {
+        "icon": "T", "color": "#F97316", "bg": "#F97316", "text": "white",
+        "logo": get_clearbit_logo("temu.com")
+    },
+    "shein": {
+        "icon": "S", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("shein.com")
+    },
+    
+    # Food & Restaurants
+    "mcdonalds": {
+        "icon": "M", "color": "#FFC72C", "bg": "#DA291C", "text": "#FFC72C",
+        "logo": get_clearbit_logo("mcdonalds.com")
+    },
+    "mcdonald's": {
+        "icon": "M", "color": "#FFC72C", "bg": "#DA291C", "text": "#FFC72C",
+        "logo": get_clearbit_logo("mcdonalds.com")
+    },
+    "starbucks": {
+        "icon": "☕", "color": "#00704A", "bg": "#00704A", "text": "white",
+        "logo": get_clearbit_logo("starbucks.com")
+    },
+    "jollibee": {
+        "icon": "🐝", "color": "#E31837", "bg": "#E31837", "text": "white",
+        "logo": get_clearbit_logo("jollibee.com.ph")
+    },
+    "kfc": {
+        "icon": "🍗", "color": "#F40027", "bg": "#F40027", "text": "white",
+        "logo": get_clearbit_logo("kfc.com")
+    },
+    "burger king": {
+        "icon": "🍔", "color": "#FF8732", "bg": "#502314", "text": "#FF8732",
+        "logo": get_clearbit_logo("bk.com")
+    },
+    "pizza hut": {
+        "icon": "🍕", "color": "#E31837", "bg": "#E31837", "text": "white",
+        "logo": get_clearbit_logo("pizzahut.com")
+    },
+    "dominos": {
+        "icon": "🍕", "color": "#006491", "bg": "#006491", "text": "white",
+        "logo": get_clearbit_logo("dominos.com")
+    },
+    "domino's": {
+        "icon": "🍕", "color": "#006491", "bg": "#006491", "text": "white",
+        "logo": get_clearbit_logo("dominos.com")
+    },
+    "subway": {
+        "icon": "🥪", "color": "#008C15", "bg": "#FFC600", "text": "#008C15",
+        "logo": get_clearbit_logo("subway.com")
+    },
+    "dunkin": {
+        "icon": "🍩", "color": "#FF671F", "bg": "#FF671F", "text": "white",
+        "logo": get_clearbit_logo("dunkindonuts.com")
+    },
+    "chowking": {
+        "icon": "🥡", "color": "#E31837", "bg": "#E31837", "text": "white",
+        "logo": get_clearbit_logo("chowkingdelivery.com")
+    },
+    "greenwich": {
+        "icon": "🍕", "color": "#006B3F", "bg": "#006B3F", "text": "white",
+        "logo": get_clearbit_logo("greenwichdelivery.com")
+    },
+    "mang inasal": {
+        "icon": "🍗", "color": "#FDB813", "bg": "#FDB813", "text": "#1E1E1E",
+        "logo": get_clearbit_logo("manginasal.com")
+    },
+    "yellow cab": {
+        "icon": "🍕", "color": "#FFD100", "bg": "#000000", "text": "#FFD100",
+        "logo": get_clearbit_logo("yellowcabpizza.com")
+    },
+    "shakeys": {
+        "icon": "🍕", "color": "#E31937", "bg": "#E31937", "text": "white",
+        "logo": get_clearbit_logo("shakeyspizza.ph")
+    },
+    "shakey's": {
+        "icon": "🍕", "color": "#E31937", "bg": "#E31937", "text": "white",
+        "logo": get_clearbit_logo("shakeyspizza.ph")
+    },
+    "wendy's": {
+        "icon": "W", "color": "#E2164B", "bg": "#E2164B", "text": "white",
+        "logo": get_clearbit_logo("wendys.com")
+    },
+    "wendys": {
+        "icon": "W", "color": "#E2164B", "bg": "#E2164B", "text": "white",
+        "logo": get_clearbit_logo("wendys.com")
+    },
+    "taco bell": {
+        "icon": "🌮", "color": "#702082", "bg": "#702082", "text": "white",
+        "logo": get_clearbit_logo("tacobell.com")
+    },
+    "chipotle": {
+        "icon": "🌯", "color": "#441500", "bg": "#441500", "text": "white",
+        "logo": get_clearbit_logo("chipotle.com")
+    },
+    "popeyes": {
+        "icon": "🍗", "color": "#FF6700", "bg": "#FF6700", "text": "white",
+        "logo": get_clearbit_logo("popeyes.com")
+    },
+    "krispy kreme": {
+        "icon": "🍩", "color": "#00873C", "bg": "#00873C", "text": "white",
+        "logo": get_clearbit_logo("krispykreme.com")
+    },
+    "tim hortons": {
+        "icon": "☕", "color": "#C8102E", "bg": "#C8102E", "text": "white",
+        "logo": get_clearbit_logo("timhortons.com")
+    },
+    "papa johns": {
+        "icon": "🍕", "color": "#008145", "bg": "#008145", "text": "white",
+        "logo": get_clearbit_logo("papajohns.com")
+    },
+    
+    # Tech & Electronics
+    "apple": {
+        "icon": "", "color": "#555555", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("apple.com")
+    },
+    "ipad": {
+        "icon": "", "color": "#555555", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("apple.com")
+    },
+    "iphone": {
+        "icon": "", "color": "#555555", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("apple.com")
+    },
+    "macbook": {
+        "icon": "", "color": "#555555", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("apple.com")
+    },
+    "airpods": {
+        "icon": "🎧", "color": "#555555", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("apple.com")
+    },
+    "samsung": {
+        "icon": "S", "color": "#1428A0", "bg": "#1428A0", "text": "white",
+        "logo": get_clearbit_logo("samsung.com")
+    },
+    "galaxy": {
+        "icon": "S", "color": "#1428A0", "bg": "#1428A0", "text": "white",
+        "logo": get_clearbit_logo("samsung.com")
+    },
+    "google": {
+        "icon": "G", "color": "#4285F4", "bg": "#FFFFFF", "text": "#4285F4",
+        "logo": get_clearbit_logo("google.com")
+    },
+    "pixel": {
+        "icon": "G", "color": "#4285F4", "bg": "#FFFFFF", "text": "#4285F4",
+        "logo": get_clearbit_logo("google.com")
+    },
+    "microsoft": {
+        "icon": "⊞", "color": "#00A4EF", "bg": "#737373", "text": "white",
+        "logo": get_clearbit_logo("microsoft.com")
+    },
+    "xbox": {
+        "icon": "X", "color": "#107C10", "bg": "#107C10", "text": "white",
+        "logo": get_clearbit_logo("xbox.com")
+    },
+    "sony": {
+        "icon": "S", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("sony.com")
+    },
+    "playstation": {
+        "icon": "P", "color": "#003791", "bg": "#003791", "text": "white",
+        "logo": get_clearbit_logo("playstation.com")
+    },
+    "ps5": {
+        "icon": "P", "color": "#003791", "bg": "#003791", "text": "white",
+        "logo": get_clearbit_logo("playstation.com")
+    },
+    "nintendo": {
+        "icon": "N", "color": "#E60012", "bg": "#E60012", "text": "white",
+        "logo": get_clearbit_logo("nintendo.com")
+    },
+    "dell": {
+        "icon": "D", "color": "#007DB8", "bg": "#007DB8", "text": "white",
+        "logo": get_clearbit_logo("dell.com")
+    },
+    "hp": {
+        "icon": "hp", "color": "#0096D6", "bg": "#0096D6", "text": "white",
+        "logo": get_clearbit_logo("hp.com")
+    },
+    "lenovo": {
+        "icon": "L", "color": "#E2231A", "bg": "#E2231A", "text": "white",
+        "logo": get_clearbit_logo("lenovo.com")
+    },
+    "asus": {
+        "icon": "A", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("asus.com")
+    },
+    "acer": {
+        "icon": "A", "color": "#83B81A", "bg": "#83B81A", "text": "white",
+        "logo": get_clearbit_logo("acer.com")
+    },
+    "huawei": {
+        "icon": "H", "color": "#FF0000", "bg": "#FF0000", "text": "white",
+        "logo": get_clearbit_logo("huawei.com")
+    },
+    "xiaomi": {
+        "icon": "Mi", "color": "#FF6900", "bg": "#FF6900", "text": "white",
+        "logo": get_clearbit_logo("mi.com")
+    },
+    "oppo": {
+        "icon": "O", "color": "#1BA784", "bg": "#1BA784", "text": "white",
+        "logo": get_clearbit_logo("oppo.com")
+    },
+    "vivo": {
+        "icon": "V", "color": "#415FFF", "bg": "#415FFF", "text": "white",
+        "logo": get_clearbit_logo("vivo.com")
+    },
+    "realme": {
+        "icon": "R", "color": "#F5C700", "bg": "#F5C700", "text": "#1E1E1E",
+        "logo": get_clearbit_logo("realme.com")
+    },
+    "jbl": {
+        "icon": "JBL", "color": "#FF6600", "bg": "#FF6600", "text": "white",
+        "logo": get_clearbit_logo("jbl.com")
+    },
+    "bose": {
+        "icon": "B", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("bose.com")
+    },
+    "beats": {
+        "icon": "b", "color": "#E31937", "bg": "#E31937", "text": "white",
+        "logo": get_clearbit_logo("beatsbydre.com")
+    },
+    "logitech": {
+        "icon": "L", "color": "#00B8FC", "bg": "#00B8FC", "text": "white",
+        "logo": get_clearbit_logo("logitech.com")
+    },
+    "razer": {
+        "icon": "R", "color": "#44D62C", "bg": "#000000", "text": "#44D62C",
+        "logo": get_clearbit_logo("razer.com")
+    },
+    "gopro": {
+        "icon": "G", "color": "#00A0D6", "bg": "#00A0D6", "text": "white",
+        "logo": get_clearbit_logo("gopro.com")
+    },
+    "canon": {
+        "icon": "C", "color": "#BC0024", "bg": "#BC0024", "text": "white",
+        "logo": get_clearbit_logo("canon.com")
+    },
+    "nikon": {
+        "icon": "N", "color": "#F6CE13", "bg": "#F6CE13", "text": "#1E1E1E",
+        "logo": get_clearbit_logo("nikon.com")
+    },
+    "fujifilm": {
+        "icon": "F", "color": "#ED1A3A", "bg": "#ED1A3A", "text": "white",
+        "logo": get_clearbit_logo("fujifilm.com")
+    },
+    
+    # Finance & Payment
+    "mastercard": {
+        "icon": "●●", "color": "#EB001B", "bg": "#FF5F00", "text": "white",
+        "logo": get_clearbit_logo("mastercard.com")
+    },
+    "visa": {
+        "icon": "V", "color": "#1A1F71", "bg": "#1A1F71", "text": "white",
+        "logo": get_clearbit_logo("visa.com")
+    },
+    "paypal": {
+        "icon": "P", "color": "#003087", "bg": "#003087", "text": "white",
+        "logo": get_clearbit_logo("paypal.com")
+    },
+    "gcash": {
+        "icon": "G", "color": "#007DFE", "bg": "#007DFE", "text": "white",
+        "logo": get_clearbit_logo("gcash.com")
+    },
+    "maya": {
+        "icon": "M", "color": "#00D66C", "bg": "#00D66C", "text": "white",
+        "logo": get_clearbit_logo("maya.ph")
+    },
+    "paymaya": {
+        "icon": "M", "color": "#00D66C", "bg": "#00D66C", "text": "white",
+        "logo": get_clearbit_logo("maya.ph")
+    },
+    "bpi": {
+        "icon": "B", "color": "#9E1B34", "bg": "#9E1B34", "text": "white",
+        "logo": get_clearbit_logo("bpi.com.ph")
+    },
+    "bdo": {
+        "icon": "B", "color": "#003478", "bg": "#003478", "text": "white",
+        "logo": get_clearbit_logo("bdo.com.ph")
+    },
+    "metrobank": {
+        "icon": "M", "color": "#003DA5", "bg": "#003DA5", "text": "white",
+        "logo": get_clearbit_logo("metrobank.com.ph")
+    },
+    "landbank": {
+        "icon": "L", "color": "#006400", "bg": "#006400", "text": "white",
+        "logo": get_clearbit_logo("landbank.com")
+    },
+    "unionbank": {
+        "icon": "U", "color": "#FF6600", "bg": "#FF6600", "text": "white",
+        "logo": get_clearbit_logo("unionbankph.com")
+    },
+    
+    # Streaming & Entertainment
+    "netflix": {
+        "icon": "N", "color": "#E50914", "bg": "#000000", "text": "#E50914",
+        "logo": get_clearbit_logo("netflix.com")
+    },
+    "spotify": {
+        "icon": "♪", "color": "#1DB954", "bg": "#191414", "text": "#1DB954",
+        "logo": get_clearbit_logo("spotify.com")
+    },
+    "youtube": {
+        "icon": "▶", "color": "#FF0000", "bg": "#282828", "text": "#FF0000",
+        "logo": get_clearbit_logo("youtube.com")
+    },
+    "youtube premium": {
+        "icon": "▶", "color": "#FF0000", "bg": "#282828", "text": "#FF0000",
+        "logo": get_clearbit_logo("youtube.com")
+    },
+    "disney": {
+        "icon": "D", "color": "#113CCF", "bg": "#040814", "text": "white",
+        "logo": get_clearbit_logo("disneyplus.com")
+    },
+    "disney+": {
+        "icon": "D", "color": "#113CCF", "bg": "#040814", "text": "white",
+        "logo": get_clearbit_logo("disneyplus.com")
+    },
+    "hbo": {
+        "icon": "H", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("hbomax.com")
+    },
+    "hulu": {
+        "icon": "H", "color": "#1CE783", "bg": "#1CE783", "text": "#1E1E1E",
+        "logo": get_clearbit_logo("hulu.com")
+    },
+    "amazon prime": {
+        "icon": "P", "color": "#00A8E1", "bg": "#232F3E", "text": "white",
+        "logo": get_clearbit_logo("primevideo.com")
+    },
+    "prime video": {
+        "icon": "P", "color": "#00A8E1", "bg": "#232F3E", "text": "white",
+        "logo": get_clearbit_logo("primevideo.com")
+    },
+    "twitch": {
+        "icon": "T", "color": "#9146FF", "bg": "#9146FF", "text": "white",
+        "logo": get_clearbit_logo("twitch.tv")
+    },
+    "steam": {
+        "icon": "S", "color": "#1B2838", "bg": "#1B2838", "text": "white",
+        "logo": get_clearbit_logo("steampowered.com")
+    },
+    "epic games": {
+        "icon": "E", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("epicgames.com")
+    },
+    
+    # Transport
+    "grab": {
+        "icon": "G", "color": "#00B14F", "bg": "#00B14F", "text": "white",
+        "logo": get_clearbit_logo("grab.com")
+    },
+    "grabfood": {
+        "icon": "G", "color": "#00B14F", "bg": "#00B14F", "text": "white",
+        "logo": get_clearbit_logo("grab.com")
+    },
+    "uber": {
+        "icon": "U", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("uber.com")
+    },
+    "angkas": {
+        "icon": "A", "color": "#F16521", "bg": "#F16521", "text": "white",
+        "logo": get_clearbit_logo("angkas.com")
+    },
+    "foodpanda": {
+        "icon": "🐼", "color": "#D70F64", "bg": "#D70F64", "text": "white",
+        "logo": get_clearbit_logo("foodpanda.com")
+    },
+    "lalamove": {
+        "icon": "L", "color": "#F26722", "bg": "#F26722", "text": "white",
+        "logo": get_clearbit_logo("lalamove.com")
+    },
+    "shell": {
+        "icon": "🐚", "color": "#FBCE07", "bg": "#DD1D21", "text": "#FBCE07",
+        "logo": get_clearbit_logo("shell.com")
+    },
+    "petron": {
+        "icon": "P", "color": "#1E4D8C", "bg": "#1E4D8C", "text": "white",
+        "logo": get_clearbit_logo("petron.com")
+    },
+    "caltex": {
+        "icon": "★", "color": "#E31937", "bg": "#E31937", "text": "white",
+        "logo": get_clearbit_logo("caltex.com")
+    },
+    "phoenix": {
+        "icon": "P", "color": "#FF6600", "bg": "#FF6600", "text": "white",
+        "logo": get_clearbit_logo("phoenixfuels.ph")
+    },
+    
+    # Utilities
+    "meralco": {
+        "icon": "⚡", "color": "#FF6B00", "bg": "#FF6B00", "text": "white",
+        "logo": get_clearbit_logo("meralco.com.ph")
+    },
+    "pldt": {
+        "icon": "P", "color": "#E31937", "bg": "#E31937", "text": "white",
+        "logo": get_clearbit_logo("pldthome.com")
+    },
+    "globe": {
+        "icon": "G", "color": "#0056A3", "bg": "#0056A3", "text": "white",
+        "logo": get_clearbit_logo("globe.com.ph")
+    },
+    "smart": {
+        "icon": "S", "color": "#00913A", "bg": "#00913A", "text": "white",
+        "logo": get_clearbit_logo("smart.com.ph")
+    },
+    "maynilad": {
+        "icon": "M", "color": "#0072CE", "bg": "#0072CE", "text": "white",
+        "logo": get_clearbit_logo("mayniladwater.com.ph")
+    },
+    "manila water": {
+        "icon": "M", "color": "#003DA5", "bg": "#003DA5", "text": "white",
+        "logo": get_clearbit_logo("manilawater.com")
+    },
+    "converge": {
+        "icon": "C", "color": "#FF6600", "bg": "#FF6600", "text": "white",
+        "logo": get_clearbit_logo("convergeict.com")
+    },
+    
+    # Retail & Supermarkets
+    "sm": {
+        "icon": "SM", "color": "#003DA5", "bg": "#003DA5", "text": "white",
+        "logo": get_clearbit_logo("smsupermalls.com")
+    },
+    "sm supermarket": {
+        "icon": "SM", "color": "#003DA5", "bg": "#003DA5", "text": "white",
+        "logo": get_clearbit_logo("smsupermarket.com")
+    },
+    "robinsons": {
+        "icon": "R", "color": "#00529B", "bg": "#00529B", "text": "white",
+        "logo": get_clearbit_logo("robinsonsmalls.com")
+    },
+    "puregold": {
+        "icon": "P", "color": "#FFD700", "bg": "#FFD700", "text": "#1E1E1E",
+        "logo": get_clearbit_logo("puregold.com.ph")
+    },
+    "savemore": {
+        "icon": "S", "color": "#00529B", "bg": "#00529B", "text": "white",
+        "logo": get_clearbit_logo("savemore.com.ph")
+    },
+    "mercury drug": {
+        "icon": "M", "color": "#E31937", "bg": "#E31937", "text": "white",
+        "logo": get_clearbit_logo("mercurydrug.com")
+    },
+    "watsons": {
+        "icon": "W", "color": "#00A651", "bg": "#00A651", "text": "white",
+        "logo": get_clearbit_logo("watsons.com.ph")
+    },
+    "7-eleven": {
+        "icon": "7", "color": "#00703C", "bg": "#00703C", "text": "white",
+        "logo": get_clearbit_logo("7-eleven.com")
+    },
+    "7eleven": {
+        "icon": "7", "color": "#00703C", "bg": "#00703C", "text": "white",
+        "logo": get_clearbit_logo("7-eleven.com")
+    },
+    "ministop": {
+        "icon": "M", "color": "#003DA5", "bg": "#003DA5", "text": "white",
+        "logo": get_clearbit_logo("ministop.com.ph")
+    },
+    "family mart": {
+        "icon": "F", "color": "#00703C", "bg": "#00703C", "text": "white",
+        "logo": get_clearbit_logo("family.co.jp")
+    },
+    
+    # Fashion & Apparel
+    "uniqlo": {
+        "icon": "U", "color": "#FF0000", "bg": "#FFFFFF", "text": "#FF0000",
+        "logo": get_clearbit_logo("uniqlo.com")
+    },
+    "h&m": {
+        "icon": "H&M", "color": "#E50010", "bg": "#FFFFFF", "text": "#E50010",
+        "logo": get_clearbit_logo("hm.com")
+    },
+    "zara": {
+        "icon": "Z", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("zara.com")
+    },
+    "nike": {
+        "icon": "✓", "color": "#111111", "bg": "#111111", "text": "white",
+        "logo": get_clearbit_logo("nike.com")
+    },
+    "adidas": {
+        "icon": "⫿", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("adidas.com")
+    },
+    "puma": {
+        "icon": "P", "color": "#E31937", "bg": "#E31937", "text": "white",
+        "logo": get_clearbit_logo("puma.com")
+    },
+    "new balance": {
+        "icon": "NB", "color": "#CF0A2C", "bg": "#CF0A2C", "text": "white",
+        "logo": get_clearbit_logo("newbalance.com")
+    },
+    "converse": {
+        "icon": "★", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("converse.com")
+    },
+    "vans": {
+        "icon": "V", "color": "#C41230", "bg": "#C41230", "text": "white",
+        "logo": get_clearbit_logo("vans.com")
+    },
+    "skechers": {
+        "icon": "S", "color": "#0033A0", "bg": "#0033A0", "text": "white",
+        "logo": get_clearbit_logo("skechers.com")
+    },
+    "under armour": {
+        "icon": "UA", "color": "#1D1D1D", "bg": "#1D1D1D", "text": "white",
+        "logo": get_clearbit_logo("underarmour.com")
+    },
+    "gap": {
+        "icon": "GAP", "color": "#1E3A5F", "bg": "#1E3A5F", "text": "white",
+        "logo": get_clearbit_logo("gap.com")
+    },
+    "levis": {
+        "icon": "L", "color": "#C41230", "bg": "#C41230", "text": "white",
+        "logo": get_clearbit_logo("levi.com")
+    },
+    "levi's": {
+        "icon": "L", "color": "#C41230", "bg": "#C41230", "text": "white",
+        "logo": get_clearbit_logo("levi.com")
+    },
+    "gucci": {
+        "icon": "G", "color": "#1B4D3E", "bg": "#1B4D3E", "text": "white",
+        "logo": get_clearbit_logo("gucci.com")
+    },
+    "louis vuitton": {
+        "icon": "LV", "color": "#8B6914", "bg": "#8B6914", "text": "white",
+        "logo": get_clearbit_logo("louisvuitton.com")
+    },
+    "lv": {
+        "icon": "LV", "color": "#8B6914", "bg": "#8B6914", "text": "white",
+        "logo": get_clearbit_logo("louisvuitton.com")
+    },
+    "chanel": {
+        "icon": "C", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("chanel.com")
+    },
+    "prada": {
+        "icon": "P", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("prada.com")
+    },
+    "crocs": {
+        "icon": "C", "color": "#00A651", "bg": "#00A651", "text": "white",
+        "logo": get_clearbit_logo("crocs.com")
+    },
+    
+    # Coffee & Cafes
+    "coffee bean": {
+        "icon": "☕", "color": "#6B3A1E", "bg": "#6B3A1E", "text": "white",
+        "logo": get_clearbit_logo("coffeebean.com")
+    },
+    "bo's coffee": {
+        "icon": "☕", "color": "#003DA5", "bg": "#003DA5", "text": "white",
+        "logo": get_clearbit_logo("bfranchising.com")
+    },
+    
+    # Software & Services
+    "adobe": {
+        "icon": "A", "color": "#FF0000", "bg": "#FF0000", "text": "white",
+        "logo": get_clearbit_logo("adobe.com")
+    },
+    "dropbox": {
+        "icon": "D", "color": "#0061FF", "bg": "#0061FF", "text": "white",
+        "logo": get_clearbit_logo("dropbox.com")
+    },
+    "slack": {
+        "icon": "S", "color": "#4A154B", "bg": "#4A154B", "text": "white",
+        "logo": get_clearbit_logo("slack.com")
+    },
+    "zoom": {
+        "icon": "Z", "color": "#2D8CFF", "bg": "#2D8CFF", "text": "white",
+        "logo": get_clearbit_logo("zoom.us")
+    },
+    "notion": {
+        "icon": "N", "color": "#000000", "bg": "#000000", "text": "white",
+        "logo": get_clearbit_logo("notion.so")
+    },
+    "canva": {
+        "icon": "C", "color": "#00C4CC", "bg": "#00C4CC", "text": "white",
+        "logo": get_clearbit_logo("canva.com")
+    },
+    "github": {
+        "icon": "G", "color": "#181717", "bg": "#181717", "text": "white",
+        "logo": get_clearbit_logo("github.com")
+    },
+    "figma": {
+        "icon": "F", "color": "#F24E1E", "bg": "#F24E1E", "text": "white",
+        "logo": get_clearbit_logo("figma.com")
+    },
+}
+
+# Category fallback icons
+CATEGORY_EMOJIS = {
+    "food": {"icon": "🍔", "bg": "#EF4444"},
+    "transport": {"icon": "🚗", "bg": "#3B82F6"},
+    "shopping": {"icon": "🛍️", "bg": "#8B5CF6"},
+    "entertainment": {"icon": "🎬", "bg": "#EC4899"},
+    "bills": {"icon": "📄", "bg": "#F59E0B"},
+    "health": {"icon": "💊", "bg": "#10B981"},
+    "education": {"icon": "📚", "bg": "#6366F1"},
+    "salary": {"icon": "💰", "bg": "#10B981"},
+    "income": {"icon": "📈", "bg": "#10B981"},
+    "electronics": {"icon": "📱", "bg": "#6366F1"},
+    "groceries": {"icon": "🛒", "bg": "#10B981"},
+    "utilities": {"icon": "⚡", "bg": "#F59E0B"},
+    "rent": {"icon": "🏠", "bg": "#8B5CF6"},
+    "travel": {"icon": "✈️", "bg": "#3B82F6"},
+    "fitness": {"icon": "💪", "bg": "#EF4444"},
+    "subscription": {"icon": "📺", "bg": "#EC4899"},
+    "other": {"icon": "📦", "bg": "#6B7280"},
+}
+
+# Category colors for charts
+CATEGORY_COLORS = {
+    "food": "#F59E0B",
+    "dining": "#F59E0B",
+    "transport": "#3B82F6",
+    "shopping": "#EC4899",
+    "entertainment": "#8B5CF6",
+    "bills": "#6366F1",
+    "utilities": "#06B6D4",
+    "health": "#EF4444",
+    "education": "#10B981",
+    "electronics": "#14B8A6",
+    "groceries": "#22C55E",
+    "travel": "#F97316",
+    "subscription": "#A855F7",
+    "rent": "#7C3AED",
+    "fitness": "#DC2626",
+    "salary": "#10B981",
+    "income": "#059669",
+    "other": "#6B7280",
+}
+
+DEFAULT_COLORS = [
+    "#3B82F6", "#EF4444", "#10B981", "#F59E0B", "#8B5CF6",
+    "#EC4899", "#06B6D4", "#F97316", "#6366F1", "#14B8A6",
+]
+
+# First brand / category key (in dict order) contained in the text
+_LOGO_NAMES = list(BRAND_LOGOS)
+_LOGOS_IN_TEXT = _KeywordAutomaton((name, rank) for rank, name in enumerate(_LOGO_NAMES))
+_EMOJI_KEYS = list(CATEGORY_EMOJIS)
+_EMOJIS_IN_TEXT = _KeywordAutomaton((key, rank) for rank, key in enumerate(_EMOJI_KEYS))
+_COLOR_KEYS = list(CATEGORY_COLORS)
+_COLORS_IN_TEXT = _KeywordAutomaton((key, rank) for rank, key in enumerate(_COLOR_KEYS))
+
+
+@lru_cache(maxsize=CATEGORY_RESOLVER_MAX_ENTRIES)
+def resolve_category(text: str) -> dict:
+    """
+    Resolve a category name or expense description to its appearance.
+
+    Returns a dict (shared between callers, treat it as read-only) with:
+        display_name, category, icon, color, is_brand - from identify_brand
+        brand - the BRAND_LOGOS entry (icon/color/bg/text/logo) or None
+        emoji, bg - the brand's text icon and background, else the category emoji
+        chart_color - color used for the category in statistics charts
+    """
+    text = text or ""
+    lower = text.lower()
+    recognized = identify_brand(text)
+
+    rank = _LOGOS_IN_TEXT.first_match(lower)
+    brand = BRAND_LOGOS[_LOGO_NAMES[rank]] if rank is not None else None
+    if brand is not None:
+        emoji, bg = brand["icon"], brand["bg"]
+    else:
+        rank = _EMOJIS_IN_TEXT.first_match(lower)
+        fallback = CATEGORY_EMOJIS[_EMOJI_KEYS[rank]] if rank is not None else {"icon": "📦", "bg": "#6B7280"}
+        emoji, bg = fallback["icon"], fallback["bg"]
+
+    rank = _COLORS_IN_TEXT.first_match(lower)
+    if rank is not None:
+        chart_color = CATEGORY_COLORS[_COLOR_KEYS[rank]]
+    else:
+        chart_color = DEFAULT_COLORS[hash(text) % len(DEFAULT_COLORS)]
+
+    return {
+        "display_name": recognized["display_name"],
+        "category": recognized["category"],
+        "icon": recognized["icon"],
+        "color": recognized["color"],
+        "is_brand": recognized["is_brand"],
+        "brand": brand,
+        "emoji": emoji,
+        "bg": bg,
+        "chart_color": chart_color,
+    }
+
+
+def resolver_cache_info() -> dict:
+    """Hit/miss counters and size of the resolver cache, for profiling."""
+    info = resolve_category.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+
+
+def clear_resolver_cache():
+    resolve_category.cache_clear()
@@ -275,6 +275,29 @@ def convert_amount(amount: float, from_currency: str, to_currency: str) -> float
         return amount
 
 
+def convert_total(amounts, from_currencies, to_currency: str) -> float:
+    """
+    Sum amounts held in different currencies in to_currency.
+    
+    All amounts are converted in one pass against a single rate snapshot.
+    
+    Args:
+        amounts: Amounts to add up
+        from_currencies: Currency code of each amount
+        to_currency: Currency code of the total
+    
+    Returns:
+        float: Converted total
+    """
+    amounts = list(amounts)
+    try:
+        from utils.currency_exchange import convert_many
+        return round(sum(convert_many(amounts, list(from_currencies), to_currency)), 2)
+    except ImportError:
+        # Fallback if exchange API not available
+        return sum(amounts)
+
+
 def get_live_exchange_rate(from_currency: str, to_currency: str) -> float:
     """
     Get live exchange rate between two currencies.
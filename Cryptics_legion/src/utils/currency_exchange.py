@@ -5,9 +5,21 @@ Fetches live exchange rates and handles currency conversions
 
 import requests
 import json
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import Future
 from datetime import datetime, timedelta
+from itertools import repeat
+from operator import mul
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from core.lazy_imports import optional_import
+
+# Vectorizes large convert_many() batches when installed
+np = optional_import("numpy")
 
 # API Configuration
 # Using exchangerate-api.com (free tier: 1,500 requests/month)
@@ -22,6 +34,150 @@ CACHE_FILE = Path(__file__).parent.parent / "storage" / "data" / "exchange_rates
 SUPPORTED_CURRENCIES = ["PHP", "USD", "EUR", "GBP", "JPY", "KRW", "SGD", "AUD", "CAD", "INR"]
 BASE_CURRENCY = "USD"  # Use USD as base for all conversions
 
+# Row/column of each supported currency in the cross-rate matrix
+CURRENCY_INDEX = {code: i for i, code in enumerate(SUPPORTED_CURRENCIES)}
+
+# Batches smaller than this are converted without numpy (not worth its import)
+VECTORIZE_MIN_BATCH = 256
+
+# How often the in-memory table stats the cache file for a snapshot written
+# by another process
+RELOAD_CHECK_SECONDS = 30
+# After a failed background refresh, keep serving stale rates this long
+# before trying the APIs again
+REFRESH_RETRY_SECONDS = 60
+
+
+class _RateTable:
+    """Process-wide, in-memory copy of the latest exchange-rate snapshot.
+    
+    Readers get the current (rates, fetched_at, cross_rates) snapshot without
+    touching disk. A refresh swaps in a new snapshot with one assignment, so
+    readers never see a half-updated table; the rates dict itself is never
+    mutated. The cross-rate matrix is built once per snapshot, and the cache
+    file is only re-read when its mtime changes.
+    """
+    
+    def __init__(self, cache_file: Path):
+        self.cache_file = cache_file
+        self.lock = threading.Lock()
+        self._snapshot = (None, None, None)
+        self._mtime = None
+        self._checked_at = None
+        self._refreshing = None
+        self._retry_at = None
+        self._subscribers = []
+    
+    def snapshot(self) -> Tuple[Optional[Dict], Optional[datetime], Optional[array]]:
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= RELOAD_CHECK_SECONDS:
+            self._reload_if_changed(now)
+        return self._snapshot
+    
+    def _reload_if_changed(self, now: float):
+        with self.lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.cache_file).st_mtime_ns
+            except OSError:
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    cache_data = json.load(f)
+                fetched_at = datetime.fromisoformat(cache_data.get('timestamp', ''))
+                rates = cache_data.get('rates') or None
+            except (json.JSONDecodeError, ValueError, OSError):
+                return
+            self._mtime = mtime
+            self._snapshot = (rates, fetched_at, build_cross_rates(rates) if rates else None)
+    
+    def replace(self, rates: Dict, fetched_at: datetime):
+        """Write a new snapshot to the cache file and swap it in."""
+        with self.lock:
+            try:
+                tmp_file = self.cache_file.with_name(self.cache_file.name + ".tmp")
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'timestamp': fetched_at.isoformat(),
+                        'base': BASE_CURRENCY,
+                        'rates': rates
+                    }, f, indent=2)
+                os.replace(tmp_file, self.cache_file)
+                self._mtime = os.stat(self.cache_file).st_mtime_ns
+            except OSError as e:
+                print(f"Warning: Could not save exchange rate cache: {e}")
+            self._snapshot = (rates, fetched_at, build_cross_rates(rates))
+    
+    def start_refresh(self, job: Callable[[], Optional[Dict]], force: bool = False) -> Future:
+        """Run job on a background thread unless a refresh is already running.
+        
+        Concurrent callers (several sessions hitting an expired table) share
+        one in-flight refresh. The returned future resolves to the new rates,
+        or None when the refresh failed; subscribers are notified on success.
+        """
+        with self.lock:
+            if self._refreshing is not None:
+                return self._refreshing
+            if not force and self._retry_at is not None and time.monotonic() < self._retry_at:
+                future = Future()
+                future.set_result(None)
+                return future
+            future = self._refreshing = Future()
+        
+        def run():
+            try:
+                rates = job()
+            except Exception as e:
+                print(f"Warning: Exchange rate refresh failed: {e}")
+                rates = None
+            with self.lock:
+                self._refreshing = None
+                self._retry_at = None if rates else time.monotonic() + REFRESH_RETRY_SECONDS
+                subscribers = list(self._subscribers) if rates else []
+            future.set_result(rates)
+            for callback in subscribers:
+                try:
+                    callback(rates)
+                except Exception as e:
+                    print(f"Warning: Exchange rate subscriber failed: {e}")
+        
+        threading.Thread(target=run, name="exchange-rate-refresh", daemon=True).start()
+        return future
+    
+    def subscribe(self, callback: Callable[[Dict], None]) -> Callable[[], None]:
+        with self.lock:
+            self._subscribers.append(callback)
+        
+        def unsubscribe():
+            with self.lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+
+def build_cross_rates(rates: Dict) -> array:
+    """Dense N x N cross-rate matrix over SUPPORTED_CURRENCIES, row-major.
+    
+    Entry [i * N + j] is how many of currency j one unit of currency i buys;
+    codes missing from `rates` count as 1.0, as in single conversions.
+    """
+    base_rates = [rates.get(code, 1.0) for code in SUPPORTED_CURRENCIES]
+    return array('d', (to_rate / from_rate for from_rate in base_rates for to_rate in base_rates))
+
+
+_rate_tables = {}
+_rate_tables_lock = threading.Lock()
+
+
+def _get_rate_table(cache_file: Path) -> _RateTable:
+    with _rate_tables_lock:
+        table = _rate_tables.get(cache_file)
+        if table is None:
+            table = _rate_tables[cache_file] = _RateTable(cache_file)
+        return table
+
 
 class CurrencyExchangeAPI:
     """Handles currency exchange rate fetching and caching."""
@@ -29,40 +185,20 @@ class CurrencyExchangeAPI:
     def __init__(self):
         self.cache_file = CACHE_FILE
         self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        self._table = _get_rate_table(self.cache_file)
     
-    def _load_cache(self) -> Optional[Dict]:
-        """Load cached exchange rates if valid."""
-        try:
-            if not self.cache_file.exists():
-                return None
-            
-            with open(self.cache_file, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-            
-            # Check if cache is still valid
-            cached_time = datetime.fromisoformat(cache_data.get('timestamp', ''))
-            if datetime.now() - cached_time < timedelta(hours=CACHE_DURATION_HOURS):
-                return cache_data.get('rates', {})
-            
-        except (json.JSONDecodeError, ValueError, OSError):
-            pass
-        
+    def _load_cache(self, allow_expired: bool = False) -> Optional[Dict]:
+        """Get the in-memory rates if still valid (or at all, with allow_expired)."""
+        rates, fetched_at, _ = self._table.snapshot()
+        if not rates:
+            return None
+        if allow_expired or datetime.now() - fetched_at < timedelta(hours=CACHE_DURATION_HOURS):
+            return rates
         return None
     
     def _save_cache(self, rates: Dict):
-        """Save exchange rates to cache."""
-        try:
-            cache_data = {
-                'timestamp': datetime.now().isoformat(),
-                'base': BASE_CURRENCY,
-                'rates': rates
-            }
-            
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, indent=2)
-        
-        except OSError as e:
-            print(f"Warning: Could not save exchange rate cache: {e}")
+        """Save exchange rates to the in-memory table and the cache file."""
+        self._table.replace(rates, datetime.now())
     
     def _fetch_from_api(self, base: str = BASE_CURRENCY) -> Optional[Dict]:
         """Fetch exchange rates from API."""
@@ -84,10 +220,44 @@ class CurrencyExchangeAPI:
                 print(f"Error fetching exchange rates: {e}")
                 return None
     
+    def _refresh(self, base: str = BASE_CURRENCY) -> Optional[Dict]:
+        """Fetch rates from the APIs and store them. Returns None on failure."""
+        rates = self._fetch_from_api(base)
+        if not rates:
+            return None
+        
+        # Filter to only supported currencies
+        filtered_rates = {code: rate for code, rate in rates.items() 
+                        if code in SUPPORTED_CURRENCIES}
+        # Add base currency
+        filtered_rates[base] = 1.0
+        
+        self._save_cache(filtered_rates)
+        if base == "USD":
+            try:
+                # Keep the dated history used for past-date conversions
+                from core import db
+                db.record_exchange_rates(filtered_rates)
+            except Exception as e:
+                print(f"Warning: Could not record exchange rate history: {e}")
+        return filtered_rates
+    
+    def refresh_in_background(self, base: str = BASE_CURRENCY, force: bool = False) -> Future:
+        """Start (or join) a background refresh; the future resolves to the new rates or None."""
+        return self._table.start_refresh(lambda: self._refresh(base), force=force)
+    
+    def subscribe(self, callback: Callable[[Dict], None]) -> Callable[[], None]:
+        """Call callback(rates) whenever refreshed rates land. Returns an unsubscribe function."""
+        return self._table.subscribe(callback)
+    
     def get_exchange_rates(self, base: str = BASE_CURRENCY, force_refresh: bool = False) -> Dict:
         """
         Get exchange rates for all supported currencies.
         
+        Expired rates are served immediately while a background refresh
+        fetches new ones (stale-while-revalidate); callers only wait on the
+        APIs when no rates are known yet or on force_refresh.
+        
         Args:
             base: Base currency code (default: USD)
             force_refresh: Force fetch from API even if cache is valid
@@ -100,22 +270,19 @@ class CurrencyExchangeAPI:
             cached_rates = self._load_cache()
             if cached_rates:
                 return cached_rates
+            
+            stale_rates = self._load_cache(allow_expired=True)
+            if stale_rates:
+                self.refresh_in_background(base)
+                return stale_rates
         
-        # Fetch from API
-        rates = self._fetch_from_api(base)
-        
+        # Fetch from API, sharing any refresh already in flight
+        rates = self.refresh_in_background(base, force=force_refresh).result()
         if rates:
-            # Filter to only supported currencies
-            filtered_rates = {code: rate for code, rate in rates.items() 
-                            if code in SUPPORTED_CURRENCIES}
-            # Add base currency
-            filtered_rates[base] = 1.0
-            
-            self._save_cache(filtered_rates)
-            return filtered_rates
+            return rates
         
         # If API fails, try to return cached data even if expired
-        cached_rates = self._load_cache()
+        cached_rates = self._load_cache(allow_expired=True)
         if cached_rates:
             print("Warning: Using expired exchange rate cache")
             return cached_rates
@@ -124,6 +291,23 @@ class CurrencyExchangeAPI:
         print("Warning: Using default exchange rates (1:1)")
         return {code: 1.0 for code in SUPPORTED_CURRENCIES}
     
+    def _cross_rates(self) -> Tuple[Dict, array]:
+        """Current rates and their precomputed cross-rate matrix."""
+        rates = self.get_exchange_rates()
+        table_rates, _, matrix = self._table.snapshot()
+        if rates is not table_rates:
+            # Default 1:1 rates when nothing could be fetched or cached
+            matrix = build_cross_rates(rates)
+        return rates, matrix
+    
+    def _rate(self, from_currency: str, to_currency: str) -> float:
+        rates, matrix = self._cross_rates()
+        i = CURRENCY_INDEX.get(from_currency)
+        j = CURRENCY_INDEX.get(to_currency)
+        if i is not None and j is not None:
+            return matrix[i * len(SUPPORTED_CURRENCIES) + j]
+        return rates.get(to_currency, 1.0) / rates.get(from_currency, 1.0)
+    
     def convert_currency(self, amount: float, from_currency: str, to_currency: str) -> float:
         """
         Convert amount from one currency to another.
@@ -139,21 +323,55 @@ class CurrencyExchangeAPI:
         if from_currency == to_currency:
             return amount
         
-        rates = self.get_exchange_rates()
+        return round(amount * self._rate(from_currency, to_currency), 2)
+    
+    def convert_many(self, amounts: Iterable[float], from_codes: Union[str, Iterable[str]],
+                     to_code: str) -> List[float]:
+        """
+        Convert many amounts into one currency against a single rate snapshot.
         
-        # Convert to USD first (base currency), then to target
-        if from_currency != BASE_CURRENCY:
-            # Convert from_currency to USD
-            from_rate = rates.get(from_currency, 1.0)
-            amount_in_usd = amount / from_rate
-        else:
-            amount_in_usd = amount
+        The target's column of the cross-rate matrix is read once, then the
+        whole batch is scaled in one step: a numpy multiply for large batches
+        when numpy is installed, otherwise a single map over the amounts.
         
-        # Convert USD to target currency
-        to_rate = rates.get(to_currency, 1.0)
-        converted_amount = amount_in_usd * to_rate
+        Args:
+            amounts: Amounts to convert
+            from_codes: Source currency per amount, or one code for all of them
+            to_code: Target currency code
         
-        return round(converted_amount, 2)
+        Returns:
+            list: Converted amounts, rounded like convert_currency
+        """
+        rates, matrix = self._cross_rates()
+        amounts = list(amounts)
+        if isinstance(from_codes, str):
+            factors = repeat(self._column(rates, matrix, (from_codes,), to_code)[from_codes], len(amounts))
+        else:
+            codes = list(from_codes)[:len(amounts)]
+            amounts = amounts[:len(codes)]
+            column = self._column(rates, matrix, set(codes), to_code)
+            factors = map(column.__getitem__, codes)
+        
+        if len(amounts) >= VECTORIZE_MIN_BATCH and np.available:
+            converted = np.array(amounts, dtype=float) * np.fromiter(factors, dtype=float, count=len(amounts))
+            return np.round(converted, 2).tolist()
+        return list(map(round, map(mul, amounts, factors), repeat(2)))
+    
+    @staticmethod
+    def _column(rates: Dict, matrix: array, codes: Iterable[str], to_code: str) -> Dict[str, float]:
+        """Rate from each of codes into to_code, read off the matrix's to_code column."""
+        n = len(SUPPORTED_CURRENCIES)
+        j = CURRENCY_INDEX.get(to_code)
+        column = {}
+        for code in codes:
+            i = CURRENCY_INDEX.get(code)
+            if code == to_code:
+                column[code] = 1.0
+            elif i is not None and j is not None:
+                column[code] = matrix[i * n + j]
+            else:
+                column[code] = rates.get(to_code, 1.0) / rates.get(code, 1.0)
+        return column
     
     def get_exchange_rate(self, from_currency: str, to_currency: str) -> float:
         """
@@ -169,42 +387,27 @@ class CurrencyExchangeAPI:
         if from_currency == to_currency:
             return 1.0
         
-        rates = self.get_exchange_rates()
-        
-        from_rate = rates.get(from_currency, 1.0)
-        to_rate = rates.get(to_currency, 1.0)
-        
-        # Calculate direct exchange rate
-        exchange_rate = to_rate / from_rate
-        
-        return round(exchange_rate, 4)
+        return round(self._rate(from_currency, to_currency), 4)
     
     def get_cache_age(self) -> Optional[str]:
         """Get the age of cached data in human-readable format."""
-        try:
-            if not self.cache_file.exists():
-                return None
-            
-            with open(self.cache_file, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-            
-            cached_time = datetime.fromisoformat(cache_data.get('timestamp', ''))
-            age = datetime.now() - cached_time
-            
-            if age.total_seconds() < 60:
-                return "Just now"
-            elif age.total_seconds() < 3600:
-                minutes = int(age.total_seconds() / 60)
-                return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-            elif age.total_seconds() < 86400:
-                hours = int(age.total_seconds() / 3600)
-                return f"{hours} hour{'s' if hours > 1 else ''} ago"
-            else:
-                days = int(age.total_seconds() / 86400)
-                return f"{days} day{'s' if days > 1 else ''} ago"
-        
-        except (json.JSONDecodeError, ValueError, OSError):
+        _, cached_time, _ = self._table.snapshot()
+        if cached_time is None:
             return None
+        
+        age = datetime.now() - cached_time
+        
+        if age.total_seconds() < 60:
+            return "Just now"
+        elif age.total_seconds() < 3600:
+            minutes = int(age.total_seconds() / 60)
+            return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
+        elif age.total_seconds() < 86400:
+            hours = int(age.total_seconds() / 3600)
+            return f"{hours} hour{'s' if hours > 1 else ''} ago"
+        else:
+            days = int(age.total_seconds() / 86400)
+            return f"{days} day{'s' if days > 1 else ''} ago"
     
     def get_all_rates_formatted(self, base_currency: str = "USD") -> Dict[str, Tuple[float, str]]:
         """
@@ -216,17 +419,26 @@ class CurrencyExchangeAPI:
         Returns:
             dict: {currency_code: (rate, formatted_string)}
         """
-        rates = self.get_exchange_rates()
         formatted_rates = {}
         
-        for code in SUPPORTED_CURRENCIES:
+        for code, rate in self.get_rates_for(base_currency).items():
             if code == base_currency:
                 formatted_rates[code] = (1.0, f"1.00 {code}")
             else:
-                rate = self.get_exchange_rate(base_currency, code)
                 formatted_rates[code] = (rate, f"{rate:.4f} {code}")
         
         return formatted_rates
+    
+    def get_rates_for(self, base_currency: str = "USD") -> Dict[str, float]:
+        """Rates from base_currency to every supported currency, read off one matrix row."""
+        if base_currency not in CURRENCY_INDEX:
+            return {code: 1.0 if code == base_currency else self.get_exchange_rate(base_currency, code)
+                    for code in SUPPORTED_CURRENCIES}
+        _, matrix = self._cross_rates()
+        n = len(SUPPORTED_CURRENCIES)
+        row = CURRENCY_INDEX[base_currency] * n
+        return {code: 1.0 if code == base_currency else round(matrix[row + j], 4)
+                for j, code in enumerate(SUPPORTED_CURRENCIES)}
 
 
 # Global instance
@@ -253,20 +465,22 @@ def get_exchange_rate(from_currency: str, to_currency: str) -> float:
     return api.get_exchange_rate(from_currency, to_currency)
 
 
+def convert_many(amounts: Iterable[float], from_codes: Union[str, Iterable[str]], to_code: str) -> List[float]:
+    """Convert many amounts into one currency."""
+    api = get_exchange_api()
+    return api.convert_many(amounts, from_codes, to_code)
+
+
 def get_all_rates(base_currency: str = "USD") -> Dict[str, float]:
     """Get all exchange rates for supported currencies."""
     api = get_exchange_api()
-    rates = api.get_exchange_rates()
-    
-    # Convert all rates to be relative to base_currency
-    result = {}
-    for code in SUPPORTED_CURRENCIES:
-        if code == base_currency:
-            result[code] = 1.0
-        else:
-            result[code] = api.get_exchange_rate(base_currency, code)
-    
-    return result
+    return api.get_rates_for(base_currency)
+
+
+def subscribe_to_rates(callback: Callable[[Dict], None]) -> Callable[[], None]:
+    """Get notified when refreshed exchange rates land."""
+    api = get_exchange_api()
+    return api.subscribe(callback)
 
 
 def refresh_rates() -> bool:
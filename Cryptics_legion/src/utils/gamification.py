@@ -4,6 +4,7 @@ Gamification Engine — Streaks, Badges, XP/Levels, Weekly Challenges.
 Drives user engagement through psychology-backed reward mechanics.
 """
 
+import operator
 from datetime import datetime, timedelta
 from core import db
 
@@ -22,32 +23,59 @@ LEVELS = {
 }
 
 # ── Badge Catalog ──
+# "rule" is (metric, comparator, threshold) over the metrics in
+# GamificationPipeline.metrics; None means the badge is awarded elsewhere.
 BADGES = {
     # Tracking badges
-    "first_steps":      {"title": "First Steps",       "desc": "Log your first expense",              "icon": "👶", "category": "tracking"},
-    "penny_counter":    {"title": "Penny Counter",     "desc": "Log 10 expenses",                     "icon": "🪙", "category": "tracking"},
-    "expense_pro":      {"title": "Expense Pro",       "desc": "Log 50 expenses",                     "icon": "💼", "category": "tracking"},
-    "data_machine":     {"title": "Data Machine",      "desc": "Log 200 expenses",                    "icon": "🤖", "category": "tracking"},
-    "expense_legend":   {"title": "Expense Legend",    "desc": "Log 500 expenses",                    "icon": "🏆", "category": "tracking"},
+    "first_steps":      {"title": "First Steps",       "desc": "Log your first expense",              "icon": "👶", "category": "tracking", "rule": ("expense_count", ">=", 1)},
+    "penny_counter":    {"title": "Penny Counter",     "desc": "Log 10 expenses",                     "icon": "🪙", "category": "tracking", "rule": ("expense_count", ">=", 10)},
+    "expense_pro":      {"title": "Expense Pro",       "desc": "Log 50 expenses",                     "icon": "💼", "category": "tracking", "rule": ("expense_count", ">=", 50)},
+    "data_machine":     {"title": "Data Machine",      "desc": "Log 200 expenses",                    "icon": "🤖", "category": "tracking", "rule": ("expense_count", ">=", 200)},
+    "expense_legend":   {"title": "Expense Legend",    "desc": "Log 500 expenses",                    "icon": "🏆", "category": "tracking", "rule": ("expense_count", ">=", 500)},
     # Streak badges
-    "week_warrior":     {"title": "Week Warrior",      "desc": "Maintain a 7-day streak",             "icon": "🔥", "category": "streak"},
-    "fortnight_fighter":{"title": "Fortnight Fighter",  "desc": "Maintain a 14-day streak",            "icon": "⚡", "category": "streak"},
-    "monthly_master":   {"title": "Monthly Master",    "desc": "Maintain a 30-day streak",            "icon": "💎", "category": "streak"},
-    "legendary_tracker":{"title": "Legendary Tracker", "desc": "Maintain a 100-day streak",           "icon": "🌟", "category": "streak"},
+    "week_warrior":     {"title": "Week Warrior",      "desc": "Maintain a 7-day streak",             "icon": "🔥", "category": "streak", "rule": ("current_streak", ">=", 7)},
+    "fortnight_fighter":{"title": "Fortnight Fighter",  "desc": "Maintain a 14-day streak",            "icon": "⚡", "category": "streak", "rule": ("current_streak", ">=", 14)},
+    "monthly_master":   {"title": "Monthly Master",    "desc": "Maintain a 30-day streak",            "icon": "💎", "category": "streak", "rule": ("current_streak", ">=", 30)},
+    "legendary_tracker":{"title": "Legendary Tracker", "desc": "Maintain a 100-day streak",           "icon": "🌟", "category": "streak", "rule": ("current_streak", ">=", 100)},
     # Budget badges
-    "budget_keeper":    {"title": "Budget Keeper",     "desc": "Stay under budget for a full week",   "icon": "🛡️", "category": "budget"},
-    "savings_hero":     {"title": "Savings Hero",      "desc": "Save 30% of your budget in a month",  "icon": "💰", "category": "budget"},
+    "budget_keeper":    {"title": "Budget Keeper",     "desc": "Stay under budget for a full week",   "icon": "🛡️", "category": "budget", "rule": None},
+    "savings_hero":     {"title": "Savings Hero",      "desc": "Save 30% of your budget in a month",  "icon": "💰", "category": "budget", "rule": None},
     # Special badges
-    "voice_commander":  {"title": "Voice Commander",   "desc": "Use voice assistant 10 times",        "icon": "🎤", "category": "special"},
-    "night_owl":        {"title": "Night Owl",         "desc": "Log an expense after 11 PM",          "icon": "🦉", "category": "special"},
-    "early_bird":       {"title": "Early Bird",        "desc": "Log an expense before 7 AM",          "icon": "🐦", "category": "special"},
-    "category_king":    {"title": "Category King",     "desc": "Use all 13 expense categories",       "icon": "🎨", "category": "special"},
-    "challenge_champ":  {"title": "Challenge Champ",   "desc": "Complete 5 weekly challenges",        "icon": "🎯", "category": "special"},
+    "voice_commander":  {"title": "Voice Commander",   "desc": "Use voice assistant 10 times",        "icon": "🎤", "category": "special", "rule": ("voice_expenses", ">=", 10)},
+    "night_owl":        {"title": "Night Owl",         "desc": "Log an expense after 11 PM",          "icon": "🦉", "category": "special", "rule": ("hour", "in", (23, 0, 1, 2, 3))},
+    "early_bird":       {"title": "Early Bird",        "desc": "Log an expense before 7 AM",          "icon": "🐦", "category": "special", "rule": ("hour", "in", (4, 5, 6))},
+    "category_king":    {"title": "Category King",     "desc": "Use all 13 expense categories",       "icon": "🎨", "category": "special", "rule": ("categories_used", ">=", 13)},
+    "challenge_champ":  {"title": "Challenge Champ",   "desc": "Complete 5 weekly challenges",        "icon": "🎯", "category": "special", "rule": ("challenges_completed", ">=", 5)},
     # Level-up badges
-    "level_5":          {"title": "Finance Pro",       "desc": "Reach Level 5",                       "icon": "⭐", "category": "level"},
-    "level_10":         {"title": "Diamond Member",    "desc": "Reach Level 10",                      "icon": "💎", "category": "level"},
+    "level_5":          {"title": "Finance Pro",       "desc": "Reach Level 5",                       "icon": "⭐", "category": "level", "rule": ("level", ">=", 5)},
+    "level_10":         {"title": "Diamond Member",    "desc": "Reach Level 10",                      "icon": "💎", "category": "level", "rule": ("level", ">=", 10)},
 }
 
+_COMPARATORS = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "in": lambda value, allowed: value in allowed,
+}
+
+
+def compile_badge_rules(badges: dict) -> dict:
+    """Index the catalog's rules by metric: {metric: [(badge_id, test, threshold)]}, in catalog order."""
+    rules = {}
+    for badge_id, info in badges.items():
+        if info.get("rule") is None:
+            continue
+        metric, comparator, threshold = info["rule"]
+        if comparator not in _COMPARATORS:
+            raise ValueError(f"Badge {badge_id}: unknown comparator {comparator!r}")
+        rules.setdefault(metric, []).append((badge_id, _COMPARATORS[comparator], threshold))
+    return rules
+
+
+BADGE_RULES = compile_badge_rules(BADGES)
+_BADGE_ORDER = {badge_id: i for i, badge_id in enumerate(BADGES)}
+
 # ── Challenge Templates ──
 CHALLENGE_TEMPLATES = [
     {"type": "daily_log", "desc": "Log at least 1 expense every day this week", "target": 7, "xp": 50},
@@ -68,66 +96,10 @@ class StreakManager:
     @staticmethod
     def check_in(user_id: int) -> dict:
         """Call on login or expense log. Returns streak info + events."""
-        streak = db.get_user_streak(user_id)
-        today = datetime.now().strftime("%Y-%m-%d")
-        last = streak["last_active"]
-        events = []
-
-        if last == today:
-            # Already checked in today
-            return {"streak": streak, "events": events}
-
-        if last is None:
-            # First ever check-in
-            new_current = 1
-            events.append("first_checkin")
-        else:
-            try:
-                last_date = datetime.strptime(last, "%Y-%m-%d").date()
-                today_date = datetime.now().date()
-                diff = (today_date - last_date).days
-            except (ValueError, TypeError):
-                diff = 999
-
-            if diff == 1:
-                # Consecutive day!
-                new_current = streak["current"] + 1
-                events.append("streak_continued")
-            elif diff == 2 and streak["freezes"] > 0:
-                # Missed 1 day — use freeze
-                new_current = streak["current"] + 1
-                streak["freezes"] -= 1
-                events.append("freeze_used")
-            else:
-                # Streak broken
-                new_current = 1
-                if streak["current"] > 0:
-                    events.append("streak_broken")
-                events.append("streak_restarted")
-                # Reset freezes on Monday
-                if datetime.now().weekday() == 0:
-                    streak["freezes"] = 1
-
-        new_longest = max(streak["longest"], new_current)
-        new_total = streak["total_days"] + 1
-
-        db.update_user_streak(user_id, new_current, new_longest, today, streak["freezes"], new_total)
-
-        result_streak = {
-            "current": new_current,
-            "longest": new_longest,
-            "last_active": today,
-            "freezes": streak["freezes"],
-            "total_days": new_total,
-        }
-
-        # Check streak milestones
-        for threshold, badge_id in [(7, "week_warrior"), (14, "fortnight_fighter"), (30, "monthly_master"), (100, "legendary_tracker")]:
-            if new_current >= threshold and not db.has_badge(user_id, badge_id):
-                db.unlock_badge(user_id, badge_id)
-                events.append(f"badge:{badge_id}")
-
-        return {"streak": result_streak, "events": events}
+        pipeline = GamificationPipeline(user_id)
+        result = pipeline.check_in()
+        pipeline.commit()
+        return result
 
     @staticmethod
     def get_streak_visual(current: int) -> dict:
@@ -155,52 +127,9 @@ class BadgeEngine:
     @staticmethod
     def check_all(user_id: int) -> list:
         """Check all badge conditions and unlock any newly earned. Returns list of newly unlocked badge_ids."""
-        newly_unlocked = []
-
-        # Get user stats
-        expense_count = db.get_expense_count_by_user(user_id)
-        streak = db.get_user_streak(user_id)
-        categories_used = db.get_unique_categories_used(user_id)
-        xp_data = db.get_user_xp(user_id)
-        hour = datetime.now().hour
-
-        # Tracking badges
-        checks = [
-            ("first_steps", expense_count >= 1),
-            ("penny_counter", expense_count >= 10),
-            ("expense_pro", expense_count >= 50),
-            ("data_machine", expense_count >= 200),
-            ("expense_legend", expense_count >= 500),
-        ]
-
-        # Streak badges
-        checks += [
-            ("week_warrior", streak["current"] >= 7),
-            ("fortnight_fighter", streak["current"] >= 14),
-            ("monthly_master", streak["current"] >= 30),
-            ("legendary_tracker", streak["current"] >= 100),
-        ]
-
-        # Special badges
-        checks += [
-            ("category_king", categories_used >= 13),
-            ("night_owl", hour >= 23 or hour < 4),
-            ("early_bird", 4 <= hour < 7),
-        ]
-
-        # Level badges
-        checks += [
-            ("level_5", xp_data["level"] >= 5),
-            ("level_10", xp_data["level"] >= 10),
-        ]
-
-        for badge_id, condition in checks:
-            if condition and not db.has_badge(user_id, badge_id):
-                if db.unlock_badge(user_id, badge_id):
-                    newly_unlocked.append(badge_id)
-                    # Award bonus XP for badge
-                    db.add_user_xp(user_id, 25)
-
+        pipeline = GamificationPipeline(user_id)
+        newly_unlocked = pipeline.check_badges(full=True)
+        pipeline.commit()
         return newly_unlocked
 
     @staticmethod
@@ -299,10 +228,7 @@ class ChallengeManager:
         if existing:
             return
 
-        import random
-        # Pick 2 random challenges for this week
-        selected = random.sample(CHALLENGE_TEMPLATES, min(2, len(CHALLENGE_TEMPLATES)))
-        for ch in selected:
+        for ch in _pick_weekly_challenges():
             db.upsert_challenge(user_id, ch["type"], ch["target"], ch["xp"])
 
     @staticmethod
@@ -366,26 +292,224 @@ class ChallengeManager:
     @staticmethod
     def update_after_expense(user_id: int):
         """Update challenge progress after an expense is logged."""
-        challenges = db.get_active_challenges(user_id)
-        for ch in challenges:
+        pipeline = GamificationPipeline(user_id)
+        pipeline.update_challenges()
+        pipeline.commit()
+
+
+def _pick_weekly_challenges() -> list:
+    import random
+    # Pick 2 random challenges for this week
+    return random.sample(CHALLENGE_TEMPLATES, min(2, len(CHALLENGE_TEMPLATES)))
+
+
+# ═══════════════════════════════════════════════════
+# EVALUATION PIPELINE
+# ═══════════════════════════════════════════════════
+
+class GamificationPipeline:
+    """
+    One user's gamification state, read in one query batch and updated in
+    memory by the streak, badge, XP and challenge rules. commit() writes
+    every change in one transaction, so a logged expense costs two database
+    round trips instead of one per rule.
+
+    Badge rules read self.metrics. Each change marks its metric dirty, and
+    check_badges() only evaluates the rules indexed under dirty metrics.
+    """
+
+    def __init__(self, user_id: int, now: datetime = None):
+        self.user_id = user_id
+        self.now = now or datetime.now()
+        state = db.get_gamification_state(user_id)
+        self.xp = state["xp"]
+        self.level = state["level"]
+        self.streak = state["streak"]
+        self.badges = state["badges"]
+        self.challenges = [list(ch) for ch in state["challenges"]]
+        self.today_count = state["today_count"]
+        self.metrics = {
+            "expense_count": state["expense_count"],
+            "categories_used": state["categories_used"],
+            "voice_expenses": state["voice_expenses"],
+            "challenges_completed": state["challenges_completed"],
+            "current_streak": self.streak["current"],
+            "level": self.level,
+            "hour": self.now.hour,
+        }
+        self.dirty = set()
+
+        self.xp_gained = 0
+        self.voice_expenses = 0
+        self.streak_changed = False
+        self.unlocked = []
+        self.changed_challenges = {}
+        self.new_challenges = []
+
+    def _set_metric(self, metric: str, value):
+        if self.metrics[metric] != value:
+            self.metrics[metric] = value
+            self.dirty.add(metric)
+
+    def award_xp(self, amount: int) -> dict:
+        """Add XP in memory. Returns {xp, level, leveled_up} like db.add_user_xp."""
+        old_level = self.level
+        self.xp += amount
+        self.xp_gained += amount
+        self.level = db.level_for_xp(self.xp)
+        self._set_metric("level", self.level)
+        return {"xp": self.xp, "level": self.level, "leveled_up": self.level > old_level}
+
+    def expense_logged(self, via_voice: bool = False):
+        """Mark the metrics a newly saved expense changes (the counts already include it)."""
+        self.dirty.update(("expense_count", "categories_used", "hour"))
+        if via_voice:
+            self.voice_expenses += 1
+            self._set_metric("voice_expenses", self.metrics["voice_expenses"] + 1)
+
+    def unlock(self, badge_id: str) -> bool:
+        if badge_id in self.badges:
+            return False
+        self.badges.add(badge_id)
+        self.unlocked.append(badge_id)
+        return True
+
+    def _earned(self, metrics) -> list:
+        """Badges not yet held whose rules on `metrics` now hold, in catalog order."""
+        earned = []
+        for metric in metrics:
+            value = self.metrics[metric]
+            for badge_id, test, threshold in BADGE_RULES.get(metric, ()):
+                if badge_id not in self.badges and test(value, threshold):
+                    earned.append(badge_id)
+        return sorted(earned, key=_BADGE_ORDER.get)
+
+    def check_in(self) -> dict:
+        """Daily streak check-in. Returns {streak, events} like StreakManager.check_in."""
+        streak = self.streak
+        today = self.now.strftime("%Y-%m-%d")
+        last = streak["last_active"]
+        events = []
+
+        if last == today:
+            # Already checked in today
+            return {"streak": streak, "events": events}
+
+        if last is None:
+            # First ever check-in
+            new_current = 1
+            events.append("first_checkin")
+        else:
+            try:
+                last_date = datetime.strptime(last, "%Y-%m-%d").date()
+                diff = (self.now.date() - last_date).days
+            except (ValueError, TypeError):
+                diff = 999
+
+            if diff == 1:
+                # Consecutive day!
+                new_current = streak["current"] + 1
+                events.append("streak_continued")
+            elif diff == 2 and streak["freezes"] > 0:
+                # Missed 1 day — use freeze
+                new_current = streak["current"] + 1
+                streak["freezes"] -= 1
+                events.append("freeze_used")
+            else:
+                # Streak broken
+                new_current = 1
+                if streak["current"] > 0:
+                    events.append("streak_broken")
+                events.append("streak_restarted")
+                # Reset freezes on Monday
+                if self.now.weekday() == 0:
+                    streak["freezes"] = 1
+
+        self.streak = {
+            "current": new_current,
+            "longest": max(streak["longest"], new_current),
+            "last_active": today,
+            "freezes": streak["freezes"],
+            "total_days": streak["total_days"] + 1,
+        }
+        self.streak_changed = True
+
+        # Streak milestones unlock here, without the badge XP bonus
+        self.metrics["current_streak"] = new_current
+        for badge_id in self._earned(["current_streak"]):
+            self.unlock(badge_id)
+            events.append(f"badge:{badge_id}")
+
+        return {"streak": dict(self.streak), "events": events}
+
+    def check_badges(self, full: bool = False) -> list:
+        """
+        Unlock every badge whose rule now holds (+25 XP each). Only rules on
+        dirty metrics are evaluated unless full is set. Returns the new badge_ids.
+        """
+        newly_unlocked = []
+        pending = set(self.metrics) if full else self.dirty
+        while pending:
+            self.dirty = set()
+            for badge_id in self._earned(pending):
+                self.unlock(badge_id)
+                newly_unlocked.append(badge_id)
+                # Award bonus XP for badge (may level up, which is re-checked)
+                self.award_xp(XPEngine.XP_VALUES["badge_unlocked"])
+            pending = self.dirty
+        return newly_unlocked
+
+    def ensure_challenges(self):
+        """Pick this week's challenges if there are none yet."""
+        if self.challenges or self.new_challenges:
+            return
+        self.new_challenges = [(ch["type"], ch["target"], ch["xp"]) for ch in _pick_weekly_challenges()]
+
+    def update_challenges(self):
+        """Update challenge progress after an expense; completing one awards its XP."""
+        for ch in self.challenges:
             cid, ctype, target, current, xp, completed = ch
             if completed:
                 continue
 
             new_val = current
             if ctype == "total_expenses":
-                new_val = db.get_expense_count_by_user(user_id)
+                new_val = self.metrics["expense_count"]
             elif ctype == "daily_log":
-                new_val = db.get_today_expense_count(user_id)
+                new_val = self.today_count
             elif ctype == "multi_category":
-                new_val = db.get_unique_categories_used(user_id)
+                new_val = self.metrics["categories_used"]
 
             if new_val != current:
-                db.update_challenge_progress(cid, new_val)
-
-            if new_val >= target and not completed:
-                db.complete_challenge(cid)
-                db.add_user_xp(user_id, xp)
+                ch[3] = new_val
+                self.changed_challenges[cid] = ch
+
+            if new_val >= target:
+                ch[5] = 1
+                self.changed_challenges[cid] = ch
+                self.award_xp(xp)
+                self._set_metric("challenges_completed", self.metrics["challenges_completed"] + 1)
+
+    def commit(self):
+        """Write all changes in one transaction (nothing to do if none)."""
+        if not (self.xp_gained or self.voice_expenses or self.streak_changed or self.unlocked
+                or self.changed_challenges or self.new_challenges):
+            return
+        db.save_gamification_changes(
+            self.user_id,
+            xp_gained=self.xp_gained,
+            streak=self.streak if self.streak_changed else None,
+            badges=self.unlocked,
+            challenge_progress=[(cid, ch[3], ch[5]) for cid, ch in self.changed_challenges.items()],
+            new_challenges=self.new_challenges,
+            voice_expenses=self.voice_expenses,
+        )
+        self.xp_gained = 0
+        self.voice_expenses = 0
+        self.streak_changed = False
+        self.unlocked = []
+        self.changed_challenges = {}
+        self.new_challenges = []
 
 
 # ═══════════════════════════════════════════════════
@@ -399,46 +523,50 @@ def on_expense_logged(user_id: int, via_voice: bool = False) -> dict:
     Returns summary of events for UI notifications.
     """
     events = {"xp_gained": 0, "new_badges": [], "leveled_up": False, "new_level": 0, "streak": 0}
+    pipeline = GamificationPipeline(user_id)
 
     # Award XP
     action = "voice_expense" if via_voice else "log_expense"
-    xp_result = XPEngine.award(user_id, action)
-    events["xp_gained"] = XPEngine.XP_VALUES.get(action, 0)
-    events["leveled_up"] = xp_result.get("leveled_up", False)
-    events["new_level"] = xp_result.get("level", 1)
+    xp_result = pipeline.award_xp(XPEngine.XP_VALUES[action])
+    events["xp_gained"] = XPEngine.XP_VALUES[action]
+    events["leveled_up"] = xp_result["leveled_up"]
+    events["new_level"] = xp_result["level"]
 
-    # Update streak
-    streak_result = StreakManager.check_in(user_id)
-    events["streak"] = streak_result["streak"]["current"]
+    pipeline.expense_logged(via_voice)
 
-    # Check badges
-    new_badges = BadgeEngine.check_all(user_id)
-    events["new_badges"] = new_badges
+    # Update streak
+    events["streak"] = pipeline.check_in()["streak"]["current"]
 
     # Update challenges
-    ChallengeManager.update_after_expense(user_id)
+    pipeline.update_challenges()
+
+    # Check badges whose metrics changed
+    events["new_badges"] = pipeline.check_badges()
 
+    pipeline.commit()
     return events
 
 
 def on_user_login(user_id: int) -> dict:
     """Call on user login. Awards daily XP and checks streak."""
     events = {"xp_gained": 0, "streak": 0, "new_badges": []}
+    pipeline = GamificationPipeline(user_id)
 
     # Daily login XP
-    xp_result = XPEngine.award(user_id, "daily_login")
+    pipeline.award_xp(XPEngine.XP_VALUES["daily_login"])
     events["xp_gained"] = XPEngine.XP_VALUES["daily_login"]
 
     # Streak check-in
-    streak_result = StreakManager.check_in(user_id)
+    streak_result = pipeline.check_in()
     events["streak"] = streak_result["streak"]["current"]
     events["streak_events"] = streak_result["events"]
 
     # Ensure challenges exist
-    ChallengeManager.ensure_challenges(user_id)
+    pipeline.ensure_challenges()
 
-    # Check badges
-    new_badges = BadgeEngine.check_all(user_id)
-    events["new_badges"] = new_badges
+    # Check every rule, so badges whose rules were added or changed since
+    # the user's metrics last moved are awarded too (in-memory only)
+    events["new_badges"] = pipeline.check_badges(full=True)
 
+    pipeline.commit()
     return events
@@ -0,0 +1,137 @@
+# src/utils/gamification_worker.py
+"""
+Background gamification processing.
+
+Saving an expense or logging in queues an event here and returns at once;
+one worker thread runs the gamification pipeline for each event in order,
+persists the results and then hands the events summary to the caller's
+notify callback (e.g. announce_to(page) to show level-ups and badges).
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+
+from utils.gamification import on_expense_logged, on_user_login
+
+# Pending events allowed before submit() blocks
+GAMIFICATION_QUEUE_SIZE = 256
+# Seconds submit() waits for room in a full queue
+GAMIFICATION_SUBMIT_TIMEOUT = 5.0
+
+EVENT_HANDLERS = {
+    "expense": lambda user_id: on_expense_logged(user_id),
+    "voice_expense": lambda user_id: on_expense_logged(user_id, via_voice=True),
+    "login": on_user_login,
+}
+
+
+class GamificationWorker(threading.Thread):
+    """Single thread that processes gamification events off the UI thread."""
+
+    def __init__(self):
+        super().__init__(name="gamification-worker", daemon=True)
+        self.events = queue.Queue(maxsize=GAMIFICATION_QUEUE_SIZE)
+
+    def submit(self, kind: str, user_id: int, notify=None) -> Future:
+        """
+        Queue an event and return a Future for its events summary.
+
+        notify(summary) is called on the worker thread once the results
+        are saved.
+        """
+        if kind not in EVENT_HANDLERS:
+            raise ValueError(f"Unknown gamification event: {kind}")
+        future = Future()
+        try:
+            self.events.put((kind, user_id, notify, future), timeout=GAMIFICATION_SUBMIT_TIMEOUT)
+        except queue.Full:
+            future.set_exception(RuntimeError("Gamification queue is full"))
+        return future
+
+    def drain(self):
+        """Block until every queued event has been processed."""
+        self.events.join()
+
+    def stop(self):
+        self.events.put(None)
+        self.join()
+
+    def run(self):
+        while True:
+            event = self.events.get()
+            try:
+                if event is None:
+                    break
+                self._process(*event)
+            finally:
+                self.events.task_done()
+
+    def _process(self, kind, user_id, notify, future):
+        try:
+            summary = EVENT_HANDLERS[kind](user_id)
+        except Exception as e:
+            print(f"[Gamification] {kind} event for user {user_id} failed: {e}")
+            future.set_exception(e)
+            return
+        future.set_result(summary)
+        if notify is not None:
+            try:
+                notify(summary)
+            except Exception as e:
+                print(f"[Gamification] Notification error: {e}")
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_gamification_worker() -> GamificationWorker:
+    """The shared worker, started on first use."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = GamificationWorker()
+            _worker.start()
+        return _worker
+
+
+def submit_expense_logged(user_id: int, via_voice: bool = False, notify=None) -> Future:
+    return get_gamification_worker().submit("voice_expense" if via_voice else "expense", user_id, notify)
+
+
+def submit_user_login(user_id: int, notify=None) -> Future:
+    return get_gamification_worker().submit("login", user_id, notify)
+
+
+def shutdown():
+    """Finish queued events and stop the worker (call before db.close_pools)."""
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+    if worker is not None and worker.is_alive():
+        worker.stop()
+
+
+def announce_to(page):
+    """A notify callback that shows level-ups and new badges on `page`."""
+    def announce(summary: dict):
+        from components.notification import ImmersiveNotification, show_success_notification
+        if "streak_events" in summary:
+            # Login: XP goes to the log, each new badge gets a notification
+            if summary.get("xp_gained", 0) > 0:
+                print(f"[Gamification] Daily login! +{summary['xp_gained']} XP. Streak: {summary['streak']}")
+            for _ in summary.get("new_badges", []):
+                show_success_notification(page, "🏆 New Badge Unlocked!", title="Achievement")
+            return
+        # Expense: a level-up is shown instead of any badges unlocked with it.
+        # ImmersiveNotification rather than SnackBar avoids navigation race conditions
+        notif = ImmersiveNotification(page)
+        if summary.get("leveled_up"):
+            notif.show(f"🎉 Level Up! You reached Level {summary['new_level']}!", "success", title="Level Up!")
+        elif summary.get("new_badges"):
+            for _ in summary["new_badges"]:
+                notif.show("🏆 New Badge Unlocked!", "success", title="Achievement Unlocked!")
+        elif summary.get("xp_gained", 0) > 0:
+            print(f"[Gamification] +{summary['xp_gained']} XP gained")
+    return announce
@@ -12,26 +12,15 @@ import wave
 import tempfile
 import threading
 import requests
-import numpy as np
+
+from core.lazy_imports import optional_import
 
 # ── Optional heavy imports (graceful degradation) ──
-try:
-    import sounddevice as sd
-    SD_AVAILABLE = True
-except ImportError:
-    SD_AVAILABLE = False
-
-try:
-    import torch
-    TORCH_AVAILABLE = True
-except ImportError:
-    TORCH_AVAILABLE = False
-
-try:
-    from snac import SNAC
-    SNAC_AVAILABLE = True
-except ImportError:
-    SNAC_AVAILABLE = False
+# Imported on first use so loading this module stays cheap
+np = optional_import("numpy")
+sd = optional_import("sounddevice")
+torch = optional_import("torch")
+snac = optional_import("snac")
 
 # ── Constants ──
 OLLAMA_API_URL = "http://localhost:11434/api/generate"
@@ -70,21 +59,21 @@ class OrpheusTTS:
 
         self._initialized = True
 
-        if not TORCH_AVAILABLE:
+        if not torch.available:
             self._init_error = "PyTorch not installed (pip install torch)"
             return False
 
-        if not SNAC_AVAILABLE:
+        if not snac.available:
             self._init_error = "SNAC not installed (pip install snac)"
             return False
 
-        if not SD_AVAILABLE:
+        if not sd.available:
             self._init_error = "sounddevice not installed (pip install sounddevice)"
             return False
 
         try:
             print("[OrpheusTTS] Loading SNAC model...")
-            self.snac_model = SNAC.from_pretrained("hubertsiuzdak/snac_24khz").eval()
+            self.snac_model = snac.SNAC.from_pretrained("hubertsiuzdak/snac_24khz").eval()
 
             if torch.cuda.is_available():
                 self.snac_device = "cuda"
@@ -105,11 +94,11 @@ class OrpheusTTS:
     # ── Check if TTS is available ──
     def check_available(self) -> tuple:
         """Check if TTS system is available. Returns (available: bool, error: str|None)."""
-        if not TORCH_AVAILABLE:
+        if not torch.available:
             return False, "PyTorch not installed"
-        if not SNAC_AVAILABLE:
+        if not snac.available:
             return False, "SNAC not installed (pip install snac)"
-        if not SD_AVAILABLE:
+        if not sd.available:
             return False, "sounddevice not installed"
 
         # Check Ollama connectivity
@@ -284,7 +273,7 @@ class OrpheusTTS:
             audio_buffer = b"".join(audio_segments) if audio_segments else b""
 
             # Play audio
-            if play and audio_buffer and SD_AVAILABLE:
+            if play and audio_buffer and sd.available:
                 try:
                     audio_data = np.frombuffer(audio_buffer, dtype=np.int16)
                     audio_float = audio_data.astype(np.float32) / 32767.0
@@ -324,7 +313,7 @@ class OrpheusTTS:
     def stop(self):
         """Stop any currently playing audio."""
         self.is_speaking = False
-        if SD_AVAILABLE:
+        if sd.loaded and sd.available:
             try:
                 sd.stop()
             except Exception:
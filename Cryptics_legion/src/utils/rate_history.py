@@ -0,0 +1,102 @@
+"""
+Historical exchange rates
+Answers "what was the rate on date X" from the exchange_rate_history table
+"""
+
+import threading
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from core import db
+
+
+class RateHistory:
+    """
+    In-memory copy of the rate history, one sorted date list per currency.
+
+    Rates are units of the currency per 1 USD; a rate applies from its
+    effective date (a UTC day) until the next one, and dates before the
+    first known rate use the earliest one.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str, float]] = ()):
+        self._dates = {}
+        self._rates = {}
+        for currency, effective_date, rate in sorted(rows):
+            self._dates.setdefault(currency, []).append(effective_date[:10])
+            self._rates.setdefault(currency, []).append(rate)
+
+    def currencies(self):
+        return sorted(self._dates)
+
+    def rate_as_of(self, currency: str, date: str) -> Optional[float]:
+        """Units of currency per USD on date (YYYY-MM-DD...), or None if unknown."""
+        if currency == "USD":
+            return 1.0
+        dates = self._dates.get(currency)
+        if not dates:
+            return None
+        i = bisect_right(dates, date[:10])
+        return self._rates[currency][max(i - 1, 0)]
+
+    def as_of(self, date: str) -> Dict[str, float]:
+        """All known USD-based rates on date."""
+        rates = {"USD": 1.0}
+        for currency in self._dates:
+            rates[currency] = self.rate_as_of(currency, date)
+        return rates
+
+    def rate(self, from_currency: str, to_currency: str, date: str) -> Optional[float]:
+        """1 from_currency in to_currency on date, or None if either rate is unknown."""
+        if from_currency == to_currency:
+            return 1.0
+        from_rate = self.rate_as_of(from_currency, date)
+        to_rate = self.rate_as_of(to_currency, date)
+        if not from_rate or not to_rate:
+            return None
+        return to_rate / from_rate
+
+    def convert(self, amount: float, from_currency: str, to_currency: str, date: str) -> Optional[float]:
+        """Convert amount at the rates in effect on date, or None if either rate is unknown."""
+        rate = self.rate(from_currency, to_currency, date)
+        return round(amount * rate, 2) if rate is not None else None
+
+
+def utc_day(date: str) -> str:
+    """The UTC day of a local "YYYY-MM-DD HH:MM[:SS]" timestamp; bare dates are kept as they are."""
+    if len(date) <= 10:
+        return date
+    try:
+        return datetime.fromisoformat(date).astimezone(timezone.utc).strftime("%Y-%m-%d")
+    except ValueError:
+        return date[:10]
+
+
+_history = None
+_history_version = None
+_history_lock = threading.Lock()
+
+
+def get_rate_history() -> RateHistory:
+    """The shared RateHistory, reloaded after the table has been written."""
+    global _history, _history_version
+    with _history_lock:
+        version = db.rate_history_version()
+        if _history is None or version != _history_version:
+            _history = RateHistory(db.get_exchange_rate_history())
+            _history_version = version
+        return _history
+
+
+# The helpers below take local expense dates and look them up by UTC day
+def as_of(date: str) -> Dict[str, float]:
+    return get_rate_history().as_of(utc_day(date))
+
+
+def rate_as_of(from_currency: str, to_currency: str, date: str) -> Optional[float]:
+    return get_rate_history().rate(from_currency, to_currency, utc_day(date))
+
+
+def convert_as_of(amount: float, from_currency: str, to_currency: str, date: str) -> Optional[float]:
+    return get_rate_history().convert(amount, from_currency, to_currency, utc_day(date))
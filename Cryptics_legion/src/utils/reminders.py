@@ -2,10 +2,15 @@
 """
 Reminder Engine — Background service that monitors user activity,
 budget thresholds, and scheduled reminders to fire notifications.
+
+A single ReminderScheduler thread serves every logged-in session: each
+reminder is checked only when it could next fire, and re-planned when the
+user's expenses, accounts, reminders or recurring expenses change.
 """
 
+import heapq
+import itertools
 import threading
-import time
 from datetime import datetime, timedelta
 from core import db
 from utils.currency import get_currency_symbol
@@ -45,26 +50,121 @@ REMINDER_TYPES = {
 }
 
 
+# How long after firing a reminder type stays quiet
+REMINDER_COOLDOWNS = {"budget_warning": timedelta(hours=4)}
+DEFAULT_REMINDER_COOLDOWN = timedelta(hours=12)
+# Timed reminders fire within this long either side of their set time
+REMINDER_WINDOW = timedelta(minutes=15)
+# How soon a check that raised (e.g. "database is locked") is tried again
+REMINDER_RETRY_DELAY = timedelta(minutes=5)
+# Superseded heap entries tolerated before the heap is rebuilt without them
+STALE_ENTRY_LIMIT = 64
+# Reminder types to re-plan when each kind of data changes (see db.notifies_change)
+CHANGE_AFFECTS = {
+    "expenses": ("daily_expense", "budget_warning", "idle_reminder"),
+    "accounts": ("budget_warning",),
+    "recurring_expenses": ("recurring_expense",),
+    "reminders": tuple(REMINDER_TYPES),
+}
+
+
+def _parse_time(time_str: str, default: tuple) -> tuple:
+    try:
+        hour, minute = map(int, time_str.split(":"))
+        return hour, minute
+    except (ValueError, TypeError, AttributeError):
+        return default
+
+
+def _next_window(earliest: datetime, hour: int, minute: int, weekdays=None):
+    """Earliest moment at or after `earliest` inside a ±REMINDER_WINDOW window around hour:minute."""
+    day = earliest.replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset in range(9):
+        target = day + timedelta(days=offset, hours=hour, minutes=minute)
+        if weekdays is not None and target.weekday() not in weekdays:
+            continue
+        if target + REMINDER_WINDOW >= earliest:
+            # A second inside the window, so the check's own window test passes
+            return max(earliest, target - REMINDER_WINDOW + timedelta(seconds=1))
+    return None
+
+
+def next_check_time(reminder: dict, now: datetime, last_expense_date: str = None, ran: bool = False):
+    """
+    When the scheduler should next check `reminder` (a dict of the reminders
+    row), or None if nothing can make it fire until the user's data changes.
+
+    ran is True right after a check, so a timed reminder moves on to its next
+    window instead of re-checking the current one.
+    """
+    if not reminder["enabled"]:
+        return None
+    rtype = reminder["type"]
+
+    # After a check, never re-check within the minute
+    earliest = now + timedelta(minutes=1) if ran else now
+    if reminder["last_triggered"]:
+        try:
+            last = datetime.strptime(reminder["last_triggered"], "%Y-%m-%d %H:%M:%S")
+            earliest = max(earliest, last + REMINDER_COOLDOWNS.get(rtype, DEFAULT_REMINDER_COOLDOWN))
+        except (ValueError, TypeError):
+            pass
+
+    if rtype in ("daily_expense", "weekly_summary"):
+        if rtype == "daily_expense":
+            hour, minute = _parse_time(reminder["time"], (20, 0))
+            weekdays = None
+        else:
+            hour, minute = _parse_time(reminder["time"], (9, 0))
+            weekdays = (6, 0)  # Sunday or Monday morning
+        if ran:
+            # Skip past the window just checked
+            current = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if abs(now - current) <= REMINDER_WINDOW:
+                earliest = max(earliest, current + REMINDER_WINDOW + timedelta(seconds=1))
+        return _next_window(earliest, hour, minute, weekdays)
+
+    if rtype == "idle_reminder":
+        if not last_expense_date:
+            return earliest
+        try:
+            last_day = datetime.strptime(last_expense_date.split(" ")[0], "%Y-%m-%d")
+        except (ValueError, TypeError):
+            return None
+        return max(earliest, last_day + timedelta(days=reminder["days_inactive"] or 0))
+
+    if rtype == "budget_warning":
+        # Balances only move when expenses or accounts change
+        return None if ran else earliest
+
+    if rtype == "recurring_expense":
+        if ran:
+            tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            return max(earliest, tomorrow)
+        return earliest
+
+    return None
+
+
 class ReminderEngine:
     """
-    Background reminder engine that periodically checks conditions
-    and fires notifications via the ImmersiveNotification system.
+    One session's reminders. start() hands them to the process-wide
+    ReminderScheduler, which checks each reminder when it can next fire
+    and shows notifications on this session's page.
     """
 
-    CHECK_INTERVAL = 300  # Check every 5 minutes (seconds)
+    # Delay before the first checks (let app fully load)
+    STARTUP_DELAY = timedelta(seconds=5)
 
     def __init__(self, page, user_id: int):
         self.page = page
         self.user_id = user_id
         self._running = False
-        self._thread = None
+        self._reminders = None
         self._last_budget_check = {}
-        self._last_daily_check = None
-        self._last_weekly_check = None
-        self._last_idle_check = None
 
     def start(self):
-        """Start the reminder engine in background."""
+        """Start checking this user's reminders."""
         if self._running:
             return
         
@@ -75,62 +175,58 @@ class ReminderEngine:
             print(f"[ReminderEngine] Init defaults note: {e}")
         
         self._running = True
-        self._thread = threading.Thread(target=self._run_loop, daemon=True)
-        self._thread.start()
+        get_reminder_scheduler().add(self)
         print(f"[ReminderEngine] Started for user {self.user_id}")
 
     def stop(self):
         """Stop the reminder engine."""
         self._running = False
+        get_reminder_scheduler().remove(self)
         print(f"[ReminderEngine] Stopped for user {self.user_id}")
 
-    def _run_loop(self):
-        """Main loop that checks reminder conditions periodically."""
-        # Wait a bit before first check (let app fully load)
-        time.sleep(5)
-        
-        while self._running:
-            try:
-                self._check_all_reminders()
-            except Exception as e:
-                print(f"[ReminderEngine] Check error: {e}")
-            
-            # Sleep in small increments so we can stop quickly
-            for _ in range(self.CHECK_INTERVAL):
-                if not self._running:
-                    break
-                time.sleep(1)
+    def _load_reminders(self) -> dict:
+        keys = ("id", "type", "enabled", "time", "threshold", "days_inactive", "custom_message", "last_triggered")
+        self._reminders = {row[1]: dict(zip(keys, row)) for row in db.get_user_reminders(self.user_id)}
+        return self._reminders
 
-    def _check_all_reminders(self):
-        """Check all reminder conditions for the current user."""
-        reminders = db.get_user_reminders(self.user_id)
-        
-        for reminder in reminders:
-            rid, rtype, enabled, rtime, threshold, days_inactive, custom_msg, last_triggered, _ = reminder
-            
-            if not enabled:
-                continue
-            
-            # Skip if recently triggered (within last hour for most types)
-            if last_triggered:
-                try:
-                    last_dt = datetime.strptime(last_triggered, "%Y-%m-%d %H:%M:%S")
-                    cooldown = timedelta(hours=12) if rtype != "budget_warning" else timedelta(hours=4)
-                    if datetime.now() - last_dt < cooldown:
-                        continue
-                except (ValueError, TypeError):
-                    pass
-            
-            if rtype == "daily_expense":
-                self._check_daily_expense(rid, rtime)
-            elif rtype == "budget_warning":
-                self._check_budget_warning(rid, threshold)
-            elif rtype == "weekly_summary":
-                self._check_weekly_summary(rid, rtime)
-            elif rtype == "idle_reminder":
-                self._check_idle_reminder(rid, days_inactive)
-            elif rtype == "recurring_expense":
-                self._check_recurring_expenses(rid)
+    def plan(self, reminder_types, now: datetime, ran: bool = False, reload: bool = False) -> list:
+        """(reminder_type, next check time or None) for each of reminder_types."""
+        reminders = self._load_reminders() if reload or self._reminders is None else self._reminders
+        last_expense = None
+        if "idle_reminder" in reminder_types and "idle_reminder" in reminders:
+            last_expense = db.get_last_expense_date(self.user_id)
+        plan = []
+        for rtype in reminder_types:
+            reminder = reminders.get(rtype)
+            when = next_check_time(reminder, now, last_expense, ran) if reminder else None
+            plan.append((rtype, when))
+        return plan
+
+    def run_reminder(self, reminder_type: str, now: datetime = None, account_budgets: list = None) -> bool:
+        """
+        Check one reminder now; True if it fired. account_budgets is this
+        user's entry from db.get_account_budgets(), when already fetched.
+        """
+        reminder = (self._reminders or {}).get(reminder_type)
+        if reminder is None or not reminder["enabled"]:
+            return False
+        rid = reminder["id"]
+        if reminder_type == "daily_expense":
+            fired = self._check_daily_expense(rid, reminder["time"])
+        elif reminder_type == "budget_warning":
+            fired = self._check_budget_warning(rid, reminder["threshold"], account_budgets)
+        elif reminder_type == "weekly_summary":
+            fired = self._check_weekly_summary(rid, reminder["time"])
+        elif reminder_type == "idle_reminder":
+            fired = self._check_idle_reminder(rid, reminder["days_inactive"])
+        elif reminder_type == "recurring_expense":
+            fired = self._check_recurring_expenses(rid)
+        else:
+            fired = False
+        if fired and reminder_type != "recurring_expense":
+            # Mirrors update_reminder_last_triggered so the cooldown applies
+            reminder["last_triggered"] = (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        return bool(fired)
 
     def _fire_notification(self, title: str, message: str, notif_type: str = "info"):
         """Fire an in-app notification via overlay."""
@@ -165,20 +261,19 @@ class ReminderEngine:
                     "info"
                 )
                 db.update_reminder_last_triggered(rid)
+                return True
+        return False
 
-    def _check_budget_warning(self, rid: int, threshold: float):
+    def _check_budget_warning(self, rid: int, threshold: float, accounts: list = None):
         """Check if any account balance is below threshold percentage."""
-        accounts = db.get_accounts_by_user(self.user_id)
+        if accounts is None:
+            accounts = db.get_account_budgets([self.user_id])[self.user_id]
+        fired = False
         
-        for acc in accounts:
-            acc_id = acc[0]
-            acc_name = acc[1]
-            balance = acc[4]
-            currency = acc[5] if len(acc) > 5 else "PHP"
-            symbol = get_currency_symbol(currency)
+        for acc_id, acc_name, balance, currency, total_expenses in accounts:
+            symbol = get_currency_symbol(currency or "PHP")
             
             # Calculate original budget
-            total_expenses = db.total_expenses_by_account(self.user_id, acc_id)
             original_budget = balance + total_expenses
             
             if original_budget <= 0:
@@ -200,6 +295,7 @@ class ReminderEngine:
                 )
                 self._last_budget_check[cache_key] = True
                 db.update_reminder_last_triggered(rid)
+                fired = True
             elif remaining_pct <= threshold:
                 # Warning
                 self._fire_notification(
@@ -209,6 +305,8 @@ class ReminderEngine:
                 )
                 self._last_budget_check[cache_key] = True
                 db.update_reminder_last_triggered(rid)
+                fired = True
+        return fired
 
     def _check_weekly_summary(self, rid: int, reminder_time: str):
         """Show weekly summary on Sunday."""
@@ -216,7 +314,7 @@ class ReminderEngine:
         
         # Only on Sunday (weekday 6) OR Monday morning (weekday 0)
         if now.weekday() not in (6, 0):
-            return
+            return False
         
         try:
             hour, minute = map(int, reminder_time.split(":"))
@@ -240,6 +338,8 @@ class ReminderEngine:
                 "info"
             )
             db.update_reminder_last_triggered(rid)
+            return True
+        return False
 
     def _check_idle_reminder(self, rid: int, days_inactive: int):
         """Remind user if they haven't logged expenses recently."""
@@ -254,7 +354,7 @@ class ReminderEngine:
                 "info"
             )
             db.update_reminder_last_triggered(rid)
-            return
+            return True
         
         try:
             # Parse date — handle both "YYYY-MM-DD" and "YYYY-MM-DD HH:MM:SS"
@@ -269,13 +369,16 @@ class ReminderEngine:
                     "warning"
                 )
                 db.update_reminder_last_triggered(rid)
+                return True
         except (ValueError, TypeError):
             pass
+        return False
 
     def _check_recurring_expenses(self, rid: int):
         """Check for upcoming recurring expenses."""
         recurring = db.get_recurring_expenses(self.user_id)
         now = datetime.now()
+        fired = False
         today_day = now.day
         
         for rec in recurring:
@@ -317,3 +420,160 @@ class ReminderEngine:
                     "warning"
                 )
                 db.update_recurring_last_reminded(rec_id)
+                fired = True
+        return fired
+
+
+class ReminderScheduler(threading.Thread):
+    """
+    One thread for every session's reminders. Each (engine, reminder type)
+    has one entry in a heap keyed by its next check time; the thread sleeps
+    until the earliest is due. Data changes reported by db's change
+    listeners re-plan only the affected reminders of that user's sessions.
+    """
+
+    def __init__(self):
+        super().__init__(name="reminder-scheduler", daemon=True)
+        self._cond = threading.Condition()
+        self._heap = []        # (when, seq, engine, reminder_type)
+        self._live = {}        # (engine, reminder_type) -> seq of its current heap entry
+        self._seq = itertools.count()
+        self._engines = {}     # user_id -> set of engines
+        self._changes = set()  # (user_id, kind) waiting to be re-planned
+        self._running = True
+        db.add_change_listener(self.data_changed)
+
+    def add(self, engine: ReminderEngine):
+        plan = engine.plan(tuple(REMINDER_TYPES), datetime.now() + engine.STARTUP_DELAY, reload=True)
+        with self._cond:
+            self._engines.setdefault(engine.user_id, set()).add(engine)
+            self._schedule(engine, plan)
+            self._cond.notify()
+
+    def remove(self, engine: ReminderEngine):
+        with self._cond:
+            engines = self._engines.get(engine.user_id)
+            if engines is not None:
+                engines.discard(engine)
+                if not engines:
+                    del self._engines[engine.user_id]
+            for key in [key for key in self._live if key[0] is engine]:
+                del self._live[key]
+            # Release the engine (and its page) now rather than when its entries come due
+            self._compact()
+
+    def data_changed(self, kind: str, user_id: int):
+        """db change listener: queue a re-plan for that user's sessions."""
+        if kind not in CHANGE_AFFECTS:
+            return
+        with self._cond:
+            if user_id in self._engines:
+                self._changes.add((user_id, kind))
+                self._cond.notify()
+
+    def pending(self) -> list:
+        """(when, user_id, reminder_type) of every scheduled check, soonest first."""
+        with self._cond:
+            return sorted((when, engine.user_id, rtype) for when, seq, engine, rtype in self._heap
+                          if self._live.get((engine, rtype)) == seq)
+
+    def stop(self):
+        db.remove_change_listener(self.data_changed)
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.join()
+
+    def _schedule(self, engine, plan):
+        # Caller holds self._cond; superseded heap entries are skipped when popped
+        for rtype, when in plan:
+            if when is None:
+                self._live.pop((engine, rtype), None)
+                continue
+            seq = next(self._seq)
+            self._live[(engine, rtype)] = seq
+            heapq.heappush(self._heap, (when, seq, engine, rtype))
+        # Every live key has exactly one heap entry; the rest are superseded
+        if len(self._heap) - len(self._live) > max(STALE_ENTRY_LIMIT, len(self._live)):
+            self._compact()
+
+    def _compact(self):
+        # Caller holds self._cond
+        self._heap = [entry for entry in self._heap if self._live.get((entry[2], entry[3])) == entry[1]]
+        heapq.heapify(self._heap)
+
+    def _registered(self, engine) -> bool:
+        return engine in self._engines.get(engine.user_id, ())
+
+    def _take_work(self):
+        """Wait for due checks or data changes; return (changes, due)."""
+        with self._cond:
+            while self._running:
+                # Drop entries superseded by a re-plan or a removed engine
+                while self._heap and self._live.get((self._heap[0][2], self._heap[0][3])) != self._heap[0][1]:
+                    heapq.heappop(self._heap)
+                now = datetime.now()
+                if self._changes or (self._heap and self._heap[0][0] <= now):
+                    break
+                timeout = (self._heap[0][0] - now).total_seconds() if self._heap else None
+                self._cond.wait(timeout)
+            if not self._running:
+                return None, None
+
+            changes = [(engine, kind) for user_id, kind in self._changes
+                       for engine in self._engines.get(user_id, ())]
+            self._changes = set()
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                when, seq, engine, rtype = heapq.heappop(self._heap)
+                if self._live.get((engine, rtype)) == seq:
+                    del self._live[(engine, rtype)]
+                    due.append((engine, rtype))
+            return changes, due
+
+    def run(self):
+        while True:
+            changes, due = self._take_work()
+            if changes is None:
+                return
+            for engine, kind in changes:
+                try:
+                    plan = engine.plan(CHANGE_AFFECTS[kind], datetime.now(), reload=kind == "reminders")
+                except Exception as e:
+                    print(f"[ReminderEngine] Re-plan error: {e}")
+                    continue
+                with self._cond:
+                    if self._registered(engine):
+                        self._schedule(engine, plan)
+            # Every due budget check shares one accounts query
+            budget_users = {engine.user_id for engine, rtype in due if rtype == "budget_warning"}
+            try:
+                budgets = db.get_account_budgets(budget_users) if budget_users else {}
+            except Exception as e:
+                print(f"[ReminderEngine] Budget query error: {e}")
+                budgets = {}
+            for engine, rtype in due:
+                try:
+                    engine.run_reminder(rtype, account_budgets=budgets.get(engine.user_id))
+                    plan = engine.plan((rtype,), datetime.now(), ran=True)
+                except Exception as e:
+                    print(f"[ReminderEngine] Check error: {e}")
+                    # It left the heap in _take_work, so put it back or it never runs again
+                    plan = [(rtype, datetime.now() + REMINDER_RETRY_DELAY)]
+                with self._cond:
+                    if self._registered(engine):
+                        self._schedule(engine, plan)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_reminder_scheduler() -> ReminderScheduler:
+    """The process-wide scheduler, started on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler = ReminderScheduler()
+            _scheduler.start()
+        return _scheduler
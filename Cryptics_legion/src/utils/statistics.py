@@ -1,78 +1,88 @@
 import flet as ft
 import sqlite3
+import inspect
 import os
 import sys
 from datetime import datetime, timedelta
 from collections import defaultdict
+from functools import wraps
 
 # Add the parent directory to the path to import from core
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from core.db import connect_db, select_expenses_by_user
-
-# Category colors for charts
-CATEGORY_COLORS = {
-    "food": "#F59E0B",
-    "dining": "#F59E0B",
-    "transport": "#3B82F6",
-    "shopping": "#EC4899",
-    "entertainment": "#8B5CF6",
-    "bills": "#6366F1",
-    "utilities": "#06B6D4",
-    "health": "#EF4444",
-    "education": "#10B981",
-    "electronics": "#14B8A6",
-    "groceries": "#22C55E",
-    "travel": "#F97316",
-    "subscription": "#A855F7",
-    "rent": "#7C3AED",
-    "fitness": "#DC2626",
-    "salary": "#10B981",
-    "income": "#059669",
-    "other": "#6B7280",
+from core.db import session
+from core.stats_cache import get_stats_cache
+from utils.category_resolver import resolve_category
+
+# Look-back window for each period chip
+PERIOD_DELTAS = {
+    "1D": timedelta(days=1),
+    "1W": timedelta(weeks=1),
+    "1M": timedelta(days=30),
+    "3M": timedelta(days=90),
+    "6M": timedelta(days=180),
+    "1Y": timedelta(days=365),
 }
 
-DEFAULT_COLORS = [
-    "#3B82F6", "#EF4444", "#10B981", "#F59E0B", "#8B5CF6",
-    "#EC4899", "#06B6D4", "#F97316", "#6366F1", "#14B8A6",
-]
+
+def _period_start(period: str, default: timedelta) -> str:
+    """First day (YYYY-MM-DD) included in a period ending today."""
+    return (datetime.now() - PERIOD_DELTAS.get(period, default)).strftime("%Y-%m-%d")
+
+
+def _cached(chart_type: str):
+    """Serve a per-user statistics function from the stats cache.
+
+    The cache key is (user_id, period, chart_type plus any other arguments);
+    expense writes in core.db invalidate the user's entries.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            user_id = params.pop("user_id")
+            if user_id is None:
+                return fn(*args, **kwargs)
+            period = params.pop("period", None)
+            key = (chart_type, *params.values()) if params else chart_type
+            return get_stats_cache().get_or_compute(user_id, period, key, lambda: fn(*args, **kwargs))
+        return wrapper
+    return decorator
 
 
 def get_category_color(category: str) -> str:
     """Get color for a category."""
-    cat_lower = category.lower()
-    for key, color in CATEGORY_COLORS.items():
-        if key in cat_lower:
-            return color
-    # Return a default color based on hash
-    return DEFAULT_COLORS[hash(category) % len(DEFAULT_COLORS)]
+    return resolve_category(category)["chart_color"]
 
 
+@_cached("categories")
 def get_expense_summary(user_id: int = None):
     """Get expense summary grouped by category."""
-    conn = connect_db()
-    cursor = conn.cursor()
-
-    if user_id:
-        cursor.execute("""
-            SELECT category, SUM(amount) 
-            FROM expenses 
-            WHERE user_id = ?
-            GROUP BY category
-            ORDER BY SUM(amount) DESC
-        """, (user_id,))
-    else:
-        cursor.execute("""
-            SELECT category, SUM(amount) 
-            FROM expenses 
-            GROUP BY category
-            ORDER BY SUM(amount) DESC
-        """)
-
-    rows = cursor.fetchall()
-    conn.close()
+    with session() as cursor:
+        if user_id:
+            cursor.execute("""
+                SELECT category, SUM(amount) 
+                FROM expenses 
+                WHERE user_id = ?
+                GROUP BY category
+                ORDER BY SUM(amount) DESC
+            """, (user_id,))
+        else:
+            cursor.execute("""
+                SELECT category, SUM(amount) 
+                FROM expenses 
+                GROUP BY category
+                ORDER BY SUM(amount) DESC
+            """)
+
+        rows = cursor.fetchall()
     return rows
 
 
+@_cached("categories")
 def get_expense_summary_by_period(user_id: int, period: str = "1W"):
     """Get expense summary for a specific time period.
     
@@ -83,43 +93,28 @@ def get_expense_summary_by_period(user_id: int, period: str = "1W"):
     Returns:
         List of (category, total_amount) tuples
     """
-    today = datetime.now()
-    
-    period_map = {
-        "1D": timedelta(days=1),
-        "1W": timedelta(weeks=1),
-        "1M": timedelta(days=30),
-        "3M": timedelta(days=90),
-        "6M": timedelta(days=180),
-        "1Y": timedelta(days=365),
-    }
-    
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    if period == "ALL":
-        cursor.execute("""
-            SELECT category, SUM(amount) 
-            FROM expenses 
-            WHERE user_id = ?
-            GROUP BY category
-            ORDER BY SUM(amount) DESC
-        """, (user_id,))
-    else:
-        start_date = today - period_map.get(period, timedelta(weeks=1))
-        cursor.execute("""
-            SELECT category, SUM(amount) 
-            FROM expenses 
-            WHERE user_id = ? AND date >= ?
-            GROUP BY category
-            ORDER BY SUM(amount) DESC
-        """, (user_id, start_date.strftime("%Y-%m-%d")))
-    
-    rows = cursor.fetchall()
-    conn.close()
+    with session() as cursor:
+        if period == "ALL":
+            cursor.execute("""
+                SELECT category, total_amount
+                FROM category_expense_stats
+                WHERE user_id = ?
+                ORDER BY total_amount DESC
+            """, (user_id,))
+        else:
+            cursor.execute("""
+                SELECT category, SUM(total)
+                FROM expense_daily_rollup
+                WHERE user_id = ? AND day >= ?
+                GROUP BY category
+                ORDER BY SUM(total) DESC
+            """, (user_id, _period_start(period, timedelta(weeks=1))))
+    
+        rows = cursor.fetchall()
     return rows
 
 
+@_cached("daily")
 def get_daily_expenses(user_id: int, days: int = 7):
     """Get daily expense totals for the last N days.
     
@@ -129,18 +124,16 @@ def get_daily_expenses(user_id: int, days: int = 7):
     today = datetime.now()
     start_date = today - timedelta(days=days)
     
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT date, SUM(amount) 
-        FROM expenses 
-        WHERE user_id = ? AND date >= ?
-        GROUP BY date
-        ORDER BY date ASC
-    """, (user_id, start_date.strftime("%Y-%m-%d")))
+    with session() as cursor:
+        cursor.execute("""
+            SELECT day, SUM(total)
+            FROM expense_daily_rollup
+            WHERE user_id = ? AND day >= ?
+            GROUP BY day
+            ORDER BY day ASC
+        """, (user_id, start_date.strftime("%Y-%m-%d")))
     
-    rows = cursor.fetchall()
-    conn.close()
+        rows = cursor.fetchall()
     
     # Fill in missing days with 0
     daily_data = {row[0]: row[1] for row in rows}
@@ -153,33 +146,140 @@ def get_daily_expenses(user_id: int, days: int = 7):
     return result
 
 
+def _month_start(today: datetime, months_back: int) -> str:
+    """First day (YYYY-MM-DD) of the month `months_back` months before today's."""
+    index = today.year * 12 + today.month - 1 - months_back
+    return f"{index // 12:04d}-{index % 12 + 1:02d}-01"
+
+
+def _trend(current: float, previous: float) -> dict:
+    if previous > 0:
+        change_percent = ((current - previous) / previous) * 100
+    elif current > 0:
+        change_percent = 100
+    else:
+        change_percent = 0
+    
+    if change_percent > 5:
+        trend = "up"
+    elif change_percent < -5:
+        trend = "down"
+    else:
+        trend = "same"
+    
+    return {
+        "current": current,
+        "previous": previous,
+        "change_percent": round(change_percent, 1),
+        "trend": trend,
+    }
+
+
+@_cached("overview")
+def compute_statistics(user_id: int, period: str = "1M", days: int = 7, weeks: int = 4, months: int = 6):
+    """Compute every bucket a statistics screen needs in a single pass.
+    
+    One read of the user's daily rollup rows (with week and month keys
+    derived in SQL) is folded into daily, weekly and monthly totals, the
+    current vs. previous period comparison and the category breakdown.
+    
+    Returns:
+        dict with 'total_spent', 'previous_total', 'trend', 'categories',
+        'category_count', 'transaction_count', 'top_categories',
+        'highest_expense', 'average_daily' (last 30 days), 'daily' (last
+        `days` days, zero-filled), 'period_daily' (days with spending in the
+        period), 'weekly' and 'monthly'
+    """
+    today = datetime.now()
+    today_str = today.strftime("%Y-%m-%d")
+    delta = PERIOD_DELTAS.get(period, timedelta(weeks=1))
+    if period == "ALL":
+        start = previous_start = ""
+    else:
+        start = (today - delta).strftime("%Y-%m-%d")
+        previous_start = (today - 2 * delta).strftime("%Y-%m-%d")
+    daily_start = (today - timedelta(days=days)).strftime("%Y-%m-%d")
+    average_start = (today - timedelta(days=30)).strftime("%Y-%m-%d")
+    week_start = (today - timedelta(days=today.weekday() + 7 * weeks)).strftime("%Y-%m-%d")
+    month_start = _month_start(today, months)
+    since = min(previous_start, daily_start, average_start, week_start, month_start)
+    
+    with session() as cursor:
+        cursor.execute("""
+            SELECT day, date(day, 'weekday 0', '-6 days'), substr(day, 1, 7),
+                   category, total, count, max_amount
+            FROM expense_daily_rollup
+            WHERE user_id = ? AND day >= ?
+        """, (user_id, since))
+        rows = cursor.fetchall()
+    
+        current_total = previous_total = average_total = 0.0
+        transaction_count = 0
+        by_day = defaultdict(float)
+        by_week = defaultdict(float)
+        by_month = defaultdict(float)
+        by_category = defaultdict(float)
+        highest_group = None
+        for day, week, month, category, total, count, max_amount in rows:
+            by_day[day] += total
+            if week and day >= week_start:
+                by_week[week] += total
+            if day >= month_start:
+                by_month[month] += total
+            if average_start <= day <= today_str:
+                average_total += total
+            if day >= start:
+                current_total += total
+                transaction_count += count
+                by_category[category] += total
+                if highest_group is None or max_amount > highest_group[2]:
+                    highest_group = (day, category, max_amount)
+            elif day >= previous_start:
+                previous_total += total
+    
+        highest = None
+        if highest_group:
+            day, category, amount = highest_group
+            cursor.execute("""
+                SELECT id, amount, category, description, date
+                FROM expenses
+                WHERE user_id = ? AND date >= ? AND date < ? || '~' AND category = ? AND amount = ?
+                LIMIT 1
+            """, (user_id, day, day, category, amount))
+            highest = cursor.fetchone()
+    
+    categories = sorted(by_category.items(), key=lambda x: x[1], reverse=True)
+    daily = []
+    for i in range(days + 1):
+        date_str = (today - timedelta(days=days - i)).strftime("%Y-%m-%d")
+        daily.append((date_str, by_day.get(date_str, 0)))
+    
+    return {
+        "user_id": user_id,
+        "period": period,
+        "total_spent": current_total,
+        "previous_total": previous_total,
+        "trend": _trend(current_total, previous_total),
+        "categories": categories,
+        "category_count": len(categories),
+        "transaction_count": transaction_count,
+        "top_categories": _top_categories(categories, 5),
+        "highest_expense": highest,
+        "average_daily": average_total / 31,
+        "daily": daily,
+        "period_daily": sorted((d, v) for d, v in by_day.items() if start <= d <= today_str),
+        "weekly": sorted(by_week.items())[-weeks:],
+        "monthly": sorted(by_month.items())[-months:],
+    }
+
+
 def get_weekly_expenses(user_id: int, weeks: int = 4):
     """Get weekly expense totals for the last N weeks.
     
     Returns:
         List of (week_start_date, total_amount) tuples
     """
-    today = datetime.now()
-    expenses = select_expenses_by_user(user_id)
-    
-    weekly_totals = defaultdict(float)
-    for exp in expenses:
-        try:
-            exp_date = datetime.strptime(exp[5], "%Y-%m-%d")
-            # Get the start of the week (Monday)
-            week_start = exp_date - timedelta(days=exp_date.weekday())
-            week_key = week_start.strftime("%Y-%m-%d")
-            
-            # Only include weeks within range
-            weeks_ago = (today - week_start).days // 7
-            if weeks_ago <= weeks:
-                weekly_totals[week_key] += exp[2]
-        except:
-            pass
-    
-    # Sort by date
-    result = sorted(weekly_totals.items(), key=lambda x: x[0])
-    return result[-weeks:] if len(result) > weeks else result
+    return compute_statistics(user_id, weeks=weeks)["weekly"]
 
 
 def get_monthly_expenses(user_id: int, months: int = 6):
@@ -188,25 +288,7 @@ def get_monthly_expenses(user_id: int, months: int = 6):
     Returns:
         List of (month_str, total_amount) tuples
     """
-    today = datetime.now()
-    expenses = select_expenses_by_user(user_id)
-    
-    monthly_totals = defaultdict(float)
-    for exp in expenses:
-        try:
-            exp_date = datetime.strptime(exp[5], "%Y-%m-%d")
-            month_key = exp_date.strftime("%Y-%m")
-            
-            # Calculate months difference
-            months_diff = (today.year - exp_date.year) * 12 + (today.month - exp_date.month)
-            if months_diff <= months:
-                monthly_totals[month_key] += exp[2]
-        except:
-            pass
-    
-    # Sort by date
-    result = sorted(monthly_totals.items(), key=lambda x: x[0])
-    return result[-months:] if len(result) > months else result
+    return compute_statistics(user_id, months=months)["monthly"]
 
 
 def get_spending_trend(user_id: int, period: str = "1W"):
@@ -215,58 +297,7 @@ def get_spending_trend(user_id: int, period: str = "1W"):
     Returns:
         dict with 'current', 'previous', 'change_percent', 'trend' (up/down/same)
     """
-    today = datetime.now()
-    
-    period_map = {
-        "1D": timedelta(days=1),
-        "1W": timedelta(weeks=1),
-        "1M": timedelta(days=30),
-        "3M": timedelta(days=90),
-        "1Y": timedelta(days=365),
-    }
-    
-    delta = period_map.get(period, timedelta(weeks=1))
-    
-    current_start = today - delta
-    previous_start = current_start - delta
-    
-    expenses = select_expenses_by_user(user_id)
-    
-    current_total = 0
-    previous_total = 0
-    
-    for exp in expenses:
-        try:
-            exp_date = datetime.strptime(exp[5], "%Y-%m-%d")
-            amount = exp[2]
-            
-            if exp_date >= current_start:
-                current_total += amount
-            elif exp_date >= previous_start:
-                previous_total += amount
-        except:
-            pass
-    
-    if previous_total > 0:
-        change_percent = ((current_total - previous_total) / previous_total) * 100
-    elif current_total > 0:
-        change_percent = 100
-    else:
-        change_percent = 0
-    
-    if change_percent > 5:
-        trend = "up"
-    elif change_percent < -5:
-        trend = "down"
-    else:
-        trend = "same"
-    
-    return {
-        "current": current_total,
-        "previous": previous_total,
-        "change_percent": round(change_percent, 1),
-        "trend": trend,
-    }
+    return compute_statistics(user_id, period)["trend"]
 
 
 def get_top_spending_categories(user_id: int, limit: int = 5, period: str = "1M"):
@@ -275,7 +306,11 @@ def get_top_spending_categories(user_id: int, limit: int = 5, period: str = "1M"
     Returns:
         List of dicts with 'category', 'amount', 'percentage', 'color'
     """
-    summary = get_expense_summary_by_period(user_id, period)
+    return _top_categories(get_expense_summary_by_period(user_id, period), limit)
+
+
+def _top_categories(summary, limit: int):
+    """Format the first `limit` (category, amount) rows of a sorted summary."""
     total = sum(row[1] for row in summary)
     
     result = []
@@ -301,67 +336,52 @@ def get_average_daily_spending(user_id: int, days: int = 30):
     return total / len(daily)
 
 
+@_cached("category_counts")
 def get_expense_count_by_category(user_id: int, period: str = "1M"):
     """Get count of expenses per category.
     
     Returns:
         List of (category, count) tuples
     """
-    today = datetime.now()
-    period_map = {
-        "1D": timedelta(days=1),
-        "1W": timedelta(weeks=1),
-        "1M": timedelta(days=30),
-        "3M": timedelta(days=90),
-        "1Y": timedelta(days=365),
-    }
-    
-    start_date = today - period_map.get(period, timedelta(days=30))
-    
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT category, COUNT(*) 
-        FROM expenses 
-        WHERE user_id = ? AND date >= ?
-        GROUP BY category
-        ORDER BY COUNT(*) DESC
-    """, (user_id, start_date.strftime("%Y-%m-%d")))
+    with session() as cursor:
+        cursor.execute("""
+            SELECT category, SUM(count)
+            FROM expense_daily_rollup
+            WHERE user_id = ? AND day >= ?
+            GROUP BY category
+            ORDER BY SUM(count) DESC
+        """, (user_id, _period_start(period, timedelta(days=30))))
     
-    rows = cursor.fetchall()
-    conn.close()
+        rows = cursor.fetchall()
     return rows
 
 
+@_cached("highest")
 def get_highest_expense(user_id: int, period: str = "1M"):
     """Get the highest single expense in a period.
     
     Returns:
         tuple (id, amount, category, description, date) or None
     """
-    today = datetime.now()
-    period_map = {
-        "1D": timedelta(days=1),
-        "1W": timedelta(weeks=1),
-        "1M": timedelta(days=30),
-        "3M": timedelta(days=90),
-        "1Y": timedelta(days=365),
-    }
-    
-    start_date = today - period_map.get(period, timedelta(days=30))
-    
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id, amount, category, description, date 
-        FROM expenses 
-        WHERE user_id = ? AND date >= ?
-        ORDER BY amount DESC
-        LIMIT 1
-    """, (user_id, start_date.strftime("%Y-%m-%d")))
-    
-    row = cursor.fetchone()
-    conn.close()
+    # The rollup names the day and category holding the maximum; only that
+    # group's expenses are then read to recover the row itself.
+    with session() as cursor:
+        cursor.execute("""
+            SELECT e.id, e.amount, e.category, e.description, e.date
+            FROM (
+                SELECT day, category, max_amount
+                FROM expense_daily_rollup
+                WHERE user_id = ? AND day >= ?
+                ORDER BY max_amount DESC
+                LIMIT 1
+            ) r
+            JOIN expenses e
+              ON e.user_id = ? AND e.date >= r.day AND e.date < r.day || '~'
+             AND e.category = r.category AND e.amount = r.max_amount
+            LIMIT 1
+        """, (user_id, _period_start(period, timedelta(days=30)), user_id))
+    
+        row = cursor.fetchone()
     return row
 
 
@@ -446,26 +466,9 @@ def get_statistics_summary(user_id: int, period: str = "1M"):
     """Get a comprehensive statistics summary.
     
     Returns:
-        dict with all key statistics
+        dict with all key statistics (see compute_statistics)
     """
-    summary = get_expense_summary_by_period(user_id, period)
-    total = sum(row[1] for row in summary)
-    trend = get_spending_trend(user_id, period)
-    top_categories = get_top_spending_categories(user_id, 5, period)
-    highest = get_highest_expense(user_id, period)
-    avg_daily = get_average_daily_spending(user_id, 30)
-    expense_count = get_expense_count_by_category(user_id, period)
-    
-    return {
-        "total_spent": total,
-        "category_count": len(summary),
-        "transaction_count": sum(c[1] for c in expense_count),
-        "trend": trend,
-        "top_categories": top_categories,
-        "highest_expense": highest,
-        "average_daily": avg_daily,
-        "categories": summary,
-    }
+    return compute_statistics(user_id, period)
 
 
 def create_charts_view(page: ft.Page, user_id: int = None):
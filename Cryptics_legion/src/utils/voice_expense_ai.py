@@ -12,25 +12,18 @@ import wave
 import tempfile
 import os
 
+from core.lazy_imports import optional_import
+
 # ── Optional dependencies (graceful degradation) ──
-try:
-    import speech_recognition as sr
-    SPEECH_AVAILABLE = True
-except ImportError:
-    SPEECH_AVAILABLE = False
-
-try:
-    import sounddevice as sd
-    import numpy as np
-    AUDIO_AVAILABLE = True
-except ImportError:
-    AUDIO_AVAILABLE = False
-
-try:
-    import ollama
-    OLLAMA_AVAILABLE = True
-except ImportError:
-    OLLAMA_AVAILABLE = False
+# Imported on first use so loading this module stays cheap
+sr = optional_import("speech_recognition")
+sd = optional_import("sounddevice")
+np = optional_import("numpy")
+ollama = optional_import("ollama")
+
+
+def _audio_available():
+    return sd.available and np.available
 
 
 # ── Ollama System Prompt ──
@@ -84,14 +77,14 @@ class VoiceExpenseAI:
     def check_dependencies():
         """Return list of missing dependency messages. Empty = all good."""
         issues = []
-        if not SPEECH_AVAILABLE:
+        if not sr.available:
             issues.append("SpeechRecognition not installed (pip install SpeechRecognition)")
-        if not AUDIO_AVAILABLE:
+        if not _audio_available():
             issues.append("sounddevice not installed (pip install sounddevice numpy)")
-        if not OLLAMA_AVAILABLE:
+        if not ollama.available:
             issues.append("ollama not installed (pip install ollama)")
 
-        if OLLAMA_AVAILABLE:
+        if ollama.available:
             try:
                 ollama.list()
             except Exception:
@@ -101,7 +94,7 @@ class VoiceExpenseAI:
     # ── Audio Recording ──
     def record_audio(self, duration=5, sample_rate=16000):
         """Record audio using sounddevice and return WAV bytes."""
-        if not AUDIO_AVAILABLE:
+        if not _audio_available():
             return None, "Audio library not available"
 
         try:
@@ -132,7 +125,7 @@ class VoiceExpenseAI:
     # ── Transcription ──
     def transcribe(self, wav_bytes):
         """Transcribe WAV audio bytes using Google Speech Recognition."""
-        if not SPEECH_AVAILABLE:
+        if not sr.available:
             return None, "SpeechRecognition not installed"
 
         recognizer = sr.Recognizer()
@@ -162,7 +155,7 @@ class VoiceExpenseAI:
     # ── AI Parsing via Ollama ──
     def parse_expense(self, user_text):
         """Send text to Ollama, get structured expense data back."""
-        if not OLLAMA_AVAILABLE:
+        if not ollama.available:
             return {"error": "Ollama package not installed"}
 
         self.is_processing = True
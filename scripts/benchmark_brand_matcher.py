@@ -0,0 +1,79 @@
+import random
+import sys
+import time
+sys.path.insert(0, 'Cryptics_legion/src')
+from utils import brand_recognition as br
+
+# Usage: python scripts/benchmark_brand_matcher.py [count]
+# Times identify_brand against the linear scans it replaced on generated
+# descriptions and checks both give the same answer for every one.
+
+
+def linear_identify_brand(input_text):
+    """The original dict-order scans, kept here as the reference."""
+    input_lower = input_text.lower().strip()
+    if input_lower in br.BRAND_DATABASE:
+        return input_lower
+    for brand_name in br.BRAND_DATABASE:
+        if brand_name in input_lower or input_lower in brand_name:
+            return brand_name
+    for category, keywords in br.CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in input_lower:
+                return category
+    return None
+
+
+def compiled_identify_brand(input_text):
+    input_lower = input_text.lower().strip()
+    if input_lower in br.BRAND_DATABASE:
+        return input_lower
+    brand_name = br._match_brand(input_lower)
+    if brand_name is not None:
+        return brand_name
+    rank = br._KEYWORDS_IN_TEXT.first_match(input_lower)
+    return br._KEYWORD_CATEGORIES[rank] if rank is not None else None
+
+
+def make_descriptions(count, seed=42):
+    rng = random.Random(seed)
+    brands = list(br.BRAND_DATABASE)
+    keywords = [k for words in br.CATEGORY_KEYWORDS.values() for k in words]
+    filler = ['paid', 'for', 'the', 'with', 'friends', 'today', 'xq', 'zz', 'order', 'weekly', '2pcs', 'promo']
+    descriptions = []
+    for _ in range(count):
+        words = [rng.choice(filler) for _ in range(rng.randint(0, 5))]
+        kind = rng.random()
+        if kind < 0.35:
+            words.insert(rng.randint(0, len(words)), rng.choice(brands))
+        elif kind < 0.65:
+            words.insert(rng.randint(0, len(words)), rng.choice(keywords))
+        elif kind < 0.8:
+            brand = rng.choice(brands)
+            words = [brand[:rng.randint(1, len(brand))]]  # partially typed
+        descriptions.append(' '.join(words).title() or 'x')
+    return descriptions
+
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+descriptions = make_descriptions(count)
+
+mismatches = [d for d in descriptions if linear_identify_brand(d) != compiled_identify_brand(d)]
+if mismatches:
+    print(f'{len(mismatches)} description(s) resolve differently, e.g. {mismatches[:5]}')
+    sys.exit(1)
+
+timings = {}
+for name, fn in (('linear scan', linear_identify_brand), ('compiled matcher', compiled_identify_brand),
+                 ('identify_brand', br.identify_brand)):
+    start = time.perf_counter()
+    for d in descriptions:
+        fn(d)
+    timings[name] = time.perf_counter() - start
+
+print(f'{count} descriptions, identical results')
+print('Matcher | Total (ms) | Per call (us)')
+print('-' * 45)
+for name, seconds in timings.items():
+    print(f'{name} | {seconds * 1000:.1f} | {seconds / count * 1e6:.2f}')
+print(f"Speed-up: {timings['linear scan'] / timings['compiled matcher']:.1f}x")
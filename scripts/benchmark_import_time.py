@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+# Usage: python scripts/benchmark_import_time.py [runs]
+# Import-time report for app startup: how long `import main` takes next to
+# the floor of flet plus core, which page modules cost the most, and
+# whether any of the heavy optional stacks were pulled in.
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Cryptics_legion', 'src')
+HEAVY = ['torch', 'snac', 'numpy', 'sounddevice', 'speech_recognition', 'ollama']
+BASELINE = 'import flet, core.db, core.theme, core.auth'
+
+
+def import_times(statement):
+    """{module: (depth, self_us, cumulative_us)} from one cold `python -X importtime` run."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            cwd=SRC, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f'`{statement}` failed:\n{result.stderr[-2000:]}')
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times[name.strip()] = (depth, int(self_us), int(cumulative_us))
+    return times
+
+
+def total_ms(times):
+    return sum(cumulative for depth, _, cumulative in times.values() if depth == 0) / 1000
+
+
+runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+app_runs = [import_times('import main') for _ in range(runs)]
+base_runs = [import_times(BASELINE) for _ in range(runs)]
+app = min(app_runs, key=total_ms)
+base = min(base_runs, key=total_ms)
+
+print(f'Best of {runs} cold starts')
+print('Import | Total (ms)')
+print('-' * 40)
+print(f'flet + core | {total_ms(base):.1f}')
+print(f'main | {total_ms(app):.1f}')
+print(f'main over flet + core | {total_ms(app) - total_ms(base):.1f}')
+
+print('\nHeaviest modules imported by main')
+print('Module | Cumulative (ms)')
+print('-' * 40)
+children = [(name, cumulative) for name, (depth, _, cumulative) in app.items()
+            if depth == 1 and name.split('.')[0] in ('ui', 'utils', 'components')]
+for name, cumulative in sorted(children, key=lambda c: c[1], reverse=True)[:10]:
+    print(f'{name} | {cumulative / 1000:.1f}')
+if not children:
+    print('(none - pages load on first navigation)')
+
+loaded = [name for name in HEAVY if name in app]
+print(f"\nHeavy optional stacks at startup: {', '.join(loaded) if loaded else 'none'}")
+sys.exit(1 if loaded else 0)
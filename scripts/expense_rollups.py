@@ -0,0 +1,21 @@
+import sys
+sys.path.insert(0, 'Cryptics_legion/src')
+from core import db
+
+# Usage: python scripts/expense_rollups.py [check|rebuild]
+mode = sys.argv[1] if len(sys.argv) > 1 else 'check'
+if mode == 'rebuild':
+    db.rebuild_expense_rollups()
+    print('Expense rollups rebuilt from the expenses table.')
+
+mismatches = db.verify_expense_rollups()
+if not mismatches:
+    print('Expense rollups match the expenses table.')
+else:
+    print(f'{len(mismatches)} rollup mismatch(es):')
+    print('Table | Key | Expected (count, total) | Actual (count, total)')
+    print('-' * 60)
+    for table, key, expected, actual in mismatches:
+        print(f'{table} | {key} | {expected} | {actual}')
+db.close_pools()
+sys.exit(1 if mismatches else 0)
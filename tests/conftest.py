@@ -0,0 +1,27 @@
+"""
+Shared fixtures: a throwaway database and a user in it
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point core.db at a throwaway database file with its own pool."""
+    path = str(tmp_path / "expense_tracker.db")
+    monkeypatch.setattr(db, "DB_PATH", path)
+    yield path
+    db.close_pools()
+
+
+@pytest.fixture
+def user(temp_db):
+    """Id of "alice", a fresh user in temp_db."""
+    db.insert_user("alice", b"x")
+    return db.get_user_by_username("alice")[0]
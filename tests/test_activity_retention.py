@@ -0,0 +1,100 @@
+"""
+Tests for the activity indexes and retention job (migration 4)
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db
+
+
+def _plan(sql, params):
+    with db.session() as cur:
+        cur.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return " | ".join(row[3] for row in cur.fetchall())
+
+
+def _ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+@pytest.mark.parametrize("sql,params,index", [
+    ("SELECT COUNT(*) FROM user_notifications WHERE user_id = ? AND is_read = 0",
+     (1,), "idx_user_notifications_user_read"),
+    ("SELECT id FROM user_notifications WHERE user_id = ? AND is_read = 0 ORDER BY created_at DESC, id DESC LIMIT ?",
+     (1, 20), "idx_user_notifications_user_read"),
+    ("SELECT id FROM user_notifications WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+     (1, 20), "idx_user_notifications_user_created"),
+    ("SELECT COUNT(*) FROM user_notifications un WHERE un.announcement_id = ? AND un.is_read = 1",
+     (1,), "idx_user_notifications_announcement"),
+    ("SELECT id FROM admin_logs ORDER BY timestamp DESC LIMIT ?",
+     (100,), "idx_admin_logs_timestamp"),
+    ("SELECT badge_id FROM user_badges WHERE user_id = ? AND seen = 0",
+     (1,), "idx_user_badges_user_seen"),
+    ("SELECT id FROM weekly_challenges WHERE user_id = ? AND challenge_type = ? AND week_start = ?",
+     (1, "log_daily", "2025-01-06"), "idx_weekly_challenges_user_week"),
+    ("SELECT id FROM reminders WHERE user_id = ? AND type = ?",
+     (1, "daily_expense"), "idx_reminders_user_type"),
+])
+def test_activity_query_uses_index(temp_db, sql, params, index):
+    plan = _plan(sql, params)
+    assert index in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_old_admin_logs_are_archived(temp_db):
+    db.insert_admin("root", b"x")
+    admin_id = db.get_admin_by_username("root")[0]
+    with db.session() as cur:
+        cur.executemany(
+            "INSERT INTO admin_logs (admin_id, action, details, timestamp) VALUES (?, ?, '', ?)",
+            [(admin_id, "old", _ago(400)), (admin_id, "recent", _ago(1)), (admin_id, "recent", _ago(2))],
+        )
+
+    assert db.purge_old_records(log_days=180)["admin_logs"] == 1
+    assert [row[3] for row in db.get_admin_logs()] == ["recent", "recent"]
+    with db.session() as cur:
+        cur.execute("SELECT action FROM admin_logs_archive")
+        assert cur.fetchall() == [("old",)]
+
+    # Count cap keeps only the newest rows
+    assert db.purge_old_records(max_logs=1)["admin_logs"] == 1
+    assert len(db.get_admin_logs()) == 1
+
+
+def test_only_read_notifications_are_archived(temp_db):
+    db.insert_user("alice", b"x")
+    user_id = db.get_user_by_username("alice")[0]
+    announcement_id = db.add_announcement("Hi", "Hello", target_users=str(user_id))
+    with db.session() as cur:
+        cur.executemany(
+            "INSERT INTO user_notifications (user_id, title, message, is_read, read_at, created_at) VALUES (?, 't', 'm', ?, ?, ?)",
+            [(user_id, 1, _ago(120), _ago(121)), (user_id, 0, None, _ago(300)), (user_id, 1, _ago(1), _ago(1))],
+        )
+        cur.execute("UPDATE user_notifications SET is_read = 1, read_at = ? WHERE announcement_id = ?",
+                    (_ago(100), announcement_id))
+
+    assert db.purge_old_records(notification_days=90)["user_notifications"] == 2
+    assert db.get_unread_notification_count(user_id) == 1
+    assert len(db.get_user_notifications(user_id, include_read=True)) == 2
+
+    # Archived notifications still count towards the announcement's stats
+    announcement = [a for a in db.get_announcements() if a[0] == announcement_id][0]
+    assert announcement[14:16] == (1, 1)
+
+
+def test_read_notifications_capped_per_user(temp_db):
+    db.insert_user("bob", b"x")
+    user_id = db.get_user_by_username("bob")[0]
+    with db.session() as cur:
+        cur.executemany(
+            "INSERT INTO user_notifications (user_id, title, message, is_read, read_at, created_at) VALUES (?, 't', 'm', 1, ?, ?)",
+            [(user_id, _ago(i), _ago(i)) for i in range(10)],
+        )
+
+    assert db.purge_old_records(notifications_per_user=3)["user_notifications"] == 7
+    assert len(db.get_user_notifications(user_id, include_read=True)) == 3
@@ -0,0 +1,71 @@
+"""
+Tests for the ranked prefix-index autocomplete
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db
+
+autocomplete = pytest.importorskip("utils.autocomplete")
+
+
+@pytest.fixture
+def users(user, monkeypatch):
+    """Two users; bob eats at Starbucks a lot, alice keeps logging her gym."""
+    alice = user
+    db.insert_user("bob", b"x")
+    bob = db.get_user_by_username("bob")[0]
+    for description in ["Starbucks"] * 3 + ["Starbucks Reserve"] * 2:
+        db.insert_expense(bob, 5.0, "Food", description, "2025-01-01")
+    for description in ["Stretch Gym", "stretch gym ", "Subway", "Yoga pass"]:
+        db.insert_expense(alice, 5.0, "Other", description, "2025-01-01")
+    monkeypatch.setattr(autocomplete, "_autocomplete", autocomplete.Autocomplete())
+    return alice, bob
+
+
+def test_prefix_index_matches_word_starts():
+    index = autocomplete.PrefixIndex(["uber eats", "uber", "seven-eleven", "starbucks"])
+
+    assert index.matching("ub") == {"uber", "uber eats"}
+    assert index.matching("eat") == {"uber eats"}
+    assert index.matching("elev") == {"seven-eleven"}
+    assert index.matching("tarb") == set()
+    index.add("eat bulaga")
+    assert index.matching("eat") == {"uber eats", "eat bulaga"}
+
+
+def test_ranked_by_personal_then_global_usage(users):
+    alice, bob = users
+
+    names = [s["name"] for s in autocomplete.suggest("st", user_id=alice, limit=3)]
+    # alice's own twice-used description first, then the globally popular brand
+    assert names[:2] == ["Stretch Gym", "Starbucks"]
+    # bob's descriptions never leak to alice
+    assert autocomplete.suggest("starbucks r", user_id=alice) == []
+    assert autocomplete.suggest("starbucks r", user_id=bob)[0]["name"] == "Starbucks Reserve"
+
+    first = autocomplete.suggest("su", user_id=alice)[0]
+    assert first["name"] == "Subway"
+    assert (first["uses"], first["is_brand"], first["category"]) == (1, True, "Food & Dining")
+
+
+def test_new_expenses_merge_in_incrementally(users):
+    alice, _ = users
+    # Used once so far: not suggested back yet
+    assert [s["name"] for s in autocomplete.suggest("yoga", user_id=alice)] == []
+
+    autocomplete.record_description_use(alice, "Yoga pass")
+
+    top = autocomplete.suggest("yoga", user_id=alice)[0]
+    assert (top["name"], top["uses"]) == ("Yoga pass", 2)
+
+
+def test_brand_suggestions_stay_name_lists(users):
+    from utils.brand_recognition import get_brand_suggestions
+
+    assert get_brand_suggestions("s") == []
+    assert get_brand_suggestions("starb", limit=2) == ["Starbucks"]
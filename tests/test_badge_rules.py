@@ -0,0 +1,118 @@
+"""
+Tests for the declarative badge rules and the per-user gamification counters
+"""
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db, migrations
+
+# utils/__init__ pulls in the Flet statistics helpers
+gamification = pytest.importorskip("utils.gamification")
+
+NOON = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+def _counters(user_id):
+    with db.session() as cur:
+        cur.execute("SELECT categories_used, voice_expenses, challenges_completed "
+                    "FROM user_gamification_state WHERE user_id = ?", (user_id,))
+        return cur.fetchone()
+
+
+def test_rules_are_indexed_by_metric():
+    rules = gamification.BADGE_RULES
+
+    assert [badge_id for badge_id, _, _ in rules["expense_count"]] == [
+        "first_steps", "penny_counter", "expense_pro", "data_machine", "expense_legend"]
+    assert {badge_id for badge_id, _, _ in rules["hour"]} == {"night_owl", "early_bird"}
+    # Budget badges have no rule and are never evaluated here
+    assert not any(badge_id == "budget_keeper" for entries in rules.values() for badge_id, _, _ in entries)
+
+    with pytest.raises(ValueError):
+        gamification.compile_badge_rules({"odd": {"rule": ("level", "~", 3)}})
+
+
+def test_counters_follow_expense_and_challenge_changes(user):
+    first = db.insert_expense(user, 5.0, "Food", "Lunch", "2025-01-01")
+    db.insert_expense(user, 5.0, "Food", "Dinner", "2025-01-01")
+    db.insert_expense(user, 5.0, "Transport", "Bus", "2025-01-01")
+    assert _counters(user) == (2, 0, 0)
+
+    db.update_expense_row(first, user, 5.0, "Bills", "Lunch", "2025-01-01")
+    assert _counters(user)[0] == 3
+    db.delete_expense_row(first, user)
+    assert _counters(user)[0] == 2
+
+    db.upsert_challenge(user, "voice_log", 3, 30)
+    db.complete_challenge(db.get_active_challenges(user)[0][0])
+    assert _counters(user) == (2, 0, 1)
+
+    with db.session() as cur:
+        migrations.rebuild_expense_rollups(cur)
+    assert _counters(user) == (2, 0, 1)
+
+
+def test_only_rules_on_changed_metrics_are_evaluated(user):
+    pipeline = gamification.GamificationPipeline(user, now=NOON)
+    # Qualifies for first_steps on paper, but no expense metric has changed
+    pipeline.metrics["expense_count"] = 1
+    assert pipeline.check_badges() == []
+
+    pipeline.expense_logged()
+    assert pipeline.check_badges() == ["first_steps"]
+    assert pipeline.check_badges() == []
+
+
+def test_voice_and_challenge_badges(user):
+    for _ in range(10):
+        db.insert_expense(user, 5.0, "Food", "Lunch", NOON.strftime("%Y-%m-%d"))
+        pipeline = gamification.GamificationPipeline(user, now=NOON)
+        pipeline.expense_logged(via_voice=True)
+        unlocked = pipeline.check_badges()
+        pipeline.commit()
+    assert unlocked == ["penny_counter", "voice_commander"]
+    assert _counters(user)[1] == 10
+
+    with db.session() as cur:
+        cur.executemany("INSERT INTO weekly_challenges (user_id, challenge_type, target_value, xp_reward, week_start) "
+                        "VALUES (?, 'voice_log', 3, 30, ?)", [(user, f"2025-01-{d:02d}") for d in range(1, 6)])
+        cur.execute("UPDATE weekly_challenges SET completed = 1 WHERE user_id = ?", (user,))
+
+    # A full check (as BadgeEngine.check_all) picks up counters changed elsewhere
+    assert gamification.GamificationPipeline(user, now=NOON).check_badges(full=True) == ["challenge_champ"]
+
+
+def test_login_awards_badges_already_earned(user):
+    # Completed before challenge_champ was earnable, so no metric will change for it
+    with db.session() as cur:
+        cur.executemany("INSERT INTO weekly_challenges (user_id, challenge_type, target_value, xp_reward, week_start) "
+                        "VALUES (?, 'voice_log', 3, 30, ?)", [(user, f"2025-01-{d:02d}") for d in range(1, 6)])
+        cur.execute("UPDATE weekly_challenges SET completed = 1 WHERE user_id = ?", (user,))
+
+    assert "challenge_champ" in gamification.on_user_login(user)["new_badges"]
+
+
+def test_migration_backfills_counters(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+    cur = conn.cursor()
+    for _, _, step in migrations.MIGRATIONS[:7]:
+        step(cur)
+    cur.execute("PRAGMA user_version = 7")
+    cur.executemany("INSERT INTO expenses (user_id, amount, category, description, date) VALUES (?, 1, ?, '', '2025-01-01')",
+                    [(1, "Food"), (1, "Food"), (1, "Bills"), (2, "Food")])
+    cur.execute("INSERT INTO weekly_challenges (user_id, challenge_type, target_value, week_start, completed) "
+                "VALUES (2, 'daily_log', 7, '2025-01-06', 1)")
+    conn.commit()
+
+    migrations.apply_migrations(conn)
+
+    cur.execute("SELECT user_id, categories_used, voice_expenses, challenges_completed "
+                "FROM user_gamification_state ORDER BY user_id")
+    assert cur.fetchall() == [(1, 2, 0, 0), (2, 1, 0, 1)]
+    conn.close()
@@ -0,0 +1,66 @@
+"""
+Tests for the compiled brand/keyword matcher behind identify_brand
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+br = pytest.importorskip("utils.brand_recognition")
+
+
+def _linear_identify_brand(input_text):
+    """The dict-order scans identify_brand used before the matcher was compiled."""
+    input_lower = input_text.lower().strip()
+    if input_lower in br.BRAND_DATABASE:
+        return br.BRAND_DATABASE[input_lower]["category"], True
+    for brand_name, info in br.BRAND_DATABASE.items():
+        if brand_name in input_lower or input_lower in brand_name:
+            return info["category"], True
+    for category, keywords in br.CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in input_lower:
+                return category, False
+    return input_text.title(), False
+
+
+def _identify(text):
+    result = br.identify_brand(text)
+    return result["category"], result["is_brand"]
+
+
+@pytest.mark.parametrize("text", [
+    "Jollibee", "  jollibee  ", "lunch at jollibee", "jol", "ee", "b", "   ",
+    "grab ride home", "grabfood delivery", "uber eats", "weekly groceries", "parking fee",
+    "phone bill", "sneakers", "zzqx", "ÜBER café", "a",
+])
+def test_matches_linear_scan(text):
+    assert _identify(text) == _linear_identify_brand(text)
+
+
+def test_matches_linear_scan_on_generated_descriptions():
+    rng = random.Random(7)
+    brands = list(br.BRAND_DATABASE)
+    keywords = [k for words in br.CATEGORY_KEYWORDS.values() for k in words]
+    for _ in range(2000):
+        pick = rng.choice(brands + keywords)
+        start = rng.randint(0, len(pick) - 1)
+        text = f"{rng.choice(['', 'paid ', 'x'])}{pick[start:start + rng.randint(1, len(pick))]}{rng.choice(['', ' 2pcs', 'z'])}"
+        assert _identify(text) == _linear_identify_brand(text), text
+
+
+def test_automaton_returns_lowest_rank():
+    automaton = br._KeywordAutomaton([("he", 2), ("she", 1), ("hers", 0), ("his", 3)])
+    assert automaton.first_match("ushers") == 0
+    assert automaton.first_match("ushe") == 1
+    assert automaton.first_match("this") == 3
+    assert automaton.first_match("xyz") is None
+
+    trie = br._SubstringTrie([("abc", 1), ("bcd", 0)])
+    assert trie.containing("bc") == 0
+    assert trie.containing("ab") == 1
+    assert trie.containing("") == 0
+    assert trie.containing("ac") is None
@@ -0,0 +1,65 @@
+"""
+Tests for the shared, cached category/brand resolver
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+resolver = pytest.importorskip("utils.category_resolver")
+from utils.brand_recognition import identify_brand
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    resolver.clear_resolver_cache()
+    yield
+    resolver.clear_resolver_cache()
+
+
+def _first_key_in(table, text):
+    lower = text.lower()
+    return next((key for key in table if key in lower), None)
+
+
+@pytest.mark.parametrize("text", [
+    "Lunch at Jollibee", "jollibee", "Grab ride", "Starbucks coffee", "Monthly rent",
+    "Food", "Groceries", "Salary", "Netflix", "zzqx", "",
+])
+def test_matches_the_per_view_lookups(text):
+    info = resolver.resolve_category(text)
+    recognized = identify_brand(text)
+
+    assert {k: info[k] for k in ("display_name", "category", "icon", "color", "is_brand")} == \
+        {k: recognized[k] for k in ("display_name", "category", "icon", "color", "is_brand")}
+
+    brand_key = _first_key_in(resolver.BRAND_LOGOS, text)
+    assert info["brand"] == (resolver.BRAND_LOGOS[brand_key] if brand_key else None)
+    if brand_key is None:
+        emoji_key = _first_key_in(resolver.CATEGORY_EMOJIS, text)
+        expected = resolver.CATEGORY_EMOJIS[emoji_key] if emoji_key else {"icon": "📦", "bg": "#6B7280"}
+        assert (info["emoji"], info["bg"]) == (expected["icon"], expected["bg"])
+
+    color_key = _first_key_in(resolver.CATEGORY_COLORS, text)
+    expected_color = (resolver.CATEGORY_COLORS[color_key] if color_key
+                      else resolver.DEFAULT_COLORS[hash(text) % len(resolver.DEFAULT_COLORS)])
+    assert info["chart_color"] == expected_color
+
+
+def test_repeat_lookups_hit_the_cache():
+    for _ in range(3):
+        resolver.resolve_category("Food")
+        resolver.resolve_category("Transport")
+
+    info = resolver.resolver_cache_info()
+    assert (info["hits"], info["misses"], info["size"]) == (4, 2, 2)
+    assert resolver.resolve_category("Food") is resolver.resolve_category("Food")
+
+
+def test_cache_is_bounded():
+    for i in range(resolver.CATEGORY_RESOLVER_MAX_ENTRIES + 50):
+        resolver.resolve_category(f"custom {i}")
+
+    assert resolver.resolver_cache_info()["size"] == resolver.CATEGORY_RESOLVER_MAX_ENTRIES
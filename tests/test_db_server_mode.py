@@ -0,0 +1,104 @@
+"""
+Tests for the server storage mode (WAL + serialized writer) in core/db.py
+"""
+import os
+import sqlite3
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db
+
+
+@pytest.fixture
+def server_db(temp_db, monkeypatch):
+    """Throwaway database running in server mode."""
+    monkeypatch.setattr(db, "DB_MODE", "server")
+    return temp_db
+
+
+def test_server_mode_enables_wal_and_pragmas(server_db):
+    with db.session() as cur:
+        cur.execute("PRAGMA synchronous")
+        assert cur.fetchone()[0] == 1  # NORMAL
+        cur.execute("PRAGMA busy_timeout")
+        assert cur.fetchone()[0] == 10000
+
+    conn = sqlite3.connect(server_db)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_concurrent_writes_are_serialized(server_db):
+    db.insert_user("alice", b"x")
+    user_id = db.get_user_by_username("alice")[0]
+    account_id = db.insert_account(user_id, "Cash", "", "cash", 1000.0, "PHP", "#fff", "2025-01-01")
+
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(25):
+                db.insert_expense(user_id, 1.0, "Food", "", "2025-01-02", account_id)
+                db.add_user_xp(user_id, 1)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert db.get_expense_count_by_user(user_id) == 200
+    assert db.get_user_xp(user_id)["xp"] == 200
+    assert db.get_account_by_id(account_id, user_id)[4] == pytest.approx(800.0)
+
+
+def test_failing_write_does_not_affect_its_batch(server_db):
+    db.insert_user("bob", b"x")
+
+    @db.serialized_write
+    def broken_write():
+        with db.session() as cur:
+            cur.execute("INSERT INTO users (username, password) VALUES ('carol', x'00')")
+            raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        broken_write()
+
+    assert db.get_user_by_username("carol") is None
+    assert db.insert_user("dave", b"x")
+    assert db.get_user_by_username("dave") is not None
+
+
+def test_nested_write_helpers_run_inline_on_writer(server_db):
+    db.insert_user("erin", b"x")
+    user_id = db.get_user_by_username("erin")[0]
+
+    # init_default_reminders calls upsert_reminder from the writer thread
+    db.init_default_reminders(user_id)
+    assert len(db.get_user_reminders(user_id)) == 5
+
+
+def test_account_selection_and_data_deletion_go_through_writer(server_db):
+    db.insert_user("frank", b"x")
+    user_id = db.get_user_by_username("frank")[0]
+    account_id = db.insert_account(user_id, "Wallet", "", "Cash", 100.0, "PHP", "#000", "2025-01-01 00:00:00")
+    db.insert_expense(user_id, 10.0, "Food", "Lunch", "2025-01-01", account_id)
+
+    # A selection pointing at a missing account is cleared by the writer
+    db.set_selected_account(user_id, account_id + 1)
+    db.get_selected_account(user_id)
+    with db.session() as cur:
+        cur.execute("SELECT selected_account_id FROM users WHERE id = ?", (user_id,))
+        assert cur.fetchone()[0] is None
+
+    db.delete_user_data(user_id)
+    assert db.get_user_by_username("frank") is None
+    assert db.get_expense_count_by_user(user_id) == 0
+    assert db.get_account_by_id(account_id, user_id) is None
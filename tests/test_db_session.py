@@ -0,0 +1,60 @@
+"""
+Tests for the pooled connection / session() API in core/db.py
+"""
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db
+
+
+def test_session_commits_and_reuses_connection(temp_db):
+    assert db.insert_user("alice", b"x")
+    user_id = db.get_user_by_username("alice")[0]
+
+    pool = db.get_pool()
+    before = pool._created
+    for _ in range(20):
+        db.get_user_profile(user_id)
+    assert pool._created == before == 1
+
+
+def test_nested_sessions_share_one_transaction(temp_db):
+    db.insert_user("bob", b"x")
+    user_id = db.get_user_by_username("bob")[0]
+
+    with pytest.raises(RuntimeError):
+        with db.session():
+            db.insert_expense(user_id, 10.0, "Food", "", "2025-01-01")
+            raise RuntimeError("abort")
+
+    # The inner helper joined the outer transaction, so it was rolled back too
+    assert db.select_expenses_by_user(user_id) == []
+
+
+def test_pool_is_bounded_across_threads(temp_db, monkeypatch):
+    db.insert_user("carol", b"x")
+    pool = db.get_pool()
+    monkeypatch.setattr(pool, "max_size", 2)
+
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(50):
+                db.get_recent_usernames()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert pool._created <= 2
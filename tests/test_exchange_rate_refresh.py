@@ -0,0 +1,142 @@
+"""
+Offline tests for the stale-while-revalidate exchange-rate refresh, using a
+local stub HTTP server in place of the rate APIs
+"""
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+pytest.importorskip("requests")
+
+from core import db
+from utils import currency_exchange
+
+OLD_RATES = {"USD": 1.0, "PHP": 50.0, "EUR": 0.8}
+NEW_RATES = {"USD": 1.0, "PHP": 58.0, "EUR": 0.92, "XYZ": 3.0}
+
+
+class StubRatesServer(ThreadingHTTPServer):
+    """Serves {"rates": NEW_RATES} under /primary/<base> and /backup/<base>."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubRatesHandler)
+        self.requests = []
+        self.failing = set()
+        self.delay = 0.0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubRatesHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        time.sleep(self.server.delay)
+        if self.path.split("/")[1] in self.server.failing:
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = json.dumps({"rates": NEW_RATES}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    stub = StubRatesServer()
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(currency_exchange, "API_BASE_URL", f"{stub.url}/primary")
+    monkeypatch.setattr(currency_exchange, "BACKUP_API_URL", f"{stub.url}/backup")
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+@pytest.fixture
+def api(temp_db, tmp_path, monkeypatch):
+    """An API instance whose cache file holds rates that expired an hour ago.
+
+    Refreshes record rate history, so the database is a throwaway one too.
+    """
+    cache_file = tmp_path / "exchange_rates_cache.json"
+    expired = datetime.now() - timedelta(hours=currency_exchange.CACHE_DURATION_HOURS + 1)
+    cache_file.write_text(json.dumps({"timestamp": expired.isoformat(), "base": "USD", "rates": OLD_RATES}))
+    monkeypatch.setattr(currency_exchange, "CACHE_FILE", cache_file)
+    return currency_exchange.CurrencyExchangeAPI()
+
+
+def test_expired_rates_served_immediately_then_refreshed(server, api):
+    server.delay = 0.3
+    landed = threading.Event()
+    received = []
+    api.subscribe(lambda rates: (received.append(rates), landed.set()))
+
+    started = time.monotonic()
+    assert api.get_exchange_rate("USD", "PHP") == 50.0
+    assert time.monotonic() - started < server.delay
+
+    assert landed.wait(5)
+    assert received == [{"USD": 1.0, "PHP": 58.0, "EUR": 0.92}]
+    assert api.get_exchange_rate("USD", "PHP") == 58.0
+    assert server.requests == ["/primary/USD"]
+    assert json.loads(api.cache_file.read_text())["rates"]["PHP"] == 58.0
+    # The refresh was recorded in the test's own database
+    assert ("PHP", 58.0) in [(currency, rate) for currency, _, rate in db.get_exchange_rate_history()]
+
+
+def test_concurrent_sessions_share_one_refresh(server, api):
+    server.delay = 0.2
+    landed = threading.Event()
+    api.subscribe(lambda rates: landed.set())
+    barrier = threading.Barrier(8)
+    served = []
+
+    def session():
+        barrier.wait()
+        served.append(api.get_exchange_rates()["PHP"])
+
+    threads = [threading.Thread(target=session) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert landed.wait(5)
+    assert len(served) == 8
+    assert server.requests == ["/primary/USD"]
+
+
+def test_backup_api_used_when_primary_fails(server, api):
+    server.failing = {"primary"}
+
+    rates = api.get_exchange_rates(force_refresh=True)
+
+    assert rates["PHP"] == 58.0
+    assert server.requests == ["/primary/USD", "/backup/USD"]
+
+
+def test_failed_refresh_keeps_stale_rates_and_backs_off(server, api):
+    server.failing = {"primary", "backup"}
+
+    assert api.get_exchange_rates() == OLD_RATES
+    assert api.refresh_in_background().result(5) is None
+    assert api.get_exchange_rates() == OLD_RATES
+    assert api.refresh_in_background().result(5) is None
+    # The first attempt tried both APIs; later ones wait out REFRESH_RETRY_SECONDS
+    assert server.requests == ["/primary/USD", "/backup/USD"]
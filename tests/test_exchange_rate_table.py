@@ -0,0 +1,144 @@
+"""
+Tests for the in-memory exchange-rate table in utils/currency_exchange.py
+"""
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+pytest.importorskip("requests")
+
+from utils import currency_exchange
+
+RATES = {"USD": 1.0, "PHP": 56.0, "EUR": 0.9, "JPY": 150.0}
+
+
+@pytest.fixture
+def api(temp_db, tmp_path, monkeypatch):
+    """An API instance with its own cache file and a counting fake fetch.
+
+    Refreshes record rate history, so the database is a throwaway one too.
+    """
+    monkeypatch.setattr(currency_exchange, "CACHE_FILE", tmp_path / "exchange_rates_cache.json")
+    instance = currency_exchange.CurrencyExchangeAPI()
+    instance.fetches = []
+
+    def fetch(base="USD"):
+        instance.fetches.append(base)
+        return dict(RATES)
+
+    instance._fetch_from_api = fetch
+    return instance
+
+
+def _write_cache(path, rates, age_hours=0):
+    timestamp = datetime.now() - timedelta(hours=age_hours)
+    path.write_text(json.dumps({"timestamp": timestamp.isoformat(), "base": "USD", "rates": rates}))
+
+
+def test_conversions_do_not_touch_disk(api, monkeypatch):
+    api.get_exchange_rates()
+    assert api.cache_file.exists()
+
+    def no_disk(*args, **kwargs):
+        raise AssertionError("cache file read on the hot path")
+
+    monkeypatch.setattr(json, "load", no_disk)
+    for _ in range(100):
+        assert api.convert_currency(56.0, "PHP", "USD") == 1.0
+        assert api.get_exchange_rate("USD", "EUR") == 0.9
+    assert api.fetches == ["USD"]
+    assert api.get_cache_age() == "Just now"
+
+
+def test_newer_file_is_reloaded_by_mtime(api, monkeypatch):
+    monkeypatch.setattr(currency_exchange, "RELOAD_CHECK_SECONDS", 0)
+    api.get_exchange_rates()
+
+    # Another process refreshes the shared cache file
+    _write_cache(api.cache_file, dict(RATES, PHP=58.0))
+    os.utime(api.cache_file, ns=(os.stat(api.cache_file).st_atime_ns, os.stat(api.cache_file).st_mtime_ns + 10**9))
+
+    assert api.get_exchange_rate("USD", "PHP") == 58.0
+    assert api.fetches == ["USD"]
+
+
+def test_valid_file_is_used_without_fetching(api):
+    _write_cache(api.cache_file, RATES, age_hours=1)
+
+    assert api.get_exchange_rates() == RATES
+    assert api.fetches == []
+    assert api.get_cache_age() == "1 hour ago"
+
+
+def test_expired_rates_are_served_when_fetch_fails(api):
+    _write_cache(api.cache_file, RATES, age_hours=currency_exchange.CACHE_DURATION_HOURS + 1)
+    api._fetch_from_api = lambda base="USD": None
+
+    assert api.get_exchange_rates() == RATES
+
+
+def test_cross_rates_match_pairwise_formula(api):
+    rates = api.get_exchange_rates()
+    matrix = currency_exchange.build_cross_rates(rates)
+    n = len(currency_exchange.SUPPORTED_CURRENCIES)
+
+    assert len(matrix) == n * n
+    for i, source in enumerate(currency_exchange.SUPPORTED_CURRENCIES):
+        for j, target in enumerate(currency_exchange.SUPPORTED_CURRENCIES):
+            assert matrix[i * n + j] == pytest.approx(rates.get(target, 1.0) / rates.get(source, 1.0))
+
+    assert api.get_rates_for("PHP")["USD"] == round(1 / 56.0, 4)
+    assert api.get_all_rates_formatted("USD")["JPY"] == (150.0, "150.0000 JPY")
+
+
+def test_convert_many_matches_single_conversions(api):
+    amounts = [100.0, 2.5, 33.33, 0.0, 12.0]
+    codes = ["PHP", "USD", "EUR", "JPY", "XYZ"]
+
+    converted = api.convert_many(amounts, codes, "EUR")
+
+    assert converted == [round(api.convert_currency(a, c, "EUR"), 2) for a, c in zip(amounts, codes)]
+    assert api.convert_many([56.0, 112.0], "PHP", "USD") == [1.0, 2.0]
+
+
+def test_matrix_is_built_once_per_refresh(api, monkeypatch):
+    builds = []
+    build = currency_exchange.build_cross_rates
+    monkeypatch.setattr(currency_exchange, "build_cross_rates", lambda rates: builds.append(1) or build(rates))
+
+    api.get_exchange_rates()
+    for _ in range(50):
+        api.convert_currency(10.0, "PHP", "JPY")
+    api.convert_many([1.0] * 1000, "EUR", "PHP")
+    assert len(builds) == 1
+
+    api.get_exchange_rates(force_refresh=True)
+    api.convert_currency(10.0, "PHP", "JPY")
+    assert len(builds) == 2
+
+
+def test_mixed_currency_total(api, monkeypatch):
+    currency = pytest.importorskip("utils.currency")
+    monkeypatch.setattr(currency_exchange, "_exchange_api", api)
+
+    # Account balances in three currencies, totalled in pesos
+    assert currency.convert_total([100.0, 10.0, 1500.0], ["PHP", "USD", "JPY"], "PHP") == pytest.approx(100.0 + 560.0 + 560.0)
+    assert currency.convert_total([], [], "PHP") == 0
+
+
+def test_large_mixed_batch(api):
+    codes = ["PHP", "USD", "EUR", "JPY", "XYZ"] * 4000
+    amounts = [round(i * 0.37 % 5000, 2) for i in range(len(codes))]
+
+    converted = api.convert_many(amounts, codes, "PHP")
+
+    # Above VECTORIZE_MIN_BATCH numpy does the multiply when installed; its
+    # rounding may differ from round() at an exact half cent
+    assert len(codes) >= currency_exchange.VECTORIZE_MIN_BATCH
+    assert converted == pytest.approx([a * api._rate(c, "PHP") for a, c in zip(amounts, codes)], abs=0.0051)
+    assert api.convert_many(amounts, "USD", "PHP") == pytest.approx([a * 56.0 for a in amounts], abs=0.0051)
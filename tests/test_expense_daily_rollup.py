@@ -0,0 +1,115 @@
+"""
+Tests for the daily expense rollup (migration 6) and the statistics
+period queries it backs
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db
+
+
+def _day(days_ago, suffix=""):
+    return (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d") + suffix
+
+
+@pytest.fixture
+def user(user):
+    """The shared user, with expenses spread over the last few months."""
+    for i in range(40):
+        db.insert_expense(user, float(i % 7 + 1), ["Food", "Travel", "Bills"][i % 3], f"e{i}",
+                          _day(i * 3, " 09:30" if i % 4 == 0 else ""))
+    return user
+
+
+def _rollup(user_id, day, category):
+    with db.session() as cur:
+        cur.execute("SELECT total, count, max_amount FROM expense_daily_rollup "
+                    "WHERE user_id = ? AND day = ? AND category = ?", (user_id, day, category))
+        return cur.fetchone()
+
+
+def test_rollup_tracks_max_through_deletes_and_moves(user):
+    day = _day(200)
+    small = db.insert_expense(user, 3.0, "Gifts", "", day)
+    big = db.insert_expense(user, 9.0, "Gifts", "", f"{day} 20:00")
+    assert _rollup(user, day, "Gifts") == (12.0, 2, 9.0)
+
+    db.delete_expense_row(big, user)
+    assert _rollup(user, day, "Gifts") == (3.0, 1, 3.0)
+
+    # Moving the last expense to another day empties the old group
+    db.update_expense_row(small, user, 4.0, "Gifts", "", _day(201))
+    assert _rollup(user, day, "Gifts") is None
+    assert _rollup(user, _day(201), "Gifts") == (4.0, 1, 4.0)
+    assert db.verify_expense_rollups() == []
+
+
+def test_rebuild_restores_daily_rollup(user):
+    with db.session() as cur:
+        cur.execute("DELETE FROM expense_daily_rollup WHERE user_id = ?", (user,))
+
+    assert {m[0] for m in db.verify_expense_rollups()} == {"expense_daily_rollup"}
+    db.rebuild_expense_rollups()
+    assert db.verify_expense_rollups() == []
+
+
+def test_weekly_total_reads_the_rollup(user):
+    today = datetime.now()
+    monday = (today - timedelta(days=today.weekday())).strftime("%Y-%m-%d")
+    db.insert_expense(user, 2.5, "Food", "", f"{monday} 00:05")
+    with db.session() as cur:
+        cur.execute("SELECT SUM(amount) FROM expenses WHERE user_id = ? AND date >= ?", (user, monday))
+        raw = cur.fetchone()[0]
+
+    assert db.get_weekly_total(user) == pytest.approx(raw)
+    assert db.verify_expense_rollups() == []
+
+
+def test_verify_reports_the_drifted_week(user):
+    day = _day(200)
+    db.insert_expense(user, 3.0, "Gifts", "", day)
+    with db.session() as cur:
+        cur.execute("UPDATE expense_daily_rollup SET total = 7 WHERE user_id = ? AND day = ?", (user, day))
+
+    monday = datetime.strptime(day, "%Y-%m-%d")
+    monday = (monday - timedelta(days=monday.weekday())).strftime("%Y-%m-%d")
+    keys = [m[1] for m in db.verify_expense_rollups()]
+    assert keys == [(user, day, "Gifts"), (user, monday)]
+
+
+@pytest.mark.parametrize("period", ["1D", "1W", "1M", "3M", "1Y", "ALL"])
+def test_period_queries_match_raw_expenses(user, period):
+    statistics = pytest.importorskip("utils.statistics")
+    start = statistics._period_start(period, timedelta(weeks=1)) if period != "ALL" else ""
+
+    with db.session() as cur:
+        cur.execute("SELECT category, SUM(amount), COUNT(*), MAX(amount) FROM expenses "
+                    "WHERE user_id = ? AND date >= ? GROUP BY category", (user, start))
+        raw = {r[0]: r[1:] for r in cur.fetchall()}
+
+    summary = statistics.get_expense_summary_by_period(user, period)
+    assert dict(summary) == {c: pytest.approx(v[0]) for c, v in raw.items()}
+    assert [r[1] for r in summary] == sorted((r[1] for r in summary), reverse=True)
+
+    result = statistics.get_statistics_summary(user, period)
+    assert result["transaction_count"] == sum(v[1] for v in raw.values())
+    if period != "ALL":
+        assert dict(statistics.get_expense_count_by_category(user, period)) == {c: v[1] for c, v in raw.items()}
+        highest = statistics.get_highest_expense(user, period)
+        assert highest[1] == max((v[2] for v in raw.values()), default=None)
+
+
+def test_daily_expenses_fold_timestamped_dates(user):
+    statistics = pytest.importorskip("utils.statistics")
+
+    daily = dict(statistics.get_daily_expenses(user, 7))
+
+    # Day 0 holds expense 0 (amount 1, stored with a time of day)
+    assert daily[_day(0)] == 1.0
+    assert daily[_day(3)] == 2.0
+    assert daily[_day(1)] == 0
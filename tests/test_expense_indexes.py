@@ -0,0 +1,98 @@
+"""
+Query-plan tests for the expense indexes (migration 3) and the expense rollups
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db
+
+
+def _plan(sql, params):
+    with db.session() as cur:
+        cur.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return " | ".join(row[3] for row in cur.fetchall())
+
+
+# (query as issued by core/db.py or utils/statistics.py, params, table or alias
+#  that must not be scanned, expected index, covering)
+QUERIES = [
+    # select_expenses_by_user
+    ("SELECT id, user_id, amount, category, description, date, account_id FROM expenses WHERE user_id = ? ORDER BY date DESC",
+     (1,), "expenses", "idx_expenses_user_date", False),
+    # select_expenses_by_user with an account filter
+    ("SELECT id, user_id, amount, category, description, date, account_id FROM expenses WHERE user_id = ? AND account_id = ? ORDER BY date DESC",
+     (1, 2), "expenses", "idx_expenses_user_account_date", False),
+    # select_expenses_page, a scroll page
+    (db._EXPENSE_WITH_ACCOUNT_SQL + " WHERE e.user_id = ? AND (e.date, e.id) < (?, ?) ORDER BY e.date DESC, e.id DESC LIMIT ?",
+     (1, "2025-01-03", 10, 51), "e", "idx_expenses_user_date", False),
+    # select_expenses_page with an account filter
+    (db._EXPENSE_WITH_ACCOUNT_SQL + " WHERE e.user_id = ? AND e.account_id = ? AND (e.date, e.id) < (?, ?) "
+     "ORDER BY e.date DESC, e.id DESC LIMIT ?",
+     (1, 2, "2025-01-03", 10, 51), "e", "idx_expenses_user_account_date", False),
+    # get_last_expense_date
+    ("SELECT date FROM expenses WHERE user_id = ? ORDER BY date DESC LIMIT 1",
+     (1,), "expenses", "idx_expenses_user_date", True),
+    # get_weekly_total
+    ("SELECT SUM(total) FROM expense_daily_rollup WHERE user_id = ? AND day >= ?",
+     (1, "2025-01-01"), "expense_daily_rollup", "PRIMARY KEY", False),
+    # get_today_expense_count
+    ("SELECT COUNT(*) FROM expenses WHERE user_id = ? AND date >= ? AND date < ?",
+     (1, "2025-01-01", "2025-01-02"), "expenses", "idx_expenses_user_date", True),
+    # statistics.compute_statistics, the highest expense of a day and category
+    ("SELECT id, amount, category, description, date FROM expenses "
+     "WHERE user_id = ? AND date >= ? AND date < ? || '~' AND category = ? AND amount = ? LIMIT 1",
+     (1, "2025-01-01", "2025-01-01", "Food", 5.0), "expenses", "idx_expenses_user_date", False),
+    # total_expenses_by_user and the first page of select_expenses_page
+    ("SELECT total_amount FROM user_expense_stats WHERE user_id=? AND expense_count > 0",
+     (1,), "user_expense_stats", "INTEGER PRIMARY KEY", False),
+    # total_expenses_by_account
+    ("SELECT total_amount FROM account_expense_stats WHERE user_id=? AND account_id=?",
+     (1, 2), "account_expense_stats", "sqlite_autoindex_account_expense_stats_1", False),
+    # get_account_budgets, spend per account from the rollup
+    ("SELECT a.user_id, a.id, a.name, a.balance, a.currency, COALESCE(s.total_amount, 0) FROM accounts a "
+     "LEFT JOIN account_expense_stats s ON s.user_id = a.user_id AND s.account_id = a.id "
+     "WHERE a.user_id IN (?, ?) AND a.status = 'active' ORDER BY a.user_id, a.sort_order ASC, a.created_at DESC",
+     (1, 2), "s", "sqlite_autoindex_account_expense_stats_1", False),
+    # category_summary_by_user
+    ("SELECT category, total_amount FROM category_expense_stats WHERE user_id=? ORDER BY category",
+     (1,), "category_expense_stats", "sqlite_autoindex_category_expense_stats_1", False),
+    # statistics.get_expense_summary_by_period
+    ("SELECT category, SUM(total) FROM expense_daily_rollup WHERE user_id = ? AND day >= ? GROUP BY category ORDER BY SUM(total) DESC",
+     (1, "2025-01-01"), "expense_daily_rollup", "PRIMARY KEY", False),
+    # statistics.get_daily_expenses
+    ("SELECT day, SUM(total) FROM expense_daily_rollup WHERE user_id = ? AND day >= ? GROUP BY day ORDER BY day ASC",
+     (1, "2025-01-01"), "expense_daily_rollup", "PRIMARY KEY", False),
+]
+
+
+@pytest.mark.parametrize("sql,params,table,index,covering", QUERIES)
+def test_expense_query_uses_index(temp_db, sql, params, table, index, covering):
+    plan = _plan(sql, params)
+
+    assert index in plan
+    assert f"SCAN {table}" not in plan
+    if covering:
+        assert f"COVERING INDEX {index}" in plan
+
+
+def test_ordered_list_needs_no_sort(temp_db):
+    plan = _plan(QUERIES[0][0], QUERIES[0][1])
+    assert "TEMP B-TREE" not in plan
+
+
+def test_today_count_matches_like_semantics(temp_db):
+    from datetime import datetime, timedelta
+
+    db.insert_user("alice", b"x")
+    user_id = db.get_user_by_username("alice")[0]
+    today = datetime.now().strftime("%Y-%m-%d")
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    db.insert_expense(user_id, 1.0, "Food", "", today)
+    db.insert_expense(user_id, 1.0, "Food", "", f"{today} 18:30")
+    db.insert_expense(user_id, 1.0, "Food", "", yesterday)
+
+    assert db.get_today_expense_count(user_id) == 2
@@ -0,0 +1,118 @@
+"""
+Tests for keyset-paginated expense listing (db.select_expenses_page)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db
+
+
+@pytest.fixture
+def user_with_expenses(user):
+    """A user with 23 expenses spread over a few dates (many sharing a date)."""
+    account_id = db.insert_account(user, "Cash", "", "cash", 0.0, "PHP", "#fff", "2025-01-01")
+    for i in range(23):
+        db.insert_expense(user, float(i + 1), "Food", f"e{i}", f"2025-01-{(i % 5) + 1:02d}",
+                          account_id if i % 2 else None)
+    return user, account_id
+
+
+def _all_pages(user_id, limit, **kwargs):
+    """(rows, page count, first page's result) for every page in order."""
+    rows, after, pages, first = [], None, 0, None
+    while True:
+        result = db.select_expenses_page(user_id, after=after, limit=limit, **kwargs)
+        first = first or result
+        rows.extend(result["rows"])
+        pages += 1
+        after = result["next_after"]
+        if after is None:
+            return rows, pages, first
+
+
+def test_pages_cover_every_expense_once_in_order(user_with_expenses):
+    user_id, _ = user_with_expenses
+
+    rows, pages, first = _all_pages(user_id, limit=5)
+
+    assert pages == 5
+    assert len(rows) == 23
+    assert len({r[0] for r in rows}) == 23
+    assert [(r[5], r[0]) for r in rows] == sorted(((r[5], r[0]) for r in rows), reverse=True)
+    assert {r[0] for r in rows} == {r[0] for r in db.select_expenses_by_user(user_id)}
+    assert first["total_count"] == 23
+    assert first["total_amount"] == pytest.approx(sum(range(1, 24)))
+    # Scroll pages skip the totals
+    assert db.select_expenses_page(user_id, after=first["next_after"], limit=5)["total_count"] is None
+
+
+def test_exact_multiple_has_no_empty_trailing_page(user_with_expenses):
+    user_id, _ = user_with_expenses
+
+    first = db.select_expenses_page(user_id, limit=23)
+    assert len(first["rows"]) == 23
+    assert first["next_after"] is None
+
+
+def test_account_filter(user_with_expenses):
+    user_id, account_id = user_with_expenses
+
+    rows, _, first = _all_pages(user_id, limit=4, account_id=account_id)
+
+    assert len(rows) == 11
+    assert all(r[6] == account_id for r in rows)
+    assert first["total_count"] == 11
+    assert first["total_amount"] == pytest.approx(sum(range(2, 24, 2)))
+
+
+def test_page_query_uses_index(user_with_expenses):
+    with db.session() as cur:
+        cur.execute(
+            "EXPLAIN QUERY PLAN SELECT id, user_id, amount, category, description, date, account_id "
+            "FROM expenses WHERE user_id = ? AND (date, id) < (?, ?) ORDER BY date DESC, id DESC LIMIT ?",
+            (1, "2025-01-03", 10, 51),
+        )
+        plan = " | ".join(row[3] for row in cur.fetchall())
+
+    assert "idx_expenses_user_date" in plan
+    assert "SCAN expenses" not in plan
+
+
+def test_rows_are_joined_with_account(user_with_expenses):
+    user_id, account_id = user_with_expenses
+    other_id = db.insert_account(user_id, "Card", "", "card", 0.0, "USD", "#000", "2025-01-01")
+    db.insert_expense(user_id, 5.0, "Travel", "taxi", "2025-02-01", other_id)
+
+    rows = db.select_expenses_with_accounts(user_id)
+
+    assert len(rows) == 24
+    assert rows[0][6:10] == (other_id, "Card", "USD", "#000")
+    by_account = {r[6]: r[7:] for r in rows}
+    assert by_account[account_id][:3] == ("Cash", "PHP", "#fff")
+    assert by_account[None][:3] == (None, None, None)
+
+    # A deleted account leaves the expense with empty account fields
+    db.delete_account(other_id, user_id)
+    assert db.select_expenses_with_accounts(user_id, limit=1)[0][7:10] == (None, None, None)
+
+
+def test_joined_fetch_is_a_single_query(user_with_expenses):
+    user_id, _ = user_with_expenses
+    statements = []
+
+    with db.session():
+        conn = db.get_pool()._local.conn
+        conn.set_trace_callback(statements.append)
+        try:
+            db.select_expenses_with_accounts(user_id)
+            db.select_expenses_page(user_id)
+        finally:
+            conn.set_trace_callback(None)
+
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    # One joined fetch, plus the rollup totals and one joined page for the paginated call
+    assert len(selects) == 3
@@ -0,0 +1,103 @@
+"""
+Tests for the trigger-maintained expense rollups (migration 5)
+"""
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db, migrations
+
+
+@pytest.fixture
+def user_with_accounts(user):
+    """A user with two accounts and no expenses yet."""
+    cash = db.insert_account(user, "Cash", "", "cash", 0.0, "PHP", "#fff", "2025-01-01")
+    card = db.insert_account(user, "Card", "", "card", 0.0, "PHP", "#000", "2025-01-01")
+    return user, cash, card
+
+
+def test_empty_user_reads_zero(user_with_accounts):
+    user_id, cash, _ = user_with_accounts
+
+    assert db.total_expenses_by_user(user_id) == 0.0
+    assert db.total_expenses_by_account(user_id, cash) == 0.0
+    assert db.get_expense_count_by_user(user_id) == 0
+    assert db.get_unique_categories_used(user_id) == 0
+    assert db.category_summary_by_user(user_id) == []
+
+
+def test_rollups_follow_insert_update_and_delete(user_with_accounts):
+    user_id, cash, card = user_with_accounts
+    food = db.insert_expense(user_id, 10.0, "Food", "", "2025-01-01", cash)
+    db.insert_expense(user_id, 5.5, "Food", "", "2025-01-02", card)
+    taxi = db.insert_expense(user_id, 20.0, "Travel", "", "2025-01-03")
+
+    assert db.total_expenses_by_user(user_id) == pytest.approx(35.5)
+    assert db.get_expense_count_by_user(user_id) == 3
+    assert db.total_expenses_by_account(user_id, cash) == pytest.approx(10.0)
+    assert db.category_summary_by_user(user_id) == [("Food", 15.5), ("Travel", 20.0)]
+
+    # Amount, category and account all move in one update
+    db.update_expense_row(food, user_id, 12.0, "Travel", "", "2025-01-01", card)
+    assert db.total_expenses_by_account(user_id, cash) == 0.0
+    assert db.total_expenses_by_account(user_id, card) == pytest.approx(17.5)
+    assert db.category_summary_by_user(user_id) == [("Food", 5.5), ("Travel", 32.0)]
+
+    db.delete_expense_row(taxi, user_id)
+    assert db.get_expense_count_by_user(user_id) == 2
+    assert db.total_expenses_by_user(user_id) == pytest.approx(17.5)
+    assert db.get_unique_categories_used(user_id) == 2
+    assert db.verify_expense_rollups() == []
+
+
+def test_raw_sql_changes_stay_consistent(user_with_accounts):
+    user_id, cash, _ = user_with_accounts
+    for i in range(5):
+        db.insert_expense(user_id, 1.0 + i, "Food" if i % 2 else "Bills", "", "2025-01-01", cash)
+
+    with db.session() as cur:
+        cur.execute("DELETE FROM expenses WHERE user_id = ? AND category = 'Bills'", (user_id,))
+
+    assert db.get_unique_categories_used(user_id) == 1
+    assert db.total_expenses_by_account(user_id, cash) == pytest.approx(6.0)
+    assert db.verify_expense_rollups() == []
+
+
+def test_verify_detects_drift_and_rebuild_repairs(user_with_accounts):
+    user_id, cash, _ = user_with_accounts
+    db.insert_expense(user_id, 8.0, "Food", "", "2025-01-01", cash)
+    with db.session() as cur:
+        cur.execute("UPDATE user_expense_stats SET total_amount = 99 WHERE user_id = ?", (user_id,))
+        cur.execute("DELETE FROM category_expense_stats WHERE user_id = ?", (user_id,))
+
+    tables = {m[0] for m in db.verify_expense_rollups()}
+    assert tables == {"user_expense_stats", "category_expense_stats"}
+
+    db.rebuild_expense_rollups()
+    assert db.verify_expense_rollups() == []
+    assert db.total_expenses_by_user(user_id) == 8.0
+
+
+def test_migration_backfills_existing_expenses(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+    cur = conn.cursor()
+    for _, _, step in migrations.MIGRATIONS[:4]:
+        step(cur)
+    cur.execute("PRAGMA user_version = 4")
+    cur.executemany(
+        "INSERT INTO expenses (user_id, amount, category, date, account_id) VALUES (1, ?, ?, '2025-01-01', ?)",
+        [(2.0, "Food", 3), (3.0, "Food", None), (4.0, "Rent", 3)],
+    )
+    conn.commit()
+
+    migrations.apply_migrations(conn)
+
+    cur.execute("SELECT expense_count, total_amount FROM user_expense_stats WHERE user_id = 1")
+    assert cur.fetchone() == (3, 9.0)
+    cur.execute("SELECT account_id, total_amount FROM account_expense_stats")
+    assert cur.fetchall() == [(3, 6.0)]
+    conn.close()
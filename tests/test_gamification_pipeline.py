@@ -0,0 +1,108 @@
+"""
+Tests for the single-transaction gamification pipeline
+"""
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db
+
+# utils/__init__ pulls in the Flet statistics helpers
+gamification = pytest.importorskip("utils.gamification")
+
+NOON = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+class _Noon(datetime):
+    """Keeps the night owl / early bird badges out of the way."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return NOON
+
+
+@pytest.fixture(autouse=True)
+def fixed_clock(monkeypatch):
+    monkeypatch.setattr(gamification, "datetime", _Noon)
+
+
+def _log_expense(user_id, category="Food", via_voice=False):
+    db.insert_expense(user_id, 5.0, category, "Lunch", NOON.strftime("%Y-%m-%d"))
+    return gamification.on_expense_logged(user_id, via_voice=via_voice)
+
+
+def test_first_expense(user):
+    events = _log_expense(user)
+
+    assert events == {"xp_gained": 10, "new_badges": ["first_steps"], "leveled_up": False,
+                      "new_level": 1, "streak": 1}
+    # 10 for the expense + 25 for the badge
+    assert db.get_user_xp(user) == {"xp": 35, "level": 1}
+    assert db.get_user_streak(user)["current"] == 1
+    assert [b[0] for b in db.get_user_badges(user)] == ["first_steps"]
+
+    # Same day: no new streak day, no repeat badge
+    assert _log_expense(user, via_voice=True)["new_badges"] == []
+    assert db.get_user_xp(user)["xp"] == 50
+    assert db.get_user_streak(user)["total_days"] == 1
+
+
+def test_one_read_and_one_write_per_expense(user, monkeypatch):
+    db.upsert_challenge(user, "total_expenses", 10, 40)
+    opened = []
+    real_session = db.session
+
+    @contextmanager
+    def counting_session():
+        opened.append(1)
+        with real_session() as cur:
+            yield cur
+
+    monkeypatch.setattr(db, "session", counting_session)
+    db.insert_expense(user, 5.0, "Food", "Lunch", NOON.strftime("%Y-%m-%d"))
+    opened.clear()
+
+    gamification.on_expense_logged(user)
+
+    assert len(opened) == 2
+
+
+def test_challenges_progress_and_complete(user):
+    db.upsert_challenge(user, "total_expenses", 2, 40)
+    db.upsert_challenge(user, "multi_category", 3, 35)
+
+    _log_expense(user, "Food")
+    _log_expense(user, "Transport")
+
+    progress = {c[1]: (c[3], c[5]) for c in db.get_active_challenges(user)}
+    assert progress == {"total_expenses": (2, 1), "multi_category": (2, 0)}
+    # 2 x 10 for the expenses, 25 for first_steps, 40 for the challenge
+    assert db.get_user_xp(user)["xp"] == 85
+
+
+def test_login_continues_streak_and_picks_challenges(user):
+    yesterday = (NOON - timedelta(days=1)).strftime("%Y-%m-%d")
+    db.update_user_streak(user, 6, 6, yesterday, 1, 6)
+
+    events = gamification.on_user_login(user)
+
+    assert (events["xp_gained"], events["streak"]) == (5, 7)
+    assert events["streak_events"] == ["streak_continued", "badge:week_warrior"]
+    assert db.has_badge(user, "week_warrior")
+    assert len(db.get_active_challenges(user)) == 2
+    # A second login the same day changes nothing but the daily XP
+    assert gamification.on_user_login(user)["streak_events"] == []
+    assert len(db.get_active_challenges(user)) == 2
+
+
+def test_xp_level_follows_the_stored_total(user):
+    db.add_user_xp(user, 95)
+    events = _log_expense(user)
+
+    assert (events["leveled_up"], events["new_level"]) == (True, 2)
+    assert db.get_user_xp(user) == {"xp": 130, "level": 2}
@@ -0,0 +1,97 @@
+"""
+Tests for the background gamification worker
+"""
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db
+
+# utils/__init__ pulls in the Flet statistics helpers
+worker_module = pytest.importorskip("utils.gamification_worker")
+
+
+@pytest.fixture
+def user(user):
+    """The shared user; the worker is stopped before the database closes."""
+    yield user
+    worker_module.shutdown()
+
+
+def test_events_are_processed_in_order_off_the_caller_thread(user):
+    seen = []
+
+    def notify(summary):
+        seen.append((threading.current_thread().name, summary))
+
+    db.insert_expense(user, 5.0, "Food", "Lunch", "2025-01-01")
+    login = worker_module.submit_user_login(user, notify=notify)
+    expense = worker_module.submit_expense_logged(user, via_voice=True, notify=notify)
+
+    assert expense.result(timeout=5)["xp_gained"] == 15
+    assert login.result(timeout=5)["xp_gained"] == 5
+    worker_module.get_gamification_worker().drain()
+    assert [name for name, _ in seen] == ["gamification-worker"] * 2
+    # Login checks every rule, so the expense already on file earns first_steps there
+    assert "streak_events" in seen[0][1] and "first_steps" in seen[0][1]["new_badges"]
+    assert "first_steps" not in seen[1][1]["new_badges"]
+    assert db.get_user_xp(user)["xp"] >= 5 + 15 + 25
+
+
+def test_failures_are_reported_and_the_worker_keeps_going(user, monkeypatch):
+    def boom(user_id):
+        raise RuntimeError("db down")
+
+    monkeypatch.setitem(worker_module.EVENT_HANDLERS, "login", boom)
+
+    failed = worker_module.submit_user_login(user)
+    with pytest.raises(RuntimeError):
+        failed.result(timeout=5)
+    assert worker_module.submit_expense_logged(user).result(timeout=5)["xp_gained"] == 10
+
+    with pytest.raises(ValueError):
+        worker_module.get_gamification_worker().submit("unknown", user)
+
+
+def test_shutdown_finishes_queued_events(user, monkeypatch):
+    release = threading.Event()
+    original = worker_module.EVENT_HANDLERS["expense"]
+
+    def slow(user_id):
+        release.wait(5)
+        return original(user_id)
+
+    monkeypatch.setitem(worker_module.EVENT_HANDLERS, "expense", slow)
+    futures = [worker_module.submit_expense_logged(user) for _ in range(3)]
+    assert not any(f.done() for f in futures)
+
+    release.set()
+    worker_module.shutdown()
+
+    assert all(f.done() for f in futures)
+    # 10 per expense plus the bonus for any badges (night owl depends on the clock)
+    badges = sum(len(f.result()["new_badges"]) for f in futures)
+    assert db.get_user_xp(user)["xp"] == 30 + 25 * badges
+
+
+def test_announcements_match_the_inline_hooks(monkeypatch):
+    notification = pytest.importorskip("components.notification")
+    shown = []
+    monkeypatch.setattr(notification.ImmersiveNotification, "__init__", lambda self, page: None)
+    monkeypatch.setattr(notification.ImmersiveNotification, "show",
+                        lambda self, message, kind="info", title=None: shown.append(title))
+    announce = worker_module.announce_to(page=None)
+
+    # A level-up is shown instead of the badges earned with it
+    announce({"xp_gained": 35, "leveled_up": True, "new_level": 2, "new_badges": ["first_steps"]})
+    assert shown == ["Level Up!"]
+    shown.clear()
+    announce({"xp_gained": 35, "new_badges": ["first_steps", "night_owl"]})
+    assert shown == ["Achievement Unlocked!"] * 2
+    shown.clear()
+    announce({"xp_gained": 5, "streak": 1, "streak_events": [], "new_badges": ["first_steps"]})
+    assert shown == ["Achievement"]
@@ -0,0 +1,65 @@
+"""
+Tests for deferred imports (core.lazy_imports) and the startup import path
+"""
+import os
+import subprocess
+import sys
+import types
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src')
+sys.path.insert(0, SRC)
+
+import pytest
+
+from core import lazy_imports
+from core.lazy_imports import lazy_attr, optional_import
+
+
+def test_optional_module_imports_on_first_use(monkeypatch):
+    module = types.ModuleType("fake_heavy_stack")
+    module.answer = 42
+    monkeypatch.setitem(sys.modules, "fake_heavy_stack", module)
+    monkeypatch.setattr(lazy_imports, "_modules", {})
+
+    stack = optional_import("fake_heavy_stack")
+    assert not stack.loaded
+    assert stack.answer == 42
+    assert stack.loaded and stack.available
+    assert optional_import("fake_heavy_stack") is stack
+    assert ("fake_heavy_stack", "loaded", stack.import_seconds) in lazy_imports.import_report()
+
+
+def test_missing_optional_module_is_unavailable(monkeypatch):
+    monkeypatch.setattr(lazy_imports, "_modules", {})
+
+    missing = optional_import("no_such_package_for_tests")
+    assert not missing
+    assert not missing.available
+    with pytest.raises(ImportError):
+        missing.anything
+    assert lazy_imports.import_report() == [("no_such_package_for_tests", "missing", missing.import_seconds)]
+
+
+def test_lazy_attr_resolves_on_call(monkeypatch):
+    module = types.ModuleType("fake_page")
+    module.build = lambda x: x * 2
+    monkeypatch.setitem(sys.modules, "fake_page", module)
+    monkeypatch.setattr(lazy_imports, "_modules", {})
+
+    build = lazy_attr("fake_page", "build")
+    assert not build.loaded
+    assert build(21) == 42
+    assert build.loaded and build.resolve() is module.build
+
+
+def test_startup_imports_no_pages_or_heavy_stacks():
+    pytest.importorskip("flet")
+    pytest.importorskip("bcrypt")
+    code = (
+        "import sys, main; "
+        "print(sorted(m for m in sys.modules if m.split('.')[0] in "
+        "('ui', 'torch', 'snac', 'numpy', 'sounddevice', 'speech_recognition', 'ollama')))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=SRC, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,137 @@
+"""
+Tests for the exchange rate history (migration 7) and the as-of lookup
+"""
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db, migrations
+
+# utils/__init__ pulls in the Flet statistics helpers
+rate_history = pytest.importorskip("utils.rate_history")
+RateHistory = rate_history.RateHistory
+
+
+def test_as_of_picks_latest_rate_on_or_before_date():
+    history = RateHistory([
+        ("PHP", "2025-03-01", 58.0),
+        ("PHP", "2025-01-01", 56.0),
+        ("EUR", "2025-02-01", 0.9),
+    ])
+
+    assert history.rate_as_of("PHP", "2025-02-15") == 56.0
+    assert history.rate_as_of("PHP", "2025-03-01") == 58.0
+    assert history.rate_as_of("PHP", "2025-03-01 18:30:00") == 58.0
+    assert history.rate_as_of("PHP", "2026-01-01") == 58.0
+    # Before the first known rate the earliest one is used
+    assert history.rate_as_of("PHP", "2024-06-01") == 56.0
+    assert history.rate_as_of("JPY", "2025-02-15") is None
+    assert history.as_of("2025-02-15") == {"USD": 1.0, "PHP": 56.0, "EUR": 0.9}
+    assert history.convert(90.0, "EUR", "PHP", "2025-03-02") == pytest.approx(5800.0)
+    assert history.convert(10.0, "JPY", "PHP", "2025-03-02") is None
+
+
+def test_recorded_rates_are_visible_to_lookups(temp_db):
+    db.record_exchange_rates({"USD": 1.0, "PHP": 56.0, "EUR": 0.9}, effective_date="2025-01-01")
+    assert rate_history.as_of("2025-06-01") == {"USD": 1.0, "PHP": 56.0, "EUR": 0.9}
+
+    # Same day replaces the rate; a later day adds one
+    db.record_exchange_rates({"PHP": 57.0}, effective_date="2025-01-01")
+    db.record_exchange_rates({"PHP": 59.0}, effective_date="2025-05-01")
+    assert rate_history.as_of("2025-04-30")["PHP"] == 57.0
+    assert rate_history.as_of("2025-05-01")["PHP"] == 59.0
+    assert rate_history.convert_as_of(1.0, "USD", "PHP", "2025-02-01") == 57.0
+
+
+def test_admin_rates_quoted_against_usd_are_recorded(temp_db):
+    db.add_currency_rate("USD", "JPY", 150.0, effective_date="2025-01-10")
+    db.add_currency_rate("GBP", "USD", 1.25, effective_date="2025-01-10")
+    db.add_currency_rate("EUR", "PHP", 61.0, effective_date="2025-01-10")
+
+    assert db.get_exchange_rate_history() == [("GBP", "2025-01-10", 0.8), ("JPY", "2025-01-10", 150.0)]
+
+
+def test_expense_keeps_structured_conversion(temp_db):
+    db.insert_user("alice", b"x")
+    user_id = db.get_user_by_username("alice")[0]
+    account_id = db.insert_account(user_id, "Cash", "", "cash", 1000.0, "PHP", "#fff", "2025-01-01")
+
+    db.insert_expense(user_id, 560.0, "Food", "lunch", "2025-01-02", account_id,
+                      original_amount=10.0, original_currency="USD", rate=56.0)
+
+    row = db.select_expenses_with_accounts(user_id)[0]
+    assert row[4] == "lunch"
+    assert row[8] == "PHP"
+    assert row[10:13] == (10.0, "USD", 56.0)
+
+
+def test_migration_moves_conversion_notes_into_columns(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+    cur = conn.cursor()
+    for _, _, step in migrations.MIGRATIONS[:6]:
+        step(cur)
+    cur.execute("PRAGMA user_version = 6")
+    cur.executemany(
+        "INSERT INTO expenses (user_id, amount, category, description, date) VALUES (1, ?, 'Food', ?, '2025-01-01')",
+        [(1069.52, "Sushi [₱500.00 (PHP) = ¥1,069.52 (JPY) • Rate: 1 PHP = 2.139 JPY]"),
+         (5.0, "plain")],
+    )
+    cur.execute("INSERT INTO currency_rates (from_currency, to_currency, rate, effective_date) "
+                "VALUES ('USD', 'PHP', 56.5, '2025-01-01 00:00:00')")
+    conn.commit()
+
+    migrations.apply_migrations(conn)
+
+    cur.execute("SELECT description, original_amount, original_currency, rate FROM expenses ORDER BY id")
+    assert cur.fetchall() == [("Sushi", 500.0, "PHP", 2.139), ("plain", None, None, None)]
+    cur.execute("SELECT currency, effective_date, rate FROM exchange_rate_history")
+    assert cur.fetchall() == [("PHP", "2025-01-01", 56.5)]
+    conn.close()
+
+
+def test_admin_rate_edits_update_history(temp_db):
+    rate_id = db.add_currency_rate("USD", "JPY", 150.0, effective_date="2025-01-10", source="manual")
+    assert rate_history.rate_as_of("USD", "JPY", "2025-02-01") == 150.0
+
+    db.update_currency_rate(rate_id, rate=155.0)
+    assert rate_history.rate_as_of("USD", "JPY", "2025-02-01") == 155.0
+    assert rate_history.rate_as_of("JPY", "USD", "2025-02-01") == pytest.approx(1 / 155.0)
+
+    # A deactivated rate stops applying to dated conversions
+    db.update_currency_rate(rate_id, is_active=0)
+    assert db.get_exchange_rate_history() == []
+    assert rate_history.convert_as_of(10.0, "USD", "JPY", "2025-02-01") is None
+
+
+@pytest.fixture
+def manila_clock():
+    """Run the test at UTC+8, so local midnight is 16:00 UTC the day before."""
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "Asia/Manila"
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+def test_history_days_are_utc(temp_db, manila_clock):
+    db.record_exchange_rates({"PHP": 56.0})
+    assert db.get_exchange_rate_history()[0][1] == datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    db.record_exchange_rates({"PHP": 57.0}, effective_date="2025-03-01")
+    db.record_exchange_rates({"PHP": 58.0}, effective_date="2025-03-02")
+    # 05:00 in Manila on the 2nd is still the 1st in UTC; 09:00 is the 2nd
+    assert rate_history.utc_day("2025-03-02 05:00:00") == "2025-03-01"
+    assert rate_history.rate_as_of("USD", "PHP", "2025-03-02 05:00:00") == 57.0
+    assert rate_history.rate_as_of("USD", "PHP", "2025-03-02 09:00:00") == 58.0
+    # A bare date names the day itself
+    assert rate_history.rate_as_of("USD", "PHP", "2025-03-02") == 58.0
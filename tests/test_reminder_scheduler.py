@@ -0,0 +1,191 @@
+"""
+Tests for the process-wide reminder scheduler
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db
+
+# utils/__init__ pulls in the Flet statistics helpers
+reminders = pytest.importorskip("utils.reminders")
+next_check_time = reminders.next_check_time
+
+# A Wednesday
+NOW = datetime(2025, 6, 4, 12, 0, 0)
+SECOND = timedelta(seconds=1)
+
+
+def _reminder(rtype, **fields):
+    reminder = {"id": 1, "type": rtype, "enabled": 1, "time": "20:00", "threshold": 20.0,
+                "days_inactive": 3, "custom_message": "", "last_triggered": None}
+    reminder.update(fields)
+    return reminder
+
+
+def test_timed_reminders_wait_for_their_window():
+    daily = _reminder("daily_expense")
+
+    assert next_check_time(daily, NOW) == datetime(2025, 6, 4, 19, 45) + SECOND
+    in_window = datetime(2025, 6, 4, 20, 10)
+    assert next_check_time(daily, in_window) == in_window
+    # Once checked, the next window is tomorrow's
+    assert next_check_time(daily, in_window, ran=True) == datetime(2025, 6, 5, 19, 45) + SECOND
+    assert next_check_time(daily, datetime(2025, 6, 4, 21, 0)) == datetime(2025, 6, 5, 19, 45) + SECOND
+    # Fired an hour ago: quiet for 12 hours
+    fired = _reminder("daily_expense", last_triggered="2025-06-04 20:00:00")
+    assert next_check_time(fired, in_window) == datetime(2025, 6, 5, 19, 45) + SECOND
+
+    weekly = _reminder("weekly_summary", time="09:00")
+    assert next_check_time(weekly, NOW) == datetime(2025, 6, 8, 8, 45) + SECOND  # Sunday
+    assert next_check_time(_reminder("daily_expense", enabled=0), NOW) is None
+
+
+def test_data_driven_reminders():
+    idle = _reminder("idle_reminder")
+    assert next_check_time(idle, NOW, last_expense_date="2025-06-03 08:30:00") == datetime(2025, 6, 6)
+    assert next_check_time(idle, NOW, last_expense_date=None) == NOW
+
+    budget = _reminder("budget_warning", last_triggered="2025-06-04 10:00:00")
+    assert next_check_time(budget, NOW) == datetime(2025, 6, 4, 14, 0)
+    # Balances only move with expenses or accounts, so nothing to poll for
+    assert next_check_time(budget, NOW, ran=True) is None
+
+    recurring = _reminder("recurring_expense")
+    assert next_check_time(recurring, NOW) == NOW
+    assert next_check_time(recurring, NOW, ran=True) == datetime(2025, 6, 5)
+
+
+class _Session:
+    def __init__(self, user_id):
+        self.engine = reminders.ReminderEngine(page=None, user_id=user_id)
+        self.fired = []
+        self.engine._fire_notification = lambda title, message, notif_type="info": self.fired.append(title)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def scheduler(temp_db, monkeypatch):
+    monkeypatch.setattr(reminders.ReminderEngine, "STARTUP_DELAY", timedelta(0))
+    monkeypatch.setattr(reminders, "_scheduler", None)
+    yield reminders.get_reminder_scheduler()
+    reminders.get_reminder_scheduler().stop()
+
+
+def test_one_thread_serves_sessions_and_replans_on_changes(scheduler):
+    users = []
+    for name in ("alice", "bob"):
+        db.insert_user(name, b"x")
+        user_id = db.get_user_by_username(name)[0]
+        # Only the idle and recurring reminders, so the clock does not matter
+        db.upsert_reminder(user_id, "idle_reminder", days_inactive=3)
+        db.upsert_reminder(user_id, "recurring_expense")
+        users.append(user_id)
+    alice, bob = _Session(users[0]), _Session(users[1])
+
+    alice.engine.start()
+    bob.engine.start()
+    assert _wait_for(lambda: alice.fired and bob.fired)
+    assert alice.fired == bob.fired == ["💤 No Expenses Yet"]
+    assert reminders.get_reminder_scheduler() is scheduler
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    db.insert_expense(alice.engine.user_id, 5.0, "Food", "Lunch", today.strftime("%Y-%m-%d"))
+    # Idle again three days after today's expense
+    due = (today + timedelta(days=3), alice.engine.user_id, "idle_reminder")
+    assert _wait_for(lambda: due in scheduler.pending())
+    # bob's entries were not touched
+    bob_idle = [when for when, user_id, rtype in scheduler.pending()
+                if user_id == bob.engine.user_id and rtype == "idle_reminder"]
+    assert len(bob_idle) == 1 and bob_idle[0] > datetime.now() + timedelta(hours=11)
+
+    alice.engine.stop()
+    assert all(user_id == bob.engine.user_id for _, user_id, _ in scheduler.pending())
+    assert alice.fired == ["💤 No Expenses Yet"]
+    # Removing a session drops its heap entries at once, not when they come due
+    assert all(entry[2] is not alice.engine for entry in scheduler._heap)
+
+
+def test_failed_check_is_retried(scheduler, user, monkeypatch):
+    db.upsert_reminder(user, "recurring_expense")
+    session = _Session(user)
+
+    def locked(rtype, now=None, account_budgets=None):
+        raise RuntimeError("database is locked")
+
+    session.engine.run_reminder = locked
+    before = datetime.now()
+    session.engine.start()
+    # The check failed, so it is back on the heap for another try in five minutes
+    assert _wait_for(lambda: any(rtype == "recurring_expense" and when >= before + reminders.REMINDER_RETRY_DELAY
+                                 for when, _, rtype in scheduler.pending()))
+    session.engine.stop()
+
+
+def test_superseded_entries_are_compacted(scheduler, user):
+    session = _Session(user)
+    with scheduler._cond:
+        session.engine.start()
+        for _ in range(200):
+            scheduler._schedule(session.engine, [("weekly_summary", datetime.now() + timedelta(days=7))])
+        assert len(scheduler._heap) - len(scheduler._live) <= reminders.STALE_ENTRY_LIMIT
+    session.engine.stop()
+
+
+def _user_with_account(name, balance, spent):
+    db.insert_user(name, b"x")
+    user_id = db.get_user_by_username(name)[0]
+    account_id = db.insert_account(user_id, f"{name} wallet", "", "Cash", balance, "PHP", "#000", "2025-01-01 00:00:00")
+    db.insert_expense(user_id, spent, "Food", "Lunch", "2025-01-01", account_id)
+    return user_id, account_id
+
+
+def test_account_budgets_for_many_users_in_one_query(scheduler):
+    alice, alice_wallet = _user_with_account("alice", 100.0, 90.0)
+    bob, bob_wallet = _user_with_account("bob", 50.0, 10.0)
+    db.insert_user("carol", b"x")
+    carol = db.get_user_by_username("carol")[0]
+
+    budgets = db.get_account_budgets([alice, bob, carol])
+
+    # insert_expense already deducted the spend from the balance
+    assert budgets == {
+        alice: [(alice_wallet, "alice wallet", 10.0, "PHP", 90.0)],
+        bob: [(bob_wallet, "bob wallet", 40.0, "PHP", 10.0)],
+        carol: [],
+    }
+    assert budgets[alice][0][4] == db.total_expenses_by_account(alice, alice_wallet)
+
+
+def test_due_budget_checks_share_one_query(scheduler, monkeypatch):
+    sessions = []
+    for name in ("alice", "bob"):
+        user_id, _ = _user_with_account(name, 100.0, 90.0)
+        db.upsert_reminder(user_id, "budget_warning", threshold=20.0)
+        sessions.append(_Session(user_id))
+
+    calls = []
+    real_budgets = db.get_account_budgets
+    monkeypatch.setattr(db, "get_account_budgets", lambda user_ids: calls.append(set(user_ids)) or real_budgets(user_ids))
+
+    # Register both before the scheduler thread can take either check
+    with scheduler._cond:
+        for session in sessions:
+            session.engine.start()
+
+    assert _wait_for(lambda: all(session.fired for session in sessions))
+    assert calls == [{session.engine.user_id for session in sessions}]
+    assert sessions[0].fired == ["⚠️ Low Balance Warning"]
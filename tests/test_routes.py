@@ -0,0 +1,73 @@
+"""
+Tests for the route table (core.routes): lazy builders, warm-up and build timings
+"""
+import ast
+import os
+import sys
+import types
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src')
+sys.path.insert(0, SRC)
+
+import pytest
+
+from core import lazy_imports
+from core.routes import ROUTES, USER_WARM_UP, RouteRegistry
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    """Two fake page modules and a registry routing to them."""
+    monkeypatch.setattr(lazy_imports, "_modules", {})
+    home = types.ModuleType("fake_home_page")
+    home.build_home_content = lambda page, user: f"home:{page}:{user}"
+    admin = types.ModuleType("fake_admin_page")
+    admin.build_admin_content = lambda page: f"admin:{page}"
+    monkeypatch.setitem(sys.modules, home.__name__, home)
+    monkeypatch.setitem(sys.modules, admin.__name__, admin)
+    return RouteRegistry({
+        "home": "fake_home_page:build_home_content",
+        "admin": "fake_admin_page:build_admin_content",
+    })
+
+
+def test_builders_resolve_on_first_build(pages):
+    assert not pages.is_loaded("home")
+    assert pages.build("home", "page", user=7) == "home:page:7"
+    assert pages.is_loaded("home")
+    assert not pages.is_loaded("admin")
+    assert pages.builder("home") is pages.builder("home")
+    with pytest.raises(KeyError):
+        pages.build("nowhere")
+
+
+def test_builds_are_timed_per_route(pages):
+    for _ in range(3):
+        pages.build("home", "page", user=1)
+
+    [(name, import_seconds, builds, mean, longest, last)] = pages.build_report()
+    assert (name, builds) == ("home", 3)
+    assert import_seconds is not None
+    assert 0 <= mean <= longest and last == pages.last_build_seconds("home")
+    assert pages.last_build_seconds("admin") is None
+
+
+def test_warm_up_imports_in_the_background(pages):
+    thread = pages.warm_up(["home", "admin", "unknown"])
+    thread.join(5)
+
+    assert pages.is_loaded("home") and pages.is_loaded("admin")
+    # Warm-up imports only; nothing has been built yet
+    assert pages.build_report() == []
+    assert pages.warm_up(["home"], background=False) is None
+
+
+def test_route_table_points_at_real_builders():
+    for name, target in ROUTES.items():
+        module, _, attr = target.partition(":")
+        path = os.path.join(SRC, *module.split(".")) + ".py"
+        tree = ast.parse(open(path, encoding="utf-8").read())
+        defined = {node.name for node in tree.body
+                   if isinstance(node, (ast.FunctionDef, ast.ClassDef))}
+        assert attr in defined, f"{name}: {target}"
+    assert set(USER_WARM_UP) <= set(ROUTES)
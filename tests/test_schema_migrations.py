@@ -0,0 +1,63 @@
+"""
+Tests for the versioned schema bootstrap in core/migrations.py
+"""
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+from core import db, migrations
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_fresh_database_reaches_latest_version(temp_db):
+    db.ensure_schema()
+
+    conn = sqlite3.connect(temp_db)
+    assert migrations.get_schema_version(conn) == migrations.LATEST_VERSION
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+
+    for table in ("users", "expenses", "accounts", "user_xp", "user_notifications", "currency_rates"):
+        assert table in tables
+
+
+def test_legacy_database_is_upgraded_in_place(temp_db):
+    # A pre-versioning database: user_version 0, tables missing later columns
+    conn = sqlite3.connect(temp_db)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password BLOB NOT NULL)")
+    conn.execute("CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, amount REAL NOT NULL, category TEXT NOT NULL, description TEXT, date TEXT NOT NULL)")
+    conn.execute("INSERT INTO users (username, password) VALUES ('alice', x'00')")
+    conn.commit()
+    conn.close()
+
+    db.ensure_schema()
+
+    conn = sqlite3.connect(temp_db)
+    assert migrations.get_schema_version(conn) == migrations.LATEST_VERSION
+    assert {"currency", "passcode", "selected_account_id"} <= _columns(conn, "users")
+    assert {"account_id", "synced_to_qb"} <= _columns(conn, "expenses")
+    assert conn.execute("SELECT username FROM users").fetchone() == ("alice",)
+    conn.close()
+
+
+def test_connect_db_does_not_rerun_migrations(temp_db, monkeypatch):
+    db.ensure_schema()
+
+    calls = []
+    monkeypatch.setattr(migrations, "apply_migrations", lambda conn: calls.append(conn))
+    for _ in range(5):
+        db.connect_db().close()
+
+    assert calls == []
+
+
+def test_apply_migrations_is_a_no_op_when_current(temp_db):
+    conn = sqlite3.connect(temp_db)
+    assert migrations.apply_migrations(conn) == [m[0] for m in migrations.MIGRATIONS]
+    assert migrations.apply_migrations(conn) == []
+    conn.close()
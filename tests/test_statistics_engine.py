@@ -0,0 +1,112 @@
+"""
+Tests for the single-pass statistics engine (utils.statistics.compute_statistics)
+"""
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db
+
+statistics = pytest.importorskip("utils.statistics")
+
+
+@pytest.fixture
+def user(user):
+    """The shared user, with a year of expenses, a few of them timestamped."""
+    today = datetime.now()
+    for i in range(150):
+        day = (today - timedelta(days=(i * 5) % 380)).strftime("%Y-%m-%d")
+        db.insert_expense(user, float(i % 9 + 1) * 1.25, ["Food", "Travel", "Bills", "Rent"][i % 4],
+                          f"e{i}", day + (" 12:00" if i % 6 == 0 else ""))
+    return user
+
+
+def _raw(user_id):
+    with db.session() as cur:
+        cur.execute("SELECT amount, category, substr(date, 1, 10) FROM expenses WHERE user_id = ?", (user_id,))
+        return cur.fetchall()
+
+
+@pytest.mark.parametrize("period", ["1D", "1W", "1M", "3M", "6M", "1Y"])
+def test_period_buckets_match_raw_rows(user, period):
+    result = statistics.compute_statistics(user, period)
+    today = datetime.now()
+    start = statistics._period_start(period, timedelta(weeks=1))
+    previous_start = (today - 2 * statistics.PERIOD_DELTAS[period]).strftime("%Y-%m-%d")
+    rows = _raw(user)
+
+    current = [r for r in rows if r[2] >= start]
+    categories = defaultdict(float)
+    for amount, category, _ in current:
+        categories[category] += amount
+
+    assert result["total_spent"] == pytest.approx(sum(r[0] for r in current))
+    assert result["previous_total"] == pytest.approx(sum(r[0] for r in rows if previous_start <= r[2] < start))
+    assert result["transaction_count"] == len(current)
+    assert dict(result["categories"]) == pytest.approx(dict(categories))
+    assert [c["category"] for c in result["top_categories"]] == [c for c, _ in result["categories"][:5]]
+    if current:
+        assert result["highest_expense"][1] == max(r[0] for r in current)
+    else:
+        assert result["highest_expense"] is None
+
+
+def test_week_and_month_buckets(user):
+    result = statistics.compute_statistics(user, weeks=4, months=6)
+    rows = _raw(user)
+
+    weekly, monthly = defaultdict(float), defaultdict(float)
+    for amount, _, day in rows:
+        date = datetime.strptime(day, "%Y-%m-%d")
+        weekly[(date - timedelta(days=date.weekday())).strftime("%Y-%m-%d")] += amount
+        monthly[day[:7]] += amount
+
+    assert len(result["weekly"]) <= 4 and len(result["monthly"]) <= 6
+    for week, amount in result["weekly"]:
+        assert datetime.strptime(week, "%Y-%m-%d").weekday() == 0
+        assert amount == pytest.approx(weekly[week])
+    assert [m for m, _ in result["monthly"]] == sorted(monthly)[-6:]
+    for month, amount in result["monthly"]:
+        assert amount == pytest.approx(monthly[month])
+
+
+def test_daily_series_and_average(user):
+    result = statistics.compute_statistics(user, days=7)
+    today = datetime.now()
+    rows = _raw(user)
+
+    assert [d for d, _ in result["daily"]] == [
+        (today - timedelta(days=7 - i)).strftime("%Y-%m-%d") for i in range(8)
+    ]
+    for day, amount in result["daily"]:
+        assert amount == pytest.approx(sum(r[0] for r in rows if r[2] == day))
+    start = (today - timedelta(days=30)).strftime("%Y-%m-%d")
+    assert result["average_daily"] == pytest.approx(sum(r[0] for r in rows if r[2] >= start) / 31)
+
+
+def test_one_rollup_read_per_screen(user):
+    statements = []
+
+    with db.session():
+        conn = db.get_pool()._local.conn
+        conn.set_trace_callback(statements.append)
+        try:
+            statistics.compute_statistics(user, "1M")
+        finally:
+            conn.set_trace_callback(None)
+
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    # The rollup read plus the lookup of the highest expense's row
+    assert len(selects) == 2
+    assert "FROM expenses" not in selects[0]
+
+
+def test_wrappers_share_the_engine(user):
+    assert statistics.get_spending_trend(user, "1M") == statistics.compute_statistics(user, "1M")["trend"]
+    assert statistics.get_weekly_expenses(user, 2) == statistics.compute_statistics(user, weeks=2)["weekly"]
+    assert statistics.get_monthly_expenses(user, 3) == statistics.compute_statistics(user, months=3)["monthly"]
@@ -0,0 +1,124 @@
+"""
+Tests for the per-user statistics cache (core/stats_cache.py)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Cryptics_legion', 'src'))
+
+import pytest
+
+from core import db, stats_cache
+from core.stats_cache import StatsCache
+
+
+def _counter():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+    return compute, calls
+
+
+def test_hit_after_first_compute():
+    cache = StatsCache()
+    compute, calls = _counter()
+
+    assert cache.get_or_compute(1, "1W", "overview", compute) == 1
+    assert cache.get_or_compute(1, "1W", "overview", compute) == 1
+    assert cache.get_or_compute(1, "1M", "overview", compute) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_lru_bounds_overall_and_per_user():
+    cache = StatsCache(max_entries=4, max_per_user=2)
+    compute, _ = _counter()
+
+    for period in ["1D", "1W", "1M"]:
+        cache.get_or_compute(1, period, "overview", compute)
+    assert len(cache) == 2
+    # User 1's oldest entry went first
+    cache.get_or_compute(1, "1D", "overview", compute)
+    assert cache.misses == 4
+
+    for user_id in [2, 3, 4]:
+        cache.get_or_compute(user_id, "1W", "overview", compute)
+    assert len(cache) == 4
+
+
+def test_invalidation_and_ttl():
+    cache = StatsCache(ttl=0)
+    compute, calls = _counter()
+    cache.get_or_compute(1, "1W", "overview", compute)
+    cache.get_or_compute(1, "1W", "overview", compute)
+    assert len(calls) == 2
+
+    cache = StatsCache()
+    cache.get_or_compute(1, "1W", "overview", compute)
+    cache.get_or_compute(2, "1W", "overview", compute)
+    cache.invalidate_user(1)
+    assert len(cache) == 1
+
+
+def test_result_computed_across_an_invalidation_is_not_stored():
+    cache = StatsCache()
+
+    def compute():
+        # An expense write lands while this result is being computed
+        cache.invalidate_user(1)
+        return "stale"
+
+    cache.get_or_compute(1, "1W", "overview", compute)
+    assert len(cache) == 0
+
+
+@pytest.fixture(params=["local", "server"])
+def temp_db(request, temp_db, monkeypatch):
+    """The shared throwaway database, in each storage mode."""
+    monkeypatch.setattr(db, "DB_MODE", request.param)
+    return temp_db
+
+
+def test_expense_writes_invalidate(user):
+    cache = stats_cache.get_stats_cache()
+    compute, _ = _counter()
+
+    def cached():
+        return cache.get_or_compute(user, "1W", "overview", compute)
+
+    cached()
+    expense_id = db.insert_expense(user, 5.0, "Food", "", "2025-01-01")
+    assert cached() == 2
+    db.update_expense_row(expense_id, user, 6.0, "Food", "", "2025-01-01")
+    assert cached() == 3
+    db.delete_expense_row(expense_id, user_id=user)
+    assert cached() == 4
+    assert cached() == 4
+
+
+def test_rollup_rebuild_invalidates(user):
+    cache = stats_cache.get_stats_cache()
+    compute, _ = _counter()
+
+    assert cache.get_or_compute(user, "1W", "overview", compute) == 1
+    db.rebuild_expense_rollups()
+    assert cache.get_or_compute(user, "1W", "overview", compute) == 2
+
+
+def test_period_toggle_is_served_from_cache(user):
+    statistics = pytest.importorskip("utils.statistics")
+    db.insert_expense(user, 5.0, "Food", "", "2025-01-01")
+
+    first = {p: statistics.compute_statistics(user, p) for p in ["1W", "1M", "1Y"]}
+    statements = []
+    with db.session():
+        conn = db.get_pool()._local.conn
+        conn.set_trace_callback(statements.append)
+        try:
+            again = {p: statistics.compute_statistics(user, p) for p in ["1W", "1M", "1Y"]}
+        finally:
+            conn.set_trace_callback(None)
+
+    assert again == first
+    assert not [s for s in statements if s.lstrip().upper().startswith("SELECT")]